@@ -259,8 +259,11 @@ class TopologyClientV1_0(RyuClientBase):
     # /topology/switches/{dpid}
     # /topology/links
     # /topology/links/{dpid}
+    # /topology/hosts
+    # /topology/hosts/{dpid}
     _path_switches = 'topology/switches'
     _path_links = 'topology/links'
+    _path_hosts = 'topology/hosts'
 
     def __init__(self, address):
         super(TopologyClientV1_0, self).__init__(self.version, address)
@@ -282,5 +285,13 @@ class TopologyClientV1_0(RyuClientBase):
             uri += '/%s' % (dpid)
         return self._do_request('GET', uri)
 
+    # dpid: string representation (see ryu.lib.dpid)
+    #       if None, get all
+    def list_hosts(self, dpid=None):
+        uri = self._path_hosts
+        if dpid:
+            uri += '/%s' % (dpid)
+        return self._do_request('GET', uri)
+
 
 TopologyClient = TopologyClientV1_0
@@ -157,6 +157,7 @@ var topo = {
             console.log("delete switch: " + JSON.stringify(nodes[i]));
 
             node_index = this.get_node_index(nodes[i]);
+            if (node_index == null) continue;
             this.nodes.splice(node_index, 1);
         }
         this.refresh_node_index();
@@ -167,6 +168,7 @@ var topo = {
             console.log("delete link: " + JSON.stringify(links[i]));
 
             link_index = this.get_link_index(links[i]);
+            if (link_index == null) continue;
             this.links.splice(link_index, 1);
         }
     },
@@ -234,48 +236,25 @@ var topo = {
     },
 }
 
+// the whole topology is sent by event_topology_snapshot on connection,
+// then its changes by event_topology_update
 var rpc = {
-    event_switch_enter: function (params) {
-        var switches = [];
-        for(var i=0; i < params.length; i++){
-            switches.push({"dpid":params[i].dpid,"ports":params[i].ports});
-        }
-        topo.add_nodes(switches);
-        elem.update();
-        return "";
-    },
-    event_switch_leave: function (params) {
-        var switches = [];
-        for(var i=0; i < params.length; i++){
-            switches.push({"dpid":params[i].dpid,"ports":params[i].ports});
-        }
-        topo.delete_nodes(switches);
-        elem.update();
-        return "";
-    },
-    event_link_add: function (links) {
-        topo.add_links(links);
+    event_topology_snapshot: function (params) {
+        topo.nodes = [];
+        topo.links = [];
+        topo.initialize({switches: params[0].switches,
+                         links: params[0].links});
         elem.update();
         return "";
     },
-    event_link_delete: function (links) {
-        topo.delete_links(links);
+    event_topology_update: function (params) {
+        var switches = params[0].switches;
+        var links = params[0].links;
+        topo.delete_links(links["delete"]);
+        topo.delete_nodes(switches["delete"]);
+        topo.add_nodes(switches.add);
+        topo.add_links(links.add);
         elem.update();
         return "";
     },
 }
-
-function initialize_topology() {
-    d3.json("/v1.0/topology/switches", function(error, switches) {
-        d3.json("/v1.0/topology/links", function(error, links) {
-            topo.initialize({switches: switches, links: links});
-            elem.update();
-        });
-    });
-}
-
-function main() {
-    initialize_topology();
-}
-
-main();
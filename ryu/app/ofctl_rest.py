@@ -17,8 +17,11 @@ import logging
 
 import json
 import ast
+import time
 from webob import Response
 
+from ryu import cfg
+from ryu import exception
 from ryu.base import app_manager
 from ryu.controller import ofp_event
 from ryu.controller import dpset
@@ -27,6 +30,7 @@ from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_0
 from ryu.ofproto import ofproto_v1_2
 from ryu.ofproto import ofproto_v1_3
+from ryu.lib import hub
 from ryu.lib import ofctl_v1_0
 from ryu.lib import ofctl_v1_2
 from ryu.lib import ofctl_v1_3
@@ -35,6 +39,17 @@ from ryu.app.wsgi import ControllerBase, WSGIApplication
 
 LOG = logging.getLogger('ryu.app.ofctl_rest')
 
+CONF = cfg.CONF
+CONF.register_cli_opts([
+    cfg.FloatOpt('ofctl-rest-timeout', default=3.0,
+                 help='ofctl_rest: per switch timeout in seconds of the '
+                      'multi switch stats requests'),
+    cfg.FloatOpt('ofctl-rest-cache-ttl', default=0.0,
+                 help='ofctl_rest: lifetime in seconds of cached stats '
+                      'replies of the multi switch requests '
+                      '(0 disables the cache)')
+])
+
 # REST API
 #
 
@@ -75,6 +90,19 @@ LOG = logging.getLogger('ryu.app.ofctl_rest')
 #
 # get ports description of the switch
 # GET /stats/portdesc/<dpid>
+#
+# get the stats of several switches at once
+# GET /stats/multi/<stats>/<dpid>[,<dpid>...]
+#
+# get the stats of all the switches
+# GET /stats/all/<stats>
+#
+# <stats> is one of desc, flow, port, portdesc, meter, meterconfig,
+# meterfeatures, group, groupdesc and groupfeatures.
+# The requests are sent to the switches concurrently.  A switch which
+# does not answer in time or fails is reported in "errors" while the
+# results of the other switches are still returned.
+# For flow stats, the filter can be given as a POST body.
 
 # Update the switch stats
 #
@@ -122,11 +150,143 @@ LOG = logging.getLogger('ryu.app.ofctl_rest')
 # POST /stats/experimenter/<dpid>
 
 
+_OFCTL = {
+    ofproto_v1_0.OFP_VERSION: ofctl_v1_0,
+    ofproto_v1_2.OFP_VERSION: ofctl_v1_2,
+    ofproto_v1_3.OFP_VERSION: ofctl_v1_3,
+}
+
+# stats name in URI -> ofctl function name
+_STATS_FUNCS = {
+    'desc': 'get_desc_stats',
+    'flow': 'get_flow_stats',
+    'port': 'get_port_stats',
+    'portdesc': 'get_port_desc',
+    'meter': 'get_meter_stats',
+    'meterconfig': 'get_meter_config',
+    'meterfeatures': 'get_meter_features',
+    'group': 'get_group_stats',
+    'groupdesc': 'get_group_desc',
+    'groupfeatures': 'get_group_features',
+}
+
+
+class StatsCache(object):
+    """Short-lived cache of stats replies.
+
+    Keyed by (dpid, stats name, filter).  Entries older than ttl seconds
+    are never returned.
+    """
+
+    def __init__(self, ttl):
+        super(StatsCache, self).__init__()
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expire, value = entry
+        if expire < time.time():
+            del self._entries[key]
+            return None
+        return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        # drop expired entries so that the cache doesn't keep growing
+        # with keys which are never requested again.
+        for k, (expire, _v) in self._entries.items():
+            if expire < now:
+                del self._entries[k]
+        self._entries[key] = (now + self.ttl, value)
+
+
 class StatsController(ControllerBase):
     def __init__(self, req, link, data, **config):
         super(StatsController, self).__init__(req, link, data, **config)
         self.dpset = data['dpset']
         self.waiters = data['waiters']
+        self.cache = data['cache']
+        self.timeout = data['timeout']
+
+    def _get_multi_stats(self, dps, stats, flow):
+        func_name = _STATS_FUNCS[stats]
+        if stats == 'flow':
+            args = (flow,)
+            filter_ = repr(sorted(flow.items()))
+        else:
+            args = ()
+            filter_ = None
+
+        results = {}
+        errors = {}
+
+        def _get_stats(dp):
+            dpid = str(dp.id)
+            key = (dp.id, stats, filter_)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[dpid] = cached
+                return
+
+            func = getattr(_OFCTL.get(dp.ofproto.OFP_VERSION), func_name,
+                           None)
+            if func is None:
+                errors[dpid] = 'not supported in this OF protocol version'
+                return
+            try:
+                result = func(dp, self.waiters, *args,
+                              timeout=self.timeout)[dpid]
+            except exception.OFPStatsTimeout:
+                errors[dpid] = 'timeout'
+            except Exception as e:
+                LOG.debug('failed to get %s stats of %s: %s', stats, dpid, e)
+                errors[dpid] = str(e)
+            else:
+                results[dpid] = result
+                self.cache.set(key, result)
+
+        threads = [hub.spawn(_get_stats, dp) for dp in dps]
+        hub.joinall(threads)
+        return {'stats': results, 'errors': errors}
+
+    def _multi_stats_response(self, req, dps, stats):
+        if stats not in _STATS_FUNCS:
+            return Response(status=404)
+
+        flow = {}
+        if stats == 'flow' and req.body != '':
+            try:
+                flow = ast.literal_eval(req.body)
+            except SyntaxError:
+                LOG.debug('invalid syntax %s', req.body)
+                return Response(status=400)
+
+        body = json.dumps(self._get_multi_stats(dps, stats, flow))
+        return Response(content_type='application/json', body=body)
+
+    def get_multi_stats(self, req, stats, dpids, **_kwargs):
+        try:
+            dpids = [int(dpid) for dpid in dpids.split(',')]
+        except ValueError:
+            return Response(status=400)
+
+        dps = []
+        for dpid in dpids:
+            dp = self.dpset.get(dpid)
+            if dp is None:
+                return Response(status=404)
+            dps.append(dp)
+
+        return self._multi_stats_response(req, dps, stats)
+
+    def get_all_stats(self, req, stats, **_kwargs):
+        dps = self.dpset.dps.values()
+        return self._multi_stats_response(req, dps, stats)
 
     def get_dpids(self, req, **_kwargs):
         dps = self.dpset.dps.keys()
@@ -532,6 +692,8 @@ class RestStatsApi(app_manager.RyuApp):
         self.data = {}
         self.data['dpset'] = self.dpset
         self.data['waiters'] = self.waiters
+        self.data['cache'] = StatsCache(self.CONF.ofctl_rest_cache_ttl)
+        self.data['timeout'] = self.CONF.ofctl_rest_timeout
         mapper = wsgi.mapper
 
         wsgi.registory['StatsController'] = self.data
@@ -541,6 +703,16 @@ class RestStatsApi(app_manager.RyuApp):
                        controller=StatsController, action='get_dpids',
                        conditions=dict(method=['GET']))
 
+        uri = path + '/multi/{stats}/{dpids}'
+        mapper.connect('stats', uri,
+                       controller=StatsController, action='get_multi_stats',
+                       conditions=dict(method=['GET', 'POST']))
+
+        uri = path + '/all/{stats}'
+        mapper.connect('stats', uri,
+                       controller=StatsController, action='get_all_stats',
+                       conditions=dict(method=['GET', 'POST']))
+
         uri = path + '/desc/{dpid}'
         mapper.connect('stats', uri,
                        controller=StatsController, action='get_desc_stats',
@@ -17,6 +17,7 @@
 import logging
 import json
 
+import netaddr
 from webob import Response
 
 from ryu.app.wsgi import ControllerBase
@@ -26,13 +27,15 @@ from ryu.controller import ofp_event
 from ryu.controller import dpset
 from ryu.controller.handler import MAIN_DISPATCHER
 from ryu.controller.handler import set_ev_cls
+from ryu.exception import OFPBarrierTimeout
+from ryu.exception import OFPStatsTimeout
 from ryu.exception import OFPUnknownVersion
+from ryu.lib import hub
 from ryu.lib import mac
 from ryu.lib import dpid as dpid_lib
 from ryu.lib import ofctl_v1_0
 from ryu.lib import ofctl_v1_2
 from ryu.lib import ofctl_v1_3
-from ryu.lib.packet import packet
 from ryu.ofproto import ether
 from ryu.ofproto import inet
 from ryu.ofproto import ofproto_v1_0
@@ -139,6 +142,35 @@ from ryu.ofproto import ofproto_v1_3_parser
 #     <field>  : <value>
 #    "rule_id" : "<int>" or "all"
 #
+#
+# import rules to the firewall switches at once
+# * for no vlan
+# POST /firewall/rules/{switch-id}/import
+#
+# * for specific vlan group
+# POST /firewall/rules/{switch-id}/{vlan-id}/import
+#
+#  request body format:
+#   [{"<field1>":"<value1>", "<field2>":"<value2>",...}, ...]
+#
+#   Note: Each rule is in the same format as setting a rule.
+#         No rule is set if any of them is invalid.
+#
+#
+# export rules of the firewall switches in the import format
+# * for no vlan
+# GET /firewall/rules/{switch-id}/export
+#
+# * for specific vlan group
+# GET /firewall/rules/{switch-id}/{vlan-id}/export
+#
+#
+#   Note: The rules are kept by the controller, so getting and deleting
+#         rules don't query the switches.
+#
+#   Note: A rule is refused if a rule of the same or a higher priority
+#         already matches all the packets it matches (shadowing).
+#
 
 
 SWITCHID_PATTERN = dpid_lib.DPID_PATTERN + r'|all'
@@ -194,6 +226,11 @@ VLANID_MIN = 2
 VLANID_MAX = 4094
 COOKIE_SHIFT_VLANID = 32
 
+# a barrier request is sent after every FLOW_MOD_BATCH FlowMods
+FLOW_MOD_BATCH = 1000
+# seconds to wait for the flow stats of the switch and for each barrier reply
+REPLY_TIMEOUT = 5.0
+
 
 class RestFirewallAPI(app_manager.RyuApp):
 
@@ -293,6 +330,31 @@ class RestFirewallAPI(app_manager.RyuApp):
                        conditions=dict(method=['DELETE']),
                        requirements=requirements)
 
+        # for bulk import/export
+        uri = path + '/rules/{switchid}/import'
+        mapper.connect('firewall', uri, controller=FirewallController,
+                       action='import_rules',
+                       conditions=dict(method=['POST']),
+                       requirements=requirements)
+
+        uri = path + '/rules/{switchid}/{vlanid}/import'
+        mapper.connect('firewall', uri, controller=FirewallController,
+                       action='import_vlan_rules',
+                       conditions=dict(method=['POST']),
+                       requirements=requirements)
+
+        uri = path + '/rules/{switchid}/export'
+        mapper.connect('firewall', uri, controller=FirewallController,
+                       action='export_rules',
+                       conditions=dict(method=['GET']),
+                       requirements=requirements)
+
+        uri = path + '/rules/{switchid}/{vlanid}/export'
+        mapper.connect('firewall', uri, controller=FirewallController,
+                       action='export_vlan_rules',
+                       conditions=dict(method=['GET']),
+                       requirements=requirements)
+
     def stats_reply_handler(self, ev):
         msg = ev.msg
         dp = msg.datapath
@@ -316,6 +378,31 @@ class RestFirewallAPI(app_manager.RyuApp):
         del self.waiters[dp.id][msg.xid]
         lock.set()
 
+    @set_ev_cls(ofp_event.EventOFPBarrierReply, MAIN_DISPATCHER)
+    def barrier_reply_handler(self, ev):
+        msg = ev.msg
+        dp = msg.datapath
+
+        waiter = self.waiters.get(dp.id, {}).pop(msg.xid, None)
+        if waiter is None:
+            return
+        lock, msgs = waiter
+        msgs.append(msg)
+        lock.set()
+
+    @set_ev_cls(ofp_event.EventOFPErrorMsg, MAIN_DISPATCHER)
+    def error_msg_handler(self, ev):
+        msg = ev.msg
+        dp = msg.datapath
+
+        waiter = self.waiters.get(dp.id, {}).get(msg.xid)
+        # the FlowMods of a batch have no lock of their own, they are
+        # waited for with the lock of the barrier closing the batch
+        if waiter is None or waiter[0] is not None:
+            return
+        _lock, msgs = waiter
+        msgs.append(msg)
+
     @set_ev_cls(dpset.EventDP, dpset.DPSET_EV_DISPATCHER)
     def handler_datapath(self, ev):
         if ev.enter:
@@ -445,7 +532,10 @@ class FirewallController(ControllerBase):
         msgs = []
         for f_ofs in dps.values():
             function = getattr(f_ofs, func)
-            msg = function() if waiters is None else function(waiters)
+            try:
+                msg = function() if waiters is None else function(waiters)
+            except (OFPStatsTimeout, OFPBarrierTimeout), message:
+                return Response(status=500, body=str(message))
             msgs.append(msg)
 
         body = json.dumps(msgs)
@@ -475,7 +565,25 @@ class FirewallController(ControllerBase):
     def delete_vlan_rule(self, req, switchid, vlanid, **_kwargs):
         return self._delete_rule(req, switchid, vlan_id=vlanid)
 
-    def _get_rules(self, switchid, vlan_id=VLANID_NONE):
+    # POST /firewall/rules/{switchid}/import
+    def import_rules(self, req, switchid, **_kwargs):
+        return self._set_rule(req, switchid, func='import_rules')
+
+    # POST /firewall/rules/{switchid}/{vlanid}/import
+    def import_vlan_rules(self, req, switchid, vlanid, **_kwargs):
+        return self._set_rule(req, switchid, vlan_id=vlanid,
+                              func='import_rules')
+
+    # GET /firewall/rules/{switchid}/export
+    def export_rules(self, req, switchid, **_kwargs):
+        return self._get_rules(switchid, func='export_rules')
+
+    # GET /firewall/rules/{switchid}/{vlanid}/export
+    def export_vlan_rules(self, req, switchid, vlanid, **_kwargs):
+        return self._get_rules(switchid, vlan_id=vlanid,
+                               func='export_rules')
+
+    def _get_rules(self, switchid, vlan_id=VLANID_NONE, func='get_rules'):
         try:
             dps = self._OFS_LIST.get_ofs(switchid)
             vid = FirewallController._conv_toint_vlanid(vlan_id)
@@ -484,13 +592,16 @@ class FirewallController(ControllerBase):
 
         msgs = []
         for f_ofs in dps.values():
-            rules = f_ofs.get_rules(self.waiters, vid)
+            try:
+                rules = getattr(f_ofs, func)(self.waiters, vid)
+            except OFPStatsTimeout, message:
+                return Response(status=500, body=str(message))
             msgs.append(rules)
 
         body = json.dumps(msgs)
         return Response(content_type='application/json', body=body)
 
-    def _set_rule(self, req, switchid, vlan_id=VLANID_NONE):
+    def _set_rule(self, req, switchid, vlan_id=VLANID_NONE, func='set_rule'):
         try:
             rule = json.loads(req.body)
         except SyntaxError:
@@ -506,10 +617,12 @@ class FirewallController(ControllerBase):
         msgs = []
         for f_ofs in dps.values():
             try:
-                msg = f_ofs.set_rule(rule, self.waiters, vid)
+                msg = getattr(f_ofs, func)(rule, self.waiters, vid)
                 msgs.append(msg)
             except ValueError, message:
                 return Response(status=400, body=str(message))
+            except (OFPStatsTimeout, OFPBarrierTimeout), message:
+                return Response(status=500, body=str(message))
 
         body = json.dumps(msgs)
         return Response(content_type='application/json', body=body)
@@ -534,6 +647,8 @@ class FirewallController(ControllerBase):
                 msgs.append(msg)
             except ValueError, message:
                 return Response(status=400, body=str(message))
+            except (OFPStatsTimeout, OFPBarrierTimeout), message:
+                return Response(status=500, body=str(message))
 
         body = json.dumps(msgs)
         return Response(content_type='application/json', body=body)
@@ -551,12 +666,127 @@ class FirewallController(ControllerBase):
 
     @staticmethod
     def packet_in_handler(msg):
-        pkt = packet.Packet(msg.data)
+        pkt = msg.packet
         dpid_str = dpid_lib.dpid_to_str(msg.datapath.id)
         FirewallController._LOGGER.info('dpid=%s: Blocked packet = %s',
                                         dpid_str, pkt)
 
 
+class _MsgCollector(object):
+    # stands for a datapath in ofctl calls to get the messages built
+    # by ofctl instead of sending them.
+    def __init__(self, dp):
+        super(_MsgCollector, self).__init__()
+        self.dp = dp
+        self.msgs = []
+
+    def __getattr__(self, name):
+        return getattr(self.dp, name)
+
+    def send_msg(self, msg):
+        msg.datapath = self.dp
+        self.msgs.append(msg)
+
+
+class RuleCache(object):
+    """Controller side copy of the ACL rules of a switch.
+
+    The rules are kept in the flow stats format of ofctl and indexed by
+    cookie, i.e. by VLAN id and rule id.  They are also grouped by the
+    fields they match, so that the rules shadowing a new rule are found
+    without comparing it with every rule of the switch.
+    """
+
+    _IP_FIELDS = (REST_SRC_IP, REST_DST_IP, REST_SRC_IPV6, REST_DST_IPV6)
+
+    def __init__(self):
+        super(RuleCache, self).__init__()
+        self._flows = {}    # vlan_id -> {cookie: flow}
+        # vlan_id -> {fields: {values of the non IP fields:
+        #                      {cookie: (priority, IP networks)}}}
+        self._groups = {}
+
+    def __len__(self):
+        return sum(len(flows) for flows in self._flows.itervalues())
+
+    def __contains__(self, cookie):
+        return cookie in self._flows.get(self.vlan_id(cookie), {})
+
+    @staticmethod
+    def vlan_id(cookie):
+        return cookie >> COOKIE_SHIFT_VLANID
+
+    def vlan_ids(self):
+        return self._flows.keys()
+
+    def get_flows(self, vlan_id):
+        if vlan_id == REST_ALL:
+            vlan_ids = sorted(self._flows)
+        else:
+            vlan_ids = [vlan_id]
+        flows = []
+        for vid in vlan_ids:
+            vlan_flows = self._flows.get(vid, {})
+            flows.extend(vlan_flows[cookie] for cookie in sorted(vlan_flows))
+        return flows
+
+    def _key(self, flow):
+        match = Match.to_mod_openflow(flow[REST_MATCH])
+        match.pop(REST_DL_VLAN, None)
+        fields = frozenset(match)
+        values = tuple(sorted((k, v) for k, v in match.items()
+                              if k not in self._IP_FIELDS))
+        nets = dict((k, netaddr.IPNetwork(v)) for k, v in match.items()
+                    if k in self._IP_FIELDS)
+        return fields, values, nets
+
+    def find_shadow(self, flow):
+        """Return the rule matching every packet the given rule matches
+        with the same or a higher priority, None if there is none.
+        """
+        vlan_id = self.vlan_id(flow[REST_COOKIE])
+        priority = flow[REST_PRIORITY]
+        fields, values, nets = self._key(flow)
+        for group_fields, group in self._groups.get(vlan_id, {}).items():
+            if not group_fields <= fields:
+                continue
+            # the rules of the group match the same non IP values
+            group_values = tuple((k, v) for k, v in values
+                                 if k in group_fields)
+            for cookie, (prio, group_nets) in group.get(group_values,
+                                                        {}).items():
+                if prio < priority:
+                    continue
+                if all(nets[k] in net for k, net in group_nets.items()):
+                    return self._flows[vlan_id][cookie]
+        return None
+
+    def add(self, flow):
+        cookie = flow[REST_COOKIE]
+        vlan_id = self.vlan_id(cookie)
+        fields, values, nets = self._key(flow)
+        self._flows.setdefault(vlan_id, {})[cookie] = flow
+        group = self._groups.setdefault(vlan_id, {}).setdefault(fields, {})
+        group.setdefault(values, {})[cookie] = (flow[REST_PRIORITY], nets)
+
+    def remove(self, cookie):
+        vlan_id = self.vlan_id(cookie)
+        flow = self._flows[vlan_id].pop(cookie)
+        if not self._flows[vlan_id]:
+            del self._flows[vlan_id]
+        fields, values, _nets = self._key(flow)
+        groups = self._groups[vlan_id]
+        group = groups[fields]
+        del group[values][cookie]
+        if not group[values]:
+            del group[values]
+        if not group:
+            del groups[fields]
+        if not groups:
+            del self._groups[vlan_id]
+        return flow
+
+
 class Firewall(object):
 
     _OFCTL = {ofproto_v1_0.OFP_VERSION: ofctl_v1_0,
@@ -568,6 +798,8 @@ class Firewall(object):
         self.vlan_list = {}
         self.vlan_list[VLANID_NONE] = 0  # for VLAN=None
         self.dp = dp
+        self.rules = None   # RuleCache, loaded from the switch on demand
+        self.log_enabled = False
         version = dp.ofproto.OFP_VERSION
 
         if version not in self._OFCTL:
@@ -601,6 +833,110 @@ class Firewall(object):
     def _cookie_to_ruleid(cookie):
         return cookie & ofproto_v1_3_parser.UINT32_MAX
 
+    @staticmethod
+    def _is_acl_flow(flow):
+        return (ACL_FLOW_PRIORITY_MIN <= flow[REST_PRIORITY]
+                <= ACL_FLOW_PRIORITY_MAX)
+
+    def _get_rule_cache(self, waiters):
+        # the cache is built from a complete flow stats reply only, a
+        # partial one raises OFPStatsTimeout and leaves it unloaded
+        if self.rules is None:
+            rules = RuleCache()
+            msgs = self.ofctl.get_flow_stats(self.dp, waiters,
+                                             timeout=REPLY_TIMEOUT)
+            for flow_stat in msgs.get(str(self.dp.id), []):
+                if not Firewall._is_acl_flow(flow_stat):
+                    continue
+                cookie = flow_stat[REST_COOKIE]
+                rules.add(Firewall._to_cache_flow(
+                    cookie, flow_stat[REST_PRIORITY], flow_stat[REST_MATCH],
+                    flow_stat[REST_ACTION]))
+                # don't give the rule ids in use to new rules
+                vid = RuleCache.vlan_id(cookie)
+                self.vlan_list[vid] = max(self.vlan_list.get(vid, 0),
+                                          Firewall._cookie_to_ruleid(cookie))
+            self.rules = rules
+        return self.rules
+
+    @staticmethod
+    def _to_cache_flow(cookie, priority, match, actions):
+        match = dict(match)
+        for key in (REST_SRC_IP, REST_DST_IP):
+            # OpenFlow 1.0 reports a wildcarded address with a negative
+            # prefix length
+            ip, _sep, length = str(match.get(key, '')).partition('/')
+            if length.startswith('-'):
+                match[key] = ip
+        return {REST_COOKIE: cookie,
+                REST_PRIORITY: priority,
+                REST_MATCH: match,
+                REST_ACTION: actions}
+
+    def _to_flow_mod(self, flow, cmd):
+        collector = _MsgCollector(self.dp)
+        self.ofctl.mod_flow_entry(collector, flow, cmd)
+        return collector.msgs[0]
+
+    def _to_flow_stat(self, flow_mod):
+        # the rule as it is reported by the flow stats of the switch
+        if self.dp.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
+            actions = self.ofctl.actions_to_str(flow_mod.actions)
+        else:
+            actions = self.ofctl.actions_to_str(flow_mod.instructions)
+        return Firewall._to_cache_flow(
+            flow_mod.cookie, flow_mod.priority,
+            self.ofctl.match_to_str(flow_mod.match), actions)
+
+    def _send_flow_mods(self, flow_mods, waiters=None):
+        """Sends the FlowMods pipelined, with a barrier after each batch.
+
+        With waiters, waits for the reply to each barrier and returns the
+        FlowMods the switch answered with an error.  If a barrier isn't
+        replied to in time, the state of the switch is unknown: the rule
+        cache is dropped and OFPBarrierTimeout is raised.
+        """
+        parser = self.dp.ofproto_parser
+        refused = set()
+        for i in range(0, len(flow_mods), FLOW_MOD_BATCH):
+            batch = flow_mods[i:i + FLOW_MOD_BATCH]
+            barrier = parser.OFPBarrierRequest(self.dp)
+            msgs = batch + [barrier]
+            if waiters is None:
+                self.dp.send_msgs(msgs)
+                continue
+
+            for msg in msgs:
+                self.dp.set_xid(msg)
+            waiters_per_dp = waiters.setdefault(self.dp.id, {})
+            lock = hub.Event()
+            replies = []
+            for flow_mod in batch:
+                waiters_per_dp[flow_mod.xid] = (None, replies)
+            waiters_per_dp[barrier.xid] = (lock, replies)
+            try:
+                self.dp.send_msgs(msgs)
+                lock.wait(timeout=REPLY_TIMEOUT)
+            finally:
+                for msg in msgs:
+                    waiters_per_dp.pop(msg.xid, None)
+            if not lock.is_set():
+                self.rules = None
+                raise OFPBarrierTimeout(dpid=self.dp.id,
+                                        timeout=REPLY_TIMEOUT)
+
+            errors = set(msg.xid for msg in replies
+                         if isinstance(msg, parser.OFPErrorMsg))
+            refused.update(flow_mod for flow_mod in batch
+                           if flow_mod.xid in errors)
+        return refused
+
+    @staticmethod
+    def _ids_to_str(ids):
+        if len(ids) > 1 and ids == range(ids[0], ids[-1] + 1):
+            return '%d-%d' % (ids[0], ids[-1])
+        return ','.join('%d' % rule_id for rule_id in ids)
+
     # REST command template
     def rest_command(func):
         def _rest_command(*args, **kwargs):
@@ -612,7 +948,8 @@ class Firewall(object):
 
     @rest_command
     def get_status(self, waiters):
-        msgs = self.ofctl.get_flow_stats(self.dp, waiters)
+        msgs = self.ofctl.get_flow_stats(self.dp, waiters,
+                                         timeout=REPLY_TIMEOUT)
 
         status = REST_STATUS_ENABLE
         if str(self.dp.id) in msgs:
@@ -657,7 +994,8 @@ class Firewall(object):
 
     @rest_command
     def get_log_status(self, waiters):
-        msgs = self.ofctl.get_flow_stats(self.dp, waiters)
+        msgs = self.ofctl.get_flow_stats(self.dp, waiters,
+                                         timeout=REPLY_TIMEOUT)
 
         status = REST_STATUS_DISABLE
         if str(self.dp.id) in msgs:
@@ -688,30 +1026,37 @@ class Firewall(object):
 
         cmd = self.dp.ofproto.OFPFC_ADD
 
-        if waiters:
-            msgs = self.ofctl.get_flow_stats(self.dp, waiters)
-
-            if str(self.dp.id) in msgs:
-                flow_stats = msgs[str(self.dp.id)]
-                for flow_stat in flow_stats:
-                    priority = flow_stat[REST_PRIORITY]
-                    if (priority == STATUS_FLOW_PRIORITY
-                            or priority == ARP_FLOW_PRIORITY):
-                        continue
-                    action = flow_stat[REST_ACTION]
-                    if action == ['OUTPUT:%d' % self.dp.ofproto.OFPP_NORMAL]:
-                        continue
-
-                    cookie = flow_stat[REST_COOKIE]
-                    match = Match.to_mod_openflow(flow_stat[REST_MATCH])
-                    flow = self._to_of_flow(cookie=cookie, priority=priority,
-                                            match=match, actions=actions)
-                    self.ofctl.mod_flow_entry(self.dp, flow, cmd)
-        else:
-            # Initialize.
-            flow = self._to_of_flow(cookie=0, priority=LOG_FLOW_PRIORITY,
-                                    match={}, actions=actions)
-            self.ofctl.mod_flow_entry(self.dp, flow, cmd)
+        flow = self._to_of_flow(cookie=0, priority=LOG_FLOW_PRIORITY,
+                                match={}, actions=actions)
+        log_flow_mod = self._to_flow_mod(flow, cmd)
+        flow_mods = [log_flow_mod]
+        updates = []
+
+        rules = self._get_rule_cache(waiters) if waiters else self.rules
+        if rules is not None:
+            action_allow = ['OUTPUT:%d' % self.dp.ofproto.OFPP_NORMAL]
+            for flow_stat in rules.get_flows(REST_ALL):
+                if flow_stat[REST_ACTION] == action_allow:
+                    continue
+                match = Match.to_mod_openflow(flow_stat[REST_MATCH])
+                flow = self._to_of_flow(cookie=flow_stat[REST_COOKIE],
+                                        priority=flow_stat[REST_PRIORITY],
+                                        match=match, actions=actions)
+                flow_mod = self._to_flow_mod(flow, cmd)
+                updates.append((flow_stat, flow_mod))
+                flow_mods.append(flow_mod)
+
+        refused = self._send_flow_mods(flow_mods, waiters)
+        # the rules keep their actions where the switch refused the change
+        for flow_stat, flow_mod in updates:
+            if flow_mod not in refused:
+                flow_stat[REST_ACTION] = \
+                    self._to_flow_stat(flow_mod)[REST_ACTION]
+        if log_flow_mod in refused:
+            msg = {'result': 'failure',
+                   'details': 'Log flow refused by the switch.'}
+            return REST_COMMAND_RESULT, msg
+        self.log_enabled = is_enable
 
         msg = {'result': 'success',
                'details': details}
@@ -732,13 +1077,88 @@ class Firewall(object):
     @rest_command
     def set_rule(self, rest, waiters, vlan_id):
         msgs = []
-        cookie_list = self._get_cookie(vlan_id)
-        for cookie, vid in cookie_list:
-            msg = self._set_rule(cookie, rest, waiters, vid)
+        added, refused = self._add_rules([rest], waiters, vlan_id)
+        for vid, rule_id in added:
+            msg = {'result': 'success',
+                   'details': 'Rule added. : rule_id=%d' % rule_id}
+            if vid != VLANID_NONE:
+                msg.setdefault(REST_VLANID, vid)
             msgs.append(msg)
+        for vid, rule_id in refused:
+            msg = {'result': 'failure',
+                   'details': 'Rule refused by the switch. : '
+                              'rule_id=%d' % rule_id}
+            if vid != VLANID_NONE:
+                msg.setdefault(REST_VLANID, vid)
+            msgs.append(msg)
+        return REST_COMMAND_RESULT, msgs
+
+    @rest_command
+    def import_rules(self, rests, waiters, vlan_id):
+        if not isinstance(rests, list):
+            raise ValueError('Invalid rule parameter.')
+        msgs = []
+        added, refused = self._add_rules(rests, waiters, vlan_id)
+        for result, details, rules in (
+                ('success', 'Rules added.', added),
+                ('failure', 'Rules refused by the switch.', refused)):
+            rule_ids = {}
+            for vid, rule_id in rules:
+                rule_ids.setdefault(vid, []).append(rule_id)
+            for vid, ids in sorted(rule_ids.items()):
+                msg = {'result': result,
+                       'details': '%s : rule_id=%s' % (
+                           details, Firewall._ids_to_str(ids))}
+                if vid != VLANID_NONE:
+                    msg.setdefault(REST_VLANID, vid)
+                msgs.append(msg)
         return REST_COMMAND_RESULT, msgs
 
-    def _set_rule(self, cookie, rest, waiters, vlan_id):
+    def _add_rules(self, rests, waiters, vlan_id):
+        # Check all the rules against the cache before sending any of
+        # them, a rule set is set entirely or not at all.
+        rules = self._get_rule_cache(waiters)
+        vlan_list = dict(self.vlan_list)
+        added = []
+        try:
+            for i, rest in enumerate(rests):
+                try:
+                    if not isinstance(rest, dict):
+                        raise ValueError('Invalid rule parameter.')
+                    for cookie, vid in self._get_cookie(vlan_id):
+                        flow_mod, flow_stat = self._set_rule(cookie,
+                                                             dict(rest), vid)
+                        shadow = rules.find_shadow(flow_stat)
+                        if shadow is not None:
+                            rule_id = Firewall._cookie_to_ruleid(
+                                shadow[REST_COOKIE])
+                            raise ValueError('Rule is shadowed. : '
+                                             'rule_id=%d' % rule_id)
+                        rules.add(flow_stat)
+                        added.append((vid, cookie, flow_mod))
+                except ValueError, message:
+                    if len(rests) > 1:
+                        message = 'rules[%d]: %s' % (i, message)
+                    raise ValueError(str(message))
+        except ValueError:
+            for _vid, cookie, _flow_mod in added:
+                rules.remove(cookie)
+            self.vlan_list = vlan_list
+            raise
+
+        refused = self._send_flow_mods(
+            [flow_mod for _vid, _cookie, flow_mod in added], waiters)
+
+        results = ([], [])
+        for vid, cookie, flow_mod in added:
+            is_refused = flow_mod in refused
+            if is_refused:
+                rules.remove(cookie)
+            results[is_refused].append(
+                (vid, Firewall._cookie_to_ruleid(cookie)))
+        return results
+
+    def _set_rule(self, cookie, rest, vlan_id):
         priority = int(rest.get(REST_PRIORITY, ACL_FLOW_PRIORITY_MIN))
 
         if (priority < ACL_FLOW_PRIORITY_MIN
@@ -751,8 +1171,7 @@ class Firewall(object):
 
         match = Match.to_openflow(rest)
         if rest.get(REST_ACTION) == REST_ACTION_DENY:
-            result = self.get_log_status(waiters)
-            if result[REST_LOG_STATUS] == REST_STATUS_ENABLE:
+            if self.log_enabled:
                 rest[REST_ACTION] = REST_ACTION_PACKETIN
         actions = Action.to_openflow(self.dp, rest)
         flow = self._to_of_flow(cookie=cookie, priority=priority,
@@ -760,45 +1179,44 @@ class Firewall(object):
 
         cmd = self.dp.ofproto.OFPFC_ADD
         try:
-            self.ofctl.mod_flow_entry(self.dp, flow, cmd)
+            flow_mod = self._to_flow_mod(flow, cmd)
+            flow_stat = self._to_flow_stat(flow_mod)
         except:
             raise ValueError('Invalid rule parameter.')
 
-        rule_id = Firewall._cookie_to_ruleid(cookie)
-        msg = {'result': 'success',
-               'details': 'Rule added. : rule_id=%d' % rule_id}
-
-        if vlan_id != VLANID_NONE:
-            msg.setdefault(REST_VLANID, vlan_id)
-        return msg
+        return flow_mod, flow_stat
 
     @rest_command
     def get_rules(self, waiters, vlan_id):
-        rules = {}
-        msgs = self.ofctl.get_flow_stats(self.dp, waiters)
+        return REST_ACL, self._get_rules(waiters, vlan_id)
 
-        if str(self.dp.id) in msgs:
-            flow_stats = msgs[str(self.dp.id)]
-            for flow_stat in flow_stats:
-                priority = flow_stat[REST_PRIORITY]
-                if (priority != STATUS_FLOW_PRIORITY
-                        and priority != ARP_FLOW_PRIORITY
-                        and priority != LOG_FLOW_PRIORITY):
-                    vid = flow_stat[REST_MATCH].get(REST_DL_VLAN, VLANID_NONE)
-                    if vlan_id == REST_ALL or vlan_id == vid:
-                        rule = self._to_rest_rule(flow_stat)
-                        rules.setdefault(vid, [])
-                        rules[vid].append(rule)
+    @rest_command
+    def export_rules(self, waiters, vlan_id):
+        # the rules in the format of import_rules
+        acl = self._get_rules(waiters, vlan_id)
+        for vid_data in acl:
+            for rule in vid_data[REST_RULES]:
+                del rule[REST_RULE_ID]
+                rule.pop(REST_DL_VLAN, None)
+        return REST_ACL, acl
+
+    def _get_rules(self, waiters, vlan_id):
+        rules = {}
+        for flow_stat in self._get_rule_cache(waiters).get_flows(vlan_id):
+            vid = RuleCache.vlan_id(flow_stat[REST_COOKIE])
+            rule = self._to_rest_rule(flow_stat)
+            rules.setdefault(vid, [])
+            rules[vid].append(rule)
 
         get_data = []
-        for vid, rule in rules.items():
+        for vid, rule in sorted(rules.items()):
             if vid == VLANID_NONE:
                 vid_data = {REST_RULES: rule}
             else:
                 vid_data = {REST_VLANID: vid, REST_RULES: rule}
             get_data.append(vid_data)
 
-        return REST_ACL, get_data
+        return get_data
 
     @rest_command
     def delete_rule(self, rest, waiters, vlan_id):
@@ -810,30 +1228,12 @@ class Firewall(object):
         except:
             raise ValueError('Invalid ruleID.')
 
-        vlan_list = []
+        rules = self._get_rule_cache(waiters)
         delete_list = []
-
-        msgs = self.ofctl.get_flow_stats(self.dp, waiters)
-        if str(self.dp.id) in msgs:
-            flow_stats = msgs[str(self.dp.id)]
-            for flow_stat in flow_stats:
-                cookie = flow_stat[REST_COOKIE]
-                ruleid = Firewall._cookie_to_ruleid(cookie)
-                priority = flow_stat[REST_PRIORITY]
-                dl_vlan = flow_stat[REST_MATCH].get(REST_DL_VLAN, VLANID_NONE)
-
-                if (priority != STATUS_FLOW_PRIORITY
-                        and priority != ARP_FLOW_PRIORITY
-                        and priority != LOG_FLOW_PRIORITY):
-                    if ((rule_id == REST_ALL or rule_id == ruleid) and
-                            (vlan_id == dl_vlan or vlan_id == REST_ALL)):
-                        match = Match.to_mod_openflow(flow_stat[REST_MATCH])
-                        delete_list.append([cookie, priority, match])
-                    else:
-                        if dl_vlan not in vlan_list:
-                            vlan_list.append(dl_vlan)
-
-        self._update_vlan_list(vlan_list)
+        for flow_stat in rules.get_flows(vlan_id):
+            ruleid = Firewall._cookie_to_ruleid(flow_stat[REST_COOKIE])
+            if rule_id == REST_ALL or rule_id == ruleid:
+                delete_list.append(flow_stat)
 
         if len(delete_list) == 0:
             msg_details = 'Rule is not exist.'
@@ -844,25 +1244,44 @@ class Firewall(object):
         else:
             cmd = self.dp.ofproto.OFPFC_DELETE_STRICT
             actions = []
-            delete_ids = {}
-            for cookie, priority, match in delete_list:
-                flow = self._to_of_flow(cookie=cookie, priority=priority,
+            flow_mods = []
+            for flow_stat in delete_list:
+                cookie = flow_stat[REST_COOKIE]
+                match = Match.to_mod_openflow(flow_stat[REST_MATCH])
+                flow = self._to_of_flow(cookie=cookie,
+                                        priority=flow_stat[REST_PRIORITY],
                                         match=match, actions=actions)
-                self.ofctl.mod_flow_entry(self.dp, flow, cmd)
+                flow_mods.append(self._to_flow_mod(flow, cmd))
+                rules.remove(cookie)
+            refused = self._send_flow_mods(flow_mods, waiters)
 
-                vid = match.get(REST_DL_VLAN, VLANID_NONE)
+            delete_ids = {}
+            refused_ids = {}
+            for flow_stat, flow_mod in zip(delete_list, flow_mods):
+                cookie = flow_stat[REST_COOKIE]
+                vid = RuleCache.vlan_id(cookie)
                 rule_id = Firewall._cookie_to_ruleid(cookie)
-                delete_ids.setdefault(vid, '')
-                delete_ids[vid] += (('%d' if delete_ids[vid] == ''
-                                     else ',%d') % rule_id)
+                if flow_mod in refused:
+                    # the rule is still on the switch
+                    rules.add(flow_stat)
+                    refused_ids.setdefault(vid, []).append(rule_id)
+                else:
+                    delete_ids.setdefault(vid, []).append(rule_id)
 
             msg = []
-            for vid, rule_ids in delete_ids.items():
-                del_msg = {'result': 'success',
-                           'details': 'Rule deleted. : ruleID=%s' % rule_ids}
-                if vid != VLANID_NONE:
-                    del_msg.setdefault(REST_VLANID, vid)
-                msg.append(del_msg)
+            for result, details, ids in (
+                    ('success', 'Rule deleted.', delete_ids),
+                    ('failure', 'Rule refused by the switch.', refused_ids)):
+                for vid, rule_ids in ids.items():
+                    del_msg = {'result': result,
+                               'details': '%s : ruleID=%s' % (
+                                   details, ','.join('%d' % rule_id
+                                                     for rule_id in rule_ids))}
+                    if vid != VLANID_NONE:
+                        del_msg.setdefault(REST_VLANID, vid)
+                    msg.append(del_msg)
+
+        self._update_vlan_list(rules.vlan_ids())
 
         return REST_COMMAND_RESULT, msg
 
@@ -997,7 +1416,10 @@ class Match(object):
                     raise ValueError('Unknown nw_proto: %s' % nw_proto)
 
         for key, value in rest.items():
-            if key in Match._CONVERT:
+            if key == REST_PRIORITY or key == REST_ACTION:
+                # not a match field
+                continue
+            elif key in Match._CONVERT:
                 if value in Match._CONVERT[key]:
                     match.setdefault(key, Match._CONVERT[key][value])
                 else:
@@ -96,6 +96,21 @@ from ryu.ofproto import ofproto_v1_3
 #  case2: delete routing data.
 #    parameter = {"route_id": "<int>"} or {"route_id": "all"}
 #
+
+# 4. import static routes in bulk.
+#
+# * import routes of no vlan
+# POST /router/{switch_id}/routes
+#
+# * import routes of specific vlan group
+# POST /router/{switch_id}/{vlan_id}/routes
+#
+#    parameter = [{"destination": "A.B.C.D/M", "gateway": "E.F.G.H"},
+#                 {"gateway": "E.F.G.H"}, ...]
+#    (an entry without "destination" is the default route)
+#
+#  No route is added if any of them is invalid.
+#
 #
 
 
@@ -256,6 +271,17 @@ class RestRouterAPI(app_manager.RyuApp):
                        requirements=requirements,
                        action='delete_vlan_data',
                        conditions=dict(method=['DELETE']))
+        # For bulk import of routes
+        path = '/router/{switch_id}/routes'
+        mapper.connect('router', path, controller=RouterController,
+                       requirements=requirements,
+                       action='import_routes',
+                       conditions=dict(method=['POST']))
+        path = '/router/{switch_id}/{vlan_id}/routes'
+        mapper.connect('router', path, controller=RouterController,
+                       requirements=requirements,
+                       action='import_vlan_routes',
+                       conditions=dict(method=['POST']))
 
     @set_ev_cls(dpset.EventDP, dpset.DPSET_EV_DISPATCHER)
     def datapath_handler(self, ev):
@@ -407,6 +433,18 @@ class RouterController(ControllerBase):
         return self._access_router(switch_id, vlan_id,
                                    'delete_data', req.body)
 
+    # POST /router/{switch_id}/routes
+    @rest_command
+    def import_routes(self, req, switch_id, **_kwargs):
+        return self._access_router(switch_id, VLANID_NONE,
+                                   'import_routes', req.body)
+
+    # POST /router/{switch_id}/{vlan_id}/routes
+    @rest_command
+    def import_vlan_routes(self, req, switch_id, vlan_id, **_kwargs):
+        return self._access_router(switch_id, vlan_id,
+                                   'import_routes', req.body)
+
     def _access_router(self, switch_id, vlan_id, func, rest_param):
         rest_message = []
         routers = self._get_router(switch_id)
@@ -543,6 +581,27 @@ class Router(dict):
         return {REST_SWITCHID: self.dpid_str,
                 REST_COMMAND_RESULT: msgs}
 
+    def import_routes(self, vlan_id, param, waiters):
+        vlan_routers = self._get_vlan_router(vlan_id)
+        if not vlan_routers:
+            vlan_routers = [self._add_vlan_router(vlan_id)]
+
+        msgs = []
+        for vlan_router in vlan_routers:
+            try:
+                msg = vlan_router.import_routes(param)
+                msgs.append(msg)
+                if msg[REST_RESULT] == REST_NG:
+                    # Data setting is failure.
+                    self._del_vlan_router(vlan_router.vlan_id, waiters)
+            except ValueError as err_msg:
+                # Data setting is failure.
+                self._del_vlan_router(vlan_router.vlan_id, waiters)
+                raise err_msg
+
+        return {REST_SWITCHID: self.dpid_str,
+                REST_COMMAND_RESULT: msgs}
+
     def delete_data(self, vlan_id, param, waiters):
         msgs = []
         vlan_routers = self._get_vlan_router(vlan_id)
@@ -561,7 +620,7 @@ class Router(dict):
                 REST_COMMAND_RESULT: msgs}
 
     def packet_in_handler(self, msg):
-        pkt = packet.Packet(msg.data)
+        pkt = msg.packet
         # TODO: Packet library convert to string
         # self.logger.debug('Packet in = %s', str(pkt), self.sw_id)
         header_list = dict((p.protocol_name, p)
@@ -751,7 +810,7 @@ class VlanRouter(object):
 
         return address.address_id
 
-    def _set_routing_data(self, destination, gateway):
+    def _get_gateway_address(self, gateway):
         err_msg = 'Invalid [%s] value.' % REST_GATEWAY
         dst_ip = ip_addr_aton(gateway, err_msg=err_msg)
         address = self.address_data.get_data(ip=dst_ip)
@@ -762,12 +821,56 @@ class VlanRouter(object):
             msg = 'Gateway=%s is used as default gateway of address_id=%d'\
                 % (gateway, address.address_id)
             raise CommandFailure(msg=msg)
-        else:
-            src_ip = address.default_gw
+        return address
+
+    def _set_routing_data(self, destination, gateway):
+        address = self._get_gateway_address(gateway)
+        src_ip = address.default_gw
+        route = self.routing_tbl.add(destination, gateway)
+        self._set_route_packetin(route)
+        self.send_arp_request(src_ip, route.gateway_ip)
+        return route.route_id
+
+    def import_routes(self, data):
+        if not isinstance(data, list):
+            raise ValueError('Invalid parameter.')
+
+        # Check all the routes before adding any of them.
+        routes = []
+        keys = set()
+        try:
+            for route in data:
+                if not isinstance(route, dict) or REST_GATEWAY not in route:
+                    raise ValueError('Invalid parameter.')
+                gateway = route[REST_GATEWAY]
+                destination = route.get(REST_DESTINATION, DEFAULT_ROUTE)
+                address = self._get_gateway_address(gateway)
+                key = self.routing_tbl.check(destination, gateway)[0]
+                if key in keys:
+                    msg = 'Destination overlaps [destination=%s]' % key
+                    raise CommandFailure(msg=msg)
+                keys.add(key)
+                routes.append((destination, gateway, address))
+        except CommandFailure as err_msg:
+            msg = {REST_RESULT: REST_NG, REST_DETAILS: str(err_msg)}
+            return self._response(msg)
+
+        # Resolve each gateway once for all its routes.
+        gateways = {}
+        route_ids = []
+        for destination, gateway, address in routes:
             route = self.routing_tbl.add(destination, gateway)
             self._set_route_packetin(route)
+            gateways[route.gateway_ip] = address.default_gw
+            route_ids.append(route.route_id)
+        for dst_ip, src_ip in gateways.items():
             self.send_arp_request(src_ip, dst_ip)
-            return route.route_id
+
+        details = 'Add %d routes' % len(route_ids)
+        if route_ids:
+            details += ' [route_id=%d-%d]' % (route_ids[0], route_ids[-1])
+        msg = {REST_RESULT: REST_OK, REST_DETAILS: details}
+        return self._response(msg)
 
     def _set_defaultroute_drop(self):
         cookie = self._id_to_cookie(REST_VLANID, self.vlan_id)
@@ -1163,25 +1266,24 @@ class VlanRouter(object):
         src_ip = header_list[ARP].src_ip
 
         gateway_flg = False
-        for key, value in self.routing_tbl.items():
-            if value.gateway_ip == src_ip:
-                gateway_flg = True
-                if value.gateway_mac == src_mac:
-                    continue
-                self.routing_tbl[key].gateway_mac = src_mac
-
-                cookie = self._id_to_cookie(REST_ROUTEID, value.route_id)
-                priority, log_msg = self._get_priority(PRIORITY_TYPE_ROUTE,
-                                                       route=value)
-                self.ofctl.set_routing_flow(cookie, priority, out_port,
-                                            dl_vlan=self.vlan_id,
-                                            src_mac=dst_mac,
-                                            dst_mac=src_mac,
-                                            nw_dst=value.dst_ip,
-                                            dst_mask=value.netmask,
-                                            dec_ttl=True)
-                self.logger.info('Set %s flow [cookie=0x%x]', log_msg, cookie,
-                                 extra=self.sw_id)
+        for value in self.routing_tbl.get_routes(src_ip):
+            gateway_flg = True
+            if value.gateway_mac == src_mac:
+                continue
+            value.gateway_mac = src_mac
+
+            cookie = self._id_to_cookie(REST_ROUTEID, value.route_id)
+            priority, log_msg = self._get_priority(PRIORITY_TYPE_ROUTE,
+                                                   route=value)
+            self.ofctl.set_routing_flow(cookie, priority, out_port,
+                                        dl_vlan=self.vlan_id,
+                                        src_mac=dst_mac,
+                                        dst_mac=src_mac,
+                                        nw_dst=value.dst_ip,
+                                        dst_mask=value.netmask,
+                                        dec_ttl=True)
+            self.logger.info('Set %s flow [cookie=0x%x]', log_msg, cookie,
+                             extra=self.sw_id)
         return gateway_flg
 
     def _learning_host_mac(self, msg, header_list):
@@ -1191,8 +1293,7 @@ class VlanRouter(object):
         dst_mac = self.port_data[out_port].mac
         src_ip = header_list[ARP].src_ip
 
-        gateways = self.routing_tbl.get_gateways()
-        if src_ip not in gateways:
+        if not self.routing_tbl.is_gateway(src_ip):
             address = self.address_data.get_data(ip=src_ip)
             if address is not None:
                 cookie = self._id_to_cookie(REST_ADDRESSID, address.address_id)
@@ -1315,8 +1416,13 @@ class RoutingTable(dict):
     def __init__(self):
         super(RoutingTable, self).__init__()
         self.route_id = 1
+        # binary trie on the bits of the destination for the longest
+        # prefix match.  node: [child for 0, child for 1, Route]
+        self._trie = [None, None, None]
+        self._route_ids = {}    # route_id -> key
+        self._gateways = {}     # gateway_ip -> {route_id: Route}
 
-    def add(self, dst_nw_addr, gateway_ip):
+    def check(self, dst_nw_addr, gateway_ip):
         err_msg = 'Invalid [%s] value.'
 
         if dst_nw_addr == DEFAULT_ROUTE:
@@ -1329,21 +1435,26 @@ class RoutingTable(dict):
         gateway_ip = ip_addr_aton(gateway_ip, err_msg=err_msg % REST_GATEWAY)
 
         # Check overlaps
-        overlap_route = None
         if dst_nw_addr == DEFAULT_ROUTE:
-            if DEFAULT_ROUTE in self:
-                overlap_route = self[DEFAULT_ROUTE].route_id
-        elif dst_nw_addr in self:
-            overlap_route = self[dst_nw_addr].route_id
-
-        if overlap_route is not None:
-            msg = 'Destination overlaps [route_id=%d]' % overlap_route
+            key = DEFAULT_ROUTE
+        else:
+            key = '%s/%d' % (ip_addr_ntoa(dst_ip), netmask)
+        if key in self:
+            msg = 'Destination overlaps [route_id=%d]' % self[key].route_id
             raise CommandFailure(msg=msg)
 
+        return key, dst_ip, netmask, gateway_ip
+
+    def add(self, dst_nw_addr, gateway_ip):
+        key, dst_ip, netmask, gateway_ip = self.check(dst_nw_addr,
+                                                      gateway_ip)
+
         routing_data = Route(self.route_id, dst_ip, netmask, gateway_ip)
-        ip_str = ip_addr_ntoa(dst_ip)
-        key = '%s/%d' % (ip_str, netmask)
         self[key] = routing_data
+        self._route_ids[routing_data.route_id] = key
+        self._gateways.setdefault(gateway_ip, {})[routing_data.route_id] = \
+            routing_data
+        self._trie_path(routing_data, create=True)[-1][2] = routing_data
 
         self.route_id += 1
         self.route_id &= UINT32_MAX
@@ -1352,14 +1463,49 @@ class RoutingTable(dict):
 
         return routing_data
 
+    def _trie_path(self, route, create=False):
+        # the nodes from the root to the node of the route
+        addr = ipv4_text_to_int(route.dst_ip)
+        node = self._trie
+        path = [node]
+        for i in range(route.netmask):
+            bit = (addr >> (31 - i)) & 1
+            if node[bit] is None:
+                if not create:
+                    return None
+                node[bit] = [None, None, None]
+            node = node[bit]
+            path.append(node)
+        return path
+
     def delete(self, route_id):
-        for key, value in self.items():
-            if value.route_id == route_id:
-                del self[key]
-                return
+        key = self._route_ids.pop(route_id, None)
+        if key is None:
+            return
+        route = self.pop(key)
+
+        routes = self._gateways[route.gateway_ip]
+        del routes[route_id]
+        if not routes:
+            del self._gateways[route.gateway_ip]
+
+        path = self._trie_path(route)
+        path[-1][2] = None
+        # prune the nodes left empty
+        addr = ipv4_text_to_int(route.dst_ip)
+        for i in range(route.netmask, 0, -1):
+            if path[i] != [None, None, None]:
+                break
+            path[i - 1][(addr >> (32 - i)) & 1] = None
 
     def get_gateways(self):
-        return [routing_data.gateway_ip for routing_data in self.values()]
+        return self._gateways.keys()
+
+    def is_gateway(self, ip):
+        return ip in self._gateways
+
+    def get_routes(self, gateway_ip):
+        return self._gateways.get(gateway_ip, {}).values()
 
     def get_data(self, gw_mac=None, dst_ip=None):
         if gw_mac is not None:
@@ -1369,17 +1515,16 @@ class RoutingTable(dict):
             return None
 
         elif dst_ip is not None:
-            get_route = None
-            mask = 0
-            for route in self.values():
-                if ipv4_apply_mask(dst_ip, route.netmask) == route.dst_ip:
-                    # For longest match
-                    if mask < route.netmask:
-                        get_route = route
-                        mask = route.netmask
-
-            if get_route is None:
-                get_route = self.get(DEFAULT_ROUTE, None)
+            # longest match
+            addr = ipv4_text_to_int(dst_ip)
+            node = self._trie
+            get_route = node[2]
+            for i in range(31, -1, -1):
+                node = node[(addr >> i) & 1]
+                if node is None:
+                    break
+                if node[2] is not None:
+                    get_route = node[2]
             return get_route
         else:
             return None
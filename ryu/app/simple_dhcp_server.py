@@ -42,7 +42,7 @@ class SimpleDHCPServer(app_manager.RyuApp):
         ofproto = datapath.ofproto
         in_port = msg.match['in_port']
 
-        pkt = packet.Packet(msg.data)
+        pkt = msg.packet
         udpPacket = pkt.get_protocol(udp.udp)
 
         # check if DHCP Pacet
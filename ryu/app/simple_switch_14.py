@@ -14,20 +14,25 @@
 # limitations under the License.
 
 from ryu.base import app_manager
+from ryu.controller import mac_to_port
 from ryu.controller import ofp_event
 from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER
 from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_4
-from ryu.lib.packet import packet
 from ryu.lib.packet import ethernet
 
 
 class SimpleSwitch14(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_4.OFP_VERSION]
 
+    MAC_TABLE_SIZE = 4096       # MAC addresses learned per switch
+    MAC_AGE = 300               # seconds
+    FLOW_PENDING_TIMEOUT = 5    # seconds a FlowMod is not sent again
+
     def __init__(self, *args, **kwargs):
         super(SimpleSwitch14, self).__init__(*args, **kwargs)
-        self.mac_to_port = {}
+        self.mac_to_port = mac_to_port.MacToPortTable(
+            self.MAC_TABLE_SIZE, self.MAC_AGE, self.FLOW_PENDING_TIMEOUT)
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
     def switch_features_handler(self, ev):
@@ -66,29 +71,31 @@ class SimpleSwitch14(app_manager.RyuApp):
         parser = datapath.ofproto_parser
         in_port = msg.match['in_port']
 
-        pkt = packet.Packet(msg.data)
+        pkt = msg.packet
         eth = pkt.get_protocols(ethernet.ethernet)[0]
 
         dst = eth.dst
         src = eth.src
 
         dpid = datapath.id
-        self.mac_to_port.setdefault(dpid, {})
+        self.mac_to_port.dpid_add(dpid)
 
         self.logger.info("packet in %s %s %s %s", dpid, src, dst, in_port)
 
         # learn a mac address to avoid FLOOD next time.
-        self.mac_to_port[dpid][src] = in_port
+        self.mac_to_port.port_add(dpid, in_port, src)
 
-        if dst in self.mac_to_port[dpid]:
-            out_port = self.mac_to_port[dpid][dst]
-        else:
+        out_port = self.mac_to_port.port_get(dpid, dst)
+        if out_port is None:
             out_port = ofproto.OFPP_FLOOD
 
         actions = [parser.OFPActionOutput(out_port)]
 
         # install a flow to avoid packet_in next time
-        if out_port != ofproto.OFPP_FLOOD:
+        # unless it was just installed and these are the packets which
+        # arrived before it took effect
+        if (out_port != ofproto.OFPP_FLOOD and
+                self.mac_to_port.flow_needed(dpid, in_port, dst, out_port)):
             match = parser.OFPMatch(in_port=in_port, eth_dst=dst)
             self.add_flow(datapath, 1, match, actions)
 
@@ -109,7 +109,7 @@ class SimpleSwitchSnort(app_manager.RyuApp):
         parser = datapath.ofproto_parser
         in_port = msg.match['in_port']
 
-        pkt = packet.Packet(msg.data)
+        pkt = msg.packet
         eth = pkt.get_protocols(ethernet.ethernet)[0]
 
         dst = eth.dst
@@ -0,0 +1,319 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Periodic statistics collector.
+
+Flow, port, queue, meter and group stats are polled from every switch
+on a fixed schedule.  Each switch is polled by its own thread, started
+at a random offset and jittered on every round, so that the requests
+are spread over the polling interval instead of being sent to all
+switches at once.
+
+Counter deltas are computed as the complete replies come in and are kept in
+fixed-size ring buffers per (datapath, stats type, key), where the key
+is the port number, the flow cookie, (port number, queue id), the meter
+id or the group id.  Flows sharing a cookie are summed up.  Empty or
+timed out replies are skipped, the entries missing from a complete reply
+are dropped.
+
+The REST API below is answered from memory; no request is sent to the
+switch.
+
+REST API
+========
+
+get the latest rates of all the entries of a stats type
+GET /collector/{port|flow|queue|meter|group}/<dpid>
+
+get the history of one entry ("<port_no>-<queue_id>" for queues)
+GET /collector/{port|flow|queue|meter|group}/<dpid>/<key>
+"""
+
+import json
+import random
+import time
+
+from webob import Response
+
+from ryu import cfg
+from ryu import exception
+from ryu.app.wsgi import ControllerBase, WSGIApplication, route
+from ryu.base import app_manager
+from ryu.controller import dpset
+from ryu.controller import ofp_event
+from ryu.controller.handler import MAIN_DISPATCHER
+from ryu.controller.handler import set_ev_cls
+from ryu.lib import hub
+from ryu.lib import ofctl_v1_0
+from ryu.lib import ofctl_v1_2
+from ryu.lib import ofctl_v1_3
+from ryu.lib.ringbuffer import RingBuffer
+from ryu.ofproto import ofproto_v1_0
+from ryu.ofproto import ofproto_v1_2
+from ryu.ofproto import ofproto_v1_3
+
+
+CONF = cfg.CONF
+CONF.register_cli_opts([
+    cfg.FloatOpt('stats-collector-interval', default=10.0,
+                 help='stats collector: polling interval in seconds'),
+    cfg.FloatOpt('stats-collector-jitter', default=0.1,
+                 help='stats collector: random jitter applied to the '
+                      'polling interval, as a fraction of the interval'),
+    cfg.FloatOpt('stats-collector-timeout', default=5.0,
+                 help='stats collector: seconds to wait for a complete '
+                      'stats reply'),
+    cfg.IntOpt('stats-collector-history', default=360,
+               help='stats collector: number of samples kept per entry'),
+    cfg.ListOpt('stats-collector-types',
+                default=['port', 'flow', 'queue', 'meter', 'group'],
+                help='stats collector: stats types to poll')
+])
+
+# stats type -> (key fields, counter fields)
+STATS_TYPES = {
+    'port': (('port_no',),
+             ('rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+              'rx_dropped', 'tx_dropped', 'rx_errors', 'tx_errors')),
+    'flow': (('cookie',),
+             ('packet_count', 'byte_count')),
+    'queue': (('port_no', 'queue_id'),
+              ('tx_packets', 'tx_bytes', 'tx_errors')),
+    'meter': (('meter_id',),
+              ('packet_in_count', 'byte_in_count')),
+    'group': (('group_id',),
+              ('packet_count', 'byte_count')),
+}
+
+# the datapath ids of the URLs are decimal, as in ofctl_rest
+DPID_PATTERN = r'[0-9]+'
+
+_OFCTL = {
+    ofproto_v1_0.OFP_VERSION: ofctl_v1_0,
+    ofproto_v1_2.OFP_VERSION: ofctl_v1_2,
+    ofproto_v1_3.OFP_VERSION: ofctl_v1_3,
+}
+
+
+def key_to_str(key):
+    return '-'.join(str(k) for k in key)
+
+
+class CounterSeries(object):
+    """History of the counter deltas of a single entry."""
+
+    def __init__(self, fields, size):
+        super(CounterSeries, self).__init__()
+        self.fields = fields
+        self.time = RingBuffer(size)
+        self.interval = RingBuffer(size)
+        self.deltas = dict((f, RingBuffer(size)) for f in fields)
+        self.last_time = None
+        self.last = None
+
+    def update(self, now, counters):
+        if self.last is not None and now > self.last_time:
+            self.time.append(now)
+            self.interval.append(now - self.last_time)
+            for f in self.fields:
+                delta = counters[f] - self.last[f]
+                if delta < 0:
+                    # the counter was reset (or an entry was removed)
+                    delta = counters[f]
+                self.deltas[f].append(delta)
+        self.last_time = now
+        self.last = dict((f, counters[f]) for f in self.fields)
+
+    def _sample(self, index):
+        interval = self.interval[index]
+        s = {'time': self.time[index], 'interval': interval}
+        for f in self.fields:
+            delta = self.deltas[f][index]
+            s[f] = delta
+            s[f + '_rate'] = delta / interval
+        return s
+
+    def latest(self):
+        s = {'counters': self.last}
+        if len(self.time):
+            s['rates'] = self._sample(-1)
+        return s
+
+    def history(self):
+        return [self._sample(i) for i in range(len(self.time))]
+
+
+class StatsCollectorController(ControllerBase):
+    def __init__(self, req, link, data, **config):
+        super(StatsCollectorController, self).__init__(req, link, data,
+                                                       **config)
+        self.collector = data['collector']
+
+    def _get_series(self, type_, dpid):
+        if type_ not in STATS_TYPES:
+            return None
+        return self.collector.series.get(int(dpid), {}).get(type_)
+
+    @route('collector', '/collector/{type_}/{dpid}', methods=['GET'],
+           requirements={'dpid': DPID_PATTERN})
+    def get_latest(self, req, type_, dpid, **_kwargs):
+        series = self._get_series(type_, dpid)
+        if series is None:
+            return Response(status=404)
+
+        key_fields = STATS_TYPES[type_][0]
+        entries = []
+        for key, s in series.items():
+            e = s.latest()
+            e.update(zip(key_fields, key))
+            entries.append(e)
+        body = json.dumps({dpid: entries})
+        return Response(content_type='application/json', body=body)
+
+    @route('collector', '/collector/{type_}/{dpid}/{key}', methods=['GET'],
+           requirements={'dpid': DPID_PATTERN})
+    def get_history(self, req, type_, dpid, key, **_kwargs):
+        series = self._get_series(type_, dpid)
+        if series is None:
+            return Response(status=404)
+
+        for k, s in series.items():
+            if key_to_str(k) == key:
+                body = json.dumps({dpid: {key: s.history()}})
+                return Response(content_type='application/json', body=body)
+        return Response(status=404)
+
+
+class StatsCollector(app_manager.RyuApp):
+    OFP_VERSIONS = [ofproto_v1_0.OFP_VERSION,
+                    ofproto_v1_2.OFP_VERSION,
+                    ofproto_v1_3.OFP_VERSION]
+    _CONTEXTS = {
+        'dpset': dpset.DPSet,
+        'wsgi': WSGIApplication
+    }
+
+    def __init__(self, *args, **kwargs):
+        super(StatsCollector, self).__init__(*args, **kwargs)
+        self.interval = self.CONF.stats_collector_interval
+        self.jitter = self.CONF.stats_collector_jitter
+        self.timeout = self.CONF.stats_collector_timeout
+        self.history = self.CONF.stats_collector_history
+        self.types = [t for t in self.CONF.stats_collector_types
+                      if t in STATS_TYPES]
+
+        self.waiters = {}
+        self.series = {}    # dpid -> {stats type -> {key -> CounterSeries}}
+        self.threads = {}   # dpid -> polling thread
+
+        wsgi = kwargs['wsgi']
+        wsgi.register(StatsCollectorController, {'collector': self})
+
+    def _poll_loop(self, dp):
+        # start at a random point of the interval to spread the requests
+        hub.sleep(random.uniform(0, self.interval))
+        while dp.is_active:
+            for type_ in self.types:
+                self._poll(dp, type_)
+            jitter = random.uniform(-self.jitter, self.jitter)
+            hub.sleep(self.interval * (1 + jitter))
+
+    def _poll(self, dp, type_):
+        ofctl = _OFCTL.get(dp.ofproto.OFP_VERSION)
+        get_stats = getattr(ofctl, 'get_%s_stats' % type_, None)
+        if get_stats is None:
+            # not supported by this OpenFlow version
+            return
+
+        try:
+            stats = get_stats(dp, self.waiters,
+                              timeout=self.timeout)[str(dp.id)]
+            self.update(dp.id, type_, time.time(), stats)
+        except exception.OFPStatsTimeout, e:
+            self.logger.debug('%s stats: %s', type_, e)
+        except Exception:
+            # keep on polling
+            self.logger.exception('dpid %s: failed to poll %s stats',
+                                  dp.id, type_)
+
+    def update(self, dpid, type_, now, stats):
+        if not stats:
+            # nothing to compute rates from, and no reason to believe
+            # that all the entries are gone
+            return
+
+        key_fields, fields = STATS_TYPES[type_]
+        counters = {}
+        for stat in stats:
+            key = tuple(stat[k] for k in key_fields)
+            c = counters.get(key)
+            if c is None:
+                counters[key] = dict((f, stat[f]) for f in fields)
+            else:
+                for f in fields:
+                    c[f] += stat[f]
+
+        series = self.series.setdefault(dpid, {}).setdefault(type_, {})
+        for key in set(series) - set(counters):
+            del series[key]
+        for key, c in counters.items():
+            s = series.get(key)
+            if s is None:
+                s = CounterSeries(fields, self.history)
+                series[key] = s
+            s.update(now, c)
+
+    @set_ev_cls(dpset.EventDP, dpset.DPSET_EV_DISPATCHER)
+    def _datapath_handler(self, ev):
+        dpid = ev.dp.id
+        thread = self.threads.pop(dpid, None)
+        if thread is not None:
+            hub.kill(thread)
+        self.series.pop(dpid, None)
+        self.waiters.pop(dpid, None)
+        if ev.enter and ev.dp.ofproto.OFP_VERSION in _OFCTL:
+            self.threads[dpid] = hub.spawn(self._poll_loop, ev.dp)
+
+    @set_ev_cls([ofp_event.EventOFPStatsReply,
+                 ofp_event.EventOFPFlowStatsReply,
+                 ofp_event.EventOFPPortStatsReply,
+                 ofp_event.EventOFPQueueStatsReply,
+                 ofp_event.EventOFPMeterStatsReply,
+                 ofp_event.EventOFPGroupStatsReply
+                 ], MAIN_DISPATCHER)
+    def _stats_reply_handler(self, ev):
+        msg = ev.msg
+        dp = msg.datapath
+
+        if dp.id not in self.waiters:
+            return
+        if msg.xid not in self.waiters[dp.id]:
+            return
+        lock, msgs = self.waiters[dp.id][msg.xid]
+        msgs.append(msg)
+
+        flags = 0
+        if dp.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
+            flags = dp.ofproto.OFPSF_REPLY_MORE
+        elif dp.ofproto.OFP_VERSION == ofproto_v1_2.OFP_VERSION:
+            flags = dp.ofproto.OFPSF_REPLY_MORE
+        elif dp.ofproto.OFP_VERSION == ofproto_v1_3.OFP_VERSION:
+            flags = dp.ofproto.OFPMPF_REPLY_MORE
+
+        if msg.flags & flags:
+            return
+        del self.waiters[dp.id][msg.xid]
+        lock.set()
@@ -25,19 +25,27 @@ $ wscat -c ws://localhost:8080/v1.0/topology/ws
 3. Join switches (use your favorite method):
 $ sudo mn --controller=remote --topo linear,2
 
-4. Topology change is notified:
-< {"params": [{"ports": [{"hw_addr": "56:c7:08:12:bb:36", "name": "s1-eth1", "port_no": "00000001", "dpid": "0000000000000001"}, {"hw_addr": "de:b9:49:24:74:3f", "name": "s1-eth2", "port_no": "00000002", "dpid": "0000000000000001"}], "dpid": "0000000000000001"}], "jsonrpc": "2.0", "method": "event_switch_enter", "id": 1}
+4. The topology is sent on connection, then its changes are notified:
+< {"params": [{"switches": [{"ports": [{"hw_addr": "56:c7:08:12:bb:36", "name": "s1-eth1", "port_no": "00000001", "dpid": "0000000000000001"}, {"hw_addr": "de:b9:49:24:74:3f", "name": "s1-eth2", "port_no": "00000002", "dpid": "0000000000000001"}], "dpid": "0000000000000001"}], "links": []}], "jsonrpc": "2.0", "method": "event_topology_snapshot", "id": 1}
 > {"id": 1, "jsonrpc": "2.0", "result": ""}
 
-< {"params": [{"ports": [{"hw_addr": "56:c7:08:12:bb:36", "name": "s1-eth1", "port_no": "00000001", "dpid": "0000000000000001"}, {"hw_addr": "de:b9:49:24:74:3f", "name": "s1-eth2", "port_no": "00000002", "dpid": "0000000000000001"}], "dpid": "0000000000000001"}], "jsonrpc": "2.0", "method": "event_switch_leave", "id": 2}
+< {"params": [{"switches": {"add": [], "delete": [{"ports": [{"hw_addr": "56:c7:08:12:bb:36", "name": "s1-eth1", "port_no": "00000001", "dpid": "0000000000000001"}, {"hw_addr": "de:b9:49:24:74:3f", "name": "s1-eth2", "port_no": "00000002", "dpid": "0000000000000001"}], "dpid": "0000000000000001"}]}, "links": {"add": [], "delete": []}}], "jsonrpc": "2.0", "method": "event_topology_update", "id": 2}
 > {"id": 2, "jsonrpc": "2.0", "result": ""}
 ...
+
+The changes are gathered for --ws-topology-interval seconds and sent in
+a single message, in which the changes cancelling each other out are
+dropped.  A client applies the deletions before the additions.  A
+client too slow to keep up with the changes is sent the whole topology
+again instead.
 """  # noqa
 
+import collections
 from socket import error as SocketError
 from ryu.contrib.tinyrpc.exc import InvalidReplyError
 
 
+from ryu import cfg
 from ryu.app.wsgi import (
     ControllerBase,
     WSGIApplication,
@@ -45,10 +53,90 @@ from ryu.app.wsgi import (
     WebSocketRPCClient
 )
 from ryu.base import app_manager
+from ryu.lib import hub
 from ryu.topology import event, switches
 from ryu.controller.handler import set_ev_cls
 
 
+CONF = cfg.CONF
+CONF.register_cli_opts([
+    cfg.FloatOpt('ws-topology-interval', default=0.1,
+                 help='WebSocket topology: seconds the topology changes '
+                      'are gathered for before being sent'),
+    cfg.IntOpt('ws-topology-queue-size', default=64,
+               help='WebSocket topology: messages kept for a client; '
+                    'a client lagging further behind is sent the whole '
+                    'topology again')
+])
+
+
+def link_key(link):
+    return (link['src']['dpid'], link['src']['port_no'],
+            link['dst']['dpid'], link['dst']['port_no'])
+
+
+class TopologyDelta(object):
+    """Topology changes gathered over a time window.
+
+    Only the difference between the topology before and after the
+    window is kept, e.g. a link added then deleted is dropped.
+    """
+
+    def __init__(self):
+        super(TopologyDelta, self).__init__()
+        # 'switches' or 'links' -> {key: (dict before, dict after)}
+        # where None stands for a switch or a link which doesn't exist
+        self._changes = {'switches': {}, 'links': {}}
+
+    def update(self, kind, key, before, after):
+        changes = self._changes[kind]
+        if key in changes:
+            before = changes[key][0]
+        changes[key] = (before, after)
+
+    def to_dict(self):
+        """Return the changes as a message, None if nothing changed."""
+        msg = {}
+        changed = False
+        for kind, changes in self._changes.items():
+            added = []
+            deleted = []
+            for before, after in changes.values():
+                if before == after:
+                    continue
+                if before is not None:
+                    deleted.append(before)
+                if after is not None:
+                    added.append(after)
+            if added or deleted:
+                changed = True
+            msg[kind] = {'add': added, 'delete': deleted}
+        if not changed:
+            return None
+        return msg
+
+
+class TopologyClient(object):
+    """A WebSocket client and the messages not sent to it yet."""
+
+    def __init__(self, rpc_client, queue_size):
+        super(TopologyClient, self).__init__()
+        self.rpc_client = rpc_client
+        self.queue_size = queue_size
+        self.queue = collections.deque()
+        self.resync = True      # send the whole topology first
+        self.event = hub.Event()
+        self.thread = None
+
+    def put(self, msg):
+        if len(self.queue) >= self.queue_size:
+            self.queue.clear()
+            self.resync = True
+        else:
+            self.queue.append(msg)
+        self.event.set()
+
+
 class WebSocketTopology(app_manager.RyuApp):
     _CONTEXTS = {
         'wsgi': WSGIApplication,
@@ -58,47 +146,111 @@ class WebSocketTopology(app_manager.RyuApp):
     def __init__(self, *args, **kwargs):
         super(WebSocketTopology, self).__init__(*args, **kwargs)
 
-        self.rpc_clients = []
+        self.interval = self.CONF.ws_topology_interval
+        self.queue_size = self.CONF.ws_topology_queue_size
+        self.clients = []
+
+        # the topology known by the clients
+        self.switches = {}      # dpid -> switch dict
+        self.links = {}         # link_key() -> link dict
+        self.delta = TopologyDelta()
 
         wsgi = kwargs['wsgi']
         wsgi.register(WebSocketTopologyController, {'app': self})
 
+    def start(self):
+        super(WebSocketTopology, self).start()
+        self.threads.append(hub.spawn(self._flush_loop))
+
+    def _update(self, kind, key, after):
+        table = getattr(self, kind)
+        before = table.get(key)
+        if after is None:
+            table.pop(key, None)
+        else:
+            table[key] = after
+        self.delta.update(kind, key, before, after)
+
     @set_ev_cls(event.EventSwitchEnter)
     def _event_switch_enter_handler(self, ev):
         msg = ev.switch.to_dict()
-        self._rpc_broadcall('event_switch_enter', msg)
+        self._update('switches', msg['dpid'], msg)
 
     @set_ev_cls(event.EventSwitchLeave)
     def _event_switch_leave_handler(self, ev):
         msg = ev.switch.to_dict()
-        self._rpc_broadcall('event_switch_leave', msg)
+        self._update('switches', msg['dpid'], None)
 
     @set_ev_cls(event.EventLinkAdd)
     def _event_link_add_handler(self, ev):
         msg = ev.link.to_dict()
-        self._rpc_broadcall('event_link_add', msg)
+        self._update('links', link_key(msg), msg)
 
     @set_ev_cls(event.EventLinkDelete)
     def _event_link_delete_handler(self, ev):
         msg = ev.link.to_dict()
-        self._rpc_broadcall('event_link_delete', msg)
-
-    def _rpc_broadcall(self, func_name, msg):
-        disconnected_clients = []
-        for rpc_client in self.rpc_clients:
-            # NOTE: Although broadcasting is desired,
-            #       RPCClient#get_proxy(one_way=True) does not work well
-            rpc_server = rpc_client.get_proxy()
-            try:
-                getattr(rpc_server, func_name)(msg)
-            except SocketError:
-                self.logger.debug('WebSocket disconnected: %s' % rpc_client.ws)
-                disconnected_clients.append(rpc_client)
-            except InvalidReplyError as e:
-                self.logger.error(e)
-
-        for client in disconnected_clients:
-            self.rpc_clients.remove(client)
+        self._update('links', link_key(msg), None)
+
+    def _flush_loop(self):
+        while self.is_active:
+            hub.sleep(self.interval)
+            self._flush()
+
+    def _flush(self):
+        msg = self.delta.to_dict()
+        self.delta = TopologyDelta()
+        if msg is None:
+            return
+        for client in self.clients:
+            client.put(msg)
+
+    def _snapshot(self):
+        return {'switches': self.switches.values(),
+                'links': self.links.values()}
+
+    def add_client(self, rpc_client):
+        client = TopologyClient(rpc_client, self.queue_size)
+        self.clients.append(client)
+        client.thread = hub.spawn(self._client_loop, client)
+        return client
+
+    def remove_client(self, client):
+        if client in self.clients:
+            self.clients.remove(client)
+            client.event.set()
+
+    def _client_loop(self, client):
+        while client in self.clients:
+            client.event.wait()
+            client.event.clear()
+            self._send_pending(client)
+
+    def _send_pending(self, client):
+        while client in self.clients and (client.resync or client.queue):
+            if client.resync:
+                # the snapshot includes the queued changes, and the
+                # pending ones which must not be sent to the client
+                # again afterwards
+                self._flush()
+                client.resync = False
+                client.queue.clear()
+                func_name, msg = 'event_topology_snapshot', self._snapshot()
+            else:
+                func_name = 'event_topology_update'
+                msg = client.queue.popleft()
+            self._rpc_call(client, func_name, msg)
+
+    def _rpc_call(self, client, func_name, msg):
+        # NOTE: RPCClient#get_proxy(one_way=True) does not work well
+        rpc_server = client.rpc_client.get_proxy()
+        try:
+            getattr(rpc_server, func_name)(msg)
+        except SocketError:
+            self.logger.debug('WebSocket disconnected: %s',
+                              client.rpc_client.ws)
+            self.remove_client(client)
+        except InvalidReplyError as e:
+            self.logger.error(e)
 
 
 class WebSocketTopologyController(ControllerBase):
@@ -111,5 +263,9 @@ class WebSocketTopologyController(ControllerBase):
     @websocket('topology', '/v1.0/topology/ws')
     def _websocket_handler(self, ws):
         rpc_client = WebSocketRPCClient(ws)
-        self.app.rpc_clients.append(rpc_client)
-        rpc_client.serve_forever()
+        client = self.app.add_client(rpc_client)
+        try:
+            rpc_client.serve_forever()
+        finally:
+            self.app.remove_client(client)
+            hub.kill(client.thread)
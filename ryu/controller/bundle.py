@@ -0,0 +1,188 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+OpenFlow 1.4 bundle support.
+
+A bundle groups modification messages so that the switch applies them
+in one go, optionally atomically.  Only the control requests (open,
+close, commit and discard) wait for a reply; the messages added to a
+bundle are pipelined and any error the switch reports for them is
+correlated by xid.
+
+Example::
+
+    with datapath.bundle(atomic=True) as bundle:
+        for mod in flow_mods:
+            bundle.add(mod)
+"""
+
+import logging
+
+from ryu import exception
+from ryu.lib import hub
+
+LOG = logging.getLogger('ryu.controller.bundle')
+
+DEFAULT_TIMEOUT = 5.0   # in seconds
+
+
+class BundleError(exception.RyuException):
+    message = 'bundle %(bundle_id)s: %(reason)s'
+
+
+class BundleNotSupported(BundleError):
+    message = 'bundle is not supported by OpenFlow version %(version)x'
+
+
+class BundleTimeout(BundleError):
+    message = 'bundle %(bundle_id)s: no reply for %(request)s'
+
+
+class BundleFailed(BundleError):
+    """The switch rejected a bundle request or a bundled message.
+
+    ``errors`` is a list of (message, OFPErrorMsg) tuples.  ``message``
+    is the bundled message (or the control message) which caused the
+    error.
+    """
+
+    message = 'bundle %(bundle_id)s failed: %(errors)s'
+
+    def __init__(self, bundle_id, errors):
+        self.bundle_id = bundle_id
+        self.errors = errors
+        super(BundleFailed, self).__init__(bundle_id=bundle_id, errors=errors)
+
+
+class Bundle(object):
+    """A bundle on a datapath.
+
+    Usually created by ``Datapath.bundle()`` and used as a context
+    manager.  On normal exit the bundle is committed; if the block
+    raises, the bundle is discarded and the exception is propagated.
+    """
+
+    def __init__(self, datapath, bundle_id, flags=0, properties=None,
+                 timeout=DEFAULT_TIMEOUT):
+        super(Bundle, self).__init__()
+        self.datapath = datapath
+        self.bundle_id = bundle_id
+        self.flags = flags
+        self.properties = properties or []
+        self.timeout = timeout
+        self.is_open = False
+
+        # xid -> bundled message, kept until the bundle is finished
+        self.messages = {}
+        # list of (message, error message) reported by the switch
+        self.errors = []
+
+        self._ctrl_reply = None
+        self._ctrl_event = hub.Event()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+            return
+
+        if self.is_open:
+            try:
+                self.discard()
+            except BundleError as e:
+                LOG.warning('failed to discard bundle %d: %s',
+                            self.bundle_id, e)
+
+    def _is_error(self, msg):
+        return msg.msg_type == self.datapath.ofproto.OFPT_ERROR
+
+    def _handle_msg_reply(self, msg):
+        if self._is_error(msg):
+            self.errors.append((self.messages.get(msg.xid), msg))
+
+    def _handle_ctrl_reply(self, msg):
+        self._ctrl_reply = msg
+        self._ctrl_event.set()
+
+    def _unregister(self):
+        for xid in self.messages:
+            self.datapath.unregister_xid_handler(xid)
+        self.messages = {}
+
+    def _send_ctrl(self, type_):
+        dp = self.datapath
+        req = dp.ofproto_parser.OFPBundleCtrlMsg(
+            dp, self.bundle_id, type_, self.flags, self.properties)
+        xid = dp.set_xid(req)
+
+        self._ctrl_reply = None
+        self._ctrl_event.clear()
+        dp.register_xid_handler(xid, self._handle_ctrl_reply)
+        try:
+            dp.send_msg(req)
+            self._ctrl_event.wait(self.timeout)
+        finally:
+            dp.unregister_xid_handler(xid)
+
+        reply = self._ctrl_reply
+        if reply is None:
+            raise BundleTimeout(bundle_id=self.bundle_id, request=req)
+        if self._is_error(reply):
+            raise BundleFailed(self.bundle_id, self.errors + [(req, reply)])
+        return reply
+
+    def open(self):
+        self._send_ctrl(self.datapath.ofproto.OFPBCT_OPEN_REQUEST)
+        self.is_open = True
+
+    def add(self, msg):
+        """Add a message to the bundle without waiting for a reply."""
+        assert self.is_open
+        dp = self.datapath
+        req = dp.ofproto_parser.OFPBundleAddMsg(
+            dp, self.bundle_id, self.flags, msg, [])
+        xid = dp.set_xid(req)
+        self.messages[xid] = msg
+        dp.register_xid_handler(xid, self._handle_msg_reply)
+        dp.send_msg(req)
+        return xid
+
+    def close(self):
+        self._send_ctrl(self.datapath.ofproto.OFPBCT_CLOSE_REQUEST)
+
+    def commit(self):
+        """Commit the bundle.
+
+        Raise BundleFailed if the switch rejected the commit or any of
+        the bundled messages.
+        """
+        try:
+            self._send_ctrl(self.datapath.ofproto.OFPBCT_COMMIT_REQUEST)
+        finally:
+            self.is_open = False
+            self._unregister()
+        if self.errors:
+            raise BundleFailed(self.bundle_id, self.errors)
+
+    def discard(self):
+        try:
+            self._send_ctrl(self.datapath.ofproto.OFPBCT_DISCARD_REQUEST)
+        finally:
+            self.is_open = False
+            self._unregister()
@@ -26,11 +26,13 @@ import contextlib
 from ryu import cfg
 import logging
 from ryu.lib import hub
+from ryu.lib import ofp_pktinfilter
 from ryu.lib.hub import StreamServer
 import traceback
 import random
 import ssl
-from socket import IPPROTO_TCP, TCP_NODELAY
+import time
+from socket import IPPROTO_TCP, TCP_NODELAY, SHUT_RDWR
 
 import ryu.base.app_manager
 
@@ -40,6 +42,7 @@ from ryu.ofproto import ofproto_protocol
 from ryu.ofproto import ofproto_v1_0
 from ryu.ofproto import nx_match
 
+from ryu.controller import bundle
 from ryu.controller import handler
 from ryu.controller import ofp_event
 
@@ -56,7 +59,27 @@ CONF.register_cli_opts([
                help='openflow ssl listen port'),
     cfg.StrOpt('ctl-privkey', default=None, help='controller private key'),
     cfg.StrOpt('ctl-cert', default=None, help='controller certificate'),
-    cfg.StrOpt('ca-certs', default=None, help='CA certificates')
+    cfg.StrOpt('ca-certs', default=None, help='CA certificates'),
+    cfg.FloatOpt('echo-request-interval', default=0.0,
+                 help='interval in seconds between echo requests sent to '
+                      'switches to check their liveness '
+                      '(0 disables echo requests)'),
+    cfg.IntOpt('maximum-unreplied-echo-requests', default=0,
+               help='maximum number of unreplied echo requests before '
+                    'the connection to the switch is closed'),
+    cfg.IntOpt('packet-in-rate-limit', default=0,
+               help='maximum PacketIn rate per switch in packets per '
+                    'second (0 disables the limit)'),
+    cfg.IntOpt('packet-in-port-rate-limit', default=0,
+               help='maximum PacketIn rate per switch port in packets per '
+                    'second (0 disables the limit)'),
+    cfg.FloatOpt('packet-in-dedup-ttl', default=0.0,
+                 help='seconds during which PacketIns identical to an '
+                      'admitted one (same in_port, src, dst and ethertype) '
+                      'are dropped (0 disables deduplication)'),
+    cfg.BoolOpt('packet-in-priority', default=True,
+                help='exempt LLDP, ARP and BFD PacketIns from the PacketIn '
+                     'rate limits and deduplication')
 ])
 
 
@@ -117,8 +140,27 @@ class Datapath(ofproto_protocol.ProtocolDesc):
         # The limit is arbitrary. We need to limit queue size to
         # prevent it from eating memory up
         self.send_q = hub.Queue(16)
+        # serializes writes of the send loop and of the fast path
+        self._send_lock = hub.Semaphore()
+
+        # controller-side liveness probing
+        self.echo_requests = {}     # xid -> time the request was sent
+        self.echo_rtt = None        # last measured round trip time
+        self.echo_rtt_avg = None    # smoothed round trip time
+
+        self.packet_in_admission = None
+        if (CONF.packet_in_rate_limit or CONF.packet_in_port_rate_limit or
+                CONF.packet_in_dedup_ttl):
+            self.packet_in_admission = ofp_pktinfilter.PacketInAdmission(
+                dp_rate=CONF.packet_in_rate_limit,
+                port_rate=CONF.packet_in_port_rate_limit,
+                dedup_ttl=CONF.packet_in_dedup_ttl,
+                priority=CONF.packet_in_priority)
 
         self.xid = random.randint(0, self.ofproto.MAX_XID)
+        # xid -> callable, invoked with replies/errors for that xid
+        self.xid_handlers = {}
+        self.bundle_id = 0
         self.id = None  # datapath_id is unknown yet
         self.ports = None
         self.flow_format = ofproto_v1_0.NXFF_OPENFLOW10
@@ -156,7 +198,21 @@ class Datapath(ofproto_protocol.ProtocolDesc):
                 msg = ofproto_parser.msg(self,
                                          version, msg_type, msg_len, xid, buf)
                 # LOG.debug('queue msg %s cls %s', msg, msg.__class__)
+                if msg and not self._admit_packet_in(msg):
+                    msg = None
                 if msg:
+                    # Echo is answered here rather than by an ofp_event
+                    # handler so that it is neither delayed by the apps
+                    # nor queued behind other messages to send.
+                    if msg.msg_type == self.ofproto.OFPT_ECHO_REQUEST:
+                        self._echo_reply(msg)
+                    elif msg.msg_type == self.ofproto.OFPT_ECHO_REPLY:
+                        self.acknowledge_echo_reply(msg.xid)
+
+                    xid_handler = self.xid_handlers.get(msg.xid)
+                    if xid_handler is not None:
+                        xid_handler(msg)
+
                     ev = ofp_event.ofp_msg_to_ev(msg)
                     self.ofp_brick.send_event_to_observers(ev, self.state)
 
@@ -179,12 +235,19 @@ class Datapath(ofproto_protocol.ProtocolDesc):
                     count = 0
                     hub.sleep(0)
 
+    def _admit_packet_in(self, msg):
+        if (self.packet_in_admission is None or
+                msg.msg_type != self.ofproto.OFPT_PACKET_IN):
+            return True
+        return self.packet_in_admission.admit(msg)
+
     @_deactivate
     def _send_loop(self):
         try:
             while self.is_active:
                 buf = self.send_q.get()
-                self.socket.sendall(buf)
+                with self._send_lock:
+                    self.socket.sendall(buf)
         finally:
             q = self.send_q
             # first, clear self.send_q to prevent new references.
@@ -201,32 +264,126 @@ class Datapath(ofproto_protocol.ProtocolDesc):
         if self.send_q:
             self.send_q.put(buf)
 
+    def send_priority(self, buf):
+        """Write buf to the switch without going through the send queue.
+
+        Used for echo and handshake messages which must not wait for
+        the messages queued by applications.
+        """
+        if self.send_q:
+            with self._send_lock:
+                self.socket.sendall(buf)
+
     def set_xid(self, msg):
         self.xid += 1
         self.xid &= self.ofproto.MAX_XID
         msg.set_xid(self.xid)
         return self.xid
 
-    def send_msg(self, msg):
+    def send_msg(self, msg, priority=False):
         assert isinstance(msg, self.ofproto_parser.MsgBase)
         if msg.xid is None:
             self.set_xid(msg)
         msg.serialize()
         # LOG.debug('send_msg %s', msg)
-        self.send(msg.buf)
+        if priority:
+            self.send_priority(msg.buf)
+        else:
+            self.send(msg.buf)
+
+    def send_msgs(self, msgs):
+        """Send several messages with a single write to the switch."""
+        buf = bytearray()
+        for msg in msgs:
+            assert isinstance(msg, self.ofproto_parser.MsgBase)
+            if msg.xid is None:
+                self.set_xid(msg)
+            msg.serialize()
+            buf += msg.buf
+        if buf:
+            self.send(buf)
+
+    def _echo_reply(self, msg):
+        echo_reply = self.ofproto_parser.OFPEchoReply(self)
+        echo_reply.xid = msg.xid
+        echo_reply.data = msg.data
+        self.send_msg(echo_reply, priority=True)
+
+    def _echo_request_loop(self):
+        interval = CONF.echo_request_interval
+        max_unreplied = CONF.maximum_unreplied_echo_requests
+        while self.is_active:
+            hub.sleep(interval)
+            if not self.is_active:
+                break
+            if len(self.echo_requests) > max_unreplied:
+                LOG.info('no echo reply from the datapath %s, '
+                         'closing the connection',
+                         dpid_to_str(self.id) if self.id else self.address)
+                self.is_active = False
+                try:
+                    self.socket.shutdown(SHUT_RDWR)
+                except Exception:
+                    pass
+                break
+            echo_request = self.ofproto_parser.OFPEchoRequest(self)
+            xid = self.set_xid(echo_request)
+            self.echo_requests[xid] = time.time()
+            self.send_msg(echo_request, priority=True)
+
+    def acknowledge_echo_reply(self, xid):
+        sent = self.echo_requests.pop(xid, None)
+        if sent is None:
+            return
+        # any reply proves the switch alive
+        self.echo_requests.clear()
+        self.echo_rtt = time.time() - sent
+        if self.echo_rtt_avg is None:
+            self.echo_rtt_avg = self.echo_rtt
+        else:
+            self.echo_rtt_avg += (self.echo_rtt - self.echo_rtt_avg) / 8
+
+    def register_xid_handler(self, xid, func):
+        self.xid_handlers[xid] = func
+
+    def unregister_xid_handler(self, xid):
+        self.xid_handlers.pop(xid, None)
+
+    def bundle(self, atomic=False, ordered=False, properties=None,
+               timeout=bundle.DEFAULT_TIMEOUT):
+        """Return a new ``ryu.controller.bundle.Bundle`` (OpenFlow 1.4+).
+
+        The bundle is opened when used as a context manager and is
+        committed when the block exits, or discarded if it raises.
+        """
+        if not hasattr(self.ofproto, 'OFPT_BUNDLE_CONTROL'):
+            raise bundle.BundleNotSupported(version=self.ofproto.OFP_VERSION)
+
+        flags = 0
+        if atomic:
+            flags |= self.ofproto.OFPBF_ATOMIC
+        if ordered:
+            flags |= self.ofproto.OFPBF_ORDERED
+        self.bundle_id = (self.bundle_id + 1) & 0xffffffff
+        return bundle.Bundle(self, self.bundle_id, flags, properties,
+                             timeout)
 
     def serve(self):
         send_thr = hub.spawn(self._send_loop)
+        threads = [send_thr]
+        if CONF.echo_request_interval > 0:
+            threads.append(hub.spawn(self._echo_request_loop))
 
         # send hello message immediately
         hello = self.ofproto_parser.OFPHello(self)
-        self.send_msg(hello)
+        self.send_msg(hello, priority=True)
 
         try:
             self._recv_loop()
         finally:
-            hub.kill(send_thr)
-            hub.joinall([send_thr])
+            for t in threads:
+                hub.kill(t)
+            hub.joinall(threads)
 
     #
     # Utility methods for convenience
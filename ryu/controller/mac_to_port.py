@@ -14,40 +14,106 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import logging
+import time
+
 from ryu.lib.mac import haddr_to_str
 
 LOG = logging.getLogger('ryu.controller.mac_to_port')
 
 
+def _mac_str(mac):
+    # both of the binary and the text representations are accepted
+    if len(mac) == 6:
+        return haddr_to_str(mac)
+    return mac
+
+
 class MacToPortTable(object):
-    """MAC addr <-> (dpid, port name)"""
+    """MAC addr <-> (dpid, port name)
 
-    def __init__(self):
+    capacity: max number of MAC addresses per datapath.  When it is
+              full, the least recently seen address is forgotten.
+    max_age: seconds an address is kept without being seen.
+    flow_timeout: seconds a flow is regarded as installed after
+                  flow_needed() returned True for it.
+
+    None means no limit.
+    """
+
+    def __init__(self, capacity=None, max_age=None, flow_timeout=None):
         super(MacToPortTable, self).__init__()
+        self.capacity = capacity
+        self.max_age = max_age
+        self.flow_timeout = flow_timeout
+        # dpid -> {mac -> port}, the least recently seen first
         self.mac_to_port = {}
+        self._seen = {}         # dpid -> {mac -> timestamp}
+        # dpid -> {dst mac -> {in_port -> (out_port, timestamp)}}
+        self._flows = {}
 
     def dpid_add(self, dpid):
+        if dpid in self.mac_to_port:
+            return
         LOG.debug('dpid_add: 0x%016x', dpid)
-        self.mac_to_port.setdefault(dpid, {})
+        self.mac_to_port[dpid] = collections.OrderedDict()
+        self._seen[dpid] = {}
+        self._flows[dpid] = {}
+
+    def dpid_del(self, dpid):
+        self.mac_to_port.pop(dpid, None)
+        self._seen.pop(dpid, None)
+        self._flows.pop(dpid, None)
 
-    def port_add(self, dpid, port, mac):
+    def _expire(self, dpid, now):
+        if self.max_age is None:
+            return
+        macs = self.mac_to_port[dpid]
+        seen = self._seen[dpid]
+        deadline = now - self.max_age
+        while macs:
+            mac = next(iter(macs))
+            if seen[mac] >= deadline:
+                break
+            self.mac_del(dpid, mac)
+
+    def port_add(self, dpid, port, mac, now=None):
         """
         :returns: old port if learned. (this may be = port)
                   None otherwise
         """
-        old_port = self.mac_to_port[dpid].get(mac, None)
-        self.mac_to_port[dpid][mac] = port
+        if now is None:
+            now = time.time()
+        self._expire(dpid, now)
+
+        macs = self.mac_to_port[dpid]
+        old_port = macs.pop(mac, None)
+        macs[mac] = port
+        self._seen[dpid][mac] = now
 
         if old_port is not None and old_port != port:
             LOG.debug('port_add: 0x%016x 0x%04x %s',
-                      dpid, port, haddr_to_str(mac))
+                      dpid, port, _mac_str(mac))
+            # the flows to the address are outdated
+            self._flows[dpid].pop(mac, None)
+
+        if self.capacity is not None:
+            while len(macs) > self.capacity:
+                self.mac_del(dpid, next(iter(macs)))
 
         return old_port
 
-    def port_get(self, dpid, mac):
+    def port_get(self, dpid, mac, now=None):
         # LOG.debug('dpid 0x%016x mac %s', dpid, haddr_to_str(mac))
-        return self.mac_to_port[dpid].get(mac)
+        port = self.mac_to_port[dpid].get(mac)
+        if port is not None and self.max_age is not None:
+            if now is None:
+                now = time.time()
+            if self._seen[dpid][mac] < now - self.max_age:
+                self.mac_del(dpid, mac)
+                return None
+        return port
 
     def mac_list(self, dpid, port):
         return [mac for (mac, port_) in self.mac_to_port.get(dpid).items()
@@ -55,3 +121,23 @@ class MacToPortTable(object):
 
     def mac_del(self, dpid, mac):
         del self.mac_to_port[dpid][mac]
+        del self._seen[dpid][mac]
+        self._flows[dpid].pop(mac, None)
+
+    def flow_needed(self, dpid, in_port, dst, out_port, now=None):
+        """Return True if the flow from in_port to dst through out_port
+        should be installed, i.e. it was not within flow_timeout.
+
+        The flow is then regarded as installed, so the packets arriving
+        before the flow takes effect don't install it again.
+        """
+        if now is None:
+            now = time.time()
+        flows = self._flows[dpid].setdefault(dst, {})
+        flow = flows.get(in_port)
+        if (flow is not None and flow[0] == out_port and
+                (self.flow_timeout is None or
+                 now - flow[1] < self.flow_timeout)):
+            return False
+        flows[in_port] = (out_port, now)
+        return True
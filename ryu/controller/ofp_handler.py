@@ -42,8 +42,11 @@ from ryu.controller.handler import HANDSHAKE_DISPATCHER, CONFIG_DISPATCHER,\
 # MAIN: it does nothing. Applications are expected to register their
 # own handlers.
 #
-# Note that at any state, when we receive Echo Request message, send
-# back Echo Reply message.
+# Note that at any state, when we receive Echo Request message, Datapath
+# sends back Echo Reply message by itself.
+#
+# The handshake messages are sent with priority so that they don't wait
+# behind the messages queued by applications.
 
 
 class OFPHandler(ryu.base.app_manager.RyuApp):
@@ -61,7 +64,7 @@ class OFPHandler(ryu.base.app_manager.RyuApp):
         error_msg.type = datapath.ofproto.OFPET_HELLO_FAILED
         error_msg.code = datapath.ofproto.OFPHFC_INCOMPATIBLE
         error_msg.data = error_desc
-        datapath.send_msg(error_msg)
+        datapath.send_msg(error_msg, priority=True)
 
     @set_ev_handler(ofp_event.EventOFPHello, HANDSHAKE_DISPATCHER)
     def hello_handler(self, ev):
@@ -181,7 +184,7 @@ class OFPHandler(ryu.base.app_manager.RyuApp):
 
         # now send feature
         features_reqeust = datapath.ofproto_parser.OFPFeaturesRequest(datapath)
-        datapath.send_msg(features_reqeust)
+        datapath.send_msg(features_reqeust, priority=True)
 
         # now move on to config state
         self.logger.debug('move onto config mode')
@@ -210,7 +213,7 @@ class OFPHandler(ryu.base.app_manager.RyuApp):
             datapath, ofproto.OFPC_FRAG_NORMAL,
             128  # TODO:XXX
         )
-        datapath.send_msg(set_config)
+        datapath.send_msg(set_config, priority=True)
 
         if datapath.ofproto.OFP_VERSION < 0x04:
             self.logger.debug('move onto main mode')
@@ -218,7 +221,7 @@ class OFPHandler(ryu.base.app_manager.RyuApp):
         else:
             port_desc = datapath.ofproto_parser.OFPPortDescStatsRequest(
                 datapath, 0)
-            datapath.send_msg(port_desc)
+            datapath.send_msg(port_desc, priority=True)
 
     @set_ev_handler(ofp_event.EventOFPPortDescStatsReply, CONFIG_DISPATCHER)
     def multipart_reply_handler(self, ev):
@@ -232,16 +235,6 @@ class OFPHandler(ryu.base.app_manager.RyuApp):
         self.logger.debug('move onto main mode')
         ev.msg.datapath.set_state(MAIN_DISPATCHER)
 
-    @set_ev_handler(ofp_event.EventOFPEchoRequest,
-                    [HANDSHAKE_DISPATCHER, CONFIG_DISPATCHER, MAIN_DISPATCHER])
-    def echo_request_handler(self, ev):
-        msg = ev.msg
-        datapath = msg.datapath
-        echo_reply = datapath.ofproto_parser.OFPEchoReply(datapath)
-        echo_reply.xid = msg.xid
-        echo_reply.data = msg.data
-        datapath.send_msg(echo_reply)
-
     @set_ev_handler(ofp_event.EventOFPErrorMsg,
                     [HANDSHAKE_DISPATCHER, CONFIG_DISPATCHER, MAIN_DISPATCHER])
     def error_msg_handler(self, ev):
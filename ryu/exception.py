@@ -39,6 +39,15 @@ class OFPMalformedMessage(RyuException):
     message = 'malformed message'
 
 
+class OFPStatsTimeout(RyuException):
+    message = ('no complete stats reply from datapath %(dpid)s '
+               'in %(timeout)s seconds')
+
+
+class OFPBarrierTimeout(RyuException):
+    message = 'no barrier reply from datapath %(dpid)s in %(timeout)s seconds'
+
+
 class NetworkNotFound(RyuException):
     message = 'no such network id %(network_id)s'
 
@@ -509,6 +509,12 @@ class BFDSession(object):
         LOG.debug("[BFD][%s][SEND] BFD Control sent.", hex(self._local_discr))
 
 
+def _to_packet(data):
+    if isinstance(data, packet.Packet):
+        return data
+    return packet.Packet(data)
+
+
 class BFDPacket(object):
     """
     BFDPacket class for parsing raw BFD packet, and generating BFD packet with
@@ -563,8 +569,10 @@ class BFDPacket(object):
     def bfd_parse(data):
         """
         Parse raw packet and return BFD class from packet library.
+
+        *data* may also be a packet already parsed by the packet library.
         """
-        pkt = packet.Packet(data)
+        pkt = _to_packet(data)
         i = iter(pkt)
         eth_pkt = i.next()
 
@@ -611,9 +619,11 @@ class ARPPacket(object):
     def arp_parse(data):
         """
         Parse ARP packet, return ARP class from packet library.
+
+        *data* may also be a packet already parsed by the packet library.
         """
         # Iteratize pkt
-        pkt = packet.Packet(data)
+        pkt = _to_packet(data)
         i = iter(pkt)
         eth_pkt = i.next()
         # Ensure it's an ethernet frame.
@@ -745,12 +755,12 @@ class BFDLib(app_manager.RyuApp):
         parser = datapath.ofproto_parser
         in_port = msg.match['in_port']
 
-        pkt = packet.Packet(msg.data)
+        pkt = msg.packet
 
         # If there's someone asked for an IP address associated
         # with a BFD session, generate an ARP reply for it.
         if arp.arp in pkt:
-            arp_pkt = ARPPacket.arp_parse(msg.data)
+            arp_pkt = ARPPacket.arp_parse(pkt)
             if arp_pkt.opcode == ARP_REQUEST:
                 for s in self.session.values():
                     if s.dpid == datapath.id and \
@@ -782,7 +792,7 @@ class BFDLib(app_manager.RyuApp):
             return
 
         # Parse BFD packet here.
-        self.recv_bfd_pkt(datapath, in_port, msg.data)
+        self.recv_bfd_pkt(datapath, in_port, pkt)
 
     def add_bfd_session(self, dpid, ofport, src_mac, src_ip,
                         dst_mac="FF:FF:FF:FF:FF:FF", dst_ip="255.255.255.255",
@@ -854,7 +864,7 @@ class BFDLib(app_manager.RyuApp):
         return my_discr
 
     def recv_bfd_pkt(self, datapath, in_port, data):
-        pkt = packet.Packet(data)
+        pkt = _to_packet(data)
         eth = pkt.get_protocols(ethernet.ethernet)[0]
 
         if eth.ethertype != ETH_TYPE_IP:
@@ -867,7 +877,7 @@ class BFDLib(app_manager.RyuApp):
             return
 
         # Parse BFD packet here.
-        bfd_pkt = BFDPacket.bfd_parse(data)
+        bfd_pkt = BFDPacket.bfd_parse(pkt)
 
         if not isinstance(bfd_pkt, bfd.bfd):
             return
@@ -0,0 +1,503 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Reader and writer of MRT (RFC 6396) files.
+
+The TABLE_DUMP_V2 records of RIB dumps and the BGP4MP records of BGP
+messages are supported, the other records are read as MrtUnknownRecord.
+
+A Reader reads the records of a file one after the other, so that dumps
+of full tables are streamed.  The path attributes of a RIB entry and the
+message of a BGP4MP record are only parsed when accessed, and the raw
+path attributes are available as *attr_buf* so that the entries carrying
+the same attributes can share their parsed form.
+"""
+
+import socket
+import struct
+
+from ryu.lib.packet import bgp
+
+# MRT types
+MRT_TYPE_TABLE_DUMP_V2 = 13
+MRT_TYPE_BGP4MP = 16
+
+# TABLE_DUMP_V2 subtypes
+TABLE_DUMP_V2_PEER_INDEX_TABLE = 1
+TABLE_DUMP_V2_RIB_IPV4_UNICAST = 2
+TABLE_DUMP_V2_RIB_IPV4_MULTICAST = 3
+TABLE_DUMP_V2_RIB_IPV6_UNICAST = 4
+TABLE_DUMP_V2_RIB_IPV6_MULTICAST = 5
+TABLE_DUMP_V2_RIB_GENERIC = 6
+
+# BGP4MP subtypes
+BGP4MP_STATE_CHANGE = 0
+BGP4MP_MESSAGE = 1
+BGP4MP_MESSAGE_AS4 = 4
+BGP4MP_STATE_CHANGE_AS4 = 5
+
+# Peer types of the PEER_INDEX_TABLE
+_PEER_TYPE_IPV6 = 0x01
+_PEER_TYPE_AS4 = 0x02
+
+_HDR = struct.Struct('!IHHI')  # timestamp, type, subtype, length
+_MP_REACH_NLRI_TYPE = chr(bgp.BGP_ATTR_TYPE_MP_REACH_NLRI)
+_AFI = {4: 1, 16: 2}
+_ADDR_LEN = {1: 4, 2: 16}
+
+_RIB_SUBTYPES = {
+    bgp.RF_IPv4_UC: TABLE_DUMP_V2_RIB_IPV4_UNICAST,
+    bgp.RF_IPv6_UC: TABLE_DUMP_V2_RIB_IPV6_UNICAST,
+}
+_RIB_PREFIX_CLASSES = {
+    TABLE_DUMP_V2_RIB_IPV4_UNICAST: bgp.IPAddrPrefix,
+    TABLE_DUMP_V2_RIB_IPV4_MULTICAST: bgp.IPAddrPrefix,
+    TABLE_DUMP_V2_RIB_IPV6_UNICAST: bgp.IP6AddrPrefix,
+    TABLE_DUMP_V2_RIB_IPV6_MULTICAST: bgp.IP6AddrPrefix,
+}
+
+
+def _pack_addr(addr):
+    if ':' in addr:
+        return socket.inet_pton(socket.AF_INET6, addr)
+    return socket.inet_aton(addr)
+
+
+def _unpack_addr(buf):
+    if len(buf) == 4:
+        return socket.inet_ntoa(buf)
+    return socket.inet_ntop(socket.AF_INET6, buf)
+
+
+class MrtRecord(object):
+    """Base class of the MRT records."""
+
+    _TYPE = None
+    _records = {}
+
+    def __init__(self, timestamp=0):
+        self.timestamp = timestamp
+
+    @staticmethod
+    def register(type_, *subtypes):
+        def _register(cls):
+            for subtype in subtypes:
+                MrtRecord._records[(type_, subtype)] = cls
+            return cls
+        return _register
+
+    @property
+    def subtype(self):
+        raise NotImplementedError()
+
+    @classmethod
+    def parser(cls, buf):
+        """Parses the record at the beginning of *buf*.
+
+        Returns the record and the rest of *buf*.
+        """
+        if len(buf) < _HDR.size:
+            raise ValueError('Truncated MRT header')
+        timestamp, type_, subtype, length = _HDR.unpack_from(buf)
+        end = _HDR.size + length
+        if len(buf) < end:
+            raise ValueError('Truncated MRT record')
+        body = buf[_HDR.size:end]
+        record_cls = cls._records.get((type_, subtype))
+        if record_cls is None:
+            record = MrtUnknownRecord(type_, subtype, body, timestamp)
+        else:
+            record = record_cls.parse_body(subtype, body, timestamp)
+        return record, buf[end:]
+
+    def serialize(self):
+        body = self.serialize_body()
+        return _HDR.pack(self.timestamp, self._TYPE, self.subtype,
+                         len(body)) + body
+
+    def serialize_body(self):
+        raise NotImplementedError()
+
+
+class MrtUnknownRecord(MrtRecord):
+    """Record of a type or subtype which isn't supported."""
+
+    def __init__(self, type_, subtype, data, timestamp=0):
+        super(MrtUnknownRecord, self).__init__(timestamp)
+        self._TYPE = type_
+        self._subtype = subtype
+        self.data = data
+
+    @property
+    def subtype(self):
+        return self._subtype
+
+    def serialize_body(self):
+        return self.data
+
+
+class MrtPeer(object):
+    """Peer of a PEER_INDEX_TABLE."""
+
+    _AS_PACK_STR = {0: '!H', _PEER_TYPE_AS4: '!I'}
+
+    def __init__(self, bgp_id, ip_addr, as_num):
+        self.bgp_id = bgp_id
+        self.ip_addr = ip_addr
+        self.as_num = as_num
+
+    def __repr__(self):
+        return 'MrtPeer(%s, %s, %s)' % (self.bgp_id, self.ip_addr,
+                                        self.as_num)
+
+    @classmethod
+    def parser(cls, buf):
+        peer_type = ord(buf[0])
+        bgp_id = socket.inet_ntoa(buf[1:5])
+        addr_len = 16 if peer_type & _PEER_TYPE_IPV6 else 4
+        ip_addr = _unpack_addr(buf[5:5 + addr_len])
+        as_pack_str = cls._AS_PACK_STR[peer_type & _PEER_TYPE_AS4]
+        offset = 5 + addr_len
+        as_num, = struct.unpack_from(as_pack_str, buf, offset)
+        offset += struct.calcsize(as_pack_str)
+        return cls(bgp_id, ip_addr, as_num), buf[offset:]
+
+    def serialize(self):
+        ip_addr = _pack_addr(self.ip_addr)
+        peer_type = _PEER_TYPE_AS4
+        if len(ip_addr) == 16:
+            peer_type |= _PEER_TYPE_IPV6
+        return (chr(peer_type) + socket.inet_aton(self.bgp_id) + ip_addr +
+                struct.pack('!I', self.as_num))
+
+
+@MrtRecord.register(MRT_TYPE_TABLE_DUMP_V2, TABLE_DUMP_V2_PEER_INDEX_TABLE)
+class PeerIndexTable(MrtRecord):
+    """TABLE_DUMP_V2 PEER_INDEX_TABLE record, the peers whose paths are in
+    the RIB records which follow it.
+    """
+
+    _TYPE = MRT_TYPE_TABLE_DUMP_V2
+
+    def __init__(self, collector_bgp_id, view_name, peers, timestamp=0):
+        super(PeerIndexTable, self).__init__(timestamp)
+        self.collector_bgp_id = collector_bgp_id
+        self.view_name = view_name
+        self.peers = peers
+
+    @property
+    def subtype(self):
+        return TABLE_DUMP_V2_PEER_INDEX_TABLE
+
+    @classmethod
+    def parse_body(cls, subtype, buf, timestamp):
+        collector_bgp_id = socket.inet_ntoa(buf[:4])
+        name_len, = struct.unpack_from('!H', buf, 4)
+        view_name = buf[6:6 + name_len]
+        count, = struct.unpack_from('!H', buf, 6 + name_len)
+        rest = buf[8 + name_len:]
+        peers = []
+        for _ in range(count):
+            peer, rest = MrtPeer.parser(rest)
+            peers.append(peer)
+        return cls(collector_bgp_id, view_name, peers, timestamp)
+
+    def serialize_body(self):
+        return ''.join(
+            [socket.inet_aton(self.collector_bgp_id),
+             struct.pack('!H', len(self.view_name)), self.view_name,
+             struct.pack('!H', len(self.peers))] +
+            [peer.serialize() for peer in self.peers])
+
+
+def _parse_as4_path(value):
+    # The ASes of an AS_PATH are always 4 bytes long in a RIB entry.
+    segs = []
+    offset = 0
+    while offset < len(value):
+        type_, count = struct.unpack_from('!BB', value, offset)
+        offset += 2
+        ases = list(struct.unpack_from('!%dI' % count, value, offset))
+        offset += 4 * count
+        segs.append(set(ases) if type_ == 1 else ases)
+    return bgp.BGPPathAttributeAsPath(segs, as_pack_str='!I')
+
+
+class RibEntry(object):
+    """Entry of a RIB record, a path from the peer at *peer_index* in the
+    PEER_INDEX_TABLE.
+
+    *attributes* are BGP path attributes, but MP_REACH_NLRI whose next hop
+    is *next_hop*.  The next hop of IPv4 unicast paths is usually in their
+    NEXT_HOP attribute instead.
+    """
+
+    _HDR = struct.Struct('!HIH')  # peer index, originated time, attr len
+
+    def __init__(self, peer_index, originated_time, attributes=None,
+                 next_hop=None, attr_buf=None):
+        self.peer_index = peer_index
+        self.originated_time = originated_time
+        self.next_hop = next_hop
+        self._attributes = attributes
+        self._attr_buf = attr_buf
+
+    @property
+    def attributes(self):
+        if self._attributes is None:
+            self._attributes = self._parse_attributes(self._attr_buf or '')
+        return self._attributes
+
+    @property
+    def attr_buf(self):
+        """The attributes as serialized, MP_REACH_NLRI excluded."""
+        if self._attr_buf is None:
+            self._attr_buf = ''.join(self._serialize_attribute(a)
+                                     for a in self._attributes or [])
+        return self._attr_buf
+
+    @staticmethod
+    def _serialize_attribute(attr):
+        if attr.type == bgp.BGP_ATTR_TYPE_AS_PATH:
+            attr = bgp.BGPPathAttributeAsPath(attr.value, as_pack_str='!I')
+        return str(attr.serialize())
+
+    @staticmethod
+    def _parse_attributes(buf):
+        attributes = []
+        while buf:
+            attr, buf = bgp._PathAttribute.parser(buf)
+            if attr.type == bgp.BGP_ATTR_TYPE_AS_PATH:
+                attr = _parse_as4_path(_attr_value(attr))
+            attributes.append(attr)
+        return attributes
+
+    @classmethod
+    def parser(cls, buf):
+        peer_index, originated_time, attr_len = cls._HDR.unpack_from(buf)
+        end = cls._HDR.size + attr_len
+        attr_buf = buf[cls._HDR.size:end]
+        # Moves the abbreviated MP_REACH_NLRI, next hop length and next
+        # hop only, out of the attributes.  The attributes are only walked
+        # if the type of MP_REACH_NLRI may be there.
+        next_hop = None
+        offset = 0
+        if _MP_REACH_NLRI_TYPE not in attr_buf:
+            offset = len(attr_buf)
+        while offset < len(attr_buf):
+            flags, type_ = struct.unpack_from('!BB', attr_buf, offset)
+            if flags & bgp.BGP_ATTR_FLAG_EXTENDED_LENGTH:
+                length, = struct.unpack_from('!H', attr_buf, offset + 2)
+                value_offset = offset + 4
+            else:
+                length = ord(attr_buf[offset + 2])
+                value_offset = offset + 3
+            if type_ == bgp.BGP_ATTR_TYPE_MP_REACH_NLRI:
+                next_hop = _parse_next_hop(
+                    attr_buf[value_offset:value_offset + length])
+                attr_buf = (attr_buf[:offset] +
+                            attr_buf[value_offset + length:])
+                continue
+            offset = value_offset + length
+        return cls(peer_index, originated_time, next_hop=next_hop,
+                   attr_buf=attr_buf), buf[end:]
+
+    def serialize(self):
+        attr_buf = self.attr_buf
+        if self.next_hop is not None:
+            next_hop = _pack_addr(self.next_hop)
+            attr_buf += struct.pack(
+                '!BBBB', bgp.BGP_ATTR_FLAG_OPTIONAL,
+                bgp.BGP_ATTR_TYPE_MP_REACH_NLRI, len(next_hop) + 1,
+                len(next_hop)) + next_hop
+        return self._HDR.pack(self.peer_index, self.originated_time,
+                              len(attr_buf)) + attr_buf
+
+
+def _attr_value(attr):
+    # the value bytes of a parsed attribute
+    buf = str(attr.serialize())
+    if attr.flags & bgp.BGP_ATTR_FLAG_EXTENDED_LENGTH:
+        return buf[4:]
+    return buf[3:]
+
+
+def _parse_next_hop(value):
+    # next hop length, then the next hop: an IPv4 or IPv6 address, IPv6
+    # global and link local addresses, or any of them after a (zero)
+    # route distinguisher as for VPN routes.
+    length = ord(value[0])
+    next_hop = value[1:1 + length]
+    if length in (12, 24):
+        next_hop = next_hop[8:]
+    return _unpack_addr(next_hop[:16] if len(next_hop) == 32 else next_hop)
+
+
+@MrtRecord.register(MRT_TYPE_TABLE_DUMP_V2, TABLE_DUMP_V2_RIB_IPV4_UNICAST,
+                    TABLE_DUMP_V2_RIB_IPV4_MULTICAST,
+                    TABLE_DUMP_V2_RIB_IPV6_UNICAST,
+                    TABLE_DUMP_V2_RIB_IPV6_MULTICAST,
+                    TABLE_DUMP_V2_RIB_GENERIC)
+class RibRecord(MrtRecord):
+    """TABLE_DUMP_V2 RIB record, the paths to *prefix*, a ryu BGP NLRI
+    such as IPAddrPrefix or LabelledVPNIPAddrPrefix.
+
+    The IPv4 and IPv6 unicast prefixes are in RIB_IPV4_UNICAST and
+    RIB_IPV6_UNICAST records, the others in RIB_GENERIC ones.
+    """
+
+    _TYPE = MRT_TYPE_TABLE_DUMP_V2
+
+    def __init__(self, seq_num, prefix, entries, timestamp=0, subtype=None):
+        super(RibRecord, self).__init__(timestamp)
+        self.seq_num = seq_num
+        self.prefix = prefix
+        self.entries = entries
+        if subtype is None:
+            subtype = _RIB_SUBTYPES.get(prefix.ROUTE_FAMILY,
+                                        TABLE_DUMP_V2_RIB_GENERIC)
+        self._subtype = subtype
+
+    @property
+    def subtype(self):
+        return self._subtype
+
+    @classmethod
+    def parse_body(cls, subtype, buf, timestamp):
+        seq_num, = struct.unpack_from('!I', buf)
+        if subtype == TABLE_DUMP_V2_RIB_GENERIC:
+            afi, safi = struct.unpack_from('!HB', buf, 4)
+            prefix_cls = bgp._get_addr_class(afi, safi)
+            prefix, rest = prefix_cls.parser(buf[7:])
+        else:
+            prefix, rest = _RIB_PREFIX_CLASSES[subtype].parser(buf[4:])
+        count, = struct.unpack_from('!H', rest)
+        rest = rest[2:]
+        entries = []
+        for _ in range(count):
+            entry, rest = RibEntry.parser(rest)
+            entries.append(entry)
+        return cls(seq_num, prefix, entries, timestamp, subtype)
+
+    def serialize_body(self):
+        buf = [struct.pack('!I', self.seq_num)]
+        if self._subtype == TABLE_DUMP_V2_RIB_GENERIC:
+            rf = self.prefix.ROUTE_FAMILY
+            buf.append(struct.pack('!HB', rf.afi, rf.safi))
+        buf.append(str(self.prefix.serialize()))
+        buf.append(struct.pack('!H', len(self.entries)))
+        buf.extend(entry.serialize() for entry in self.entries)
+        return ''.join(buf)
+
+
+@MrtRecord.register(MRT_TYPE_BGP4MP, BGP4MP_MESSAGE, BGP4MP_MESSAGE_AS4)
+class Bgp4MpMessage(MrtRecord):
+    """BGP4MP MESSAGE record, a BGP message received from (or sent to) a
+    peer.
+
+    *message* is a ryu BGPMessage or its raw bytes.  The records are
+    written as BGP4MP_MESSAGE_AS4.
+    """
+
+    _TYPE = MRT_TYPE_BGP4MP
+    _AS_PACK_STR = {BGP4MP_MESSAGE: '!HHHH', BGP4MP_MESSAGE_AS4: '!IIHH'}
+
+    def __init__(self, peer_as, local_as, if_index, peer_ip, local_ip,
+                 message, timestamp=0):
+        super(Bgp4MpMessage, self).__init__(timestamp)
+        self.peer_as = peer_as
+        self.local_as = local_as
+        self.if_index = if_index
+        self.peer_ip = peer_ip
+        self.local_ip = local_ip
+        if isinstance(message, str):
+            self._data = message
+            self._message = None
+        else:
+            self._data = None
+            self._message = message
+
+    @property
+    def subtype(self):
+        return BGP4MP_MESSAGE_AS4
+
+    @property
+    def message(self):
+        if self._message is None:
+            self._message, _rest = bgp.BGPMessage.parser(self._data)
+        return self._message
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = str(self._message.serialize())
+        return self._data
+
+    @classmethod
+    def parse_body(cls, subtype, buf, timestamp):
+        pack_str = cls._AS_PACK_STR[subtype]
+        peer_as, local_as, if_index, afi = struct.unpack_from(pack_str, buf)
+        offset = struct.calcsize(pack_str)
+        addr_len = _ADDR_LEN[afi]
+        peer_ip = _unpack_addr(buf[offset:offset + addr_len])
+        local_ip = _unpack_addr(buf[offset + addr_len:offset + 2 * addr_len])
+        return cls(peer_as, local_as, if_index, peer_ip, local_ip,
+                   buf[offset + 2 * addr_len:], timestamp)
+
+    def serialize_body(self):
+        peer_ip = _pack_addr(self.peer_ip)
+        local_ip = _pack_addr(self.local_ip)
+        return (struct.pack(self._AS_PACK_STR[BGP4MP_MESSAGE_AS4],
+                            self.peer_as, self.local_as, self.if_index,
+                            _AFI[len(peer_ip)]) +
+                peer_ip + local_ip + self.data)
+
+
+class Reader(object):
+    """Iterates over the records of the MRT file object *f*."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        hdr = self._f.read(_HDR.size)
+        if not hdr:
+            raise StopIteration()
+        if len(hdr) < _HDR.size:
+            raise ValueError('Truncated MRT header')
+        length = _HDR.unpack(hdr)[3]
+        body = self._f.read(length)
+        record, _rest = MrtRecord.parser(hdr + body)
+        return record
+
+    def close(self):
+        self._f.close()
+
+
+class Writer(object):
+    """Writes MRT records to the file object *f*."""
+
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, record):
+        self._f.write(record.serialize())
+
+    def close(self):
+        self._f.close()
@@ -17,6 +17,7 @@ import struct
 import socket
 import logging
 
+from ryu import exception
 from ryu.ofproto import ofproto_v1_0
 from ryu.lib import hub
 from ryu.lib.mac import haddr_to_bin, haddr_to_str
@@ -242,22 +243,31 @@ def nw_dst_to_str(wildcards, addr):
     return ip
 
 
-def send_stats_request(dp, stats, waiters, msgs):
+def send_stats_request(dp, stats, waiters, msgs, timeout=None):
+    """Sends the stats request and appends its replies to msgs.
+
+    Without timeout, gives up silently after DEFAULT_TIMEOUT seconds.
+    With timeout, raises OFPStatsTimeout if the reply isn't complete after
+    timeout seconds.
+    """
     dp.set_xid(stats)
     waiters_per_dp = waiters.setdefault(dp.id, {})
     lock = hub.Event()
     waiters_per_dp[stats.xid] = (lock, msgs)
-    dp.send_msg(stats)
-
-    lock.wait(timeout=DEFAULT_TIMEOUT)
-    if not lock.is_set():
-        del waiters_per_dp[stats.xid]
+    try:
+        dp.send_msg(stats)
+        lock.wait(timeout=DEFAULT_TIMEOUT if timeout is None else timeout)
+    finally:
+        if not lock.is_set():
+            waiters_per_dp.pop(stats.xid, None)
+    if not lock.is_set() and timeout is not None:
+        raise exception.OFPStatsTimeout(dpid=dp.id, timeout=timeout)
 
 
-def get_desc_stats(dp, waiters):
+def get_desc_stats(dp, waiters, timeout=None):
     stats = dp.ofproto_parser.OFPDescStatsRequest(dp, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     for msg in msgs:
         stats = msg.body
@@ -270,7 +280,7 @@ def get_desc_stats(dp, waiters):
     return desc
 
 
-def get_flow_stats(dp, waiters, flow={}):
+def get_flow_stats(dp, waiters, flow={}, timeout=None):
     match = to_match(dp, flow.get('match', {}))
     table_id = int(flow.get('table_id', 0xff))
     out_port = int(flow.get('out_port', dp.ofproto.OFPP_NONE))
@@ -279,7 +289,7 @@ def get_flow_stats(dp, waiters, flow={}):
         dp, 0, match, table_id, out_port)
 
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     flows = []
     for msg in msgs:
@@ -303,11 +313,11 @@ def get_flow_stats(dp, waiters, flow={}):
     return flows
 
 
-def get_port_stats(dp, waiters):
+def get_port_stats(dp, waiters, timeout=None):
     stats = dp.ofproto_parser.OFPPortStatsRequest(
         dp, 0, dp.ofproto.OFPP_NONE)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     ports = []
     for msg in msgs:
@@ -330,11 +340,11 @@ def get_port_stats(dp, waiters):
     return ports
 
 
-def get_port_desc(dp, waiters):
+def get_port_desc(dp, waiters, timeout=None):
 
     stats = dp.ofproto_parser.OFPFeaturesRequest(dp)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     descs = []
 
@@ -19,6 +19,7 @@ import socket
 import logging
 import netaddr
 
+from ryu import exception
 from ryu.ofproto import ether
 from ryu.ofproto import inet
 from ryu.ofproto import ofproto_v1_2
@@ -379,22 +380,31 @@ def match_vid_to_str(value, mask):
     return value
 
 
-def send_stats_request(dp, stats, waiters, msgs):
+def send_stats_request(dp, stats, waiters, msgs, timeout=None):
+    """Sends the stats request and appends its replies to msgs.
+
+    Without timeout, gives up silently after DEFAULT_TIMEOUT seconds.
+    With timeout, raises OFPStatsTimeout if the reply isn't complete after
+    timeout seconds.
+    """
     dp.set_xid(stats)
     waiters_per_dp = waiters.setdefault(dp.id, {})
     lock = hub.Event()
     waiters_per_dp[stats.xid] = (lock, msgs)
-    dp.send_msg(stats)
-
-    lock.wait(timeout=DEFAULT_TIMEOUT)
-    if not lock.is_set():
-        del waiters_per_dp[stats.xid]
+    try:
+        dp.send_msg(stats)
+        lock.wait(timeout=DEFAULT_TIMEOUT if timeout is None else timeout)
+    finally:
+        if not lock.is_set():
+            waiters_per_dp.pop(stats.xid, None)
+    if not lock.is_set() and timeout is not None:
+        raise exception.OFPStatsTimeout(dpid=dp.id, timeout=timeout)
 
 
-def get_desc_stats(dp, waiters):
+def get_desc_stats(dp, waiters, timeout=None):
     stats = dp.ofproto_parser.OFPDescStatsRequest(dp)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     s = {}
     for msg in msgs:
@@ -408,12 +418,12 @@ def get_desc_stats(dp, waiters):
     return desc
 
 
-def get_queue_stats(dp, waiters):
+def get_queue_stats(dp, waiters, timeout=None):
     ofp = dp.ofproto
     stats = dp.ofproto_parser.OFPQueueStatsRequest(dp, 0, ofp.OFPP_ANY,
                                                    ofp.OFPQ_ALL)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     s = []
     for msg in msgs:
@@ -428,7 +438,7 @@ def get_queue_stats(dp, waiters):
     return desc
 
 
-def get_flow_stats(dp, waiters, flow={}):
+def get_flow_stats(dp, waiters, flow={}, timeout=None):
     table_id = int(flow.get('table_id', dp.ofproto.OFPTT_ALL))
     out_port = int(flow.get('out_port', dp.ofproto.OFPP_ANY))
     out_group = int(flow.get('out_group', dp.ofproto.OFPG_ANY))
@@ -440,7 +450,7 @@ def get_flow_stats(dp, waiters, flow={}):
         dp, table_id, out_port, out_group, cookie, cookie_mask, match)
 
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     flows = []
     for msg in msgs:
@@ -465,11 +475,11 @@ def get_flow_stats(dp, waiters, flow={}):
     return flows
 
 
-def get_port_stats(dp, waiters):
+def get_port_stats(dp, waiters, timeout=None):
     stats = dp.ofproto_parser.OFPPortStatsRequest(
         dp, dp.ofproto.OFPP_ANY, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     ports = []
     for msg in msgs:
@@ -492,11 +502,11 @@ def get_port_stats(dp, waiters):
     return ports
 
 
-def get_group_stats(dp, waiters):
+def get_group_stats(dp, waiters, timeout=None):
     stats = dp.ofproto_parser.OFPGroupStatsRequest(
         dp, dp.ofproto.OFPG_ALL, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     groups = []
     for msg in msgs:
@@ -517,7 +527,7 @@ def get_group_stats(dp, waiters):
     return groups
 
 
-def get_group_features(dp, waiters):
+def get_group_features(dp, waiters, timeout=None):
 
     ofp = dp.ofproto
     type_convert = {ofp.OFPGT_ALL: 'ALL',
@@ -545,7 +555,7 @@ def get_group_features(dp, waiters):
 
     stats = dp.ofproto_parser.OFPGroupFeaturesStatsRequest(dp, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     features = []
     for msg in msgs:
@@ -577,7 +587,7 @@ def get_group_features(dp, waiters):
     return features
 
 
-def get_group_desc(dp, waiters):
+def get_group_desc(dp, waiters, timeout=None):
 
     type_convert = {dp.ofproto.OFPGT_ALL: 'ALL',
                     dp.ofproto.OFPGT_SELECT: 'SELECT',
@@ -586,7 +596,7 @@ def get_group_desc(dp, waiters):
 
     stats = dp.ofproto_parser.OFPGroupDescStatsRequest(dp, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     descs = []
     for msg in msgs:
@@ -609,11 +619,11 @@ def get_group_desc(dp, waiters):
     return descs
 
 
-def get_port_desc(dp, waiters):
+def get_port_desc(dp, waiters, timeout=None):
 
     stats = dp.ofproto_parser.OFPFeaturesRequest(dp)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     descs = []
 
@@ -19,6 +19,7 @@ import socket
 import logging
 import netaddr
 
+from ryu import exception
 from ryu.ofproto import ether
 from ryu.ofproto import inet
 from ryu.ofproto import ofproto_v1_3
@@ -401,22 +402,31 @@ def match_vid_to_str(value, mask):
     return value
 
 
-def send_stats_request(dp, stats, waiters, msgs):
+def send_stats_request(dp, stats, waiters, msgs, timeout=None):
+    """Sends the stats request and appends its replies to msgs.
+
+    Without timeout, gives up silently after DEFAULT_TIMEOUT seconds.
+    With timeout, raises OFPStatsTimeout if the reply isn't complete after
+    timeout seconds.
+    """
     dp.set_xid(stats)
     waiters_per_dp = waiters.setdefault(dp.id, {})
     lock = hub.Event()
     waiters_per_dp[stats.xid] = (lock, msgs)
-    dp.send_msg(stats)
-
-    lock.wait(timeout=DEFAULT_TIMEOUT)
-    if not lock.is_set():
-        del waiters_per_dp[stats.xid]
+    try:
+        dp.send_msg(stats)
+        lock.wait(timeout=DEFAULT_TIMEOUT if timeout is None else timeout)
+    finally:
+        if not lock.is_set():
+            waiters_per_dp.pop(stats.xid, None)
+    if not lock.is_set() and timeout is not None:
+        raise exception.OFPStatsTimeout(dpid=dp.id, timeout=timeout)
 
 
-def get_desc_stats(dp, waiters):
+def get_desc_stats(dp, waiters, timeout=None):
     stats = dp.ofproto_parser.OFPDescStatsRequest(dp, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
     s = {}
 
     for msg in msgs:
@@ -430,12 +440,12 @@ def get_desc_stats(dp, waiters):
     return desc
 
 
-def get_queue_stats(dp, waiters):
+def get_queue_stats(dp, waiters, timeout=None):
     ofp = dp.ofproto
     stats = dp.ofproto_parser.OFPQueueStatsRequest(dp, 0, ofp.OFPP_ANY,
                                                    ofp.OFPQ_ALL)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     s = []
     for msg in msgs:
@@ -452,7 +462,7 @@ def get_queue_stats(dp, waiters):
     return desc
 
 
-def get_flow_stats(dp, waiters, flow={}):
+def get_flow_stats(dp, waiters, flow={}, timeout=None):
     table_id = int(flow.get('table_id', dp.ofproto.OFPTT_ALL))
     flags = int(flow.get('flags', 0))
     out_port = int(flow.get('out_port', dp.ofproto.OFPP_ANY))
@@ -466,7 +476,7 @@ def get_flow_stats(dp, waiters, flow={}):
         match)
 
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     flows = []
     for msg in msgs:
@@ -493,11 +503,11 @@ def get_flow_stats(dp, waiters, flow={}):
     return flows
 
 
-def get_port_stats(dp, waiters):
+def get_port_stats(dp, waiters, timeout=None):
     stats = dp.ofproto_parser.OFPPortStatsRequest(
         dp, 0, dp.ofproto.OFPP_ANY)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     ports = []
     for msg in msgs:
@@ -522,11 +532,11 @@ def get_port_stats(dp, waiters):
     return ports
 
 
-def get_meter_stats(dp, waiters):
+def get_meter_stats(dp, waiters, timeout=None):
     stats = dp.ofproto_parser.OFPMeterStatsRequest(
         dp, 0, dp.ofproto.OFPM_ALL)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     meters = []
     for msg in msgs:
@@ -549,7 +559,7 @@ def get_meter_stats(dp, waiters):
     return meters
 
 
-def get_meter_features(dp, waiters):
+def get_meter_features(dp, waiters, timeout=None):
 
     ofp = dp.ofproto
     type_convert = {ofp.OFPMBT_DROP: 'DROP',
@@ -562,7 +572,7 @@ def get_meter_features(dp, waiters):
 
     stats = dp.ofproto_parser.OFPMeterFeaturesStatsRequest(dp, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     features = []
     for msg in msgs:
@@ -585,7 +595,7 @@ def get_meter_features(dp, waiters):
     return features
 
 
-def get_meter_config(dp, waiters):
+def get_meter_config(dp, waiters, timeout=None):
     flags = {dp.ofproto.OFPMF_KBPS: 'KBPS',
              dp.ofproto.OFPMF_PKTPS: 'PKTPS',
              dp.ofproto.OFPMF_BURST: 'BURST',
@@ -598,7 +608,7 @@ def get_meter_config(dp, waiters):
     stats = dp.ofproto_parser.OFPMeterConfigStatsRequest(
         dp, 0, dp.ofproto.OFPM_ALL)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     configs = []
     for msg in msgs:
@@ -625,11 +635,11 @@ def get_meter_config(dp, waiters):
     return configs
 
 
-def get_group_stats(dp, waiters):
+def get_group_stats(dp, waiters, timeout=None):
     stats = dp.ofproto_parser.OFPGroupStatsRequest(
         dp, 0, dp.ofproto.OFPG_ALL)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     groups = []
     for msg in msgs:
@@ -652,7 +662,7 @@ def get_group_stats(dp, waiters):
     return groups
 
 
-def get_group_features(dp, waiters):
+def get_group_features(dp, waiters, timeout=None):
 
     ofp = dp.ofproto
     type_convert = {ofp.OFPGT_ALL: 'ALL',
@@ -682,7 +692,7 @@ def get_group_features(dp, waiters):
 
     stats = dp.ofproto_parser.OFPGroupFeaturesStatsRequest(dp, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     features = []
     for msg in msgs:
@@ -714,7 +724,7 @@ def get_group_features(dp, waiters):
     return features
 
 
-def get_group_desc(dp, waiters):
+def get_group_desc(dp, waiters, timeout=None):
 
     type_convert = {dp.ofproto.OFPGT_ALL: 'ALL',
                     dp.ofproto.OFPGT_SELECT: 'SELECT',
@@ -723,7 +733,7 @@ def get_group_desc(dp, waiters):
 
     stats = dp.ofproto_parser.OFPGroupDescStatsRequest(dp, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     descs = []
     for msg in msgs:
@@ -746,11 +756,11 @@ def get_group_desc(dp, waiters):
     return descs
 
 
-def get_port_desc(dp, waiters):
+def get_port_desc(dp, waiters, timeout=None):
 
     stats = dp.ofproto_parser.OFPPortDescStatsRequest(dp, 0)
     msgs = []
-    send_stats_request(dp, stats, waiters, msgs)
+    send_stats_request(dp, stats, waiters, msgs, timeout)
 
     descs = []
 
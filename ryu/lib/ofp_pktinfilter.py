@@ -14,11 +14,15 @@
 # limitations under the License.
 # vim: tabstop=4 shiftwidth=4 softtabstop=4
 
+import collections
 import logging
+import struct
+import time
 from abc import ABCMeta, abstractmethod
 import six
 
-from ryu.lib.packet import packet
+from ryu.ofproto import ether
+from ryu.ofproto import inet
 
 LOG = logging.getLogger(__name__)
 
@@ -26,7 +30,7 @@ LOG = logging.getLogger(__name__)
 def packet_in_filter(cls, args=None, logging=False):
     def _packet_in_filter(packet_in_handler):
         def __packet_in_filter(self, ev):
-            pkt = packet.Packet(ev.msg.data)
+            pkt = ev.msg.packet
             if not packet_in_handler.pkt_in_filter.filter(pkt):
                 if logging:
                     LOG.debug('The packet is discarded by %s: %s' % (cls, pkt))
@@ -56,3 +60,160 @@ class RequiredTypeFilter(PacketInFilterBase):
             if not pkt.get_protocol(required_type):
                 return False
         return True
+
+
+class TokenBucket(object):
+    """Token bucket refilled with rate tokens per second up to burst."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = self.burst
+        self.last = None
+
+    def consume(self, now, tokens=1):
+        if self.last is not None:
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+
+_BFD_PORTS = (3784, 4784)   # single hop and multihop BFD control
+
+
+def _ethernet_header(data):
+    """Return (dst, src, ethertype, offset of the payload) of a frame.
+
+    Only the fixed offsets are looked at, a full parse is not needed
+    to classify a PacketIn.
+    """
+    if len(data) < 14:
+        return None
+    dst = data[0:6]
+    src = data[6:12]
+    (ethertype,) = struct.unpack_from('!H', data, 12)
+    offset = 14
+    while (ethertype in (ether.ETH_TYPE_8021Q, ether.ETH_TYPE_8021AD) and
+           len(data) >= offset + 4):
+        (ethertype,) = struct.unpack_from('!H', data, offset + 2)
+        offset += 4
+    return dst, src, ethertype, offset
+
+
+def _is_bfd(data, offset):
+    if len(data) < offset + 20:
+        return False
+    ihl = (ord(data[offset]) & 0xf) * 4
+    if ord(data[offset + 9]) != inet.IPPROTO_UDP:
+        return False
+    if len(data) < offset + ihl + 4:
+        return False
+    (dst_port,) = struct.unpack_from('!H', data, offset + ihl + 2)
+    return dst_port in _BFD_PORTS
+
+
+class PacketInAdmission(object):
+    """Admission control of the PacketIn messages of a datapath.
+
+    Applied by the controller before a PacketIn is dispatched to the
+    applications.  A PacketIn is dropped when
+
+    - the token bucket of its in_port or of the datapath is empty, or
+    - an identical (in_port, src, dst, ethertype) PacketIn was admitted
+      less than dedup_ttl seconds ago; that is, while the flow entry
+      installed for the first one is likely pending.
+
+    LLDP, ARP and BFD packets are in a priority class which bypasses
+    both checks when priority is True.
+    The number of admitted and dropped PacketIns is kept in counters.
+    A rate of 0 disables the corresponding limit.
+    """
+
+    PRIORITY_ETHERTYPES = (ether.ETH_TYPE_LLDP, ether.ETH_TYPE_ARP)
+
+    # bound of the dedup cache
+    DEDUP_MAX_ENTRIES = 4096
+
+    def __init__(self, dp_rate=0, dp_burst=None, port_rate=0,
+                 port_burst=None, dedup_ttl=0, priority=True):
+        super(PacketInAdmission, self).__init__()
+        self.dp_bucket = None
+        if dp_rate:
+            self.dp_bucket = TokenBucket(dp_rate, dp_burst or dp_rate)
+        self.port_rate = port_rate
+        self.port_burst = port_burst or port_rate
+        self.port_buckets = {}
+        self.dedup_ttl = dedup_ttl
+        self.dedup = collections.OrderedDict()  # key -> expiry
+        self.priority = priority
+        self.counters = dict.fromkeys(
+            ['admitted', 'priority', 'dropped_datapath', 'dropped_port',
+             'dropped_duplicate'], 0)
+
+    @staticmethod
+    def _in_port(msg):
+        in_port = getattr(msg, 'in_port', None)
+        if in_port is None:
+            match = getattr(msg, 'match', None)
+            if match is not None:
+                in_port = match.get('in_port')
+        return in_port
+
+    def _is_priority(self, header, data):
+        ethertype, offset = header[2], header[3]
+        if ethertype in self.PRIORITY_ETHERTYPES:
+            return True
+        return ethertype == ether.ETH_TYPE_IP and _is_bfd(data, offset)
+
+    def _expire_dedup(self, now):
+        # entries are in insertion order, hence in expiry order too.
+        dedup = self.dedup
+        while dedup:
+            k, expiry = next(six.iteritems(dedup))
+            if expiry > now and len(dedup) < self.DEDUP_MAX_ENTRIES:
+                break
+            del dedup[k]
+
+    def admit(self, msg, now=None):
+        if now is None:
+            now = time.time()
+        data = str(msg.data)
+        header = _ethernet_header(data)
+
+        if (self.priority and header is not None and
+                self._is_priority(header, data)):
+            self.counters['priority'] += 1
+            return True
+
+        in_port = self._in_port(msg)
+        key = None
+        if self.dedup_ttl and header is not None:
+            self._expire_dedup(now)
+            key = (in_port, header[0], header[1], header[2])
+            if key in self.dedup:
+                self.counters['dropped_duplicate'] += 1
+                return False
+
+        # the port bucket first, so that a flooding port doesn't use up
+        # the tokens of the datapath shared with the other ports
+        if self.port_rate:
+            bucket = self.port_buckets.get(in_port)
+            if bucket is None:
+                bucket = TokenBucket(self.port_rate, self.port_burst)
+                self.port_buckets[in_port] = bucket
+            if not bucket.consume(now):
+                self.counters['dropped_port'] += 1
+                return False
+
+        if self.dp_bucket is not None and not self.dp_bucket.consume(now):
+            self.counters['dropped_datapath'] += 1
+            return False
+
+        if key is not None:
+            self.dedup[key] = now + self.dedup_ttl
+        self.counters['admitted'] += 1
+        return True
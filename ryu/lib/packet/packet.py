@@ -135,6 +135,27 @@ class Packet(object):
     __repr__ = __str__  # note: str(list) uses __repr__ for elements
 
 
+class ReadOnlyPacket(Packet):
+    """A decoded packet which can not be modified.
+
+    The protocol list is a tuple and the methods to add protocols or to
+    encode the packet raise TypeError.  An instance is meant to be shared
+    among several readers, e.g. the applications handling the same
+    Packet-In message, so the protocol headers must not be modified
+    either.  Build a new Packet from *data* to get a modifiable copy.
+    """
+
+    def __init__(self, data, parse_cls=ethernet.ethernet):
+        super(ReadOnlyPacket, self).__init__(data, parse_cls=parse_cls)
+        self.protocols = tuple(self.protocols)
+
+    def serialize(self):
+        raise TypeError('read-only packet can not be serialized')
+
+    def add_protocol(self, proto):
+        raise TypeError('read-only packet can not be modified')
+
+
 # XXX: Hack for preventing recursive import
 def _PacketBase__div__(self, trailer):
     pkt = Packet()
@@ -0,0 +1,64 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Fixed-size ring buffer of numbers backed by array.array.
+
+Once the buffer is full, appending a value overwrites the oldest one,
+so the memory used by a buffer never grows.
+"""
+
+import array
+
+
+class RingBuffer(object):
+    def __init__(self, size, typecode='d'):
+        super(RingBuffer, self).__init__()
+        assert size > 0
+        self.size = size
+        self._buf = array.array(typecode, [0]) * size
+        self._pos = 0   # index where the next value is stored
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append(self, value):
+        self._buf[self._pos] = value
+        self._pos = (self._pos + 1) % self.size
+        if self._len < self.size:
+            self._len += 1
+
+    def __getitem__(self, index):
+        # index 0 is the oldest value, -1 the latest one.
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError('ring buffer index out of range')
+        return self._buf[(self._pos - self._len + index) % self.size]
+
+    def __iter__(self):
+        start = self._pos - self._len
+        for i in range(self._len):
+            yield self._buf[(start + i) % self.size]
+
+    def latest(self, default=None):
+        if not self._len:
+            return default
+        return self._buf[self._pos - 1]
+
+    def clear(self):
+        self._pos = 0
+        self._len = 0
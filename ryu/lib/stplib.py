@@ -466,7 +466,7 @@ class Bridge(object):
         if in_port.state == PORT_STATE_DISABLE:
             return
 
-        pkt = packet.Packet(msg.data)
+        pkt = msg.packet
         if bpdu.ConfigurationBPDUs in pkt:
             """ Receive Configuration BPDU.
                  - If receive superior BPDU:
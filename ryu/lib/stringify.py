@@ -18,7 +18,6 @@
 
 import base64
 import collections
-import inspect
 
 
 # Some arguments to __init__ is mungled in order to avoid name conflicts
@@ -325,15 +324,18 @@ def obj_python_attrs(msg_):
             yield(k, getattr(msg_, k))
         return
     base = getattr(msg_, '_base_attributes', [])
-    for k, v in inspect.getmembers(msg_):
+    for k in dir(msg_):
         if k.startswith('_'):
             continue
-        if callable(v):
-            continue
         if k in base:
             continue
+        # skip class attributes before getattr so that properties
+        # (e.g. a lazily parsed packet) are not evaluated.
         if hasattr(msg_.__class__, k):
             continue
+        v = getattr(msg_, k)
+        if callable(v):
+            continue
         yield (k, v)
 
 
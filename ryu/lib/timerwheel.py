@@ -0,0 +1,155 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Hierarchical timer wheel.
+
+Keys are scheduled to expire after a delay and are returned by
+advance() once their time has come, with a resolution of one tick.
+The first level has one slot per tick, each upper level has slots
+covering a whole turn of the level below; timers kept in the upper
+levels are moved down as the wheel turns.  Scheduling and cancelling
+a timer are O(1) regardless of the number of timers.
+"""
+
+import math
+import time
+
+
+class TimerWheel(object):
+    def __init__(self, tick, slots=64, levels=4, now=None):
+        super(TimerWheel, self).__init__()
+        assert tick > 0
+        assert slots > 1 and levels > 0
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._wheels = [[set() for _i in range(slots)]
+                        for _l in range(levels)]
+        self._due = set()       # keys whose tick has already passed
+        self._timers = {}       # key -> (expiry tick, bucket)
+        if now is None:
+            now = time.time()
+        self._start = now
+        self._current = 0       # the last processed tick
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def _insert(self, key, expiry):
+        diff = expiry - self._current
+        level = 0
+        span = self.slots
+        while diff >= span and level < self.levels - 1:
+            level += 1
+            span *= self.slots
+        slot = expiry
+        if diff >= span:
+            # beyond the range of the wheel.  park it in the farthest
+            # slot, it is placed again when that slot is cascaded.
+            slot = self._current + span - 1
+        slot = (slot // (span // self.slots)) % self.slots
+        bucket = self._wheels[level][slot]
+        bucket.add(key)
+        self._timers[key] = (expiry, bucket)
+
+    def schedule(self, key, delay, now=None):
+        """Schedule *key* to expire *delay* seconds after *now*.
+
+        An already scheduled key is rescheduled.
+        """
+        if now is None:
+            now = time.time()
+        self.cancel(key)
+        expiry = int(math.ceil((now + delay - self._start) / self.tick))
+        if expiry <= self._current:
+            self._due.add(key)
+            self._timers[key] = (expiry, self._due)
+        else:
+            self._insert(key, expiry)
+
+    def cancel(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer[1].discard(key)
+
+    def clear(self):
+        for wheel in self._wheels:
+            for bucket in wheel:
+                bucket.clear()
+        self._due.clear()
+        self._timers.clear()
+
+    def _cascade(self, level):
+        span = self.slots ** level
+        bucket = self._wheels[level][(self._current // span) % self.slots]
+        keys = list(bucket)
+        bucket.clear()
+        for key in keys:
+            self._insert(key, self._timers[key][0])
+
+    def advance(self, now=None):
+        """Turn the wheel up to *now* and return the expired keys."""
+        if now is None:
+            now = time.time()
+        target = int((now - self._start) / self.tick)
+
+        expired = list(self._due)
+        self._due.clear()
+        while self._current < target:
+            if len(self._timers) == len(expired):
+                # nothing left in the wheel
+                self._current = target
+                break
+            self._current += 1
+            for level in range(self.levels - 1, 0, -1):
+                if self._current % (self.slots ** level) == 0:
+                    self._cascade(level)
+            bucket = self._wheels[0][self._current % self.slots]
+            expired.extend(bucket)
+            bucket.clear()
+
+        for key in expired:
+            del self._timers[key]
+        return expired
+
+    def _time(self, tick, now):
+        return max(0, self._start + tick * self.tick - now)
+
+    def next_timeout(self, now=None):
+        """Return the seconds to wait before calling advance() again.
+
+        None is returned if no timer is scheduled.  The timeout can be
+        shorter than the time to the next expiry when the next timers
+        are in the upper levels.
+        """
+        if now is None:
+            now = time.time()
+        if not self._timers:
+            return None
+        if self._due:
+            return 0
+
+        wheel = self._wheels[0]
+        for tick in range(self._current + 1,
+                          self._current + self.slots + 1):
+            if wheel[tick % self.slots]:
+                return self._time(tick, now)
+        # wake up at the next cascade of the second level
+        tick = (self._current // self.slots + 1) * self.slots
+        return self._time(tick, now)
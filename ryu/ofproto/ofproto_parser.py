@@ -212,6 +212,26 @@ class MsgInMsgBase(MsgBase):
                                                   **additional_args)
 
 
+class PacketInMixin(object):
+    """Gives Packet-In messages a parsed view of their data.
+
+    ``packet`` is a ryu.lib.packet.packet.ReadOnlyPacket decoded from
+    ``data`` on the first access and cached in the message, so that the
+    frame is parsed only once however many applications handle the
+    message.
+    """
+
+    @property
+    def packet(self):
+        pkt = getattr(self, '_packet', None)
+        if pkt is None:
+            # avoid loading the packet library with the parsers
+            from ryu.lib.packet import packet
+            pkt = packet.ReadOnlyPacket(self.data)
+            self._packet = pkt
+        return pkt
+
+
 def msg_pack_into(fmt, buf, offset, *args):
     if len(buf) < offset:
         buf += bytearray(offset - len(buf))
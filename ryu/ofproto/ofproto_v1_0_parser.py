@@ -22,6 +22,7 @@ import struct
 import binascii
 
 from ofproto_parser import StringifyMixin, MsgBase, msg_pack_into, msg_str_attr
+from ofproto_parser import PacketInMixin
 from ryu.lib import addrconv
 from ryu.lib import mac
 from . import ofproto_parser
@@ -1717,7 +1718,7 @@ class OFPPortStatus(MsgBase):
 
 @_register_parser
 @_set_msg_type(ofproto.OFPT_PACKET_IN)
-class OFPPacketIn(MsgBase):
+class OFPPacketIn(MsgBase, PacketInMixin):
     def __init__(self, datapath, buffer_id=None, total_len=None, in_port=None,
                  reason=None, data=None):
         super(OFPPacketIn, self).__init__(datapath)
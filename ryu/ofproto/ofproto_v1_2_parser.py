@@ -25,6 +25,7 @@ from ryu.lib import addrconv
 from ryu.lib import mac
 from ryu import utils
 from ofproto_parser import StringifyMixin, MsgBase, msg_pack_into, msg_str_attr
+from ofproto_parser import PacketInMixin
 from . import ether
 from . import ofproto_parser
 from . import ofproto_v1_2 as ofproto
@@ -543,7 +544,7 @@ class OFPSetConfig(MsgBase):
 
 @_register_parser
 @_set_msg_type(ofproto.OFPT_PACKET_IN)
-class OFPPacketIn(MsgBase):
+class OFPPacketIn(MsgBase, PacketInMixin):
     """
     Packet-In message
 
@@ -563,6 +564,8 @@ class OFPPacketIn(MsgBase):
     table_id      ID of the table that was looked up
     match         Instance of ``OFPMatch``
     data          Ethernet frame
+    packet        Read-only ``packet.Packet`` parsed from ``data``,
+                  shared by all the handlers of this message
     ============= =========================================================
 
     Example::
@@ -47,6 +47,7 @@ from ryu.lib import addrconv
 from ryu.lib import mac
 from ryu import utils
 from ofproto_parser import StringifyMixin, MsgBase, msg_pack_into, msg_str_attr
+from ofproto_parser import PacketInMixin
 from . import ether
 from . import ofproto_parser
 from . import ofproto_common
@@ -2068,7 +2069,7 @@ class MTIPv6ExtHdr(OFPMatchField):
 
 @_register_parser
 @_set_msg_type(ofproto.OFPT_PACKET_IN)
-class OFPPacketIn(MsgBase):
+class OFPPacketIn(MsgBase, PacketInMixin):
     """
     Packet-In message
 
@@ -2089,6 +2090,8 @@ class OFPPacketIn(MsgBase):
     cookie        Cookie of the flow entry that was looked up
     match         Instance of ``OFPMatch``
     data          Ethernet frame
+    packet        Read-only ``packet.Packet`` parsed from ``data``,
+                  shared by all the handlers of this message
     ============= =========================================================
 
     Example::
@@ -25,7 +25,7 @@ from ryu.lib import addrconv
 from ryu.lib import mac
 from ryu import utils
 from ofproto_parser import (StringifyMixin, MsgBase, MsgInMsgBase,
-                            msg_pack_into, msg_str_attr)
+                            PacketInMixin, msg_pack_into, msg_str_attr)
 from . import ether
 from . import ofproto_parser
 from . import ofproto_common
@@ -1062,7 +1062,7 @@ class OFPBundleProp(OFPPropBase):
     _TYPES = {}
 
 
-@OFPBundleProp.register_type(ofproto.OFPRPT_EXPERIMENTER)
+@OFPBundleProp.register_type(ofproto.OFPBPT_EXPERIMENTER)
 class OFPBundlePropExperimenter(OFPPropCommonExperimenter4ByteData):
     pass
 
@@ -1627,7 +1627,7 @@ class MTIPv6ExtHdr(OFPMatchField):
 
 @_register_parser
 @_set_msg_type(ofproto.OFPT_PACKET_IN)
-class OFPPacketIn(MsgBase):
+class OFPPacketIn(MsgBase, PacketInMixin):
     """
     Packet-In message
 
@@ -1651,6 +1651,8 @@ class OFPPacketIn(MsgBase):
     cookie        Cookie of the flow entry that was looked up
     match         Instance of ``OFPMatch``
     data          Ethernet frame
+    packet        Read-only ``packet.Packet`` parsed from ``data``,
+                  shared by all the handlers of this message
     ============= =========================================================
 
     Example::
@@ -5959,12 +5961,16 @@ class OFPSetAsync(MsgBase):
         self.buf += bin_props
 
 
+@_register_parser
 @_set_msg_type(ofproto.OFPT_BUNDLE_CONTROL)
 class OFPBundleCtrlMsg(MsgBase):
     """
     Bundle control message
 
-    The controller uses this message to create, destroy and commit bundles
+    The controller uses this message to create, destroy and commit bundles.
+    The switch answers each request with a message of this class whose
+    ``type`` is the corresponding ``OFPBCT_*_REPLY``, or with an error
+    message carrying the ``xid`` of the request.
 
     ================ ======================================================
     Attribute        Description
@@ -5995,16 +6001,51 @@ class OFPBundleCtrlMsg(MsgBase):
 
             req = ofp_parser.OFPBundleCtrlMsg(datapath, 7,
                                               ofp.OFPBCT_OPEN_REQUEST,
-                                              [ofp.OFPBF_ATOMIC], [])
+                                              ofp.OFPBF_ATOMIC, [])
             datapath.send_msg(req)
+
+        @set_ev_cls(ofp_event.EventOFPBundleCtrlMsg, MAIN_DISPATCHER)
+        def bundle_ctrl_reply_handler(self, ev):
+            msg = ev.msg
+
+            self.logger.debug('OFPBundleCtrlMsg received: '
+                              'bundle_id=%d type=%d flags=0x%08x '
+                              'properties=%s',
+                              msg.bundle_id, msg.type, msg.flags,
+                              repr(msg.properties))
+
+    A bundle can also be driven through ``Datapath.bundle()``, which
+    takes care of the control messages and of the reply correlation::
+
+        with datapath.bundle(atomic=True) as bundle:
+            for mod in flow_mods:
+                bundle.add(mod)
     """
-    def __init__(self, datapath, bundle_id, type_, flags, properties):
+    def __init__(self, datapath, bundle_id=None, type_=None, flags=None,
+                 properties=None):
         super(OFPBundleCtrlMsg, self).__init__(datapath)
         self.bundle_id = bundle_id
         self.type = type_
         self.flags = flags
         self.properties = properties
 
+    @classmethod
+    def parser(cls, datapath, version, msg_type, msg_len, xid, buf):
+        msg = super(OFPBundleCtrlMsg, cls).parser(datapath, version,
+                                                  msg_type, msg_len,
+                                                  xid, buf)
+        (msg.bundle_id, msg.type, msg.flags) = struct.unpack_from(
+            ofproto.OFP_BUNDLE_CTRL_MSG_PACK_STR, msg.buf,
+            ofproto.OFP_HEADER_SIZE)
+
+        msg.properties = []
+        rest = msg.buf[ofproto.OFP_BUNDLE_CTRL_MSG_SIZE:]
+        while rest:
+            p, rest = OFPBundleProp.parse(rest)
+            msg.properties.append(p)
+
+        return msg
+
     def _serialize_body(self):
         bin_props = bytearray()
         for p in self.properties:
@@ -6043,7 +6084,7 @@ class OFPBundleAddMsg(MsgInMsgBase):
 
             msg = ofp_parser.OFPRoleRequest(datapath, ofp.OFPCR_ROLE_EQUAL, 0)
 
-            req = ofp_parser.OFPBundleAddMsg(datapath, 7, [ofp.OFPBF_ATOMIC],
+            req = ofp_parser.OFPBundleAddMsg(datapath, 7, ofp.OFPBF_ATOMIC,
                                              msg, [])
             datapath.send_msg(req)
     """
@@ -30,6 +30,7 @@ from ryu.services.protocols.bgp.rtconf.vrfs import VRF_RF
 from ryu.services.protocols.bgp.rtconf.vrfs import VRF_RF_IPV4
 from ryu.services.protocols.bgp.rtconf.vrfs import VrfConf
 from ryu.services.protocols.bgp import constants as const
+from ryu.services.protocols.bgp import mrt
 
 LOG = logging.getLogger('bgpspeaker.api.rtconf')
 
@@ -297,3 +298,33 @@ def bmp_start(host, port):
 def bmp_stop(host, port):
     core = CORE_MANAGER.get_core_service()
     return core.stop_bmp(host, port)
+
+# =============================================================================
+# MRT dump related APIs
+# =============================================================================
+
+
+@register(name='mrt.dump')
+def mrt_dump(filename):
+    core = CORE_MANAGER.get_core_service()
+    with open(filename, 'wb') as f:
+        return mrt.dump_tables(core, f)
+
+
+@register(name='mrt.load')
+def mrt_load(filename):
+    core = CORE_MANAGER.get_core_service()
+    with open(filename, 'rb') as f:
+        return mrt.load_tables(core, f)
+
+
+@register(name='mrt.record.start')
+def mrt_record_start(filename):
+    core = CORE_MANAGER.get_core_service()
+    return core.start_mrt_recorder(filename)
+
+
+@register(name='mrt.record.stop')
+def mrt_record_stop(filename):
+    core = CORE_MANAGER.get_core_service()
+    return core.stop_mrt_recorder(filename)
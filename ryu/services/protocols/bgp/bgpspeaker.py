@@ -38,9 +38,14 @@ from ryu.services.protocols.bgp.rtconf.common \
 from ryu.services.protocols.bgp.rtconf.common \
     import DEFAULT_BGP_CONN_RETRY_TIME
 from ryu.services.protocols.bgp.rtconf.common import DEFAULT_LABEL_RANGE
+from ryu.services.protocols.bgp.rtconf.common import DEFAULT_DECODE_WORKERS
+from ryu.services.protocols.bgp.rtconf.common \
+    import DEFAULT_PRIORITY_PREFIXES
 from ryu.services.protocols.bgp.rtconf.common import REFRESH_MAX_EOR_TIME
 from ryu.services.protocols.bgp.rtconf.common import REFRESH_STALEPATH_TIME
 from ryu.services.protocols.bgp.rtconf.common import LABEL_RANGE
+from ryu.services.protocols.bgp.rtconf.common import DECODE_WORKERS
+from ryu.services.protocols.bgp.rtconf.common import PRIORITY_PREFIXES
 from ryu.services.protocols.bgp.rtconf import neighbors
 from ryu.services.protocols.bgp.rtconf import vrfs
 from ryu.services.protocols.bgp.rtconf.base import CAP_MBGP_IPV4
@@ -60,6 +65,10 @@ from ryu.services.protocols.bgp.rtconf.neighbors import OUT_FILTER
 from ryu.services.protocols.bgp.rtconf.neighbors import IS_ROUTE_SERVER_CLIENT
 from ryu.services.protocols.bgp.rtconf.neighbors import IS_NEXT_HOP_SELF
 from ryu.services.protocols.bgp.rtconf.neighbors import CONNECT_MODE
+from ryu.services.protocols.bgp.rtconf.neighbors import \
+    ADVERTISEMENT_INTERVAL
+from ryu.services.protocols.bgp.rtconf.neighbors import \
+    DEFAULT_ADVERTISEMENT_INTERVAL
 from ryu.services.protocols.bgp.rtconf.neighbors import LOCAL_ADDRESS
 from ryu.services.protocols.bgp.rtconf.neighbors import LOCAL_PORT
 from ryu.services.protocols.bgp.info_base.base import Filter
@@ -111,7 +120,9 @@ class BGPSpeaker(object):
                  peer_down_handler=None,
                  peer_up_handler=None,
                  ssh_console=False,
-                 label_range=DEFAULT_LABEL_RANGE):
+                 label_range=DEFAULT_LABEL_RANGE,
+                 decode_workers=DEFAULT_DECODE_WORKERS,
+                 priority_prefixes=DEFAULT_PRIORITY_PREFIXES):
         """Create a new BGPSpeaker object with as_number and router_id to
         listen on bgp_server_port.
 
@@ -145,6 +156,17 @@ class BGPSpeaker(object):
         ``peer_up_handler``, if specified, is called when BGP peering
         session goes up.
 
+        ``decode_workers`` specifies the number of worker processes
+        decoding the UPDATE messages received from the peers. The
+        default, 0, decodes them in this process.
+
+        ``priority_prefixes`` specifies a list of PrefixFilter objects.
+        The destinations whose IPv4 prefix matches one of them, whatever
+        its policy, are processed before the others, as are the
+        destinations with withdrawn paths. For example,
+        PrefixFilter('0.0.0.0/0', PrefixFilter.POLICY_PERMIT, ge=32)
+        gives priority to the /32 prefixes.
+
         """
         super(BGPSpeaker, self).__init__()
 
@@ -155,6 +177,8 @@ class BGPSpeaker(object):
         settings[REFRESH_STALEPATH_TIME] = refresh_stalepath_time
         settings[REFRESH_MAX_EOR_TIME] = refresh_max_eor_time
         settings[LABEL_RANGE] = label_range
+        settings[DECODE_WORKERS] = decode_workers
+        settings[PRIORITY_PREFIXES] = priority_prefixes
         self._core_start(settings)
         self._init_signal_listeners()
         self._best_path_change_handler = best_path_change_handler
@@ -239,7 +263,8 @@ class BGPSpeaker(object):
                      next_hop=None, password=None, multi_exit_disc=None,
                      site_of_origins=None, is_route_server_client=False,
                      is_next_hop_self=False, local_address=None,
-                     local_port=None, connect_mode=DEFAULT_CONNECT_MODE):
+                     local_port=None, connect_mode=DEFAULT_CONNECT_MODE,
+                     advertisement_interval=DEFAULT_ADVERTISEMENT_INTERVAL):
         """ This method registers a new neighbor. The BGP speaker tries to
         establish a bgp session with the peer (accepts a connection
         from the peer and also tries to connect to it).
@@ -290,6 +315,12 @@ class BGPSpeaker(object):
 
         ``local_port`` specifies source TCP port for iBGP peering.
 
+        ``advertisement_interval`` specifies the minimum interval in
+        seconds between two rounds of UPDATE messages sent to this
+        neighbor: the routes which change meanwhile are sent together
+        once it elapses, only their latest state. The default is 0, the
+        routes are sent as soon as possible.
+
         """
         bgp_neighbor = {}
         bgp_neighbor[neighbors.IP_ADDRESS] = address
@@ -299,6 +330,7 @@ class BGPSpeaker(object):
         bgp_neighbor[IS_ROUTE_SERVER_CLIENT] = is_route_server_client
         bgp_neighbor[IS_NEXT_HOP_SELF] = is_next_hop_self
         bgp_neighbor[CONNECT_MODE] = connect_mode
+        bgp_neighbor[ADVERTISEMENT_INTERVAL] = advertisement_interval
         # v6 advertizement is available with only v6 peering
         if netaddr.valid_ipv4(address):
             bgp_neighbor[CAP_MBGP_IPV4] = enable_ipv4
@@ -611,6 +643,54 @@ class BGPSpeaker(object):
         param['port'] = port
         call(func_name, **param)
 
+    def mrt_dump(self, filename):
+        """ This method dumps the global tables and the VRF tables to
+        an MRT (RFC 6396) file, as TABLE_DUMP_V2 records.
+
+        ``filename`` specifies the file to write, which is overwritten.
+        """
+
+        func_name = 'mrt.dump'
+        param = {}
+        param['filename'] = filename
+        call(func_name, **param)
+
+    def mrt_load(self, filename):
+        """ This method loads the paths of an MRT (RFC 6396) TABLE_DUMP_V2
+        file into the global tables. Each destination is processed once
+        all the paths of its table are loaded.
+
+        ``filename`` specifies the file to read.
+        """
+
+        func_name = 'mrt.load'
+        param = {}
+        param['filename'] = filename
+        call(func_name, **param)
+
+    def mrt_recorder_add(self, filename):
+        """ This method starts recording the UPDATE messages received
+        from the neighbors to an MRT (RFC 6396) file, as BGP4MP records.
+
+        ``filename`` specifies the file the records are appended to.
+        """
+
+        func_name = 'mrt.record.start'
+        param = {}
+        param['filename'] = filename
+        call(func_name, **param)
+
+    def mrt_recorder_del(self, filename):
+        """ This method stops recording the UPDATE messages to the file.
+
+        ``filename`` specifies the file given to mrt_recorder_add.
+        """
+
+        func_name = 'mrt.record.stop'
+        param = {}
+        param['filename'] = filename
+        call(func_name, **param)
+
     def attribute_map_set(self, address, attribute_maps,
                           route_dist=None, route_family=RF_VPN_V4):
         """This method sets attribute mapping to a neighbor.
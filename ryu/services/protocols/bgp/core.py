@@ -38,11 +38,13 @@ from ryu.services.protocols.bgp import core_managers
 from ryu.services.protocols.bgp.model import FlexinetOutgoingRoute
 from ryu.services.protocols.bgp.protocol import Factory
 from ryu.services.protocols.bgp.signals.emit import BgpSignalBus
+from ryu.services.protocols.bgp.info_base.base import FilterList
 from ryu.services.protocols.bgp.speaker import BgpProtocol
 from ryu.services.protocols.bgp.utils.rtfilter import RouteTargetManager
 from ryu.services.protocols.bgp.rtconf.neighbors import CONNECT_MODE_ACTIVE
 from ryu.services.protocols.bgp.utils import stats
 from ryu.services.protocols.bgp.bmp import BMPClient
+from ryu.services.protocols.bgp.mrt import MrtRecorder
 from ryu.lib import sockopt
 
 
@@ -127,9 +129,20 @@ class CoreService(Factory, Activity):
         # BgpProcessor instance (initialized during start)
         self._bgp_processor = None
 
+        # DecodePool instance if UPDATE messages are decoded by worker
+        # processes (initialized during start)
+        self._decode_pool = None
+
         # BMP clients key: (host, port) value: BMPClient instance
         self.bmpclients = {}
 
+        # MRT recorders key: file name value: MrtRecorder instance
+        self.mrt_recorders = {}
+
+        # Sources of the paths loaded from MRT dumps key: (BGP id, IP
+        # address, AS number) value: MrtSource instance
+        self.mrt_sources = {}
+
     def _init_signal_listeners(self):
         self._signal_bus.register_listener(
             BgpSignalBus.BGP_DEST_CHANGED,
@@ -183,6 +196,9 @@ class CoreService(Factory, Activity):
     def enqueue_for_bgp_processing(self, dest):
         return self._bgp_processor.enqueue(dest)
 
+    def get_processor_stats(self):
+        return self._bgp_processor.get_stats_summary_dict()
+
     def on_vrf_removed(self, route_dist):
         # Remove stats timer linked with this vrf.
         vrf_stats_timer = self._timers.get(route_dist)
@@ -214,8 +230,19 @@ class CoreService(Factory, Activity):
 
     def _run(self, *args, **kwargs):
         from ryu.services.protocols.bgp.processor import BgpProcessor
+        # Start the UPDATE decoders, if any.
+        decode_workers = self._common_config.decode_workers
+        if decode_workers:
+            from ryu.services.protocols.bgp.utils.decode_pool import \
+                DecodePool
+            self._decode_pool = DecodePool(decode_workers)
         # Initialize bgp processor.
-        self._bgp_processor = BgpProcessor(self)
+        priority_filter = None
+        if self._common_config.priority_prefixes:
+            priority_filter = FilterList(
+                self._common_config.priority_prefixes)
+        self._bgp_processor = BgpProcessor(self,
+                                           priority_filter=priority_filter)
         # Start BgpProcessor in a separate thread.
         processor_thread = self._spawn_activity(self._bgp_processor)
 
@@ -235,6 +262,12 @@ class CoreService(Factory, Activity):
         server_thread.wait()
         processor_thread.wait()
 
+    def stop(self):
+        Activity.stop(self)
+        if self._decode_pool:
+            self._decode_pool.stop()
+            self._decode_pool = None
+
     # ========================================================================
     # RTC address family related utilities
     # ========================================================================
@@ -417,7 +450,8 @@ class CoreService(Factory, Activity):
         bgp_protocol = self.protocol(
             socket,
             self._signal_bus,
-            is_reactive_conn=is_reactive_conn
+            is_reactive_conn=is_reactive_conn,
+            decode_pool=self._decode_pool
         )
         return bgp_protocol
 
@@ -486,3 +520,18 @@ class CoreService(Factory, Activity):
 
         bmpclient = self.bmpclients[(host, port)]
         bmpclient.stop()
+
+    def start_mrt_recorder(self, filename):
+        if filename in self.mrt_recorders:
+            LOG.warn('MRT recorder is already running for %s', filename)
+            return False
+        self.mrt_recorders[filename] = MrtRecorder(self, filename)
+        return True
+
+    def stop_mrt_recorder(self, filename):
+        recorder = self.mrt_recorders.pop(filename, None)
+        if recorder is None:
+            LOG.warn('no MRT recorder is running for %s', filename)
+            return False
+        recorder.stop()
+        return True
@@ -122,8 +122,9 @@ class PeerManager(object):
                     # wasn't set at all now it could have changed and we may
                     # need to set new value there
                     p = sent_route.path
-                    if p.med_set_by_target_neighbor or p.get_pattr(
-                            BGP_ATTR_TYPE_MULTI_EXIT_DISC) is None:
+                    if peer.med and (p.med_set_by_target_neighbor or
+                                     p.get_pattr(BGP_ATTR_TYPE_MULTI_EXIT_DISC)
+                                     is None):
                         sent_route.path = \
                             clone_path_and_update_med_for_target_neighbor(
                                 sent_route.path, peer.med
@@ -1,3 +1,4 @@
+import itertools
 import logging
 import netaddr
 from collections import OrderedDict
@@ -127,6 +128,22 @@ class TableCoreManager(object):
         # Since destination was updated, we enqueue it for processing.
         self._signal_bus.dest_changed(gpath_dest)
 
+    def bulk_load(self, paths):
+        """Inserts `paths` into the correct global tables, processing the
+        changed destinations once all the paths are inserted.
+
+        Paths of the same route family are expected to follow each other,
+        as the paths of a table dump do: each run of paths of a route family
+        is loaded by `Table.bulk_load`.  Returns the number of destinations
+        processed.
+        """
+        count = 0
+        for route_family, rf_paths in itertools.groupby(
+                paths, lambda path: path.route_family):
+            table = self.get_global_table_by_route_family(route_family)
+            count += table.bulk_load(rf_paths)
+        return count
+
     def remember_sent_route(self, sent_route):
         """Records `sent_route` inside proper table.
 
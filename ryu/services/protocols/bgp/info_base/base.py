@@ -21,11 +21,16 @@
 import abc
 from abc import ABCMeta
 from abc import abstractmethod
-from copy import copy
+import collections
 import logging
 import netaddr
+import socket
 
+from ryu.lib import hub
 from ryu.lib.packet.bgp import RF_IPv4_UC
+from ryu.lib.packet.bgp import RF_IPv6_UC
+from ryu.lib.packet.bgp import RF_IPv4_VPN
+from ryu.lib.packet.bgp import RF_IPv6_VPN
 from ryu.lib.packet.bgp import RouteTargetMembershipNLRI
 from ryu.lib.packet.bgp import BGP_ATTR_TYPE_EXTENDED_COMMUNITIES
 from ryu.lib.packet.bgp import BGPPathAttributeLocalPref
@@ -37,10 +42,112 @@ from ryu.services.protocols.bgp.constants import VRF_TABLE
 from ryu.services.protocols.bgp.model import OutgoingRoute
 from ryu.services.protocols.bgp.processor import BPR_ONLY_PATH
 from ryu.services.protocols.bgp.processor import BPR_UNKNOWN
+from ryu.services.protocols.bgp.processor import best_path_key
+from ryu.services.protocols.bgp.processor import best_path_reason
+from ryu.services.protocols.bgp.utils.internable import Internable
+from ryu.services.protocols.bgp.utils.prefix_trie import ip_to_int
+from ryu.services.protocols.bgp.utils.prefix_trie import PrefixTrie
 
 
 LOG = logging.getLogger('bgpspeaker.info_base.base')
 
+# Length in bits of the addresses of the route families whose tables are
+# indexed by prefix.
+PREFIX_WIDTH = {
+    RF_IPv4_UC: 32,
+    RF_IPv6_UC: 128,
+    RF_IPv4_VPN: 32,
+    RF_IPv6_VPN: 128,
+}
+
+# Number of paths, or destinations, bulk loaded or dumped between two
+# yields to the other green threads.
+YIELD_INTERVAL = 1000
+
+
+def prefix_key(prefix, route_dist=None):
+    """Returns the key of *prefix* ('addr/length') in a PrefixIndex."""
+    try:
+        addr, length = prefix.split('/')
+        return route_dist, ip_to_int(addr), int(length)
+    except (ValueError, socket.error):
+        raise ValueError('Invalid prefix %s' % prefix)
+
+
+class PrefixIndex(object):
+    """Destinations of a table indexed by prefix.
+
+    Keys are (route distinguisher, address, prefix length) with the
+    address as an integer and None as the route distinguisher of non-VPN
+    tables.  There is a PrefixTrie per route distinguisher, so that the
+    longest match and more specific lookups are done within a VPN.
+    Iteration is ordered by route distinguisher and prefix.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self._tries = {}
+
+    def __len__(self):
+        return sum(len(trie) for trie in self._tries.itervalues())
+
+    def get(self, key, default=None):
+        route_dist, addr, length = key
+        trie = self._tries.get(route_dist)
+        if trie is None:
+            return default
+        return trie.get(addr, length, default)
+
+    def __setitem__(self, key, dest):
+        route_dist, addr, length = key
+        trie = self._tries.get(route_dist)
+        if trie is None:
+            trie = self._tries[route_dist] = PrefixTrie(self.width)
+        trie.insert(addr, length, dest)
+
+    def pop(self, key, default=None):
+        route_dist, addr, length = key
+        trie = self._tries.get(route_dist)
+        if trie is None:
+            return default
+        dest = trie.remove(addr, length)
+        if not trie:
+            del self._tries[route_dist]
+        return default if dest is None else dest
+
+    def __delitem__(self, key):
+        if self.pop(key) is None:
+            raise KeyError(key)
+
+    def _iter_tries(self, route_dist):
+        # all the route distinguishers if route_dist is None
+        if route_dist is not None:
+            trie = self._tries.get(route_dist)
+            return [trie] if trie is not None else []
+        return [self._tries[rd] for rd in sorted(self._tries)]
+
+    def itervalues(self, route_dist=None):
+        for trie in self._iter_tries(route_dist):
+            for dest in trie.itervalues():
+                yield dest
+
+    def match_exact(self, addr, length, route_dist=None):
+        return [d for d in (trie.get(addr, length)
+                            for trie in self._iter_tries(route_dist))
+                if d is not None]
+
+    def match_longest(self, addr, route_dist=None):
+        dests = []
+        for trie in self._iter_tries(route_dist):
+            match = trie.longest_match(addr)
+            if match is not None:
+                dests.append(match[1])
+        return dests
+
+    def match_longer(self, addr, length, route_dist=None):
+        return [dest for trie in self._iter_tries(route_dist)
+                for dest in trie.itervalues(addr, length)]
+
 
 class Table(object):
     """A container for holding information about destination/prefixes.
@@ -53,7 +160,11 @@ class Table(object):
     ROUTE_FAMILY = RF_IPv4_UC
 
     def __init__(self, scope_id, core_service, signal_bus):
-        self._destinations = dict()
+        width = PREFIX_WIDTH.get(self.ROUTE_FAMILY)
+        if width is not None:
+            self._destinations = PrefixIndex(width)
+        else:
+            self._destinations = dict()
         # Scope in which this table exists.
         # If this table represents the VRF, then this could be a VPN ID.
         # For global/VPN tables this should be None
@@ -83,6 +194,43 @@ class Table(object):
     def itervalues(self):
         return self._destinations.itervalues()
 
+    @property
+    def destinations(self):
+        return dict((dest.nlri.formatted_nlri_str, dest)
+                    for dest in self.itervalues())
+
+    def _get_prefix_index(self, addr):
+        if not isinstance(self._destinations, PrefixIndex):
+            raise ValueError('Table %s is not indexed by prefix.' % self)
+        if (':' in addr) != (self._destinations.width == 128):
+            raise ValueError('Invalid address %s for %s' % (addr, self))
+        return self._destinations
+
+    def match_exact(self, prefix, route_dist=None):
+        """Returns the destinations of *prefix* ('addr/length').
+
+        Destinations of all the route distinguishers are returned if
+        *route_dist* is None.
+        """
+        index = self._get_prefix_index(prefix)
+        _rd, addr, length = prefix_key(prefix)
+        return index.match_exact(addr, length, route_dist)
+
+    def match_longest(self, addr, route_dist=None):
+        """Returns the destinations of the longest prefix matching *addr*.
+        """
+        index = self._get_prefix_index(addr)
+        _rd, addr, _length = prefix_key(addr + '/0')
+        return index.match_longest(addr, route_dist)
+
+    def match_longer(self, prefix, route_dist=None):
+        """Returns the destinations of *prefix* and of the prefixes it
+        covers, in order.
+        """
+        index = self._get_prefix_index(prefix)
+        _rd, addr, length = prefix_key(prefix)
+        return index.match_longer(addr, length, route_dist)
+
     def insert(self, path):
         self._validate_path(path)
         self._validate_nlri(path.nlri)
@@ -92,6 +240,28 @@ class Table(object):
             updated_dest = self._insert_path(path)
         return updated_dest
 
+    def bulk_load(self, paths):
+        """Inserts *paths* and then processes each of the destinations
+        they were inserted into, once.
+
+        Unlike `insert` followed by a BGP_DEST_CHANGED signal per path,
+        the destination of many paths is processed a single time and the
+        paths don't go through the queue of the BGP processor, which makes
+        loading whole tables faster.  Returns the number of destinations
+        processed.
+        """
+        dests = OrderedDict()
+        for i, path in enumerate(paths, 1):
+            dest = self.insert(path)
+            dests[id(dest)] = dest
+            if i % YIELD_INTERVAL == 0:
+                hub.sleep(0)
+        for i, dest in enumerate(dests.itervalues(), 1):
+            dest.process()
+            if i % YIELD_INTERVAL == 0:
+                hub.sleep(0)
+        return len(dests)
+
     def insert_sent_route(self, sent_route):
         self._validate_path(sent_route.path)
         dest = self._get_or_create_dest(sent_route.path.nlri)
@@ -163,7 +333,7 @@ class Table(object):
         self._validate_nlri(nlri)
         dest = self._get_dest(nlri)
         if dest:
-            self._destinations.pop(dest)
+            self._destinations.pop(self._table_key(nlri))
         return dest
 
     def delete_dest(self, dest):
@@ -243,7 +413,7 @@ class NonVrfPathProcessingMixin(object):
     def _new_best_path(self, new_best_path):
         old_best_path = self._best_path
         self._best_path = new_best_path
-        LOG.debug('New best path selected for destination %s' % (self))
+        LOG.debug('New best path selected for destination %s', self)
 
         # If old best path was withdrawn
         if (old_best_path and old_best_path not in self._known_path_list
@@ -344,6 +514,10 @@ class Destination(object):
     def sent_routes(self):
         return self._sent_routes.values()
 
+    @property
+    def has_withdraws(self):
+        return bool(self._withdraw_list)
+
     def add_new_path(self, new_path):
         self._validate_path(new_path)
         self._new_path_list.append(new_path)
@@ -484,19 +658,26 @@ class Destination(object):
         self._remove_old_paths()
 
         # Collect all new paths into known paths.
-        self._known_path_list.extend(self._new_path_list)
+        new_paths = self._new_path_list
+        self._known_path_list.extend(new_paths)
 
         # Clear new paths as we copied them.
-        del(self._new_path_list[:])
+        self._new_path_list = []
 
         # If we do not have any paths to this destination, then we do not have
         # new best path.
         if not self._known_path_list:
             return None, BPR_UNKNOWN
 
-        # Compute new best path
-        current_best_path, reason = self._compute_best_known_path()
-        return current_best_path, reason
+        if len(self._known_path_list) == 1:
+            return self._known_path_list[0], BPR_ONLY_PATH
+
+        # If the current best path is still known, only the new paths can
+        # replace it, else all the known paths are compared.
+        best_path = self._best_path
+        if not any(path is best_path for path in self._known_path_list):
+            return self._compute_best_known_path()
+        return self._compute_best_new_path(best_path, new_paths)
 
     def _remove_withdrawals(self):
         """Removes withdrawn paths.
@@ -508,7 +689,7 @@ class Destination(object):
         stopped by the same policies.
         """
 
-        LOG.debug('Removing %s withdrawals' % len(self._withdraw_list))
+        LOG.debug('Removing %s withdrawals', len(self._withdraw_list))
 
         # If we have no withdrawals, we have nothing to do.
         if not self._withdraw_list:
@@ -591,19 +772,47 @@ class Destination(object):
         # We pick the first path as current best path. This helps in breaking
         # tie between two new paths learned in one cycle for which best-path
         # calculation steps lead to tie.
-        current_best_path = self._known_path_list[0]
-        best_path_reason = BPR_ONLY_PATH
-        for next_path in self._known_path_list[1:]:
-            from ryu.services.protocols.bgp.processor import compute_best_path
-            # Compare next path with current best path.
-            new_best_path, reason = \
-                compute_best_path(self._core_service.asn, current_best_path,
-                                  next_path)
-            best_path_reason = reason
-            if new_best_path is not None:
-                current_best_path = new_best_path
-
-        return current_best_path, best_path_reason
+        paths = self._known_path_list
+        keys = [self._best_path_key(path) for path in paths]
+        best = keys.index(max(keys))
+        if len(paths) == 1:
+            return paths[best], BPR_ONLY_PATH
+
+        # The reason is the step which selected the best path over the
+        # second best one.
+        second_key = max(keys[:best] + keys[best + 1:])
+        return paths[best], best_path_reason(keys[best], second_key)
+
+    def _compute_best_new_path(self, best_path, new_paths):
+        """Computes the best path among the current best path and the new
+        paths, which are the only known paths which may be better.
+
+        Returns the best path and the reason it is the best path.
+        """
+        best_key = self._best_path_key(best_path)
+        reason = self._best_path_reason
+        for new_path in new_paths:
+            new_key = self._best_path_key(new_path)
+            # The current best path wins a tie.
+            if new_key > best_key:
+                reason = best_path_reason(new_key, best_key)
+                best_path = new_path
+                best_key = new_key
+            else:
+                reason = best_path_reason(best_key, new_key)
+        return best_path, reason
+
+    def _best_path_key(self, path):
+        """Returns the key of *path* for best path selection, computed once
+        per path.
+        """
+        key = path.best_path_key
+        if key is None:
+            core_service = self._core_service
+            key = best_path_key(core_service.asn, core_service.router_id,
+                                path)
+            path.best_path_key = key
+        return key
 
     def withdraw_unintresting_paths(self, interested_rts):
         """Withdraws paths that are no longer interesting.
@@ -658,6 +867,66 @@ class Destination(object):
         return result
 
 
+class PathAttrMap(collections.Mapping, Internable):
+    """Immutable set of path attributes keyed by attribute type.
+
+    Two maps are equal if their attributes serialize to the same bytes,
+    so that the maps can be interned: the paths learned from UPDATEs
+    carrying the same attributes share one map (and one copy of each
+    attribute) instead of holding one each.  Interned maps are released
+    once no path refers to them.
+    """
+    def __init__(self, pattrs=None):
+        if isinstance(pattrs, PathAttrMap):
+            attrs = pattrs._attrs
+        else:
+            attrs = OrderedDict()
+            if pattrs:
+                for attr_type in sorted(pattrs):
+                    attrs[attr_type] = pattrs[attr_type]
+        self._attrs = attrs
+        self._key = None
+        self._hash = None
+
+    @property
+    def key(self):
+        if self._key is None:
+            self._key = tuple((attr_type, str(attr.serialize()))
+                              for attr_type, attr in self._attrs.iteritems())
+        return self._key
+
+    def __getitem__(self, attr_type):
+        return self._attrs[attr_type]
+
+    def get(self, attr_type, default=None):
+        # the one of Mapping is slower, get_pattr is called a lot
+        return self._attrs.get(attr_type, default)
+
+    def __iter__(self):
+        return iter(self._attrs)
+
+    def __len__(self):
+        return len(self._attrs)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self.key)
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, PathAttrMap):
+            return False
+        return self.key == other.key
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return 'PathAttrMap(%r)' % self._attrs.values()
+
+
 class Path(object):
     """Represents a way of reaching an IP destination.
 
@@ -667,7 +936,8 @@ class Path(object):
     __metaclass__ = ABCMeta
     __slots__ = ('_source', '_path_attr_map', '_nlri', '_source_version_num',
                  '_exported_from', '_nexthop', 'next_path', 'prev_path',
-                 '_is_withdraw', 'med_set_by_target_neighbor')
+                 '_is_withdraw', 'med_set_by_target_neighbor',
+                 'best_path_key')
     ROUTE_FAMILY = RF_IPv4_UC
 
     def __init__(self, source, nlri, src_ver_num, pattrs=None, nexthop=None,
@@ -681,7 +951,8 @@ class Path(object):
             - `nlri`: (Vpnv4) Nlri instance for Vpnv4 route family.
             - `src_ver_num`: (int) version number of *source* when this path
             was learned.
-            - `pattrs`: (OrderedDict) various path attributes for this path.
+            - `pattrs`: (PathAttrMap/dict) various path attributes for this
+            path. A PathAttrMap is shared, other mappings are copied.
             - `nexthop`: (str) nexthop advertised for this path.
             - `is_withdraw`: (bool) True if this represents a withdrawal.
         """
@@ -711,10 +982,10 @@ class Path(object):
         self._source = source
 
         # Path attribute of this path.
-        if pattrs:
-            self._path_attr_map = copy(pattrs)
+        if isinstance(pattrs, PathAttrMap):
+            self._path_attr_map = pattrs
         else:
-            self._path_attr_map = OrderedDict()
+            self._path_attr_map = PathAttrMap(pattrs)
 
         # NLRI that this path represents.
         self._nlri = nlri
@@ -735,6 +1006,10 @@ class Path(object):
         # The Destination from which this path was exported, if any.
         self._exported_from = None
 
+        # Key of this path for best path selection, computed by the
+        # destination of the path.
+        self.best_path_key = None
+
     @property
     def source_version_num(self):
         return self._source_version_num
@@ -757,7 +1032,13 @@ class Path(object):
 
     @property
     def pathattr_map(self):
-        return copy(self._path_attr_map)
+        """Returns a copy of the path attributes which can be modified."""
+        return OrderedDict(self._path_attr_map)
+
+    @property
+    def pathattrs(self):
+        """Returns the (immutable, maybe shared) path attributes."""
+        return self._path_attr_map
 
     @property
     def nexthop(self):
@@ -773,7 +1054,7 @@ class Path(object):
     def clone(self, for_withdrawal=False):
         pathattrs = None
         if not for_withdrawal:
-            pathattrs = self.pathattr_map
+            pathattrs = self.pathattrs
         clone = self.__class__(
             self.source,
             self.nlri,
@@ -1079,7 +1360,7 @@ class ASPathFilter(Filter):
 
         """
 
-        path_aspath = path.pathattr_map.get(BGP_ATTR_TYPE_AS_PATH)
+        path_aspath = path.get_pattr(BGP_ATTR_TYPE_AS_PATH)
         path_seg_list = path_aspath.path_seg_list
         if path_seg_list:
             path_seg = path_seg_list[0]
@@ -1087,18 +1368,13 @@ class ASPathFilter(Filter):
             path_seg = []
         result = False
 
-        LOG.debug("path_seg : %s", path_seg)
         if self.policy == ASPathFilter.POLICY_TOP:
 
             if len(path_seg) > 0 and path_seg[0] == self._as_number:
                 result = True
 
         elif self.policy == ASPathFilter.POLICY_INCLUDE:
-            for aspath in path_seg:
-                LOG.debug("POLICY_INCLUDE as_number : %s", aspath)
-                if aspath == self._as_number:
-                    result = True
-                    break
+            result = self._as_number in path_seg
 
         elif self.policy == ASPathFilter.POLICY_END:
 
@@ -1124,6 +1400,134 @@ class ASPathFilter(Filter):
                               policy=self._policy)
 
 
+class FilterList(object):
+    """Filters of a peer, compiled to be evaluated against many paths.
+
+    A path is evaluated as if going through the filters in order: the
+    first filter of the route family of the path which matches it decides
+    whether it is blocked (POLICY_DENY) or not (POLICY_PERMIT), and a path
+    matched by none isn't blocked.
+
+    The IPv4 and IPv6 PrefixFilters are kept in a PrefixTrie per route
+    family, so that only the filters whose prefix covers the prefix of a
+    path are looked at.  ASPathFilters are left out, their policies are
+    never POLICY_DENY or POLICY_PERMIT.  Any other Filter is evaluated in
+    turn.
+    """
+
+    _WIDTHS = {RF_IPv4_UC: (32, 4), RF_IPv6_UC: (128, 6)}
+
+    def __init__(self, filters=()):
+        self.filters = list(filters)
+        # PrefixTrie of the lists of (index, ge, le, filter) by route
+        # family, the lists ordered by index.
+        self._tries = {}
+        # (index, filter) of the other filters.
+        self._others = []
+        for index, filter_ in enumerate(self.filters):
+            self._add(index, filter_)
+
+    def _add(self, index, filter_):
+        if isinstance(filter_, ASPathFilter):
+            return
+        route_family = filter_.ROUTE_FAMILY
+        if (not isinstance(filter_, PrefixFilter) or
+                route_family not in self._WIDTHS):
+            self._others.append((index, filter_))
+            return
+        if filter_.policy not in (Filter.POLICY_DENY, Filter.POLICY_PERMIT):
+            return
+        width, version = self._WIDTHS[route_family]
+        network = filter_._network
+        if network.version != version:
+            # can't cover the prefix of a path of this route family
+            return
+        ge = filter_.ge
+        le = filter_.le
+        if ge == 0 or le == 0:
+            # never matches, as for PrefixFilter.evaluate()
+            return
+        trie = self._tries.get(route_family)
+        if trie is None:
+            trie = self._tries[route_family] = PrefixTrie(width)
+        entries = trie.get(network.first, network.prefixlen)
+        if entries is None:
+            entries = []
+            trie.insert(network.first, network.prefixlen, entries)
+        entries.append((index, 0 if ge is None else ge,
+                        width if le is None else le, filter_))
+
+    def _first_match(self, path, match_all=False):
+        """Returns the first filter matching the path and deciding of it,
+        or None.  With *match_all*, returns the first filter matching the
+        path whatever its policy.
+        """
+        best_index = None
+        best = None
+        trie = self._tries.get(path.ROUTE_FAMILY)
+        if trie is not None:
+            nlri = path.nlri
+            length = nlri.length
+            for _prefix, entries in trie.matches(ip_to_int(nlri.addr),
+                                                 length):
+                for index, ge, le, filter_ in entries:
+                    if best_index is not None and index > best_index:
+                        break
+                    if ge <= length <= le:
+                        best_index = index
+                        best = filter_
+                        break
+
+        for index, filter_ in self._others:
+            if best_index is not None and index > best_index:
+                break
+            if filter_.ROUTE_FAMILY != path.ROUTE_FAMILY:
+                continue
+            policy, is_matched = filter_.evaluate(path)
+            if is_matched and (match_all or policy in (Filter.POLICY_DENY,
+                                                       Filter.POLICY_PERMIT)):
+                return filter_
+        return best
+
+    def evaluate(self, path):
+        """Evaluates the path.
+
+        Returns (block, blocked_cause): whether the path is blocked and if
+        so, the cause.
+        """
+        filter_ = self._first_match(path)
+        if filter_ is not None and filter_.policy == Filter.POLICY_DENY:
+            return True, filter_.prefix + ' - DENY'
+        return False, None
+
+    def matches(self, path):
+        """Returns True if any filter which may decide of the path matches
+        it, whatever its policy.
+        """
+        return self._first_match(path, match_all=True) is not None
+
+    def diff(self, other):
+        """Returns the FilterList of the filters of this list and of
+        *other* which aren't at the same place in both.
+
+        The paths which none of them matches are evaluated the same by
+        this list and by *other*.
+        """
+        keys = dict((self._key(i, f), f) for i, f in enumerate(self.filters))
+        other_keys = dict((self._key(i, f), f)
+                          for i, f in enumerate(other.filters))
+        return FilterList(
+            [f for k, f in keys.iteritems() if k not in other_keys] +
+            [f for k, f in other_keys.iteritems() if k not in keys])
+
+    @staticmethod
+    def _key(index, filter_):
+        if filter_.__class__ is PrefixFilter:
+            return (index, filter_.ROUTE_FAMILY, filter_.prefix,
+                    filter_.policy, filter_.ge, filter_.le)
+        return (index, id(filter_))
+
+
 class AttributeMap(object):
     """
     This class is used to specify an attribute to add if the path matches
@@ -22,6 +22,7 @@ from ryu.lib.packet.bgp import IPAddrPrefix
 from ryu.lib.packet.bgp import RF_IPv4_UC
 
 from ryu.services.protocols.bgp.info_base.base import Path
+from ryu.services.protocols.bgp.info_base.base import prefix_key
 from ryu.services.protocols.bgp.info_base.base import Table
 from ryu.services.protocols.bgp.info_base.base import Destination
 from ryu.services.protocols.bgp.info_base.base import NonVrfPathProcessingMixin
@@ -63,7 +64,7 @@ class Ipv4Table(Table):
         """Return a key that will uniquely identify this NLRI inside
         this table.
         """
-        return nlri.prefix
+        return prefix_key(nlri.prefix)
 
     def _create_dest(self, nlri):
         return self.VPN_DEST_CLASS(self, nlri)
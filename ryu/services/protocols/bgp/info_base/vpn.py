@@ -23,6 +23,7 @@ import logging
 from ryu.services.protocols.bgp.info_base.base import Destination
 from ryu.services.protocols.bgp.info_base.base import NonVrfPathProcessingMixin
 from ryu.services.protocols.bgp.info_base.base import Path
+from ryu.services.protocols.bgp.info_base.base import prefix_key
 from ryu.services.protocols.bgp.info_base.base import Table
 
 LOG = logging.getLogger('bgpspeaker.info_base.vpn')
@@ -44,7 +45,7 @@ class VpnTable(Table):
         """Return a key that will uniquely identify this vpnvX NLRI inside
         this table.
         """
-        return vpn_nlri.route_dist + ':' + vpn_nlri.prefix
+        return prefix_key(vpn_nlri.prefix, vpn_nlri.route_dist)
 
     def _create_dest(self, nlri):
         return self.VPN_DEST_CLASS(self, nlri)
@@ -66,7 +67,7 @@ class VpnPath(Path):
 
         pathattrs = None
         if not is_withdraw:
-            pathattrs = self.pathattr_map
+            pathattrs = self.pathattrs
 
         vrf_path = self.VRF_PATH_CLASS(
             self.VRF_PATH_CLASS.create_puid(
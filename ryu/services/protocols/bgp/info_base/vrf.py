@@ -35,6 +35,7 @@ from ryu.services.protocols.bgp.constants import VPN_TABLE
 from ryu.services.protocols.bgp.constants import VRF_TABLE
 from ryu.services.protocols.bgp.info_base.base import Destination
 from ryu.services.protocols.bgp.info_base.base import Path
+from ryu.services.protocols.bgp.info_base.base import prefix_key
 from ryu.services.protocols.bgp.info_base.base import Table
 from ryu.services.protocols.bgp.utils.stats import LOCAL_ROUTES
 from ryu.services.protocols.bgp.utils.stats import REMOTE_ROUTES
@@ -86,7 +87,7 @@ class VrfTable(Table):
         """Return a key that will uniquely identify this NLRI inside
         this table.
         """
-        return str(nlri)
+        return prefix_key(nlri.prefix)
 
     def _create_dest(self, nlri):
         return self.VRF_DEST_CLASS(self, nlri)
@@ -158,7 +159,7 @@ class VrfTable(Table):
             source,
             vrf_nlri,
             vpn_path.source_version_num,
-            pattrs=vpn_path.pathattr_map,
+            pattrs=vpn_path.pathattrs,
             nexthop=vpn_path.nexthop,
             is_withdraw=vpn_path.is_withdraw,
             label_list=vpn_path.nlri.label_list
@@ -473,7 +474,7 @@ class VrfPath(Path):
     def clone(self, for_withdrawal=False):
         pathattrs = None
         if not for_withdrawal:
-            pathattrs = self.pathattr_map
+            pathattrs = self.pathattrs
 
         clone = self.__class__(
             self.puid,
@@ -496,7 +497,7 @@ class VrfPath(Path):
 
         pathattrs = None
         if not for_withdrawal:
-            pathattrs = self.pathattr_map
+            pathattrs = self.pathattrs
         vpnv_path = self.VPN_PATH_CLASS(
             self.source, vpn_nlri,
             self.source_version_num,
@@ -517,7 +518,7 @@ class VrfPath(Path):
             return False
         if not self.nexthop == b_path.nexthop:
             return False
-        if not self.pathattr_map == b_path.pathattr_map:
+        if not self.pathattrs == b_path.pathattrs:
             return False
 
         return True
@@ -552,5 +553,5 @@ class VrfRtImportMap(ImportMap):
         self._rt = rt
 
     def match(self, vrf_path):
-        extcomm = vrf_path.pathattr_map.get(BGP_ATTR_TYPE_EXTENDED_COMMUNITIES)
+        extcomm = vrf_path.get_pattr(BGP_ATTR_TYPE_EXTENDED_COMMUNITIES)
         return extcomm is not None and self._rt in extcomm.rt_list
@@ -0,0 +1,289 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+MRT (RFC 6396) dumps of the tables of the BGP speaker.
+
+The global tables and the VRF tables are dumped as TABLE_DUMP_V2 RIB
+records, a view per table, and the UPDATE messages received from the
+peers are recorded as BGP4MP records by an MrtRecorder.  The paths of a
+dump can be loaded back into the global tables.
+"""
+
+import logging
+import time
+
+from ryu.lib import hub
+from ryu.lib import mrtlib
+from ryu.lib.packet import bgp
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MP_REACH_NLRI
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MP_UNREACH_NLRI
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_NEXT_HOP
+from ryu.lib.packet.bgp import BGPPathAttributeNextHop
+from ryu.lib.packet.bgp import RF_IPv4_UC
+from ryu.lib.packet.bgp import RF_IPv6_UC
+from ryu.lib.packet.bgp import RF_IPv4_VPN
+from ryu.lib.packet.bgp import RF_IPv6_VPN
+from ryu.services.protocols.bgp.info_base.base import PathAttrMap
+from ryu.services.protocols.bgp.info_base.base import YIELD_INTERVAL
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.info_base.ipv6 import Ipv6Path
+from ryu.services.protocols.bgp.info_base.vpnv4 import Vpnv4Path
+from ryu.services.protocols.bgp.info_base.vpnv6 import Vpnv6Path
+from ryu.services.protocols.bgp.signals.emit import BgpSignalBus
+
+LOG = logging.getLogger('bgpspeaker.mrt')
+
+# Route families of the global tables which are dumped and loaded.
+MRT_GLOBAL_RF = (RF_IPv4_UC, RF_IPv6_UC, RF_IPv4_VPN, RF_IPv6_VPN)
+
+_PATH_CLASSES = {
+    RF_IPv4_UC: Ipv4Path,
+    RF_IPv6_UC: Ipv6Path,
+    RF_IPv4_VPN: Vpnv4Path,
+    RF_IPv6_VPN: Vpnv6Path,
+}
+
+_UNSPECIFIED_ADDRS = ('0.0.0.0', '::')
+
+
+class _MrtProtocol(object):
+    # Stands for the protocol of the peer of an MrtSource, only the
+    # OPEN message of the peer is known.
+    def __init__(self, recv_open_msg):
+        self.recv_open_msg = recv_open_msg
+
+
+class MrtSource(object):
+    """Source of the paths loaded from an MRT dump, the peer of the
+    PEER_INDEX_TABLE the paths were learned from.
+
+    The paths of a source can be removed from a table by incrementing
+    *version_num* and calling `Table.cleanup_paths_for_peer`.  The
+    sources are kept by the core service across loads, by (BGP id, IP
+    address, AS number), so that a reload replaces their paths.
+    """
+
+    def __init__(self, mrt_peer):
+        self.ip_address = mrt_peer.ip_addr
+        self.remote_as = mrt_peer.as_num
+        self.version_num = 0
+        my_as = mrt_peer.as_num
+        if my_as > 0xffff:
+            my_as = bgp.AS_TRANS
+        open_msg = bgp.BGPOpen(my_as=my_as, bgp_identifier=mrt_peer.bgp_id)
+        self.protocol = _MrtProtocol(open_msg)
+
+    def __str__(self):
+        return 'MrtSource(%s, AS %s)' % (self.ip_address, self.remote_as)
+
+
+class _TableDumper(object):
+    """Dumps a table as a view: a PEER_INDEX_TABLE of the sources of its
+    paths, followed by a RIB record per destination.
+    """
+
+    def __init__(self, core_service, writer, timestamp):
+        self._core_service = core_service
+        self._writer = writer
+        self._timestamp = timestamp
+        # serialized attributes, by (id of the map, next hop), and the map
+        self._attr_bufs = {}
+
+    def _mrt_peer(self, source):
+        protocol = getattr(source, 'protocol', None)
+        if not hasattr(source, 'version_num'):
+            # NC, or a VRF or VPN table: paths originated by the speaker
+            return mrtlib.MrtPeer(self._core_service.router_id, '0.0.0.0',
+                                  self._core_service.asn)
+        if protocol is None or protocol.recv_open_msg is None:
+            bgp_id = '0.0.0.0'
+        else:
+            bgp_id = protocol.recv_open_msg.bgp_identifier
+        return mrtlib.MrtPeer(bgp_id, source.ip_address, source.remote_as)
+
+    def _entry(self, peer_index, path, has_next_hop_attr):
+        pattrs = path.pathattrs
+        key = (id(pattrs), path.nexthop if has_next_hop_attr else None)
+        value = self._attr_bufs.get(key)
+        if value is None:
+            attrs = [attr for attr_type, attr in pattrs.iteritems()
+                     if attr_type not in (BGP_ATTR_TYPE_MP_REACH_NLRI,
+                                          BGP_ATTR_TYPE_MP_UNREACH_NLRI,
+                                          BGP_ATTR_TYPE_NEXT_HOP)]
+            if has_next_hop_attr:
+                attrs.append(BGPPathAttributeNextHop(path.nexthop))
+            attr_buf = mrtlib.RibEntry(0, 0, attrs).attr_buf
+            # the map is kept so that its id isn't reused during the dump
+            value = self._attr_bufs[key] = (pattrs, attr_buf)
+        next_hop = None if has_next_hop_attr else path.nexthop
+        return mrtlib.RibEntry(peer_index, self._timestamp,
+                               next_hop=next_hop, attr_buf=value[1])
+
+    def dump(self, table, view_name=''):
+        # the paths as of the start of the dump, the table can change
+        # while the RIB records are written
+        dests = [(dest.nlri, list(dest.known_path_list))
+                 for dest in table.itervalues() if dest.known_path_list]
+        peer_indexes = {}
+        peers = []
+        for _nlri, paths in dests:
+            for path in paths:
+                if path.source not in peer_indexes:
+                    peer_indexes[path.source] = len(peers)
+                    peers.append(self._mrt_peer(path.source))
+        self._writer.write(mrtlib.PeerIndexTable(
+            self._core_service.router_id, view_name, peers,
+            self._timestamp))
+
+        for seq_num, (nlri, paths) in enumerate(dests):
+            if seq_num and seq_num % YIELD_INTERVAL == 0:
+                hub.sleep(0)
+            # the NEXT_HOP attribute is only used for IPv4 unicast
+            has_next_hop_attr = nlri.ROUTE_FAMILY == RF_IPv4_UC
+            entries = [self._entry(peer_indexes[path.source], path,
+                                   has_next_hop_attr)
+                       for path in paths]
+            self._writer.write(mrtlib.RibRecord(
+                seq_num, nlri, entries, self._timestamp))
+        return len(dests)
+
+
+def dump_tables(core_service, f):
+    """Dumps the global tables, then the VRF tables, to the MRT file
+    object *f*.
+
+    The view of a VRF table is named after its route distinguisher.
+    Returns the number of RIB records written.
+    """
+    writer = mrtlib.Writer(f)
+    dumper = _TableDumper(core_service, writer, int(time.time()))
+    table_manager = core_service.table_manager
+    count = 0
+    for route_family in MRT_GLOBAL_RF:
+        table = table_manager.global_tables.get(route_family)
+        if table is not None:
+            count += dumper.dump(table)
+    vrf_tables = table_manager.get_vrf_tables()
+    for (route_dist, _route_family), table in sorted(vrf_tables.items()):
+        count += dumper.dump(table, route_dist)
+    LOG.info('Dumped %d RIB records', count)
+    return count
+
+
+def iter_paths(f, mrt_sources=None, reloaded=None):
+    """Iterates over the paths of the RIB records of the MRT file object
+    *f* which can be loaded into the global tables.
+
+    The records of the views of VRF tables (whose name isn't empty) are
+    skipped.  The paths from a peer whose address is unspecified are
+    originated by the speaker, the paths from each of the other peers
+    have an MrtSource, taken from or added to the dict *mrt_sources*.
+    The version of the sources already in *mrt_sources* is incremented,
+    and they are added to the set *reloaded*.  The path attributes read
+    from the same bytes are parsed once and shared.
+    """
+    if mrt_sources is None:
+        mrt_sources = {}
+    if reloaded is None:
+        reloaded = set()
+    loaded = set()
+    sources = []
+    view_name = ''
+    attr_maps = {}
+    for record in mrtlib.Reader(f):
+        if isinstance(record, mrtlib.PeerIndexTable):
+            view_name = record.view_name
+            sources = []
+            for peer in record.peers:
+                if peer.ip_addr in _UNSPECIFIED_ADDRS:
+                    sources.append(None)
+                    continue
+                key = (peer.bgp_id, peer.ip_addr, peer.as_num)
+                source = mrt_sources.get(key)
+                if source is None:
+                    source = mrt_sources[key] = MrtSource(peer)
+                elif source not in loaded:
+                    # the paths of the earlier loads become old
+                    source.version_num += 1
+                    reloaded.add(source)
+                loaded.add(source)
+                sources.append(source)
+            continue
+        if (not isinstance(record, mrtlib.RibRecord) or view_name or
+                record.prefix.ROUTE_FAMILY not in MRT_GLOBAL_RF):
+            continue
+        path_cls = _PATH_CLASSES[record.prefix.ROUTE_FAMILY]
+        for entry in record.entries:
+            pattrs = attr_maps.get(entry.attr_buf)
+            if pattrs is None:
+                pattrs = PathAttrMap(dict(
+                    (attr.type, attr) for attr in entry.attributes))
+                pattrs = attr_maps[entry.attr_buf] = pattrs.intern()
+            next_hop = entry.next_hop
+            if next_hop is None:
+                next_hop = pattrs[BGP_ATTR_TYPE_NEXT_HOP].value
+            source = sources[entry.peer_index]
+            src_ver_num = source.version_num if source else 0
+            yield path_cls(source, record.prefix, src_ver_num,
+                           pattrs=pattrs, nexthop=next_hop)
+
+
+def load_tables(core_service, f):
+    """Loads the paths of the MRT file object *f* into the global tables,
+    see `iter_paths`.
+
+    The destinations are processed once all the paths of a table are
+    inserted, see `TableCoreManager.bulk_load`.  The paths loaded earlier
+    from the peers of the dump are replaced.  Returns the number of
+    destinations processed.
+    """
+    table_manager = core_service.table_manager
+    reloaded = set()
+    count = table_manager.bulk_load(
+        iter_paths(f, core_service.mrt_sources, reloaded))
+    for source in reloaded:
+        # the paths of the earlier loads missing from this one
+        table_manager.clean_stale_routes(source)
+    LOG.info('Loaded the paths of %d destinations', count)
+    return count
+
+
+class MrtRecorder(object):
+    """Records the UPDATE messages received from the peers to the MRT file
+    *filename*, as BGP4MP records.
+    """
+
+    def __init__(self, core_service, filename):
+        self._core_service = core_service
+        self.filename = filename
+        self._writer = mrtlib.Writer(open(filename, 'ab'))
+        self._core_service.signal_bus.register_listener(
+            BgpSignalBus.BGP_UPDATE_RECEIVED, self._on_update_received)
+
+    def _on_update_received(self, _, data):
+        peer = data['peer']
+        try:
+            self._writer.write(mrtlib.Bgp4MpMessage(
+                peer.remote_as, self._core_service.asn, 0, peer.ip_address,
+                peer.host_bind_ip, data['update_msg'], int(time.time())))
+        except Exception as e:
+            LOG.error('Failed to record an UPDATE from %s to %s: %s',
+                      peer, self.filename, e)
+
+    def stop(self):
+        self._core_service.signal_bus.unregister_listener(
+            BgpSignalBus.BGP_UPDATE_RECEIVED, self._on_update_received)
+        self._writer.close()
@@ -0,0 +1,49 @@
+from ryu.services.protocols.bgp.operator.command import Command
+from ryu.services.protocols.bgp.operator.command import CommandsResponse
+from ryu.services.protocols.bgp.operator.command import STATUS_ERROR
+from ryu.services.protocols.bgp.operator.command import STATUS_OK
+from ryu.services.protocols.bgp.operator.commands.responses import \
+    WrongParamResp
+from ryu.services.protocols.bgp.utils import stats
+
+
+class Processor(Command):
+    help_msg = 'shows the backlog and timing of the BGP processor'
+    command = 'processor'
+
+    def action(self, params):
+        if len(params) > 0:
+            return WrongParamResp()
+        return CommandsResponse(STATUS_OK, self.api.get_processor_stats())
+
+    @classmethod
+    def cli_resp_formatter(cls, resp):
+        if resp.status == STATUS_ERROR:
+            return Command.cli_resp_formatter(resp)
+        val = resp.value
+        ret = 'Queued destinations: {0} ({1} priority)\n'.format(
+            val[stats.PROCESSOR_BACKLOG] +
+            val[stats.PROCESSOR_PRIORITY_BACKLOG],
+            val[stats.PROCESSOR_PRIORITY_BACKLOG])
+        ret += 'Cycles: {0}, destinations per cycle: {1}\n'.format(
+            val[stats.PROCESSOR_CYCLES], val[stats.PROCESSOR_BATCH_SIZE])
+        ret += ('Cycle time (sec): last {0:.4f}, avg {1:.4f}, '
+                'max {2:.4f}\n').format(
+            val[stats.PROCESSOR_LAST_CYCLE_TIME],
+            val[stats.PROCESSOR_AVG_CYCLE_TIME],
+            val[stats.PROCESSOR_MAX_CYCLE_TIME])
+        ret += '{0:<10s} {1:>12s} {2:>12s} {3:>12s} {4:>12s}\n'.format(
+            'Queue', 'Processed', 'Oldest(sec)', 'Avg(sec)', 'Max(sec)')
+        queues = (
+            ('normal', stats.PROCESSOR_DEST_PROCESSED,
+             stats.PROCESSOR_OLDEST_QUEUE_AGE, stats.PROCESSOR_AVG_QUEUE_AGE,
+             stats.PROCESSOR_MAX_QUEUE_AGE),
+            ('priority', stats.PROCESSOR_PRIORITY_DEST_PROCESSED,
+             stats.PROCESSOR_PRIORITY_OLDEST_QUEUE_AGE,
+             stats.PROCESSOR_PRIORITY_AVG_QUEUE_AGE,
+             stats.PROCESSOR_PRIORITY_MAX_QUEUE_AGE))
+        for name, processed, oldest, avg, max_ in queues:
+            ret += ('{0:<10s} {1:>12d} {2:>12.4f} {3:>12.4f} '
+                    '{4:>12.4f}\n').format(name, val[processed], val[oldest],
+                                           val[avg], val[max_])
+        return ret
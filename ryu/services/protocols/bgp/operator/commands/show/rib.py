@@ -16,7 +16,7 @@ class RibBase(Command, RouteFormatterMixin):
 
 class Rib(RibBase):
     help_msg = 'show all routes for address family'
-    param_help_msg = '<address-family>'
+    param_help_msg = '<address-family> [<prefix>|<address>] [longer-prefixes]'
     command = 'rib'
 
     def __init__(self, *args, **kwargs):
@@ -25,14 +25,19 @@ class Rib(RibBase):
             'all': self.All}
 
     def action(self, params):
-        if len(params) != 1 or params[0] not in self.supported_families:
+        if not 1 <= len(params) <= 3 or \
+                params[0] not in self.supported_families:
             return WrongParamResp()
+        longer = len(params) == 3
+        if longer and params[2] != 'longer-prefixes':
+            return WrongParamResp()
+        prefix = params[1] if len(params) > 1 else None
         from ryu.services.protocols.bgp.operator.internal_api \
             import WrongParamError
         try:
             return CommandsResponse(
                 STATUS_OK,
-                self.api.get_single_rib_routes(params[0])
+                self.api.get_single_rib_routes(params[0], prefix, longer)
             )
         except WrongParamError as e:
             return WrongParamResp(e)
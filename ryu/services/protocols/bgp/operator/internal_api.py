@@ -76,7 +76,14 @@ class InternalApi(object):
     def _get_vrf_tables(self):
         return CORE_MANAGER.get_core_service().table_manager.get_vrf_tables()
 
-    def get_single_rib_routes(self, addr_family):
+    def get_single_rib_routes(self, addr_family, prefix=None, longer=False):
+        """Returns the routes of the global table of *addr_family*.
+
+        If *prefix* is given, only the routes of this prefix are returned,
+        or with *longer* the routes of the prefixes it covers too.  If
+        *prefix* is an address without a length, the routes of the longest
+        prefix matching the address are returned.
+        """
         rfs = {
             'ipv4': RF_IPv4_UC,
             'ipv6': RF_IPv6_UC,
@@ -90,11 +97,21 @@ class InternalApi(object):
         rf = rfs.get(addr_family)
         table_manager = self.get_core_service().table_manager
         gtable = table_manager.get_global_table_by_route_family(rf)
-        if gtable is not None:
-            return [self._dst_to_dict(dst)
-                    for dst in sorted(gtable.itervalues())]
-        else:
+        if gtable is None:
             return []
+        if prefix is None:
+            dsts = gtable.itervalues()
+        else:
+            try:
+                if longer:
+                    dsts = gtable.match_longer(prefix)
+                elif '/' in prefix:
+                    dsts = gtable.match_exact(prefix)
+                else:
+                    dsts = gtable.match_longest(prefix)
+            except ValueError as e:
+                raise WrongParamError(str(e))
+        return [self._dst_to_dict(dst) for dst in dsts]
 
     def _dst_to_dict(self, dst):
         ret = {'paths': [],
@@ -192,6 +209,9 @@ class InternalApi(object):
     def get_core_service(self):
         return CORE_MANAGER.get_core_service()
 
+    def get_processor_stats(self):
+        return CORE_MANAGER.get_core_service().get_processor_stats()
+
 
 @add_bgp_error_metadata(code=INTERNAL_API_ERROR,
                         sub_code=INTERNAL_API_SUB_ERROR,
@@ -131,7 +131,7 @@ class TableDetailView(OperatorDetailView):
     scope_id = fields.DataField('scope_id')
     route_family = fields.DataField('route_family')
     destinations = fields.RelatedDictViewField(
-        '_destinations',
+        'destinations',
         'ryu.services.protocols.bgp.operator.views.bgp.DestinationDictView'
     )
 
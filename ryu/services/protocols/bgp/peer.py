@@ -29,19 +29,22 @@ from ryu.services.protocols.bgp.base import SUPPORTED_GLOBAL_RF
 from ryu.services.protocols.bgp import constants as const
 from ryu.services.protocols.bgp.model import OutgoingRoute
 from ryu.services.protocols.bgp.model import SentRoute
-from ryu.services.protocols.bgp.info_base.base import PrefixFilter
 from ryu.services.protocols.bgp.info_base.base import AttributeMap
+from ryu.services.protocols.bgp.info_base.base import FilterList
+from ryu.services.protocols.bgp.info_base.base import PathAttrMap
 from ryu.services.protocols.bgp.model import ReceivedRoute
 from ryu.services.protocols.bgp.net_ctrl import NET_CONTROLLER
 from ryu.services.protocols.bgp.rtconf.neighbors import NeighborConfListener
 from ryu.services.protocols.bgp.rtconf.neighbors import CONNECT_MODE_PASSIVE
 from ryu.services.protocols.bgp.signals.emit import BgpSignalBus
 from ryu.services.protocols.bgp.speaker import BgpProtocol
+from ryu.services.protocols.bgp.speaker import BGP_MAX_MSG_LEN
 from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
 from ryu.services.protocols.bgp.info_base.vpnv4 import Vpnv4Path
 from ryu.services.protocols.bgp.info_base.vpnv6 import Vpnv6Path
 from ryu.services.protocols.bgp.rtconf.vrfs import VRF_RF_IPV4, VRF_RF_IPV6
 from ryu.services.protocols.bgp.utils import bgp as bgp_utils
+from ryu.services.protocols.bgp.utils.decode_pool import DecodedUpdate
 from ryu.services.protocols.bgp.utils.evtlet import EventletIOFactory
 from ryu.services.protocols.bgp.utils import stats
 
@@ -91,6 +94,10 @@ from ryu.lib.packet.bgp import BGPIPv4AddressSpecificExtendedCommunity
 
 LOG = logging.getLogger('bgpspeaker.peer')
 
+# Maximum number of queued outgoing routes packed into Update messages at
+# once.
+MAX_PACKED_ROUTES = 2048
+
 
 def is_valid_state(state):
     """Returns True if given state is a valid bgp finite state machine state.
@@ -120,7 +127,8 @@ PeerCounterNames = namedtuple(
      'SENT_NOTIFICATION',
      'SENT_REFRESH',
      'RECV_REFRESH',
-     'FSM_ESTB_TRANSITIONS')
+     'FSM_ESTB_TRANSITIONS',
+     'SUPPRESSED_UPDATES')
 )(
     'recv_prefixes',
     'recv_updates',
@@ -129,7 +137,8 @@ PeerCounterNames = namedtuple(
     'sent_notification',
     'sent_refresh',
     'recv_refresh',
-    'fms_established_transitions'
+    'fms_established_transitions',
+    'suppressed_updates'
 )
 
 
@@ -154,6 +163,7 @@ class PeerState(object):
             'sent_refresh': 0,
             'recv_refresh': 0,
             'fms_established_transitions': 0,
+            'suppressed_updates': 0,
         }
         self._signal_bus = signal_bus
 
@@ -267,7 +277,10 @@ class PeerState(object):
             stats.FMS_EST_TRANS: self.get_count(
                 PeerCounterNames.FSM_ESTB_TRANSITIONS
             ),
-            stats.UPTIME: uptime
+            stats.UPTIME: uptime,
+            stats.SUPPRESSED_UPDATES: self.get_count(
+                PeerCounterNames.SUPPRESSED_UPDATES
+            )
         }
 
 
@@ -344,11 +357,13 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
         self._sent_init_non_rtc_update = False
         self._init_rtc_nlri_path = []
 
-        # in-bound filters
+        # in-bound filters, and compiled
         self._in_filters = self._neigh_conf.in_filter
+        self._in_filter_list = FilterList(self._in_filters)
 
-        # out-bound filters
+        # out-bound filters, and compiled
         self._out_filters = self._neigh_conf.out_filter
+        self._out_filter_list = FilterList(self._out_filters)
 
         # Adj-rib-in
         self._adj_rib_in = {}
@@ -359,6 +374,15 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
         # attribute maps
         self._attribute_maps = {}
 
+        # Routes in the outgoing queue by (route family, prefix), since the
+        # last message queued which isn't a route.
+        self._queued_routes = {}
+
+        # Time before which the routes queued once the outgoing queue was
+        # emptied are held, and whether routes were sent since.
+        self._next_round_time = 0
+        self._round_sent = False
+
     @property
     def remote_as(self):
         return self._neigh_conf.remote_as
@@ -557,44 +581,34 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
     def on_update_connect_mode(self, conf_evt):
         self._on_update_connect_mode(conf_evt.value)
 
-    def _apply_filter(self, filters, path):
-        block = False
-        blocked_cause = None
-
-        for filter_ in filters:
-            if filter_.ROUTE_FAMILY != path.ROUTE_FAMILY:
-                continue
-
-            policy, is_matched = filter_.evaluate(path)
-            if policy == PrefixFilter.POLICY_PERMIT and is_matched:
-                block = False
-                break
-            elif policy == PrefixFilter.POLICY_DENY and is_matched:
-                block = True
-                blocked_cause = filter_.prefix + ' - DENY'
-                break
-
-        return block, blocked_cause
-
     def _apply_in_filter(self, path):
-        return self._apply_filter(self._in_filters, path)
+        return self._in_filter_list.evaluate(path)
 
     def _apply_out_filter(self, path):
-        return self._apply_filter(self._out_filters, path)
+        return self._out_filter_list.evaluate(path)
 
     def on_update_in_filter(self):
         LOG.debug('on_update_in_filter fired')
+        filter_list = FilterList(self._in_filters)
+        # Only the paths matched by a filter which changed may be blocked
+        # or not differently.
+        changes = self._in_filter_list.diff(filter_list)
+        self._in_filter_list = filter_list
+        if not changes.filters:
+            return
         for received_path in self._adj_rib_in.itervalues():
-            LOG.debug('received_path: %s' % received_path)
             path = received_path.path
+            if not changes.matches(path):
+                continue
+            LOG.debug('received_path: %s', received_path)
             nlri_str = path.nlri.formatted_nlri_str
             block, blocked_reason = self._apply_in_filter(path)
             if block == received_path.filtered:
-                LOG.debug('block situation not changed: %s' % block)
+                LOG.debug('block situation not changed: %s', block)
                 continue
             elif block:
                 # path wasn't blocked, but must be blocked by this update
-                path = sent_route.path.clone(for_withdrawal=True)
+                path = path.clone(for_withdrawal=True)
                 LOG.debug('withdraw %s because of in filter update'
                           % nlri_str)
             else:
@@ -607,17 +621,26 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
 
     def on_update_out_filter(self):
         LOG.debug('on_update_out_filter fired')
+        filter_list = FilterList(self._out_filters)
+        # Only the paths matched by a filter which changed may be blocked
+        # or not differently.
+        changes = self._out_filter_list.diff(filter_list)
+        self._out_filter_list = filter_list
+        if not changes.filters:
+            return
         for sent_path in self._adj_rib_out.itervalues():
-            LOG.debug('sent_path: %s' % sent_path)
             path = sent_path.path
+            if not changes.matches(path):
+                continue
+            LOG.debug('sent_path: %s', sent_path)
             nlri_str = path.nlri.formatted_nlri_str
             block, blocked_reason = self._apply_out_filter(path)
             if block == sent_path.filtered:
-                LOG.debug('block situation not changed: %s' % block)
+                LOG.debug('block situation not changed: %s', block)
                 continue
             elif block:
                 # path wasn't blocked, but must be blocked by this update
-                withdraw_clone = sent_route.path.clone(for_withdrawal=True)
+                withdraw_clone = path.clone(for_withdrawal=True)
                 outgoing_route = OutgoingRoute(withdraw_clone)
                 LOG.debug('send withdraw %s because of out filter update'
                           % nlri_str)
@@ -675,51 +698,121 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
                               self._enqueue_eor_msg, rr_msg)
             LOG.debug('Enhanced RR max. EOR timer set.')
 
-    def _send_outgoing_route(self, outgoing_route):
-        """Constructs `Update` message from given `outgoing_route` and sends
-        it to peer.
+    def _send_outgoing_routes(self, outgoing_routes):
+        """Constructs `Update` messages from given `outgoing_routes` and
+        sends them to peer.
 
-        Also, checks if any policies prevent sending this message.
-        Populates Adj-RIB-out with corresponding `SentRoute`.
+        Also, checks if any policies prevent sending these routes.
+        Populates Adj-RIB-out with corresponding `SentRoute`s. The routes
+        sharing the same path attributes are sent in the same messages.
         """
+        # Routes to send by prefix, only the last route is sent for a
+        # prefix queued several times.
+        updates = OrderedDict()
+        for outgoing_route in outgoing_routes:
+            path = outgoing_route.path
+            block, blocked_cause = self._apply_out_filter(path)
+
+            nlri_str = outgoing_route.path.nlri.formatted_nlri_str
+            sent_route = SentRoute(outgoing_route.path, self, block)
+            self._adj_rib_out[nlri_str] = sent_route
+            self._signal_bus.adj_rib_out_changed(self, sent_route)
+
+            key = (path.route_family, nlri_str)
+            if self._queued_routes.get(key) is outgoing_route:
+                del self._queued_routes[key]
+
+            # Construct update message.
+            if not block:
+                if updates.pop(key, None) is not None:
+                    self.state.incr(PeerCounterNames.SUPPRESSED_UPDATES)
+                updates[key] = self._construct_update(outgoing_route)
+            else:
+                LOG.debug('prefix : %s is not sent by filter : %s'
+                          % (path.nlri, blocked_cause))
+
+            # We have to create sent_route for every OutgoingRoute which is
+            # not a withdraw or was for route-refresh msg.
+            if (not outgoing_route.path.is_withdraw and
+                    not outgoing_route.for_route_refresh):
+                # Update the destination with new sent route.
+                tm = self._core_service.table_manager
+                tm.remember_sent_route(sent_route)
 
-        path = outgoing_route.path
-        block, blocked_cause = self._apply_out_filter(path)
-
-        nlri_str = outgoing_route.path.nlri.formatted_nlri_str
-        sent_route = SentRoute(outgoing_route.path, self, block)
-        self._adj_rib_out[nlri_str] = sent_route
-        self._signal_bus.adj_rib_out_changed(self, sent_route)
-
-        # TODO(PH): optimized by sending several prefixes per update.
-        # Construct and send update message.
-        if not block:
-            update_msg = self._construct_update(outgoing_route)
+        for update_msg in bgp_utils.pack_updates(updates.values(),
+                                                 BGP_MAX_MSG_LEN):
             self._protocol.send(update_msg)
             # Collect update statistics.
             self.state.incr(PeerCounterNames.SENT_UPDATES)
+
+    def _pop_outgoing_routes(self, outgoing_route):
+        """Returns `outgoing_route` with the outgoing routes queued right
+        after it.
+        """
+        outgoing_routes = [outgoing_route]
+        while len(outgoing_routes) < MAX_PACKED_ROUTES:
+            outgoing_msg = self.outgoing_msg_list.pop_first()
+            if outgoing_msg is None:
+                break
+            if not isinstance(outgoing_msg, OutgoingRoute):
+                # Keep the order with the other messages.
+                self.outgoing_msg_list.prepend(outgoing_msg)
+                break
+            outgoing_routes.append(outgoing_msg)
+        return outgoing_routes
+
+    def enque_outgoing_msg(self, msg):
+        """Enqueues `msg` to be sent to this peer.
+
+        An `OutgoingRoute` takes the place in the queue of the route of the
+        same prefix queued after the last message which isn't a route, if
+        any, so that only the latest state of a prefix is sent, and EOR and
+        route refresh messages are sent after the routes queued before
+        them only.
+        """
+        if not isinstance(msg, OutgoingRoute):
+            self._queued_routes.clear()
+            Sink.enque_outgoing_msg(self, msg)
+            return
+
+        path = msg.path
+        key = (path.route_family, path.nlri.formatted_nlri_str)
+        queued = self._queued_routes.get(key)
+        self._queued_routes[key] = msg
+        if queued is not None and self.outgoing_msg_list.is_on_list(queued):
+            self.outgoing_msg_list.insert_after(queued, msg)
+            self.outgoing_msg_list.remove(queued)
+            self.state.incr(PeerCounterNames.SUPPRESSED_UPDATES)
         else:
-            LOG.debug('prefix : %s is not sent by filter : %s'
-                      % (path.nlri, blocked_cause))
-
-        # We have to create sent_route for every OutgoingRoute which is
-        # not a withdraw or was for route-refresh msg.
-        if (not outgoing_route.path.is_withdraw and
-                not outgoing_route.for_route_refresh):
-            # Update the destination with new sent route.
-            tm = self._core_service.table_manager
-            tm.remember_sent_route(sent_route)
+            Sink.enque_outgoing_msg(self, msg)
+
+    def clear_outgoing_msg_list(self):
+        Sink.clear_outgoing_msg_list(self)
+        self._queued_routes.clear()
+        self._next_round_time = 0
+        self._round_sent = False
 
     def _process_outgoing_msg_list(self):
         while True:
             outgoing_msg = None
 
             if self._protocol is not None:
+                # The messages queued once the queue was emptied are held
+                # until the advertisement interval elapses, and sent
+                # together.
+                delay = self._next_round_time - time.time()
+                if delay > 0:
+                    self.pause(delay)
+                    continue
                 # We pick the first outgoing msg. available and send it.
                 outgoing_msg = self.outgoing_msg_list.pop_first()
 
             # If we do not have any outgoing route, we wait.
             if outgoing_msg is None:
+                interval = self._neigh_conf.advertisement_interval
+                if self._round_sent and interval:
+                    self._next_round_time = time.time() + interval
+                self._round_sent = False
                 self.outgoing_msg_event.clear()
                 self.outgoing_msg_event.wait()
                 continue
@@ -735,7 +828,9 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             if isinstance(outgoing_msg, BGPRouteRefresh):
                 self._send_outgoing_route_refresh_msg(outgoing_msg)
             elif isinstance(outgoing_msg, OutgoingRoute):
-                self._send_outgoing_route(outgoing_msg)
+                self._send_outgoing_routes(
+                    self._pop_outgoing_routes(outgoing_msg))
+                self._round_sent = True
 
             # EOR are enqueued as plain Update messages.
             elif isinstance(outgoing_msg, BGPUpdate):
@@ -824,8 +919,8 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
         """
         update = None
         path = outgoing_route.path
-        # Get copy of path's path attributes.
-        pathattr_map = path.pathattr_map
+        # Path attributes of the path, shared with other paths.
+        pathattr_map = path.pathattrs
         new_pathattr = []
 
         if path.is_withdraw:
@@ -839,7 +934,7 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
                 new_pathattr.append(mpunreach_attr)
         elif self.is_route_server_client:
             nlri_list = [path.nlri]
-            for pathattr in path.pathattr_map.itervalues():
+            for pathattr in path.pathattrs.itervalues():
                 new_pathattr.append(pathattr)
         else:
             # Supported and un-supported/unknown attributes.
@@ -977,7 +1072,9 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
             if path_extcomm_attr:
                 # SOO list can be configured per VRF and/or per Neighbor.
                 # NeighborConf has this setting we add this to existing list.
-                communities = path_extcomm_attr.communities
+                # The attribute is shared by the paths with the same
+                # attributes, so extend a copy of the communities.
+                communities = list(path_extcomm_attr.communities)
                 if self._neigh_conf.soo_list:
                     # construct extended community
                     soo_list = self._neigh_conf.soo_list
@@ -1324,6 +1421,7 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
         """
         assert self.state.bgp_state == const.BGP_FSM_ESTABLISHED
         self.state.incr(PeerCounterNames.RECV_UPDATES)
+        self._signal_bus.update_received(self, update_msg)
         if not self._validate_update_msg(update_msg):
             # If update message was not valid for some reason, we ignore its
             # routes.
@@ -1366,7 +1464,11 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
         Extracted paths are added to appropriate *Destination* for further
         processing.
         """
-        umsg_pattrs = update_msg.pathattr_map
+        # The paths of the NLRIs share the interned path attributes.
+        if isinstance(update_msg, DecodedUpdate):
+            umsg_pattrs = update_msg.pathattrs
+        else:
+            umsg_pattrs = PathAttrMap(update_msg.pathattr_map).intern()
 
         msg_rf = RF_IPv4_UC
         # Check if this route family is among supported route families.
@@ -1392,14 +1494,14 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
 
         # Create path instances for each NLRI from the update message.
         for msg_nlri in msg_nlri_list:
-            LOG.debug('NLRI: %s' % msg_nlri)
+            LOG.debug('NLRI: %s', msg_nlri)
             new_path = bgp_utils.create_path(
                 self,
                 msg_nlri,
                 pattrs=umsg_pattrs,
                 nexthop=next_hop
             )
-            LOG.debug('Extracted paths from Update msg.: %s' % new_path)
+            LOG.debug('Extracted paths from Update msg.: %s', new_path)
 
             block, blocked_cause = self._apply_in_filter(new_path)
 
@@ -1490,7 +1592,8 @@ class Peer(Source, Sink, NeighborConfListener, Activity):
         Extracted paths are added to appropriate *Destination* for further
         processing.
         """
-        umsg_pattrs = update_msg.pathattr_map
+        # The paths of the NLRIs share the interned path attributes.
+        umsg_pattrs = PathAttrMap(update_msg.pathattr_map).intern()
         mpreach_nlri_attr = umsg_pattrs.get(BGP_ATTR_TYPE_MP_REACH_NLRI)
         assert mpreach_nlri_attr
 
@@ -17,12 +17,16 @@
 """
 
 import logging
+import socket
+import struct
+import time
 
 from ryu.services.protocols.bgp.base import Activity
 from ryu.services.protocols.bgp.base import add_bgp_error_metadata
 from ryu.services.protocols.bgp.base import BGP_PROCESSOR_ERROR_CODE
 from ryu.services.protocols.bgp.base import BGPSException
 from ryu.services.protocols.bgp.utils import circlist
+from ryu.services.protocols.bgp.utils import stats
 from ryu.services.protocols.bgp.utils.evtlet import EventletIOFactory
 
 from ryu.lib.packet.bgp import RF_RTC_UC
@@ -56,11 +60,30 @@ class BgpProcessor(Activity):
     cases. If you want more control on which destinations get processed faster
     compared to other destinations, you can create several instance of this
     works to achieve the desired work flow.
+
+    Destinations are processed by batches, sized so that a cycle takes about
+    `time_budget` seconds before the processor yields to the other
+    greenthreads, unless a fixed number of destinations per cycle is given.
+    Destinations with withdrawals and destinations whose prefix matches
+    `priority_filter` (a `FilterList`) are queued on a priority lane, which
+    is processed before the other destinations.
     """
 
-    # Max. number of destinations processed per cycle.
+    # Number of destinations processed by the first cycle, and per cycle
+    # until the time spent on a destination is known.
     MAX_DEST_PROCESSED_PER_CYCLE = 100
 
+    # Bounds of the number of destinations processed per cycle.
+    MIN_BATCH_SIZE = 10
+    MAX_BATCH_SIZE = 5000
+
+    # Time in seconds a cycle should take.
+    CYCLE_TIME_BUDGET = 0.02
+
+    # Weight of the last cycle in the moving average of the time spent on a
+    # destination.
+    COST_SMOOTHING = 0.3
+
     #
     # DestQueue
     #
@@ -72,15 +95,56 @@ class BgpProcessor(Activity):
         next_attr_name='next_dest_to_process',
         prev_attr_name='prev_dest_to_process')
 
-    def __init__(self, core_service, work_units_per_cycle=None):
+    #
+    # PriorityDestQueue
+    #
+    # Same as DestQueue, for the priority lane, so that a destination can be
+    # moved from one queue to the other.
+    #
+    _PriorityDestQueue = circlist.CircularListType(
+        next_attr_name='next_prio_dest_to_process',
+        prev_attr_name='prev_prio_dest_to_process')
+
+    def __init__(self, core_service, work_units_per_cycle=None,
+                 time_budget=None, priority_filter=None):
         Activity.__init__(self)
         # Back pointer to core service instance that created this processor.
         self._core_service = core_service
         self._dest_queue = BgpProcessor._DestQueue()
+        self._prio_dest_queue = BgpProcessor._PriorityDestQueue()
         self._rtdest_queue = BgpProcessor._DestQueue()
         self.dest_que_evt = EventletIOFactory.create_custom_event()
+        # The batch size is adapted to the time budget unless given.
+        self._adaptive = work_units_per_cycle is None
         self.work_units_per_cycle =\
             work_units_per_cycle or BgpProcessor.MAX_DEST_PROCESSED_PER_CYCLE
+        self.time_budget = time_budget or BgpProcessor.CYCLE_TIME_BUDGET
+        self._priority_filter = priority_filter
+        # Moving average of the time spent on a destination.
+        self._dest_cost = None
+
+        # Number of destinations on the normal and priority queues.
+        self._backlog = 0
+        self._prio_backlog = 0
+        self._cycles = 0
+        self._last_cycle_time = 0
+        self._total_cycle_time = 0
+        self._max_cycle_time = 0
+        # Number of destinations processed, total and max. time they waited
+        # on the normal and priority queues.
+        self._processed = 0
+        self._total_wait = 0
+        self._max_wait = 0
+        self._prio_processed = 0
+        self._prio_total_wait = 0
+        self._prio_max_wait = 0
+
+    @property
+    def backlog(self):
+        """Number of destinations waiting to be processed, RT destinations
+        excepted.
+        """
+        return self._backlog + self._prio_backlog
 
     def _run(self, *args, **kwargs):
         # Sit in tight loop, getting destinations from the queue and processing
@@ -96,7 +160,8 @@ class BgpProcessor(Activity):
             # greenthread to run)
             self._process_dest()
 
-            if self._dest_queue.is_empty():
+            if (self._dest_queue.is_empty() and
+                    self._prio_dest_queue.is_empty()):
                 # If we have no destinations queued for processing, we wait.
                 self.dest_que_evt.clear()
                 self.dest_que_evt.wait()
@@ -104,15 +169,71 @@ class BgpProcessor(Activity):
                 self.pause(0)
 
     def _process_dest(self):
-        dest_processed = 0
         LOG.debug('Processing destination...')
+        start = time.time()
+        dest_processed = 0
+        prio_processed = 0
+        total_wait = 0
+        max_wait = 0
+        # Destinations of the priority lane are processed first.
+        while (dest_processed < self.work_units_per_cycle and
+                not self._prio_dest_queue.is_empty()):
+            next_dest = self._prio_dest_queue.pop_first()
+            self._prio_backlog -= 1
+            wait = start - next_dest.queued_at
+            total_wait += wait
+            max_wait = max(max_wait, wait)
+            next_dest.process()
+            dest_processed += 1
+        if dest_processed:
+            prio_processed = dest_processed
+            self._prio_processed += prio_processed
+            self._prio_total_wait += total_wait
+            self._prio_max_wait = max(self._prio_max_wait, max_wait)
+            total_wait = 0
+            max_wait = 0
+
         while (dest_processed < self.work_units_per_cycle and
                 not self._dest_queue.is_empty()):
             # We process the first destination in the queue.
             next_dest = self._dest_queue.pop_first()
-            if next_dest:
-                next_dest.process()
-                dest_processed += 1
+            self._backlog -= 1
+            wait = start - next_dest.queued_at
+            total_wait += wait
+            max_wait = max(max_wait, wait)
+            next_dest.process()
+            dest_processed += 1
+        if dest_processed > prio_processed:
+            self._processed += dest_processed - prio_processed
+            self._total_wait += total_wait
+            self._max_wait = max(self._max_wait, max_wait)
+
+        if not dest_processed:
+            return
+        elapsed = time.time() - start
+        self._cycles += 1
+        self._last_cycle_time = elapsed
+        self._total_cycle_time += elapsed
+        self._max_cycle_time = max(self._max_cycle_time, elapsed)
+        if self._adaptive:
+            self._adapt_batch_size(elapsed / dest_processed)
+
+    def _adapt_batch_size(self, dest_cost):
+        """Sizes the next batches after the time spent on a destination by
+        this cycle, *dest_cost*.
+        """
+        if self._dest_cost is None:
+            self._dest_cost = dest_cost
+        else:
+            self._dest_cost += (dest_cost - self._dest_cost) * \
+                BgpProcessor.COST_SMOOTHING
+        if self._dest_cost > 0:
+            batch_size = int(self.time_budget / self._dest_cost)
+        else:
+            batch_size = BgpProcessor.MAX_BATCH_SIZE
+        self.work_units_per_cycle = min(max(batch_size,
+                                            BgpProcessor.MIN_BATCH_SIZE),
+                                        BgpProcessor.MAX_BATCH_SIZE)
 
     def _process_rtdest(self):
         LOG.debug('Processing RT NLRI destination...')
@@ -131,6 +252,12 @@ class BgpProcessor(Activity):
                 # Since RT destination were updated we update RT filters
                 self._core_service.update_rtfilters()
 
+    def _is_priority(self, destination):
+        if destination.has_withdraws:
+            return True
+        return (self._priority_filter is not None and
+                self._priority_filter.matches(destination))
+
     def enqueue(self, destination):
         """Enqueues given destination for processing.
 
@@ -139,19 +266,70 @@ class BgpProcessor(Activity):
         if not destination:
             raise BgpProcessorError('Invalid destination %s.' % destination)
 
-        dest_queue = self._dest_queue
         # RtDest are queued in a separate queue
         if destination.route_family == RF_RTC_UC:
-            dest_queue = self._rtdest_queue
-
-        # We do not add given destination to the queue for processing if
-        # it is already on the queue.
-        if not dest_queue.is_on_list(destination):
-            dest_queue.append(destination)
+            # We do not add given destination to the queue for processing if
+            # it is already on the queue.
+            if not self._rtdest_queue.is_on_list(destination):
+                self._rtdest_queue.append(destination)
+        elif self._prio_dest_queue.is_on_list(destination):
+            pass
+        elif self._is_priority(destination):
+            if self._dest_queue.is_on_list(destination):
+                # Moved to the priority lane, the time it has been waiting
+                # is kept.
+                self._dest_queue.remove(destination)
+                self._backlog -= 1
+            else:
+                destination.queued_at = time.time()
+            self._prio_dest_queue.append(destination)
+            self._prio_backlog += 1
+        elif not self._dest_queue.is_on_list(destination):
+            destination.queued_at = time.time()
+            self._dest_queue.append(destination)
+            self._backlog += 1
 
         # Wake-up processing thread if sleeping.
         self.dest_que_evt.set()
 
+    def get_stats_summary_dict(self):
+        """Returns the backlog, the timing of the cycles and the time the
+        destinations wait to be processed, in seconds.
+        """
+        now = time.time()
+        oldest = {}
+        for name, queue in (('normal', self._dest_queue),
+                            ('priority', self._prio_dest_queue)):
+            oldest[name] = 0
+            # The destinations are queued in order.
+            for dest in queue:
+                oldest[name] = now - dest.queued_at
+                break
+
+        def _avg(total, count):
+            return total / count if count else 0
+
+        return {
+            stats.PROCESSOR_BACKLOG: self._backlog,
+            stats.PROCESSOR_PRIORITY_BACKLOG: self._prio_backlog,
+            stats.PROCESSOR_BATCH_SIZE: self.work_units_per_cycle,
+            stats.PROCESSOR_CYCLES: self._cycles,
+            stats.PROCESSOR_LAST_CYCLE_TIME: self._last_cycle_time,
+            stats.PROCESSOR_AVG_CYCLE_TIME: _avg(self._total_cycle_time,
+                                                 self._cycles),
+            stats.PROCESSOR_MAX_CYCLE_TIME: self._max_cycle_time,
+            stats.PROCESSOR_DEST_PROCESSED: self._processed,
+            stats.PROCESSOR_PRIORITY_DEST_PROCESSED: self._prio_processed,
+            stats.PROCESSOR_OLDEST_QUEUE_AGE: oldest['normal'],
+            stats.PROCESSOR_PRIORITY_OLDEST_QUEUE_AGE: oldest['priority'],
+            stats.PROCESSOR_AVG_QUEUE_AGE: _avg(self._total_wait,
+                                                self._processed),
+            stats.PROCESSOR_PRIORITY_AVG_QUEUE_AGE: _avg(
+                self._prio_total_wait, self._prio_processed),
+            stats.PROCESSOR_MAX_QUEUE_AGE: self._max_wait,
+            stats.PROCESSOR_PRIORITY_MAX_QUEUE_AGE: self._prio_max_wait,
+        }
+
 # =============================================================================
 # Best path computation related utilities.
 # =============================================================================
@@ -186,13 +364,15 @@ def _compare_by_version(path1, path2):
     return None
 
 
-def compute_best_path(local_asn, path1, path2):
+def compute_best_path(local_asn, path1, path2, local_router_id=None):
     """Compares given paths and returns best path.
 
     Parameters:
         -`local_asn`: asn of local bgpspeaker
         -`path1`: first path to compare
         -`path2`: second path to compare
+        -`local_router_id`: router id of local bgpspeaker, by default the
+        one sent to the peers of the paths
 
     Best path processing will involve following steps:
     1.  Select a path with a reachable next hop.
@@ -213,301 +393,105 @@ def compute_best_path(local_asn, path1, path2):
     10. Select the route received from the peer with the lowest BGP
         router ID.
 
+    Steps 1, 2 and 9 are not supported yet. The other steps are done by
+    comparing the keys given by `best_path_key`.
+
     Returns None if best-path among given paths cannot be computed else best
     path.
     Assumes paths from NC has source equal to None.
     """
-    best_path = None
-    best_path_reason = BPR_UNKNOWN
-
-    # Follow best path calculation algorithm steps.
-    if best_path is None:
-        best_path = _cmp_by_reachable_nh(path1, path2)
-        best_path_reason = BPR_REACHABLE_NEXT_HOP
-    if best_path is None:
-        best_path = _cmp_by_higest_wg(path1, path2)
-        best_path_reason = BPR_HIGHEST_WEIGHT
-    if best_path is None:
-        best_path = _cmp_by_local_pref(path1, path2)
-        best_path_reason = BPR_LOCAL_PREF
-    if best_path is None:
-        best_path = _cmp_by_local_origin(path1, path2)
-        best_path_reason = BPR_LOCAL_ORIGIN
-    if best_path is None:
-        best_path = _cmp_by_aspath(path1, path2)
-        best_path_reason = BPR_ASPATH
-    if best_path is None:
-        best_path = _cmp_by_origin(path1, path2)
-        best_path_reason = BPR_ORIGIN
-    if best_path is None:
-        best_path = _cmp_by_med(path1, path2)
-        best_path_reason = BPR_MED
-    if best_path is None:
-        best_path = _cmp_by_asn(local_asn, path1, path2)
-        best_path_reason = BPR_ASN
-    if best_path is None:
-        best_path = _cmp_by_igp_cost(path1, path2)
-        best_path_reason = BPR_IGP_COST
-    if best_path is None:
-        best_path = _cmp_by_router_id(local_asn, path1, path2)
-        best_path_reason = BPR_ROUTER_ID
-    if best_path is None:
-        best_path_reason = BPR_UNKNOWN
-
-    return (best_path, best_path_reason)
-
-
-def _cmp_by_reachable_nh(path1, path2):
-    """Compares given paths and selects best path based on reachable next-hop.
-
-    If no path matches this criteria, return None.
-    """
-    # TODO(PH): Currently we do not have a way to check if a IGP route to
-    # NEXT_HOP exists from BGPS.
-    return None
-
-
-def _cmp_by_higest_wg(path1, path2):
-    """Selects a path with highest weight.
-
-    Weight is BGPS specific parameter. It is local to the router on which it
-     is configured.
-    Return:
-        None if best path among given paths cannot be decided, else best path.
-    """
-    # TODO(PH): Revisit this when BGPS has concept of policy to be applied to
-    # in-bound NLRIs.
-    return None
-
-
-def _cmp_by_local_pref(path1, path2):
-    """Selects a path with highest local-preference.
-
-    Unlike the weight attribute, which is only relevant to the local
-    router, local preference is an attribute that routers exchange in the
-    same AS. Highest local-pref is preferred. If we cannot decide,
-    we return None.
+    if local_router_id is None:
+        for path in (path1, path2):
+            if _source_protocol(path.source) is not None:
+                local_router_id = \
+                    path.source.protocol.sent_open_msg.bgp_identifier
+                break
+    key1 = best_path_key(local_asn, local_router_id, path1)
+    key2 = best_path_key(local_asn, local_router_id, path2)
+    reason = best_path_reason(key1, key2)
+    if key1 > key2:
+        return path1, reason
+    elif key2 > key1:
+        return path2, reason
+    return None, reason
+
+
+# Preference of the origins, higher is preferred.
+_ORIGIN_PREF = {
+    BGP_ATTR_ORIGIN_IGP: 3,
+    BGP_ATTR_ORIGIN_EGP: 2,
+    BGP_ATTR_ORIGIN_INCOMPLETE: 1,
+}
+
+# Default local-pref values is 100
+DEFAULT_LOCAL_PREF = 100
+
+# Reasons a path is preferred, by index in the keys given by best_path_key.
+_BEST_PATH_KEY_REASONS = (BPR_LOCAL_PREF, BPR_LOCAL_ORIGIN, BPR_ASPATH,
+                          BPR_ORIGIN, BPR_MED, BPR_ASN, BPR_ROUTER_ID)
+
+
+def _source_protocol(source):
+    # The protocol of a peer source, None for NC and the VRF/VPN tables.
+    return getattr(source, 'protocol', None)
+
+
+def best_path_key(local_asn, local_router_id, path):
+    """Returns the key of *path* for best path selection.
+
+    The path with the greatest key is the best path, and paths whose keys
+    are equal can't be told apart.  The key is a tuple of, in the order of
+    the best path selection steps:
+        - local preference, DEFAULT_LOCAL_PREF if the path has none
+        - 1 if the path is locally originated (from NC), else 0
+        - AS path length, negated
+        - origin preference
+        - MED, negated.  A path with no MED has a MED of 0
+        - 1 if the path is learned via eBGP, else 0
+        - router id of the peer of an iBGP path, as an integer, negated.
+          0 for an eBGP path as eBGP paths aren't tie broken by router id
+          (RFC 5004).  The router id of a path from NC is `local_router_id`
+
+    As a key only depends on the path, the source of the path and the local
+    speaker, it can be computed once when the path is learned.
     """
-    # TODO(PH): Revisit this when BGPS has concept of policy to be applied to
-    # in-bound NLRIs.
-    # Default local-pref values is 100
-    lp1 = path1.get_pattr(BGP_ATTR_TYPE_LOCAL_PREF)
-    lp2 = path2.get_pattr(BGP_ATTR_TYPE_LOCAL_PREF)
-    if not (lp1 and lp2):
-        return None
-
-    # Highest local-preference value is preferred.
-    lp1 = lp1.value
-    lp2 = lp2.value
-    if lp1 > lp2:
-        return path1
-    elif lp2 > lp1:
-        return path2
+    local_pref = path.get_pattr(BGP_ATTR_TYPE_LOCAL_PREF)
+    local_pref = local_pref.value if local_pref else DEFAULT_LOCAL_PREF
+
+    as_path = path.get_pattr(BGP_ATTR_TYPE_AS_PATH)
+    origin = path.get_pattr(BGP_ATTR_TYPE_ORIGIN)
+    assert as_path is not None and origin is not None
+    origin_pref = _ORIGIN_PREF.get(origin.value)
+    if origin_pref is None:
+        LOG.error('Invalid origin value encountered %s.' % origin)
+        origin_pref = 0
+
+    med = path.get_pattr(BGP_ATTR_TYPE_MULTI_EXIT_DISC)
+    med = med.value if med else 0
+
+    source = path.source
+    protocol = _source_protocol(source)
+    if protocol is None:
+        asn = local_asn
+        router_id = local_router_id
     else:
-        return None
-
-
-def _cmp_by_local_origin(path1, path2):
-    """Select locally originating path as best path.
-
-    Locally originating routes are network routes, redistributed routes,
-    or aggregated routes. For now we are going to prefer routes received
-    through a Flexinet-Peer as locally originating route compared to routes
-    received from a BGP peer.
-    Returns None if given paths have same source.
-    """
-    # If both paths are from same sources we cannot compare them here.
-    if path1.source == path2.source:
-        return None
-
-    # Here we consider prefix from NC as locally originating static route.
-    # Hence it is preferred.
-    if path1.source is None:
-        return path1
-
-    if path2.source is None:
-        return path2
-
-    return None
-
-
-def _cmp_by_aspath(path1, path2):
-    """Calculated the best-paths by comparing as-path lengths.
-
-    Shortest as-path length is preferred. If both path have same lengths,
-    we return None.
-    """
-    as_path1 = path1.get_pattr(BGP_ATTR_TYPE_AS_PATH)
-    as_path2 = path2.get_pattr(BGP_ATTR_TYPE_AS_PATH)
-    assert as_path1 and as_path2
-    l1 = as_path1.get_as_path_len()
-    l2 = as_path2.get_as_path_len()
-    assert l1 is not None and l2 is not None
-    if l1 > l2:
-        return path2
-    elif l2 > l1:
-        return path1
+        asn = source.remote_as
+        router_id = protocol.recv_open_msg.bgp_identifier
+    is_ebgp = asn != local_asn
+    if is_ebgp or router_id is None:
+        router_id = 0
     else:
-        return None
+        router_id = -struct.unpack('!I', socket.inet_aton(router_id))[0]
 
+    return (local_pref, int(source is None), -as_path.get_as_path_len(),
+            origin_pref, -med, int(is_ebgp), router_id)
 
-def _cmp_by_origin(path1, path2):
-    """Select the best path based on origin attribute.
 
-    IGP is preferred over EGP; EGP is preferred over Incomplete.
-    If both paths have same origin, we return None.
+def best_path_reason(key1, key2):
+    """Returns the reason a path is preferred to another, given the keys of
+    both paths.  BPR_UNKNOWN if the keys are equal.
     """
-    def get_origin_pref(origin):
-        if origin.value == BGP_ATTR_ORIGIN_IGP:
-            return 3
-        elif origin.value == BGP_ATTR_ORIGIN_EGP:
-            return 2
-        elif origin.value == BGP_ATTR_ORIGIN_INCOMPLETE:
-            return 1
-        else:
-            LOG.error('Invalid origin value encountered %s.' % origin)
-            return 0
-
-    origin1 = path1.get_pattr(BGP_ATTR_TYPE_ORIGIN)
-    origin2 = path2.get_pattr(BGP_ATTR_TYPE_ORIGIN)
-    assert origin1 is not None and origin2 is not None
-
-    # If both paths have same origins
-    if origin1.value == origin2.value:
-        return None
-
-    # Translate origin values to preference.
-    origin1 = get_origin_pref(origin1)
-    origin2 = get_origin_pref(origin2)
-    # Return preferred path.
-    if origin1 == origin2:
-        return None
-    elif origin1 > origin2:
-        return path1
-    return path2
-
-
-def _cmp_by_med(path1, path2):
-    """Select the path based with lowest MED value.
-
-    If both paths have same MED, return None.
-    By default, a route that arrives with no MED value is treated as if it
-    had a MED of 0, the most preferred value.
-    RFC says lower MED is preferred over higher MED value.
-    """
-    def get_path_med(path):
-        med = path.get_pattr(BGP_ATTR_TYPE_MULTI_EXIT_DISC)
-        if not med:
-            return 0
-        return med.value
-
-    med1 = get_path_med(path1)
-    med2 = get_path_med(path2)
-
-    if med1 == med2:
-        return None
-    elif med1 < med2:
-        return path1
-    return path2
-
-
-def _cmp_by_asn(local_asn, path1, path2):
-    """Select the path based on source (iBGP/eBGP) peer.
-
-    eBGP path is preferred over iBGP. If both paths are from same kind of
-    peers, return None.
-    """
-    def get_path_source_asn(path):
-        asn = None
-        if path.source is None:
-            asn = local_asn
-        else:
-            asn = path.source.remote_as
-        return asn
-
-    p1_asn = get_path_source_asn(path1)
-    p2_asn = get_path_source_asn(path2)
-    # If path1 is from ibgp peer and path2 is from ebgp peer.
-    if (p1_asn == local_asn) and (p2_asn != local_asn):
-        return path2
-
-    # If path2 is from ibgp peer and path1 is from ebgp peer,
-    if (p2_asn == local_asn) and (p1_asn != local_asn):
-        return path1
-
-    # If both paths are from ebgp or ibpg peers, we cannot decide.
-    return None
-
-
-def _cmp_by_igp_cost(path1, path2):
-    """Select the route with the lowest IGP cost to the next hop.
-
-    Return None if igp cost is same.
-    """
-    # TODO(PH): Currently BGPS has no concept of IGP and IGP cost.
-    return None
-
-
-def _cmp_by_router_id(local_asn, path1, path2):
-    """Select the route received from the peer with the lowest BGP router ID.
-
-    If both paths are eBGP paths, then we do not do any tie breaking, i.e we do
-    not pick best-path based on this criteria.
-    RFC: http://tools.ietf.org/html/rfc5004
-    We pick best path between two iBGP paths as usual.
-    """
-    def get_asn(path_source):
-        if path_source is None:
-            return local_asn
-        else:
-            return path_source.remote_as
-
-    def get_router_id(path_source, local_bgp_id):
-        if path_source is None:
-            return local_bgp_id
-        else:
-            return path_source.protocol.recv_open_msg.bgp_identifier
-
-    path_source1 = path1.source
-    path_source2 = path2.source
-
-    # If both paths are from NC we have same router Id, hence cannot compare.
-    if path_source1 is None and path_source2 is None:
-        return None
-
-    asn1 = get_asn(path_source1)
-    asn2 = get_asn(path_source2)
-
-    is_ebgp1 = asn1 != local_asn
-    is_ebgp2 = asn2 != local_asn
-    # If both paths are from eBGP peers, then according to RFC we need
-    # not tie break using router id.
-    if (is_ebgp1 and is_ebgp2):
-        return None
-
-    if ((is_ebgp1 is True and is_ebgp2 is False) or
-            (is_ebgp1 is False and is_ebgp2 is True)):
-        raise ValueError('This method does not support comparing ebgp with'
-                         ' ibgp path')
-
-    # At least one path is not coming from NC, so we get local bgp id.
-    if path_source1 is not None:
-        local_bgp_id = path_source1.protocol.sent_open_msg.bgp_identifier
-    else:
-        local_bgp_id = path_source2.protocol.sent_open_msg.bgp_identifier
-
-    # Get router ids.
-    router_id1 = get_router_id(path_source1, local_bgp_id)
-    router_id2 = get_router_id(path_source2, local_bgp_id)
-
-    # If both router ids are same/equal we cannot decide.
-    # This case is possible since router ids are arbitrary.
-    if router_id1 == router_id2:
-        return None
-
-    # Select the path with lowest router Id.
-    from ryu.services.protocols.bgp.utils.bgp import from_inet_ptoi
-    if (from_inet_ptoi(router_id1) < from_inet_ptoi(router_id2)):
-        return path1
-    else:
-        return path2
+    for reason, value1, value2 in zip(_BEST_PATH_KEY_REASONS, key1, key2):
+        if value1 != value2:
+            return reason
+    return BPR_UNKNOWN
@@ -21,6 +21,8 @@ import logging
 from ryu.services.protocols.bgp.utils.validation import is_valid_ipv4
 from ryu.services.protocols.bgp.utils.validation import is_valid_old_asn
 
+from ryu.services.protocols.bgp.info_base.base import PrefixFilter
+
 from ryu.services.protocols.bgp import rtconf
 from ryu.services.protocols.bgp.rtconf.base import BaseConf
 from ryu.services.protocols.bgp.rtconf.base import BaseConfListener
@@ -66,6 +68,8 @@ BGP_CONN_RETRY_TIME = 'bgp_conn_retry_time'
 BGP_SERVER_PORT = 'bgp_server_port'
 TCP_CONN_TIMEOUT = 'tcp_conn_timeout'
 MAX_PATH_EXT_RTFILTER_ALL = 'maximum_paths_external_rtfilter_all'
+DECODE_WORKERS = 'decode_workers'
+PRIORITY_PREFIXES = 'priority_prefixes'
 
 
 # Valid default values of some settings.
@@ -77,6 +81,8 @@ DEFAULT_TCP_CONN_TIMEOUT = 30
 DEFAULT_BGP_CONN_RETRY_TIME = 30
 DEFAULT_MED = 0
 DEFAULT_MAX_PATH_EXT_RTFILTER_ALL = True
+DEFAULT_DECODE_WORKERS = 0
+DEFAULT_PRIORITY_PREFIXES = []
 
 
 @validate(name=LOCAL_AS)
@@ -189,6 +195,29 @@ def validate_max_path_ext_rtfilter_all(max_path_ext_rtfilter_all):
     return max_path_ext_rtfilter_all
 
 
+@validate(name=DECODE_WORKERS)
+def validate_decode_workers(decode_workers):
+    if not isinstance(decode_workers, (int, long)):
+        raise ConfigTypeError(desc=('Invalid decode workers configuration '
+                                    'value %s' % decode_workers))
+    if decode_workers < 0:
+        raise ConfigValueError(desc=('Invalid decode workers configuration '
+                                     'value %s' % decode_workers))
+    return decode_workers
+
+
+@validate(name=PRIORITY_PREFIXES)
+def validate_priority_prefixes(priority_prefixes):
+    if not isinstance(priority_prefixes, list):
+        raise ConfigTypeError(desc=('Invalid priority prefixes configuration '
+                                    'value %s' % priority_prefixes))
+    for prefix_filter in priority_prefixes:
+        if not isinstance(prefix_filter, PrefixFilter):
+            raise ConfigTypeError(desc=('Invalid priority prefix %s, has to '
+                                        'be a PrefixFilter' % prefix_filter))
+    return priority_prefixes
+
+
 class CommonConf(BaseConf):
     """Encapsulates configurations applicable to all peer sessions.
 
@@ -206,7 +235,9 @@ class CommonConf(BaseConf):
                                    LABEL_RANGE, BGP_SERVER_PORT,
                                    TCP_CONN_TIMEOUT,
                                    BGP_CONN_RETRY_TIME,
-                                   MAX_PATH_EXT_RTFILTER_ALL])
+                                   MAX_PATH_EXT_RTFILTER_ALL,
+                                   DECODE_WORKERS,
+                                   PRIORITY_PREFIXES])
 
     def __init__(self, **kwargs):
         super(CommonConf, self).__init__(**kwargs)
@@ -228,6 +259,10 @@ class CommonConf(BaseConf):
         self._settings[MAX_PATH_EXT_RTFILTER_ALL] = compute_optional_conf(
             MAX_PATH_EXT_RTFILTER_ALL, DEFAULT_MAX_PATH_EXT_RTFILTER_ALL,
             **kwargs)
+        self._settings[DECODE_WORKERS] = compute_optional_conf(
+            DECODE_WORKERS, DEFAULT_DECODE_WORKERS, **kwargs)
+        self._settings[PRIORITY_PREFIXES] = compute_optional_conf(
+            PRIORITY_PREFIXES, DEFAULT_PRIORITY_PREFIXES, **kwargs)
 
     # =========================================================================
     # Required attributes
@@ -273,6 +308,14 @@ class CommonConf(BaseConf):
     def max_path_ext_rtfilter_all(self):
         return self._settings[MAX_PATH_EXT_RTFILTER_ALL]
 
+    @property
+    def decode_workers(self):
+        return self._settings[DECODE_WORKERS]
+
+    @property
+    def priority_prefixes(self):
+        return self._settings[PRIORITY_PREFIXES]
+
     @classmethod
     def get_opt_settings(self):
         self_confs = super(CommonConf, self).get_opt_settings()
@@ -83,6 +83,7 @@ CHECK_FIRST_AS = 'check_first_as'
 ATTRIBUTE_MAP = 'attribute_map'
 IS_NEXT_HOP_SELF = 'is_next_hop_self'
 CONNECT_MODE = 'connect_mode'
+ADVERTISEMENT_INTERVAL = 'advertisement_interval'
 CONNECT_MODE_ACTIVE = 'active'
 CONNECT_MODE_PASSIVE = 'passive'
 CONNECT_MODE_BOTH = 'both'
@@ -104,6 +105,7 @@ DEFAULT_IS_ROUTE_SERVER_CLIENT = False
 DEFAULT_CHECK_FIRST_AS = False
 DEFAULT_IS_NEXT_HOP_SELF = False
 DEFAULT_CONNECT_MODE = CONNECT_MODE_BOTH
+DEFAULT_ADVERTISEMENT_INTERVAL = 0
 
 # Default value for *MAX_PREFIXES* setting is set to 0.
 DEFAULT_MAX_PREFIXES = 0
@@ -282,6 +284,14 @@ def validate_connect_mode(mode):
     return mode
 
 
+@validate(name=ADVERTISEMENT_INTERVAL)
+def validate_advertisement_interval(interval):
+    if not isinstance(interval, (int, long)) or interval < 0:
+        raise ConfigValueError(desc='Invalid advertisement_interval(%s)' %
+                               interval)
+    return interval
+
+
 class NeighborConf(ConfWithId, ConfWithStats):
     """Class that encapsulates one neighbors' configuration."""
 
@@ -303,7 +313,8 @@ class NeighborConf(ConfWithId, ConfWithStats):
                                    PEER_NEXT_HOP, PASSWORD,
                                    IN_FILTER, OUT_FILTER,
                                    IS_ROUTE_SERVER_CLIENT, CHECK_FIRST_AS,
-                                   IS_NEXT_HOP_SELF, CONNECT_MODE])
+                                   IS_NEXT_HOP_SELF, CONNECT_MODE,
+                                   ADVERTISEMENT_INTERVAL])
 
     def __init__(self, **kwargs):
         super(NeighborConf, self).__init__(**kwargs)
@@ -343,6 +354,8 @@ class NeighborConf(ConfWithId, ConfWithStats):
             DEFAULT_IS_NEXT_HOP_SELF, **kwargs)
         self._settings[CONNECT_MODE] = compute_optional_conf(
             CONNECT_MODE, DEFAULT_CONNECT_MODE, **kwargs)
+        self._settings[ADVERTISEMENT_INTERVAL] = compute_optional_conf(
+            ADVERTISEMENT_INTERVAL, DEFAULT_ADVERTISEMENT_INTERVAL, **kwargs)
 
         # We do not have valid default MED value.
         # If no MED attribute is provided then we do not have to use MED.
@@ -538,6 +551,10 @@ class NeighborConf(ConfWithId, ConfWithStats):
         self._settings[CONNECT_MODE] = mode
         self._notify_listeners(NeighborConf.UPDATE_CONNECT_MODE_EVT, mode)
 
+    @property
+    def advertisement_interval(self):
+        return self._settings[ADVERTISEMENT_INTERVAL]
+
     def exceeds_max_prefix_allowed(self, prefix_count):
         allowed_max = self._settings[MAX_PREFIXES]
         does_exceed = False
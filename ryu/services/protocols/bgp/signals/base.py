@@ -8,7 +8,7 @@ class SignalBus(object):
 
     def emit_signal(self, identifier, data):
         identifier = _to_tuple(identifier)
-        LOG.debug('SIGNAL: %s emited with data: %s ' % (identifier, data))
+        LOG.debug('SIGNAL: %s emited with data: %s ', identifier, data)
         for func, filter_func in self._listeners.get(identifier, []):
             if not filter_func or filter_func(data):
                 func(identifier, data)
@@ -22,6 +22,13 @@ class SignalBus(object):
                 []
             ).append((func, filter_func))
 
+    def unregister_listener(self, identifier, func):
+        identifier = _to_tuple(identifier)
+        for i in xrange(1, len(identifier) + 1):
+            listeners = self._listeners.get(identifier[:i], [])
+            listeners[:] = [(f, filter_func) for f, filter_func in listeners
+                            if f != func]
+
     def unregister_all(self):
         self._listeners = {}
 
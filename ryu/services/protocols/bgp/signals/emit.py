@@ -16,6 +16,7 @@ class BgpSignalBus(SignalBus):
     BGP_ADJ_RIB_OUT_CHANGED = ('core', 'adj', 'rib', 'out', 'changed')
     BGP_ADJ_UP = ('core', 'adj', 'up')
     BGP_ADJ_DOWN = ('core', 'adj', 'down')
+    BGP_UPDATE_RECEIVED = ('bgp', 'update_received')
 
     def bgp_error(self, peer, code, subcode, reason):
         return self.emit_signal(
@@ -79,3 +80,8 @@ class BgpSignalBus(SignalBus):
 
     def adj_down(self, peer):
         return self.emit_signal(self.BGP_ADJ_DOWN, {'peer': peer})
+
+    def update_received(self, peer, update_msg):
+        return self.emit_signal(
+            self.BGP_UPDATE_RECEIVED,
+            {'peer': peer, 'update_msg': update_msg})
@@ -61,6 +61,9 @@ LOG = logging.getLogger('bgpspeaker.speaker')
 BGP_MIN_MSG_LEN = 19
 BGP_MAX_MSG_LEN = 4096
 
+# Number of bytes read at once from a peer.
+RECV_SIZE = BGP_MAX_MSG_LEN * 16
+
 # Keep-alive singleton.
 _KEEP_ALIVE = BGPKeepAlive()
 
@@ -93,7 +96,8 @@ class BgpProtocol(Protocol, Activity):
     MESSAGE_MARKER = ('\xff\xff\xff\xff\xff\xff\xff\xff'
                       '\xff\xff\xff\xff\xff\xff\xff\xff')
 
-    def __init__(self, socket, signal_bus, is_reactive_conn=False):
+    def __init__(self, socket, signal_bus, is_reactive_conn=False,
+                 decode_pool=None):
         # Validate input.
         if socket is None:
             raise ValueError('Invalid arguments passed.')
@@ -124,6 +128,8 @@ class BgpProtocol(Protocol, Activity):
         self.sent_open_msg = None
         self.recv_open_msg = None
         self._is_bound = False
+        # DecodePool decoding the UPDATE messages, if any.
+        self._decode_pool = decode_pool
 
     @property
     def is_reactive(self):
@@ -304,17 +310,22 @@ class BgpProtocol(Protocol, Activity):
             - `next_bytes`: next set of bytes received from peer.
         """
         # Append buffer with received bytes.
-        self._recv_buff += next_bytes
+        buff = self._recv_buff + next_bytes
+        self._recv_buff = ''
+        # Offset of the next message in the buffer.
+        offset = 0
+        # Raw UPDATE messages to decode with the decode pool.
+        updates = []
 
         while True:
             # If current buffer size is less then minimum bgp message size, we
             # return as we do not have a complete bgp message to work with.
-            if len(self._recv_buff) < BGP_MIN_MSG_LEN:
-                return
+            if len(buff) - offset < BGP_MIN_MSG_LEN:
+                break
 
             # Parse message header into elements.
             auth, length, ptype = BgpProtocol.parse_msg_header(
-                self._recv_buff[:BGP_MIN_MSG_LEN])
+                buff[offset:offset + BGP_MIN_MSG_LEN])
 
             # Check if we have valid bgp message marker.
             # We should get default marker since we are not supporting any
@@ -346,14 +357,38 @@ class BgpProtocol(Protocol, Activity):
                 raise bgp.BadLen(ptype, length)
 
             # If we have partial message we wait for rest of the message.
-            if len(self._recv_buff) < length:
-                return
-            msg, rest = BGPMessage.parser(self._recv_buff)
-            self._recv_buff = rest
+            if len(buff) - offset < length:
+                break
+            msg_buff = buff[offset:offset + length]
+            offset += length
+
+            # UPDATE messages are decoded by batch, the messages are still
+            # handled in the order they were received.
+            if ptype == BGP_MSG_UPDATE and self._decode_pool:
+                updates.append(msg_buff)
+                continue
+            if updates:
+                self._handle_updates(updates)
+                updates = []
+
+            msg, _rest = BGPMessage.parser(msg_buff)
 
             # If we have a valid bgp message we call message handler.
             self._handle_msg(msg)
 
+        if updates:
+            self._handle_updates(updates)
+        self._recv_buff = buff[offset:]
+
+    def _handle_updates(self, updates):
+        """Decodes the given raw UPDATE messages with the decode pool and
+        calls message handler for each of them.
+        """
+        for msg in self._decode_pool.decode(updates):
+            if isinstance(msg, Exception):
+                raise msg
+            self._handle_msg(msg)
+
     def send_notification(self, code, subcode):
         """Utility to send notification message.
 
@@ -430,7 +465,7 @@ class BgpProtocol(Protocol, Activity):
         message except for *Open* and *Notification* message. On receiving
         *Notification* message we close connection with peer.
         """
-        LOG.debug('Received msg from %s << %s' % (self._remotename, msg))
+        LOG.debug('Received msg from %s << %s', self._remotename, msg)
 
         # If we receive open message we try to bind to protocol
         if (msg.type == BGP_MSG_OPEN):
@@ -535,7 +570,7 @@ class BgpProtocol(Protocol, Activity):
         """Sits in tight loop collecting data received from peer and
         processing it.
         """
-        required_len = BGP_MIN_MSG_LEN
+        required_len = RECV_SIZE
         conn_lost_reason = "Connection lost as protocol is no longer active"
         try:
             while True:
@@ -27,9 +27,13 @@ from ryu.lib.packet.bgp import RF_IPv6_VPN
 from ryu.lib.packet.bgp import RF_RTC_UC
 from ryu.lib.packet.bgp import RouteTargetMembershipNLRI
 from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MULTI_EXIT_DISC
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MP_REACH_NLRI
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MP_UNREACH_NLRI
 from ryu.lib.packet.bgp import BGPPathAttributeMultiExitDisc
+from ryu.lib.packet.bgp import BGPPathAttributeMpReachNLRI
 from ryu.lib.packet.bgp import BGPPathAttributeMpUnreachNLRI
 from ryu.lib.packet.bgp import BGPPathAttributeUnknown
+from ryu.services.protocols.bgp.base import OrderedDict
 from ryu.services.protocols.bgp.info_base.rtc import RtcPath
 from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
 from ryu.services.protocols.bgp.info_base.ipv6 import Ipv6Path
@@ -84,7 +88,7 @@ def clone_rtcpath_update_rt_as(path, new_rt_as):
     old_nlri = path.nlri
     new_rt_nlri = RouteTargetMembershipNLRI(new_rt_as, old_nlri.route_target)
     return RtcPath(path.source, new_rt_nlri, path.source_version_num,
-                   pattrs=path.pathattr_map, nexthop=path.nexthop,
+                   pattrs=path.pathattrs, nexthop=path.nexthop,
                    is_withdraw=path.is_withdraw)
 
 
@@ -108,7 +112,7 @@ def get_unknow_opttrans_attr(path):
 
     Returns dict: <key> - attribute type code, <value> - unknown path-attr.
     """
-    path_attrs = path.pathattr_map
+    path_attrs = path.pathattrs
     unknown_opt_tran_attrs = {}
     for _, attr in path_attrs.iteritems():
         if (isinstance(attr, BGPPathAttributeUnknown) and
@@ -117,6 +121,103 @@ def get_unknow_opttrans_attr(path):
     return unknown_opt_tran_attrs
 
 
+class _UpdateGroup(object):
+    """Routes which can be sent in the same Update messages."""
+
+    def __init__(self, update, mp_attr):
+        self.update = update
+        self.mp_attr = mp_attr
+        self.routes = []
+
+    def make_update(self, routes):
+        update = self.update
+        mp_attr = self.mp_attr
+        if update.withdrawn_routes:
+            return BGPUpdate(withdrawn_routes=routes)
+        if mp_attr is None:
+            return BGPUpdate(path_attributes=update.path_attributes,
+                             nlri=routes)
+
+        if mp_attr.type == BGP_ATTR_TYPE_MP_UNREACH_NLRI:
+            new_mp_attr = BGPPathAttributeMpUnreachNLRI(
+                mp_attr.afi, mp_attr.safi, routes)
+        else:
+            new_mp_attr = BGPPathAttributeMpReachNLRI(
+                mp_attr.afi, mp_attr.safi, mp_attr.next_hop, routes)
+        path_attributes = [new_mp_attr if attr is mp_attr else attr
+                           for attr in update.path_attributes]
+        return BGPUpdate(path_attributes=path_attributes)
+
+    def pack(self, max_len):
+        """Returns the Update messages carrying the routes of the group."""
+        base_len = len(self.make_update([]).serialize())
+        if self.mp_attr is not None:
+            # the length of the attribute may need one more byte
+            base_len += 1
+
+        updates = []
+        routes = []
+        msg_len = base_len
+        for route in self.routes:
+            route_len = len(route.serialize())
+            if routes and msg_len + route_len > max_len:
+                updates.append(self.make_update(routes))
+                routes = []
+                msg_len = base_len
+            routes.append(route)
+            msg_len += route_len
+        if routes:
+            updates.append(self.make_update(routes))
+        return updates
+
+
+def pack_updates(updates, max_len):
+    """Packs Update messages sharing the same path attributes together.
+
+    `updates` is a list of Update messages carrying a single route each,
+    either a NLRI or a withdrawn route.  Returns Update messages of at
+    most `max_len` bytes carrying the same routes, the routes having the
+    same path attributes and route family sent in the same messages.
+    The order of the routes is not kept, so they must be for distinct
+    prefixes.
+    """
+    groups = OrderedDict()
+    for update in updates:
+        mp_attr = None
+        binattrs = bytearray()
+        for attr in update.path_attributes:
+            if attr.type in (BGP_ATTR_TYPE_MP_REACH_NLRI,
+                             BGP_ATTR_TYPE_MP_UNREACH_NLRI):
+                mp_attr = attr
+            else:
+                binattrs += attr.serialize()
+
+        if update.withdrawn_routes:
+            key = ('withdrawn', )
+            routes = update.withdrawn_routes
+        elif mp_attr is None:
+            key = ('nlri', bytes(binattrs))
+            routes = update.nlri
+        elif mp_attr.type == BGP_ATTR_TYPE_MP_UNREACH_NLRI:
+            key = ('mp_unreach', mp_attr.afi, mp_attr.safi)
+            routes = mp_attr.withdrawn_routes
+        else:
+            key = ('mp_reach', mp_attr.afi, mp_attr.safi, mp_attr.next_hop,
+                   bytes(binattrs))
+            routes = mp_attr.nlri
+
+        group = groups.get(key)
+        if group is None:
+            group = _UpdateGroup(update, mp_attr)
+            groups[key] = group
+        group.routes.extend(routes)
+
+    packed = []
+    for group in groups.itervalues():
+        packed.extend(group.pack(max_len))
+    return packed
+
+
 def create_end_of_rib_update():
     """Construct end-of-rib (EOR) Update instance."""
     mpunreach_attr = BGPPathAttributeMpUnreachNLRI(RF_IPv4_VPN.afi,
@@ -106,6 +106,9 @@ class CircularListType(object):
         def prepend(self, node):
             self.list_type.node_insert_after(self.head, node)
 
+        def insert_after(self, node, new_node):
+            self.list_type.node_insert_after(node, new_node)
+
         def __iter__(self):
             return self.generator()
 
@@ -0,0 +1,267 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+ Pool of worker processes decoding BGP UPDATE messages.
+
+ The raw UPDATE messages received from a peer are sent in batches to an
+ idle worker, which parses and validates them and sends back a compact
+ record per message: its withdrawn routes and NLRIs as (length, address)
+ tuples and the bytes of its path attributes.  The path attributes are
+ only parsed in the main process the first time their bytes are seen, the
+ UPDATEs carrying the same bytes then share one interned PathAttrMap.
+
+ UPDATEs carrying MP_REACH_NLRI or MP_UNREACH_NLRI attributes, whose
+ attribute bytes differ from one UPDATE to the other, are still validated
+ by the workers but are sent back raw and parsed in the main process.
+"""
+import cPickle
+import logging
+import multiprocessing
+import os
+import struct
+import traceback
+import weakref
+
+import eventlet.greenio
+import eventlet.patcher
+
+from ryu.lib import hub
+from ryu.lib.packet.bgp import BGPMessage
+from ryu.lib.packet.bgp import BGPUpdate
+from ryu.lib.packet.bgp import BGPWithdrawnRoute
+from ryu.lib.packet.bgp import BgpExc
+from ryu.lib.packet.bgp import IPAddrPrefix
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MP_REACH_NLRI
+from ryu.lib.packet.bgp import BGP_ATTR_TYPE_MP_UNREACH_NLRI
+from ryu.services.protocols.bgp.info_base.base import PathAttrMap
+
+LOG = logging.getLogger('bgpspeaker.utils.decode_pool')
+
+_socket = eventlet.patcher.original('socket')
+
+_FRAME_HDR = struct.Struct('!I')
+
+# Offset of the Withdrawn Routes Length field of an UPDATE message.
+_WITHDRAWN_LEN_OFFSET = BGPMessage._HDR_LEN
+
+
+class DecodedUpdate(BGPUpdate):
+    """UPDATE message decoded by a DecodePool.
+
+    Its path attributes are also available as an interned PathAttrMap,
+    *pathattrs*.
+    """
+
+    def __init__(self, pathattrs, withdrawn_routes, nlri):
+        super(DecodedUpdate, self).__init__(
+            withdrawn_routes=withdrawn_routes,
+            path_attributes=pathattrs.values(), nlri=nlri)
+        self.pathattrs = pathattrs
+
+
+class DecodeError(object):
+    """Exception raised by the parsing of a message in a worker.
+
+    BgpExc instances can't always be pickled, they are rebuilt from their
+    class and attributes by `exception`.
+    """
+
+    def __init__(self, exc):
+        self.exc_class = exc.__class__
+        self.args = exc.args
+        self.state = exc.__dict__
+
+    def exception(self):
+        exc = Exception.__new__(self.exc_class)
+        exc.args = self.args
+        exc.__dict__.update(self.state)
+        return exc
+
+
+def decode_updates(bufs):
+    """Decodes the given raw UPDATE messages into records.
+
+    Returns the list of the records of the messages: a (withdrawn routes,
+    path attributes bytes, NLRIs) tuple, the raw message if it carries
+    MP_(UN)REACH_NLRI attributes, or a DecodeError if the message can't be
+    parsed, which is then the last one decoded.
+    """
+    records = []
+    for buf in bufs:
+        try:
+            msg, _rest = BGPMessage.parser(buf)
+        except BgpExc as e:
+            records.append(DecodeError(e))
+            break
+        except Exception:
+            records.append(DecodeError(ValueError(traceback.format_exc())))
+            break
+
+        if (msg.get_path_attr(BGP_ATTR_TYPE_MP_REACH_NLRI) or
+                msg.get_path_attr(BGP_ATTR_TYPE_MP_UNREACH_NLRI)):
+            records.append(buf)
+            continue
+        offset = _WITHDRAWN_LEN_OFFSET + 2 + msg.withdrawn_routes_len
+        records.append((
+            [(r.length, r.addr) for r in msg.withdrawn_routes],
+            buf[offset + 2:offset + 2 + msg.total_path_attribute_len],
+            [(n.length, n.addr) for n in msg.nlri]))
+    return records
+
+
+def _recv_frame(sock):
+    """Returns the next frame received on *sock*, None if the other end
+    closed the connection.
+    """
+    data = []
+    size = _FRAME_HDR.size
+    header = True
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        data.append(chunk)
+        size -= len(chunk)
+        if not size and header:
+            size = _FRAME_HDR.unpack(''.join(data))[0]
+            data = []
+            header = False
+    return ''.join(data)
+
+
+def _send_frame(sock, data):
+    sock.sendall(_FRAME_HDR.pack(len(data)) + data)
+
+
+def _serve(sock):
+    """Main loop of a worker process: decodes the batches of UPDATE
+    messages received on *sock* until it is closed.
+    """
+    # Don't keep open the sockets of the parent, such as the connections
+    # to the peers.
+    fd = sock.fileno()
+    os.closerange(3, fd)
+    os.closerange(fd + 1, os.sysconf('SC_OPEN_MAX'))
+    while True:
+        data = _recv_frame(sock)
+        if data is None:
+            break
+        records = decode_updates(cPickle.loads(data))
+        _send_frame(sock, cPickle.dumps(records, cPickle.HIGHEST_PROTOCOL))
+
+
+class _Worker(object):
+    def __init__(self, name):
+        parent_sock, child_sock = _socket.socketpair()
+        self.process = multiprocessing.Process(target=_serve,
+                                               args=(child_sock, ),
+                                               name=name)
+        self.process.daemon = True
+        self.process.start()
+        child_sock.close()
+        self._sock = eventlet.greenio.GreenSocket(parent_sock)
+
+    def call(self, bufs):
+        _send_frame(self._sock, cPickle.dumps(bufs, cPickle.HIGHEST_PROTOCOL))
+        data = _recv_frame(self._sock)
+        if data is None:
+            raise EOFError('%s exited' % self.process.name)
+        return cPickle.loads(data)
+
+    def stop(self):
+        self._sock.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class DecodePool(object):
+    """Pool of *size* worker processes decoding UPDATE messages.
+
+    Each batch of messages is decoded by one worker, concurrently with the
+    batches of the other peers, and the greenthread waiting for it lets
+    the other greenthreads run meanwhile.
+    """
+
+    def __init__(self, size):
+        self._workers = []
+        self._idle = hub.Queue()
+        for i in range(size):
+            worker = _Worker('bgp-decoder-%d' % i)
+            self._workers.append(worker)
+            self._idle.put(worker)
+        # Interned path attributes by the bytes they were parsed from.
+        self._pathattrs = weakref.WeakValueDictionary()
+
+    @property
+    def size(self):
+        return len(self._workers)
+
+    def stop(self):
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+    def decode(self, bufs):
+        """Decodes the given raw UPDATE messages.
+
+        Returns the list of the decoded messages, in order, possibly ended
+        by the exception raised by the parsing of a message.
+        """
+        worker = self._idle.get()
+        try:
+            records = worker.call(bufs)
+        except BaseException:
+            # The reply of the worker, if any, would be read as the reply
+            # to the next batch, so the worker is replaced.
+            worker = self._replace(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+
+        msgs = []
+        for record in records:
+            if isinstance(record, DecodeError):
+                msgs.append(record.exception())
+            elif isinstance(record, str):
+                msgs.append(BGPMessage.parser(record)[0])
+            else:
+                withdrawn, attrs, nlri = record
+                msgs.append(DecodedUpdate(
+                    self._get_pathattrs(attrs),
+                    [BGPWithdrawnRoute(l, addr) for l, addr in withdrawn],
+                    [IPAddrPrefix(l, addr) for l, addr in nlri]))
+        return msgs
+
+    def _replace(self, worker):
+        LOG.debug('Replacing decoder %s', worker.process.name)
+        worker.stop()
+        if worker not in self._workers:
+            # the pool was stopped
+            return worker
+        new_worker = _Worker(worker.process.name)
+        self._workers[self._workers.index(worker)] = new_worker
+        return new_worker
+
+    def _get_pathattrs(self, attrs):
+        pathattrs = self._pathattrs.get(attrs)
+        if pathattrs is None:
+            path_attributes = BGPUpdate.parser(
+                struct.pack('!HH', 0, len(attrs)) + attrs)['path_attributes']
+            pathattrs = PathAttrMap(
+                dict((attr.type, attr) for attr in path_attributes)).intern()
+            self._pathattrs[attrs] = pathattrs
+        return pathattrs
@@ -0,0 +1,289 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Path-compressed binary trie (radix tree) of IP prefixes.
+
+A prefix of *length* bits is stored as a single integer, its "key": the
+*length* leading bits of the address preceded by a 1 bit, so that
+10.0.0.0/8 is 0b100001010 and the default route is 1.  The length of a
+key is given back by its bit_length() and a key is a prefix of another
+if it is equal to the leading bits of the other.
+
+Nodes are only created for the stored prefixes and where two branches
+fork, so that a trie of N prefixes has less than 2 * N nodes.
+"""
+
+import array
+import socket
+import struct
+
+
+def ip_to_int(addr):
+    """Converts an IPv4 or IPv6 address string to an integer."""
+    if ':' in addr:
+        hi, lo = struct.unpack('!QQ', socket.inet_pton(socket.AF_INET6, addr))
+        return hi << 64 | lo
+    return struct.unpack('!I', socket.inet_pton(socket.AF_INET, addr))[0]
+
+
+def int_to_ip(addr, width):
+    """Converts an integer to an IPv4 (width 32) or IPv6 address string."""
+    if width == 32:
+        return socket.inet_ntoa(struct.pack('!I', addr))
+    return socket.inet_ntop(socket.AF_INET6,
+                            struct.pack('!QQ', addr >> 64,
+                                        addr & 0xffffffffffffffff))
+
+
+def _is_prefix(key, other):
+    # True if key is a prefix of (or equal to) other
+    shift = other.bit_length() - key.bit_length()
+    return shift >= 0 and other >> shift == key
+
+
+def _common_prefix(key, other):
+    shift = other.bit_length() - key.bit_length()
+    if shift > 0:
+        other >>= shift
+    else:
+        key >>= -shift
+    return key >> (key ^ other).bit_length()
+
+
+def _branch(prefix, key):
+    # 0 or 1, the bit of key following prefix
+    return (key >> (key.bit_length() - prefix.bit_length() - 1)) & 1
+
+
+class PrefixTrie(object):
+    """Mapping of the prefixes of *width* bits long addresses to values.
+
+    Prefixes are given as (address, length) where address is an integer.
+    None can't be stored as a value.  Iteration is in the order of the
+    prefixes: by address, and shorter first for the same address.
+
+    The values are in a dict by key, so that exact matches cost a dict
+    lookup.  The trie is only walked for longest matches, iterations and
+    when a prefix is added or removed.  To keep the trie small, its nodes
+    aren't objects: node i is made of _keys[i] and of _left[i] and
+    _right[i], the indexes of its children or -1.  The key of a fork
+    isn't in the dict of the values.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self._values = {}
+        if array.array('l').itemsize * 8 > width + 1:
+            # the keys of the forks aren't int objects
+            self._keys = array.array('l')
+        else:
+            self._keys = []
+        self._left = array.array('i')
+        self._right = array.array('i')
+        self._free = []
+        self._root = -1
+
+    def _key(self, addr, length):
+        if not 0 <= length <= self.width:
+            raise ValueError('Invalid prefix length %d' % length)
+        return (1 << length) | (addr >> (self.width - length))
+
+    def _to_prefix(self, key):
+        length = key.bit_length() - 1
+        addr = (key ^ (1 << length)) << (self.width - length)
+        return addr, length
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, prefix):
+        return self._key(*prefix) in self._values
+
+    def get(self, addr, length, default=None):
+        return self._values.get(self._key(addr, length), default)
+
+    def _new_node(self, key):
+        if self._free:
+            i = self._free.pop()
+            self._keys[i] = key
+            self._left[i] = self._right[i] = -1
+        else:
+            i = len(self._keys)
+            self._keys.append(key)
+            self._left.append(-1)
+            self._right.append(-1)
+        return i
+
+    def _free_node(self, i):
+        self._free.append(i)
+
+    def _set_child(self, i, key, child):
+        if _branch(self._keys[i], key):
+            self._right[i] = child
+        else:
+            self._left[i] = child
+
+    def _walk(self, key):
+        """Returns the list of the nodes from the root whose keys are
+        prefixes of key (the last one may be key itself), and the next
+        node on the way to key, or -1.
+        """
+        # inlined as this is done for every update of the trie
+        keys = self._keys
+        left = self._left
+        right = self._right
+        key_len = key.bit_length()
+        path = []
+        i = self._root
+        while i >= 0:
+            node_key = keys[i]
+            shift = key_len - node_key.bit_length()
+            if shift < 0 or key >> shift != node_key:
+                break
+            path.append(i)
+            if shift == 0:
+                return path, -1
+            if (key >> (shift - 1)) & 1:
+                i = right[i]
+            else:
+                i = left[i]
+        return path, i
+
+    def insert(self, addr, length, value):
+        """Maps the prefix to value, replacing the former value if any."""
+        assert value is not None
+        key = self._key(addr, length)
+        if key in self._values:
+            self._values[key] = value
+            return
+        self._values[key] = value
+
+        keys = self._keys
+        path, i = self._walk(key)
+        if path and keys[path[-1]] == key:
+            # a fork becomes a prefix
+            return
+        new = self._new_node(key)
+        if i < 0:
+            pass
+        elif _is_prefix(key, keys[i]):
+            # the new prefix covers node i
+            self._set_child(new, keys[i], i)
+        else:
+            # node i and the new prefix fork
+            fork = self._new_node(_common_prefix(key, keys[i]))
+            self._set_child(fork, keys[i], i)
+            self._set_child(fork, key, new)
+            new = fork
+        if not path:
+            self._root = new
+        else:
+            self._set_child(path[-1], key, new)
+
+    def remove(self, addr, length):
+        """Removes the prefix and returns its value, or None if the prefix
+        isn't in the trie.
+        """
+        key = self._key(addr, length)
+        value = self._values.pop(key, None)
+        if value is None:
+            return None
+
+        path, _next = self._walk(key)
+        i = path.pop()
+        parent = path.pop() if path else -1
+        grandparent = path.pop() if path else -1
+        if self._left[i] >= 0 and self._right[i] >= 0:
+            # still needed as a fork
+            return value
+        self._splice(parent, i)
+        if (parent >= 0 and self._keys[parent] not in self._values and
+                (self._left[parent] < 0 or self._right[parent] < 0)):
+            # the fork isn't needed any more
+            self._splice(grandparent, parent)
+        return value
+
+    def _splice(self, parent, i):
+        # replaces node i, which has a child at most, by its child
+        child = max(self._left[i], self._right[i])
+        if parent < 0:
+            self._root = child
+        elif self._left[parent] == i:
+            self._left[parent] = child
+        else:
+            self._right[parent] = child
+        self._free_node(i)
+
+    def longest_match(self, addr, length=None):
+        """Returns (prefix, value) of the longest prefix which covers the
+        given prefix (or address if length is None), or None.
+        """
+        if length is None:
+            length = self.width
+        path, _next = self._walk(self._key(addr, length))
+        for i in reversed(path):
+            key = self._keys[i]
+            value = self._values.get(key)
+            if value is not None:
+                return self._to_prefix(key), value
+        return None
+
+    def matches(self, addr, length=None):
+        """Returns the list of (prefix, value) of all the prefixes which
+        cover the given prefix (or address if length is None), shortest
+        first.
+        """
+        if length is None:
+            length = self.width
+        path, _next = self._walk(self._key(addr, length))
+        matches = []
+        for i in path:
+            key = self._keys[i]
+            value = self._values.get(key)
+            if value is not None:
+                matches.append((self._to_prefix(key), value))
+        return matches
+
+    def iteritems(self, addr=0, length=0):
+        """Iterates over (prefix, value) of the prefixes covered by the
+        given prefix, the given prefix included.  All the prefixes by
+        default.
+        """
+        key = self._key(addr, length)
+        keys = self._keys
+        path, i = self._walk(key)
+        if path and keys[path[-1]] == key:
+            i = path[-1]
+        elif i >= 0 and not _is_prefix(key, keys[i]):
+            return
+        stack = [i]
+        while stack:
+            i = stack.pop()
+            if i < 0:
+                continue
+            value = self._values.get(keys[i])
+            if value is not None:
+                yield self._to_prefix(keys[i]), value
+            stack.append(self._right[i])
+            stack.append(self._left[i])
+
+    def itervalues(self, addr=0, length=0):
+        for _prefix, value in self.iteritems(addr, length):
+            yield value
+
+    def __iter__(self):
+        for prefix, _value in self.iteritems():
+            yield prefix
@@ -48,6 +48,24 @@ TOTAL_MSG_IN = 'total_message_in'
 TOTAL_MSG_OUT = 'total_message_out'
 FMS_EST_TRANS = 'fsm_established_transitions'
 UPTIME = 'uptime'
+SUPPRESSED_UPDATES = 'suppressed_updates'
+
+# BGP processor related stat constants.
+PROCESSOR_BACKLOG = 'backlog'
+PROCESSOR_PRIORITY_BACKLOG = 'priority_backlog'
+PROCESSOR_BATCH_SIZE = 'batch_size'
+PROCESSOR_CYCLES = 'cycles'
+PROCESSOR_LAST_CYCLE_TIME = 'last_cycle_time'
+PROCESSOR_AVG_CYCLE_TIME = 'avg_cycle_time'
+PROCESSOR_MAX_CYCLE_TIME = 'max_cycle_time'
+PROCESSOR_DEST_PROCESSED = 'destinations_processed'
+PROCESSOR_PRIORITY_DEST_PROCESSED = 'priority_destinations_processed'
+PROCESSOR_OLDEST_QUEUE_AGE = 'oldest_queue_age'
+PROCESSOR_PRIORITY_OLDEST_QUEUE_AGE = 'priority_oldest_queue_age'
+PROCESSOR_AVG_QUEUE_AGE = 'avg_queue_age'
+PROCESSOR_PRIORITY_AVG_QUEUE_AGE = 'priority_avg_queue_age'
+PROCESSOR_MAX_QUEUE_AGE = 'max_queue_age'
+PROCESSOR_PRIORITY_MAX_QUEUE_AGE = 'priority_max_queue_age'
 
 
 def log(stats_resource=None, stats_source=None, log_level=DEFAULT_LOG_LEVEL,
@@ -0,0 +1,141 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the best path selection of a full table convergence.
+
+Peers come up one after the other and each of them advertises the same
+prefixes, with AS paths and MEDs varying by peer and prefix.  Every
+destination is processed once per peer, the way BgpProcessor does, and
+the time taken is printed for each peer.  The first peer then goes down
+and the time taken to withdraw its paths is printed, which triggers a
+comparison of all the remaining paths of the destinations it was the best
+path of.
+
+usage: python -m ryu.tests.benchmark.bench_bgp_bestpath \
+    [--peers 10] [--prefixes 800000]
+"""
+
+import argparse
+import time
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.info_base.base import PathAttrMap
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Table
+
+LOCAL_AS = 65000
+
+
+class _Msg(object):
+    def __init__(self, bgp_identifier):
+        self.bgp_identifier = bgp_identifier
+
+
+class _Protocol(object):
+    def __init__(self, router_id):
+        self.recv_open_msg = _Msg(router_id)
+        self.sent_open_msg = _Msg('10.0.0.1')
+
+
+class _Peer(object):
+    def __init__(self, i):
+        self.version_num = 1
+        # one iBGP peer out of three
+        self.remote_as = LOCAL_AS if i % 3 == 0 else 65001 + i
+        self.protocol = _Protocol('10.0.1.%d' % (i + 1))
+
+
+class _PeerManager(object):
+    def __init__(self):
+        self.best_path_changes = 0
+
+    def comm_new_best_to_bgp_peers(self, path):
+        self.best_path_changes += 1
+
+
+class _SignalBus(object):
+    def best_path_changed(self, path, is_withdraw):
+        pass
+
+
+class _CoreService(object):
+    asn = LOCAL_AS
+    router_id = '10.0.0.1'
+
+    def __init__(self):
+        self.peer_manager = _PeerManager()
+        self._signal_bus = _SignalBus()
+
+
+def make_pattrs(peer, variant):
+    as_path = [peer.remote_as] + [64512 + n for n in range(variant % 3)]
+    attrs = {bgp.BGP_ATTR_TYPE_ORIGIN: bgp.BGPPathAttributeOrigin(0),
+             bgp.BGP_ATTR_TYPE_AS_PATH: bgp.BGPPathAttributeAsPath([as_path]),
+             bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC:
+             bgp.BGPPathAttributeMultiExitDisc(variant // 3)}
+    return PathAttrMap(attrs).intern()
+
+
+def converge(table, peer, nlris, pattrs, withdraw=False):
+    dests = []
+    for i, nlri in enumerate(nlris):
+        if withdraw:
+            path = Ipv4Path(peer, nlri, 1, is_withdraw=True)
+        else:
+            path = Ipv4Path(peer, nlri, 1, pattrs=pattrs[i % len(pattrs)],
+                            nexthop='10.0.0.2')
+        dests.append(table.insert(path))
+    for dest in dests:
+        dest.process()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--peers', type=int, default=10)
+    parser.add_argument('--prefixes', type=int, default=800000)
+    args = parser.parse_args()
+
+    core_service = _CoreService()
+    table = Ipv4Table(core_service, core_service._signal_bus)
+    # /24 prefixes, the NLRIs are shared by the paths of all the peers
+    nlris = [bgp.IPAddrPrefix(24, '%d.%d.%d.0' % (
+        1 + (i >> 16), (i >> 8) & 0xff, i & 0xff))
+        for i in range(args.prefixes)]
+    peers = [_Peer(i) for i in range(args.peers)]
+
+    total = 0
+    for i, peer in enumerate(peers):
+        # the variants are rotated so that the best paths move around
+        pattrs = [make_pattrs(peer, (v + i) % 9) for v in range(9)]
+        changes = core_service.peer_manager.best_path_changes
+        start = time.time()
+        converge(table, peer, nlris, pattrs)
+        elapsed = time.time() - start
+        total += elapsed
+        print 'peer %d: %d prefixes in %.3f sec, %d best path changes' % (
+            i + 1, len(nlris), elapsed,
+            core_service.peer_manager.best_path_changes - changes)
+    print 'converged in %.3f sec (%.1f usec per path)' % (
+        total, total * 1000000 / (len(nlris) * len(peers)))
+
+    start = time.time()
+    converge(table, peers[0], nlris, None, withdraw=True)
+    print 'peer 1 down: %d withdrawals in %.3f sec' % (
+        len(nlris), time.time() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the ingest of full tables sent by peers coming up together.
+
+Each peer has a greenthread feeding the UPDATE messages of its full
+table to a BgpProtocol, by chunks of the size read from a socket, and the
+decoded messages are turned into paths inserted into a table.  The time
+taken to ingest all the tables is printed, with the CPU time used by this
+process (the workers excluded) and the longest delay of a greenthread
+waking up every 50 ms, as the keepalive timers do.  With --workers the
+messages are decoded by a DecodePool.
+
+usage: python -m ryu.tests.benchmark.bench_bgp_decode \
+    [--peers 10] [--paths 100000] [--workers 4]
+"""
+
+import argparse
+import time
+
+from ryu.lib import hub
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.info_base.base import PathAttrMap
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Table
+from ryu.services.protocols.bgp.speaker import BgpProtocol
+from ryu.services.protocols.bgp.speaker import RECV_SIZE
+from ryu.services.protocols.bgp.utils.decode_pool import DecodedUpdate
+from ryu.services.protocols.bgp.utils.decode_pool import DecodePool
+from ryu.tests.benchmark.bench_bgp_pathattrs import make_attrs
+from ryu.tests.benchmark.bench_bgp_pathattrs import make_update
+
+
+class Ingest(object):
+    """Stands for the Peer handling the messages of a BgpProtocol."""
+
+    def __init__(self, table):
+        self.table = table
+        self.paths = 0
+
+    def handle_msg(self, msg):
+        if isinstance(msg, DecodedUpdate):
+            pattrs = msg.pathattrs
+        else:
+            pattrs = PathAttrMap(msg.pathattr_map).intern()
+        next_hop = msg.get_path_attr(bgp.BGP_ATTR_TYPE_NEXT_HOP).value
+        for nlri in msg.nlri:
+            self.table.insert(Ipv4Path(None, nlri, 0, pattrs=pattrs,
+                                       nexthop=next_hop))
+        self.paths += len(msg.nlri)
+        # as BgpProtocol does once a message is handled
+        hub.sleep(0)
+
+
+def make_full_table(n_paths, n_attr_sets, per_update):
+    attr_sets = [make_attrs(i) for i in range(n_attr_sets)]
+    updates = []
+    prefix = 0x01000000
+    for u in range(n_paths // per_update):
+        prefixes = range(prefix, prefix + (per_update << 8), 1 << 8)
+        prefix += per_update << 8
+        updates.append(make_update(attr_sets[u % n_attr_sets], prefixes))
+    return ''.join(updates)
+
+
+def feed(data, table, pool, ingests):
+    protocol = BgpProtocol.__new__(BgpProtocol)
+    protocol._recv_buff = ''
+    protocol._decode_pool = pool
+    ingest = Ingest(table)
+    ingests.append(ingest)
+    protocol._handle_msg = ingest.handle_msg
+    for offset in range(0, len(data), RECV_SIZE):
+        protocol._data_received(data[offset:offset + RECV_SIZE])
+        hub.sleep(0)
+
+
+def watch(lags, interval=0.05):
+    while True:
+        start = time.time()
+        hub.sleep(interval)
+        lags.append(time.time() - start - interval)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--peers', type=int, default=10)
+    parser.add_argument('--paths', type=int, default=100000,
+                        help='paths per peer')
+    parser.add_argument('--attr-sets', type=int, default=10000,
+                        help='number of distinct path attribute sets')
+    parser.add_argument('--per-update', type=int, default=4,
+                        help='prefixes per UPDATE message')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='decode worker processes, 0 to decode inline')
+    args = parser.parse_args()
+
+    data = make_full_table(args.paths, args.attr_sets, args.per_update)
+    pool = DecodePool(args.workers) if args.workers else None
+    table = Ipv4Table(None, None)
+    lags = []
+    watcher = hub.spawn(watch, lags)
+
+    start = time.time()
+    start_cpu = time.clock()
+    ingests = []
+    hub.joinall([hub.spawn(feed, data, table, pool, ingests)
+                 for _ in range(args.peers)])
+    paths = sum(ingest.paths for ingest in ingests)
+    elapsed = time.time() - start
+    cpu = time.clock() - start_cpu
+    hub.kill(watcher)
+    if pool:
+        pool.stop()
+
+    print '%d peers, %d paths, %d workers: ingested in %.3f sec' % (
+        args.peers, paths, args.workers, elapsed)
+    print '%.1f usec per path, %.1f usec of CPU time of this process' % (
+        elapsed * 1000000 / paths, cpu * 1000000 / paths)
+    print 'longest timer delay %.3f sec' % max(lags or [0])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the evaluation of the prefix filters of a peer.
+
+A prefix list permitting --filters /16 to /24 prefixes, with ge/le ranges,
+and ending by a deny all is evaluated against --paths /24 paths, by going
+through the filters one by one and by a FilterList.
+
+usage: python -m ryu.tests.benchmark.bench_bgp_filter \
+    [--filters 5000] [--paths 100000]
+"""
+
+import argparse
+import random
+import time
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.info_base.base import FilterList
+from ryu.services.protocols.bgp.info_base.base import PrefixFilter
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+
+
+def make_filters(n_filters, rand):
+    filters = []
+    for _ in range(n_filters):
+        length = rand.choice([16, 20, 24])
+        addr = rand.getrandbits(length) << (32 - length)
+        prefix = '%d.%d.%d.0/%d' % (addr >> 24, (addr >> 16) & 0xff,
+                                    (addr >> 8) & 0xff, length)
+        filters.append(PrefixFilter(prefix, PrefixFilter.POLICY_PERMIT,
+                                    le=rand.choice([None, 24])))
+    filters.append(PrefixFilter('0.0.0.0/0', PrefixFilter.POLICY_DENY))
+    return filters
+
+
+def evaluate(filters, path):
+    # the way the filters were evaluated before FilterList
+    for filter_ in filters:
+        if filter_.ROUTE_FAMILY != path.ROUTE_FAMILY:
+            continue
+        policy, is_matched = filter_.evaluate(path)
+        if policy == PrefixFilter.POLICY_PERMIT and is_matched:
+            return False, None
+        elif policy == PrefixFilter.POLICY_DENY and is_matched:
+            return True, filter_.prefix + ' - DENY'
+    return False, None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filters', type=int, default=5000)
+    parser.add_argument('--paths', type=int, default=100000)
+    parser.add_argument('--one-by-one-paths', type=int, default=200,
+                        help='paths evaluated going through the filters')
+    args = parser.parse_args()
+
+    rand = random.Random(1)
+    filters = make_filters(args.filters, rand)
+    paths = []
+    for _ in range(args.paths):
+        addr = rand.getrandbits(24) << 8
+        nlri = bgp.IPAddrPrefix(24, '%d.%d.%d.0' % (
+            addr >> 24, (addr >> 16) & 0xff, (addr >> 8) & 0xff))
+        # the filters are evaluated the same for withdrawals
+        paths.append(Ipv4Path(None, nlri, 0, is_withdraw=True))
+
+    start = time.time()
+    for path in paths[:args.one_by_one_paths]:
+        evaluate(filters, path)
+    elapsed = time.time() - start
+    print 'one by one: %.1f usec per path' % (
+        elapsed * 1000000 / args.one_by_one_paths)
+
+    start = time.time()
+    filter_list = FilterList(filters)
+    print 'FilterList of %d filters compiled in %.3f sec' % (
+        len(filters), time.time() - start)
+    start = time.time()
+    blocked = 0
+    for path in paths:
+        blocked += filter_list.evaluate(path)[0]
+    elapsed = time.time() - start
+    print 'FilterList: %.1f usec per path, %d paths out of %d blocked' % (
+        elapsed * 1000000 / len(paths), blocked, len(paths))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the replay of an MRT TABLE_DUMP_V2 dump of full tables.
+
+A dump of the IPv4 full tables of --peers peers, --prefixes prefixes each,
+is written and then loaded into the global table twice: path by path, as
+paths learned from UPDATEs are (each path signals its destination, which
+the BGP processor processes by batches), and by mrt.load_tables, which
+processes each destination once all the paths are inserted.  The time
+taken to read the paths of the dump alone is printed too.
+
+usage: python -m ryu.tests.benchmark.bench_bgp_mrt \
+    [--peers 4] [--prefixes 200000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from ryu.lib import mrtlib
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp import mrt
+from ryu.services.protocols.bgp.core_managers.table_manager import \
+    TableCoreManager
+from ryu.services.protocols.bgp.processor import BgpProcessor
+from ryu.services.protocols.bgp.signals.emit import BgpSignalBus
+
+
+class PeerManager(object):
+    """Stands for the peer manager, no peer is sent the best paths."""
+
+    def comm_new_best_to_bgp_peers(self, path):
+        pass
+
+
+class CommonConf(object):
+    label_range = (100, 100000)
+
+
+class CoreService(object):
+    """Stands for the core service of the speaker."""
+
+    asn = 65000
+    router_id = '10.0.0.1'
+
+    def __init__(self):
+        self.signal_bus = self._signal_bus = BgpSignalBus()
+        self.rt_manager = None
+        self.peer_manager = PeerManager()
+        self.table_manager = TableCoreManager(self, CommonConf())
+
+
+def write_dump(f, n_peers, n_prefixes, n_attr_sets):
+    peers = [mrtlib.MrtPeer('10.0.%d.%d' % (p >> 8, p & 0xff),
+                            '10.0.%d.%d' % (p >> 8, p & 0xff), 65001 + p)
+             for p in range(n_peers)]
+    # attribute sets of each peer, made of the attributes of an UPDATE
+    attr_bufs = []
+    for p, peer in enumerate(peers):
+        bufs = []
+        for i in range(n_attr_sets):
+            attrs = [bgp.BGPPathAttributeOrigin(0),
+                     bgp.BGPPathAttributeAsPath(
+                         [[peer.as_num] + [64512 + (i + j) % 1000
+                                           for j in range(i % 4 + 1)]]),
+                     bgp.BGPPathAttributeNextHop(peer.ip_addr),
+                     bgp.BGPPathAttributeMultiExitDisc(i % 100)]
+            bufs.append(mrtlib.RibEntry(p, 0, attrs).attr_buf)
+        attr_bufs.append(bufs)
+
+    writer = mrtlib.Writer(f)
+    writer.write(mrtlib.PeerIndexTable('10.0.0.1', '', peers))
+    for i in range(n_prefixes):
+        addr = 0x01000000 + (i << 8)
+        nlri = bgp.IPAddrPrefix(24, '%d.%d.%d.0' % (
+            addr >> 24, (addr >> 16) & 0xff, (addr >> 8) & 0xff))
+        entries = [mrtlib.RibEntry(p, 0, attr_buf=attr_bufs[p][
+            (i + p) % n_attr_sets]) for p in range(n_peers)]
+        writer.write(mrtlib.RibRecord(i, nlri, entries))
+
+
+def load_path_by_path(core_service, f, per_cycle):
+    processor = BgpProcessor(core_service, per_cycle)
+    core_service.signal_bus.register_listener(
+        BgpSignalBus.BGP_DEST_CHANGED,
+        lambda _, dest: processor.enqueue(dest))
+    table_manager = core_service.table_manager
+    for i, path in enumerate(mrt.iter_paths(f)):
+        table_manager.learn_path(path)
+        # the processor runs a cycle once in a while
+        if i % per_cycle == 0:
+            processor._process_dest()
+    while not processor._dest_queue.is_empty():
+        processor._process_dest()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--peers', type=int, default=4)
+    parser.add_argument('--prefixes', type=int, default=200000,
+                        help='prefixes per peer')
+    parser.add_argument('--attr-sets', type=int, default=10000,
+                        help='number of distinct path attribute sets per peer')
+    parser.add_argument('--per-cycle', type=int, default=100,
+                        help='destinations processed per processor cycle')
+    args = parser.parse_args()
+
+    fd, filename = tempfile.mkstemp(suffix='.mrt')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write_dump(f, args.peers, args.prefixes, args.attr_sets)
+        paths = args.peers * args.prefixes
+        print 'dump of %d paths: %.1f MB' % (
+            paths, os.path.getsize(filename) / 1000000.0)
+
+        with open(filename, 'rb') as f:
+            start = time.time()
+            for _path in mrt.iter_paths(f):
+                pass
+        elapsed = time.time() - start
+        print 'read: %.3f sec, %.1f usec per path' % (
+            elapsed, elapsed * 1000000 / paths)
+
+        with open(filename, 'rb') as f:
+            start = time.time()
+            load_path_by_path(CoreService(), f, args.per_cycle)
+        elapsed = time.time() - start
+        print 'path by path: %.3f sec, %.1f usec per path' % (
+            elapsed, elapsed * 1000000 / paths)
+
+        with open(filename, 'rb') as f:
+            start = time.time()
+            dests = mrt.load_tables(CoreService(), f)
+        elapsed = time.time() - start
+        print 'bulk load: %.3f sec, %.1f usec per path, %d destinations' % (
+            elapsed, elapsed * 1000000 / paths, dests)
+    finally:
+        os.remove(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the memory used by the paths of a full table load.
+
+Synthetic UPDATE messages, each carrying a few prefixes and one of a
+limited number of path attribute sets, are parsed and turned into paths
+the way Peer does.  The RSS of the process is printed once all the paths
+are held.  With --no-intern every path gets its own copy of the path
+attributes of its UPDATE, as before the attributes were interned.
+
+usage: python -m ryu.tests.benchmark.bench_bgp_pathattrs [--paths 1000000]
+"""
+
+import argparse
+import struct
+import time
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.info_base.base import PathAttrMap
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+
+
+def rss():
+    """Returns the resident set size of the process in kB."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+
+def make_attrs(i):
+    as_path = [65001, 64512 + i % 1000, 1 + i // 1000]
+    attrs = [bgp.BGPPathAttributeOrigin(0),
+             bgp.BGPPathAttributeAsPath([as_path]),
+             bgp.BGPPathAttributeNextHop('10.0.0.1'),
+             bgp.BGPPathAttributeMultiExitDisc(i % 10),
+             bgp.BGPPathAttributeCommunities(
+                 communities=[0xfde80000 + i % 100])]
+    return ''.join(str(a.serialize()) for a in attrs)
+
+
+def make_update(attrs, prefixes):
+    nlri = ''.join(struct.pack('!BI', 24, p)[:4] for p in prefixes)
+    body = struct.pack('!HH', 0, len(attrs)) + attrs + nlri
+    header = struct.pack('!HB', 19 + len(body), bgp.BGP_MSG_UPDATE)
+    return '\xff' * 16 + header + body
+
+
+def load(n_paths, n_attr_sets, per_update, intern):
+    attr_sets = [make_attrs(i) for i in range(n_attr_sets)]
+    table = {}
+    prefix = 0x01000000
+    for u in range(n_paths // per_update):
+        # /24 prefixes
+        prefixes = range(prefix, prefix + (per_update << 8), 1 << 8)
+        prefix += per_update << 8
+        buf = make_update(attr_sets[u % n_attr_sets], prefixes)
+        update, _rest = bgp.BGPMessage.parser(buf)
+        pattrs = update.pathattr_map
+        if intern:
+            pattrs = PathAttrMap(pattrs).intern()
+        next_hop = update.get_path_attr(bgp.BGP_ATTR_TYPE_NEXT_HOP).value
+        for nlri in update.nlri:
+            path = Ipv4Path(None, nlri, 0, pattrs=pattrs, nexthop=next_hop)
+            table[path.nlri.formatted_nlri_str] = path
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--paths', type=int, default=1000000)
+    parser.add_argument('--attr-sets', type=int, default=100000,
+                        help='number of distinct path attribute sets')
+    parser.add_argument('--per-update', type=int, default=4,
+                        help='prefixes per UPDATE message')
+    parser.add_argument('--no-intern', action='store_true')
+    args = parser.parse_args()
+
+    before = rss()
+    start = time.time()
+    table = load(args.paths, args.attr_sets, args.per_update,
+                 not args.no_intern)
+    elapsed = time.time() - start
+    print '%d paths, %d attribute sets: loaded in %.3f sec' % (
+        len(table), args.attr_sets, elapsed)
+    print 'RSS: %d kB (%d kB for the paths)' % (rss(), rss() - before)
+    if not args.no_intern:
+        print 'intern stats: %s' % PathAttrMap.intern_stats()
+
+
+if __name__ == '__main__':
+    main()
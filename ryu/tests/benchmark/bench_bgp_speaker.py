@@ -0,0 +1,527 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of a BGPSpeaker loaded by synthetic peers on loopback.
+
+The BGPSpeaker runs in a child process, with --peers passive neighbors.
+Each synthetic peer connects to it from its own 127.1.x.y address,
+announces a table of --prefixes /24 prefixes, disjoint from the tables
+of the other peers, and keeps the routes the speaker sends it.  The
+attributes of a table are drawn from --attr-sets sets (AS_PATH lengths
+and prepends, ORIGIN, MED, communities), randomly with --seed.
+
+The load goes through phases:
+
+  announce     all the tables are announced
+  flap         --flap-fraction of each table is withdrawn and announced
+               again, --flap-rounds times in a row
+  refresh      each peer sends a ROUTE-REFRESH
+  reset_down   --reset-fraction of the peers close their session
+  reset_up     the peers reset connect again and announce their tables
+  withdraw     all the tables are withdrawn
+
+A phase converged once the routes of every peer are the ones of the
+other peers with their last attributes (every route sent again, for
+refresh), and the speaker sent nothing for --quiet seconds.  Reported
+for each phase are the time to converge, the UPDATEs sent to the speaker
+(in) and received from it (out) and their rates over that time, the lag
+of the Adj-RIB-out of each peer (from the end of the UPDATEs sent to the
+speaker to the last UPDATE the peer received), and the memory and CPU
+time of the speaker.  With --output the results are written as JSON.
+
+usage: python -m ryu.tests.benchmark.bench_bgp_speaker \
+    [--peers 10] [--prefixes 10000] [--output results.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+from ryu.lib import hub
+from ryu.lib.packet import bgp
+
+SPEAKER_AS = 64512
+SPEAKER_ID = '10.0.0.1'
+PEER_AS = 65001
+HOLD_TIME = 90
+
+# The communities of the routes carry a tag, the version of the table
+# they were announced with.
+_TAG_AS = 64999
+
+_NLRI_PER_UPDATE = 500
+_WITHDRAWN_PER_UPDATE = 900
+
+_CLK_TCK = os.sysconf('SC_CLK_TCK')
+
+
+def _peer_address(index):
+    return '127.1.%d.%d' % ((index + 1) >> 8, (index + 1) & 0xff)
+
+
+def run_speaker(args):
+    # monkey patched before the speaker and its sockets are set up
+    hub.patch()
+    logging.basicConfig(level=logging.WARNING)
+    from ryu.services.protocols.bgp.bgpspeaker import BGPSpeaker
+    from ryu.services.protocols.bgp.rtconf.neighbors import \
+        CONNECT_MODE_PASSIVE
+
+    speaker = BGPSpeaker(SPEAKER_AS, SPEAKER_ID, bgp_server_port=args.port,
+                         decode_workers=args.decode_workers)
+    for i in range(args.peers):
+        speaker.neighbor_add(
+            _peer_address(i), PEER_AS + i,
+            connect_mode=CONNECT_MODE_PASSIVE,
+            advertisement_interval=args.advertisement_interval)
+    print 'ready'
+    sys.stdout.flush()
+    while True:
+        hub.sleep(3600)
+
+
+def _proc_usage(pid):
+    # memory (kB) and CPU time (sec) of the process pid
+    usage = {}
+    with open('/proc/%d/status' % pid) as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            if key in ('VmRSS', 'VmHWM'):
+                usage[key.lower() + '_kb'] = int(value.split()[0])
+    with open('/proc/%d/stat' % pid) as f:
+        # the fields after the command name, which may contain spaces
+        fields = f.read().rsplit(')', 1)[1].split()
+    usage['cpu_sec'] = (int(fields[11]) + int(fields[12])) / float(_CLK_TCK)
+    return usage
+
+
+class AttrSet(object):
+    """Path attributes of a part of the table of a peer."""
+
+    _ORIGINS = [bgp.BGP_ATTR_ORIGIN_IGP] * 7 + \
+        [bgp.BGP_ATTR_ORIGIN_INCOMPLETE] * 2 + [bgp.BGP_ATTR_ORIGIN_EGP]
+    # AS_PATH lengths, after the AS of the peer, as seen in full tables
+    _LENGTHS = [1] * 2 + [2] * 8 + [3] * 10 + [4] * 6 + [5] * 3 + [6, 7, 9]
+
+    def __init__(self, rnd, peer_as, next_hop):
+        as_path = [peer_as]
+        for _ in range(rnd.choice(self._LENGTHS)):
+            as_path.append(rnd.randint(1, 64000))
+        if rnd.random() < 0.1:
+            # prepended by the origin
+            as_path.extend([as_path[-1]] * rnd.randint(1, 3))
+        self.attrs = [bgp.BGPPathAttributeOrigin(rnd.choice(self._ORIGINS)),
+                      bgp.BGPPathAttributeAsPath([as_path]),
+                      bgp.BGPPathAttributeNextHop(next_hop)]
+        if rnd.random() < 0.5:
+            self.attrs.append(
+                bgp.BGPPathAttributeMultiExitDisc(rnd.randint(0, 1000)))
+        self.communities = [(peer_as << 16) | rnd.randint(1, 1000)
+                            for _ in range(rnd.randint(0, 3))]
+
+    def update(self, nlri, version):
+        communities = self.communities + [(_TAG_AS << 16) | version]
+        return bgp.BGPUpdate(
+            path_attributes=self.attrs + [
+                bgp.BGPPathAttributeCommunities(communities)],
+            nlri=nlri)
+
+
+class SyntheticPeer(object):
+    """A BGP peer of the speaker, announcing its table and keeping the
+    routes received.
+    """
+
+    def __init__(self, index, n_prefixes, n_attr_sets, seed):
+        self.address = _peer_address(index)
+        self.asn = PEER_AS + index
+        rnd = random.Random(seed * 100003 + index)
+        attr_sets = [AttrSet(rnd, self.asn, self.address)
+                     for _ in range(n_attr_sets)]
+        self.prefixes = []
+        self.attr_set = {}
+        for i in range(n_prefixes):
+            addr = 0x01000000 + ((index * n_prefixes + i) << 8)
+            prefix = '%d.%d.%d.0/24' % (
+                addr >> 24, (addr >> 16) & 0xff, (addr >> 8) & 0xff)
+            self.prefixes.append(prefix)
+            self.attr_set[prefix] = rnd.choice(attr_sets)
+        self.rnd = rnd
+        # announced prefixes and the version they were announced with
+        self.table = {}
+        # received routes and their version
+        self.rib = {}
+        # prefixes received while refreshing
+        self.refreshed = None
+        self.sock = None
+        self._send_lock = hub.Semaphore()
+        self.established = hub.Event()
+        self.closed = False
+        # closed by the benchmark, not by the speaker
+        self.down = False
+        self.updates_in = 0
+        self.updates_out = 0
+        self.last_recv = 0
+
+    def connect(self, port, timeout=30):
+        # the speaker may turn the connection down until it sees the
+        # previous session closed, connect again until established
+        deadline = time.time() + timeout
+        while True:
+            self.rib = {}
+            self.established.clear()
+            self.closed = self.down = False
+            try:
+                self.sock = hub.connect(('127.0.0.1', port),
+                                        bind=(self.address, 0))
+            except socket.error:
+                self.closed = True
+            else:
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY,
+                                     1)
+                hub.spawn(self._recv_loop, self.sock)
+                self._send(self._open_msg())
+            while not (self.established.is_set() or self.closed or
+                       time.time() > deadline):
+                self.established.wait(0.1)
+            if self.established.is_set():
+                return
+            if time.time() > deadline:
+                raise RuntimeError('%s: session not established' %
+                                   self.address)
+            hub.sleep(0.5)
+
+    def _open_msg(self):
+        caps = [bgp.BGPOptParamCapabilityMultiprotocol(
+            afi=bgp.RF_IPv4_UC.afi, safi=bgp.RF_IPv4_UC.safi),
+            bgp.BGPOptParamCapabilityRouteRefresh()]
+        return bgp.BGPOpen(my_as=self.asn, bgp_identifier=self.address,
+                           hold_time=HOLD_TIME, opt_param=caps)
+
+    def close(self):
+        self._send(bgp.BGPNotification(
+            bgp.BGP_ERROR_CEASE, bgp.BGP_ERROR_SUB_ADMINISTRATIVE_RESET))
+        self.sock.close()
+        self.closed = self.down = True
+        self.table = {}
+
+    def _send(self, msg):
+        with self._send_lock:
+            self.sock.sendall(str(msg.serialize()))
+
+    def announce(self, prefixes, version):
+        by_attr_set = {}
+        for prefix in prefixes:
+            by_attr_set.setdefault(self.attr_set[prefix], []).append(prefix)
+            self.table[prefix] = version
+        bufs = []
+        for attr_set, prefixes in by_attr_set.items():
+            for i in range(0, len(prefixes), _NLRI_PER_UPDATE):
+                nlri = [bgp.IPAddrPrefix(24, prefix.split('/')[0])
+                        for prefix in prefixes[i:i + _NLRI_PER_UPDATE]]
+                bufs.append(str(attr_set.update(nlri, version).serialize()))
+        self._send_updates(bufs)
+
+    def withdraw(self, prefixes):
+        bufs = []
+        for i in range(0, len(prefixes), _WITHDRAWN_PER_UPDATE):
+            routes = []
+            for prefix in prefixes[i:i + _WITHDRAWN_PER_UPDATE]:
+                routes.append(bgp.IPAddrPrefix(24, prefix.split('/')[0]))
+                del self.table[prefix]
+            bufs.append(str(bgp.BGPUpdate(
+                withdrawn_routes=routes).serialize()))
+        self._send_updates(bufs)
+
+    def _send_updates(self, bufs):
+        for buf in bufs:
+            with self._send_lock:
+                self.sock.sendall(buf)
+        self.updates_in += len(bufs)
+
+    def route_refresh(self):
+        self.refreshed = set()
+        self._send(bgp.BGPRouteRefresh(bgp.RF_IPv4_UC.afi,
+                                       bgp.RF_IPv4_UC.safi))
+
+    def _recv_loop(self, sock):
+        buf = ''
+        while True:
+            try:
+                data = sock.recv(65536)
+            except socket.error:
+                data = ''
+            if not data:
+                break
+            buf += data
+            while len(buf) >= bgp.BGPMessage._HDR_LEN:
+                msg_len, = struct.unpack_from('!H', buf, 16)
+                if len(buf) < msg_len:
+                    break
+                self._handle_msg(buf[:msg_len])
+                buf = buf[msg_len:]
+        if sock is self.sock:
+            self.closed = True
+
+    def _keepalive_loop(self, sock, interval):
+        while True:
+            hub.sleep(interval)
+            if sock is not self.sock or self.closed:
+                break
+            try:
+                self._send(bgp.BGPKeepAlive())
+            except socket.error:
+                break
+
+    def _handle_msg(self, buf):
+        msg_type = ord(buf[18])
+        if msg_type == bgp.BGP_MSG_OPEN:
+            open_msg, _ = bgp.BGPMessage.parser(buf)
+            hold_time = min(HOLD_TIME, open_msg.hold_time)
+            self._send(bgp.BGPKeepAlive())
+            if hold_time:
+                hub.spawn(self._keepalive_loop, self.sock, hold_time / 3.0)
+            return
+        if msg_type == bgp.BGP_MSG_KEEPALIVE:
+            self.established.set()
+            return
+        if msg_type == bgp.BGP_MSG_NOTIFICATION:
+            self.sock.close()
+            return
+        if msg_type != bgp.BGP_MSG_UPDATE:
+            return
+        self.updates_out += 1
+        self.last_recv = time.time()
+        update, _ = bgp.BGPMessage.parser(buf)
+        rib = self.rib
+        for nlri in update.withdrawn_routes:
+            rib.pop(nlri.prefix, None)
+        if not update.nlri:
+            return
+        version = None
+        for attr in update.path_attributes:
+            if isinstance(attr, bgp.BGPPathAttributeCommunities):
+                for community in attr.communities:
+                    if community >> 16 == _TAG_AS:
+                        version = community & 0xffff
+        for nlri in update.nlri:
+            rib[nlri.prefix] = version
+        if self.refreshed is not None:
+            self.refreshed.update(nlri.prefix for nlri in update.nlri)
+
+
+class Bench(object):
+    def __init__(self, args, speaker_pid):
+        self.args = args
+        self.speaker_pid = speaker_pid
+        self.peers = [SyntheticPeer(i, args.prefixes, args.attr_sets,
+                                    args.seed)
+                      for i in range(args.peers)]
+        self.version = 0
+        self.phases = []
+
+    def _next_version(self):
+        self.version = (self.version + 1) & 0xffff
+        return self.version
+
+    def _converged(self):
+        total = sum(len(peer.table) for peer in self.peers)
+        for peer in self.peers:
+            if peer.down:
+                continue
+            if peer.closed:
+                return False
+            if len(peer.rib) != total - len(peer.table):
+                return False
+            for other in self.peers:
+                if other is peer:
+                    continue
+                for prefix, version in other.table.iteritems():
+                    if peer.rib.get(prefix) != version:
+                        return False
+            if (peer.refreshed is not None and
+                    len(peer.refreshed) != len(peer.rib)):
+                return False
+        return True
+
+    def _run_phase(self, name, peers, func):
+        args = self.args
+        counts = [(peer.updates_in, peer.updates_out) for peer in self.peers]
+        cpu_sec = _proc_usage(self.speaker_pid)['cpu_sec']
+        start = time.time()
+        hub.joinall([hub.spawn(func, peer) for peer in peers])
+        sent = time.time()
+        deadline = start + args.timeout
+        converged = False
+        while time.time() < deadline:
+            hub.sleep(args.quiet / 4)
+            last_recv = max(peer.last_recv for peer in self.peers)
+            if time.time() - max(last_recv, sent) < args.quiet:
+                continue
+            converged = self._converged()
+            if converged:
+                break
+        end = max([sent] + [peer.last_recv for peer in self.peers])
+        elapsed = end - start
+
+        updates_in = updates_out = 0
+        lags = {}
+        for peer, (updates_in_0, updates_out_0) in zip(self.peers, counts):
+            updates_in += peer.updates_in - updates_in_0
+            updates_out += peer.updates_out - updates_out_0
+            if peer.updates_out > updates_out_0:
+                lags[peer.address] = max(0, peer.last_recv - sent)
+            peer.refreshed = None
+        lag_values = sorted(lags.values()) or [0]
+        result = {
+            'name': name,
+            'converged': converged,
+            'convergence_sec': elapsed,
+            'send_sec': sent - start,
+            'updates_in': updates_in,
+            'updates_out': updates_out,
+            'updates_in_per_sec': updates_in / elapsed if elapsed else 0,
+            'updates_out_per_sec': updates_out / elapsed if elapsed else 0,
+            'adj_rib_out_lag_sec': {
+                'min': lag_values[0],
+                'median': lag_values[len(lag_values) // 2],
+                'max': lag_values[-1],
+                'per_peer': lags,
+            },
+            'sessions_lost': len([peer for peer in self.peers
+                                  if peer.closed and not peer.down]),
+            'speaker': _proc_usage(self.speaker_pid),
+        }
+        result['speaker']['phase_cpu_sec'] = \
+            result['speaker']['cpu_sec'] - cpu_sec
+        self.phases.append(result)
+        print ('%-10s %s in %.3f sec, UPDATEs in %d (%.0f/sec) out %d '
+               '(%.0f/sec), lag max %.3f sec, speaker CPU %.2f sec '
+               'RSS %d kB' % (
+                   name, 'converged' if converged else 'NOT converged',
+                   elapsed, updates_in, result['updates_in_per_sec'],
+                   updates_out, result['updates_out_per_sec'],
+                   lag_values[-1], result['speaker']['phase_cpu_sec'],
+                   result['speaker'].get('vmrss_kb', 0)))
+        return result
+
+    def run(self):
+        args = self.args
+        peers = self.peers
+        self._run_phase('establish', peers,
+                        lambda peer: peer.connect(args.port))
+
+        version = self._next_version()
+        self._run_phase('announce', peers,
+                        lambda peer: peer.announce(peer.prefixes, version))
+
+        flapping = dict((peer, peer.rnd.sample(
+            peer.prefixes, int(len(peer.prefixes) * args.flap_fraction)))
+            for peer in peers)
+
+        flap_version = self._next_version()
+
+        def flap(peer):
+            for _ in range(args.flap_rounds):
+                peer.withdraw(flapping[peer])
+                peer.announce(flapping[peer], flap_version)
+        self._run_phase('flap', peers, flap)
+
+        self._run_phase('refresh', peers,
+                        lambda peer: peer.route_refresh())
+
+        reset = peers[:max(1, int(len(peers) * args.reset_fraction))]
+        self._run_phase('reset_down', reset, lambda peer: peer.close())
+
+        reset_version = self._next_version()
+
+        def reconnect(peer):
+            peer.connect(args.port)
+            peer.announce(peer.prefixes, reset_version)
+        self._run_phase('reset_up', reset, reconnect)
+
+        self._run_phase('withdraw', peers,
+                        lambda peer: peer.withdraw(list(peer.table)))
+        return self.phases
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--peers', type=int, default=10)
+    parser.add_argument('--prefixes', type=int, default=10000,
+                        help='prefixes per peer')
+    parser.add_argument('--attr-sets', type=int, default=1000,
+                        help='number of distinct path attribute sets per peer')
+    parser.add_argument('--flap-fraction', type=float, default=0.1,
+                        help='fraction of the prefixes of a peer flapping')
+    parser.add_argument('--flap-rounds', type=int, default=5)
+    parser.add_argument('--reset-fraction', type=float, default=0.2,
+                        help='fraction of the peers resetting their session')
+    parser.add_argument('--quiet', type=float, default=1.0,
+                        help='seconds without UPDATE before a phase is '
+                        'considered converged')
+    parser.add_argument('--timeout', type=float, default=600.0,
+                        help='seconds before a phase is given up')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=17179,
+                        help='port the speaker listens on')
+    parser.add_argument('--decode-workers', type=int, default=0,
+                        help='decode workers of the speaker')
+    parser.add_argument('--advertisement-interval', type=int, default=0,
+                        help='advertisement interval of the neighbors of '
+                        'the speaker, --quiet has to be longer')
+    parser.add_argument('--output', help='file the results are written to, '
+                        'as JSON')
+    parser.add_argument('--speaker', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.speaker:
+        run_speaker(args)
+        return
+
+    speaker = subprocess.Popen(
+        [sys.executable, '-m', 'ryu.tests.benchmark.bench_bgp_speaker',
+         '--speaker', '--peers', str(args.peers), '--port', str(args.port),
+         '--decode-workers', str(args.decode_workers),
+         '--advertisement-interval', str(args.advertisement_interval)],
+        stdout=subprocess.PIPE)
+    try:
+        if speaker.stdout.readline().strip() != 'ready':
+            raise RuntimeError('the speaker failed to start')
+        phases = Bench(args, speaker.pid).run()
+    finally:
+        speaker.terminate()
+        speaker.wait()
+
+    if args.output:
+        params = dict((k, v) for k, v in vars(args).items()
+                      if k not in ('output', 'speaker'))
+        with open(args.output, 'w') as f:
+            json.dump({'benchmark': 'bgp_speaker', 'params': params,
+                       'time': time.time(), 'phases': phases}, f,
+                      indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the link liveness check of ryu.topology.switches.
+
+A synthetic fabric of switches connected in a ring with chords is fed
+to Switches, then the sweeps of link_loop are timed when no link timed
+out, and when a part of the links went down.  The sweep over all the
+links done before the expiry index was introduced is timed too for
+comparison.
+
+usage: python -m ryu.tests.benchmark.bench_switches [--switches 5000]
+"""
+
+import argparse
+import collections
+import time
+
+from ryu.lib import hub
+from ryu.ofproto import ofproto_v1_3
+from ryu.topology import switches
+
+
+_OFPPort = collections.namedtuple(
+    '_OFPPort', ('port_no', 'hw_addr', 'name', 'config', 'state'))
+
+
+def _port(dpid, port_no):
+    ofpport = _OFPPort(port_no, '00:00:00:00:00:01', 'port%d' % port_no,
+                       0, 0)
+    return switches.Port(dpid, ofproto_v1_3, ofpport)
+
+
+def build_fabric(app, n_switches, chord):
+    # switch i is connected to i + 1 by port 1 and to i + chord by port 2
+    links = []
+    for i in range(n_switches):
+        for port_no, j in ((1, i + 1), (2, i + chord)):
+            j %= n_switches
+            src = _port(i, port_no)
+            dst = _port(j, port_no + 2)
+            links.append((src, dst))
+            links.append((dst, src))
+    for src, dst in links:
+        app.ports.add_port(src, '')
+        app.ports.add_port(dst, '')
+    for src, dst in links:
+        app.links.update_link(src, dst)
+    return links
+
+
+def scan_links(app, now):
+    # link_loop before the expiry index: every link is looked at
+    deleted = []
+    for (link, timestamp) in app.links.items():
+        if timestamp + app.LINK_TIMEOUT < now:
+            src = link.src
+            if src in app.ports:
+                port_data = app.ports.get_port(src)
+                if port_data.lldp_dropped() > app.LINK_LLDP_DROP:
+                    deleted.append(link)
+    return deleted
+
+
+def _time(func, *args):
+    start = time.time()
+    result = func(*args)
+    return time.time() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--switches', type=int, default=5000)
+    parser.add_argument('--chord', type=int, default=7)
+    parser.add_argument('--down', type=float, default=0.01,
+                        help='fraction of the links going down')
+    args = parser.parse_args()
+
+    app = switches.Switches()
+    app.lldp_event = hub.Event()
+    start = time.time()
+
+    elapsed, links = _time(build_fabric, app, args.switches, args.chord)
+    print '%d switches, %d links: built in %.3f sec' % (
+        args.switches, len(app.links), elapsed)
+
+    # every link was seen recently
+    now = start + 1
+    print 'idle sweep: %.6f sec (full scan %.6f sec)' % (
+        _time(app.check_links, now)[0], _time(scan_links, app, now)[0])
+
+    # a part of the links stop receiving LLDP packets, the others are
+    # refreshed before the timeout
+    n_down = int(len(links) * args.down)
+    down = links[:n_down]
+    for src, dst in down:
+        for i in range(app.LINK_LLDP_DROP + 1):
+            app.ports.lldp_sent(src, 1)
+    now = start + app.LINK_TIMEOUT - 1
+    for src, dst in links[n_down:]:
+        app.links.rev_link_set_timestamp(switches.Link(src, dst), now)
+
+    now = start + app.LINK_TIMEOUT + 1
+    scan_time, scanned = _time(scan_links, app, now)
+    elapsed, deleted = _time(app.check_links, now)
+    print '%d links down: sweep %.6f sec (full scan %.6f sec)' % (
+        len(deleted), elapsed, scan_time)
+    assert len(deleted) == len(scanned)
+
+
+if __name__ == '__main__':
+    main()
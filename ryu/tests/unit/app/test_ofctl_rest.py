@@ -0,0 +1,142 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu import exception
+from ryu.app import ofctl_rest
+from ryu.lib import hub
+from ryu.lib import ofctl_v1_3
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+
+
+class Test_ofctl_rest(unittest.TestCase):
+
+    def _datapath(self, dpid):
+        dp = mock.Mock()
+        dp.id = dpid
+        dp.ofproto = ofproto_v1_3
+        dp.ofproto_parser = ofproto_v1_3_parser
+        dp.set_xid.side_effect = lambda msg: setattr(msg, 'xid', 1)
+        return dp
+
+    def _controller(self, dps, ttl=0, timeout=0.5):
+        dpset = mock.Mock()
+        dpset.dps = dict((dp.id, dp) for dp in dps)
+        dpset.get = dpset.dps.get
+        data = {'dpset': dpset,
+                'waiters': {},
+                'cache': ofctl_rest.StatsCache(ttl),
+                'timeout': timeout}
+        return ofctl_rest.StatsController(None, None, data)
+
+    def test_stats_cache(self):
+        cache = ofctl_rest.StatsCache(10)
+        cache.set((1, 'port', None), [1])
+        eq_([1], cache.get((1, 'port', None)))
+        eq_(None, cache.get((2, 'port', None)))
+
+        cache = ofctl_rest.StatsCache(0)
+        cache.set((1, 'port', None), [1])
+        eq_(None, cache.get((1, 'port', None)))
+
+    def test_multi_stats_partial(self):
+        dps = [self._datapath(1), self._datapath(2), self._datapath(3)]
+
+        def _get_port_stats(dp, waiters, timeout):
+            if dp.id == 2:
+                raise exception.OFPStatsTimeout(dpid=dp.id, timeout=timeout)
+            if dp.id == 3:
+                raise ValueError('broken')
+            return {str(dp.id): ['ok']}
+
+        controller = self._controller(dps, timeout=0.1)
+        req = mock.Mock()
+        req.body = ''
+        with mock.patch('ryu.lib.ofctl_v1_3.get_port_stats',
+                        side_effect=_get_port_stats):
+            res = controller.get_all_stats(req, 'port')
+
+        body = json.loads(res.body)
+        eq_({'1': ['ok']}, body['stats'])
+        eq_('timeout', body['errors']['2'])
+        eq_('broken', body['errors']['3'])
+
+    def test_multi_stats_timeout(self):
+        # the switch 1 replies, the switch 2 does not
+        dps = [self._datapath(1), self._datapath(2)]
+        controller = self._controller(dps, ttl=10, timeout=0.1)
+        waiters = controller.waiters
+
+        def _reply(req):
+            lock, msgs = waiters[1].pop(req.xid)
+            msgs.append(mock.Mock(body=mock.Mock(
+                mfr_desc='mfr', hw_desc='hw', sw_desc='sw',
+                serial_num='1', dp_desc='dp')))
+            lock.set()
+        dps[0].send_msg.side_effect = lambda req: hub.spawn(_reply, req)
+        req = mock.Mock()
+        req.body = ''
+        res = controller.get_all_stats(req, 'desc')
+
+        body = json.loads(res.body)
+        eq_(['1'], body['stats'].keys())
+        eq_('mfr', body['stats']['1']['mfr_desc'])
+        eq_({'2': 'timeout'}, body['errors'])
+        # the request of the switch 2 isn't waited for anymore, nor cached
+        eq_({}, waiters[2])
+        eq_(None, controller.cache.get((2, 'desc', None)))
+        ok_(controller.cache.get((1, 'desc', None)))
+
+    def test_stats_request_timeout(self):
+        dp = self._datapath(1)
+        waiters = {}
+        assert_raises(exception.OFPStatsTimeout, ofctl_v1_3.get_desc_stats,
+                      dp, waiters, timeout=0.01)
+        eq_({}, waiters[1])
+        # nor is a request which failed to be sent waited for
+        dp.send_msg.side_effect = IOError
+        assert_raises(IOError, ofctl_v1_3.get_desc_stats, dp, waiters,
+                      timeout=0.01)
+        eq_({}, waiters[1])
+
+    def test_multi_stats_cache(self):
+        dps = [self._datapath(1), self._datapath(2)]
+        controller = self._controller(dps, ttl=10)
+        req = mock.Mock()
+        req.body = ''
+        stats = {'1': ['a'], '2': ['b']}
+        with mock.patch('ryu.lib.ofctl_v1_3.get_port_stats',
+                        side_effect=lambda dp, w, timeout: stats) as m:
+            controller.get_multi_stats(req, 'port', '1,2')
+            res = controller.get_multi_stats(req, 'port', '1,2')
+            eq_(2, m.call_count)
+
+        body = json.loads(res.body)
+        eq_(stats, body['stats'])
+        eq_({}, body['errors'])
+
+    def test_multi_stats_unknown(self):
+        controller = self._controller([self._datapath(1)])
+        req = mock.Mock()
+        req.body = ''
+        eq_(404, controller.get_multi_stats(req, 'port', '1,2').status_int)
+        eq_(404, controller.get_multi_stats(req, 'foo', '1').status_int)
+        eq_(400, controller.get_multi_stats(req, 'port', 'x').status_int)
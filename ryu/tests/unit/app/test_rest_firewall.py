@@ -0,0 +1,293 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu.app import rest_firewall
+from ryu.exception import OFPBarrierTimeout
+from ryu.exception import OFPStatsTimeout
+from ryu.ofproto import ofproto_protocol
+from ryu.ofproto import ofproto_v1_0
+from ryu.ofproto import ofproto_v1_3
+
+
+class _Datapath(ofproto_protocol.ProtocolDesc):
+    def __init__(self, version):
+        super(_Datapath, self).__init__(version)
+        self.id = 1
+        self.xid = 0
+        self.sent = []
+
+    def set_xid(self, msg):
+        self.xid += 1
+        msg.set_xid(self.xid)
+        return self.xid
+
+    def send_msgs(self, msgs):
+        self.sent.append(msgs)
+
+
+class Test_Firewall(unittest.TestCase):
+    """ Test case for ryu.app.rest_firewall.Firewall
+    """
+
+    version = ofproto_v1_3.OFP_VERSION
+
+    def setUp(self):
+        self.dp = _Datapath(self.version)
+        self.fw = rest_firewall.Firewall(self.dp)
+        self.fw.rules = rest_firewall.RuleCache()
+
+    def _flow_mods(self):
+        mods = []
+        for msgs in self.dp.sent:
+            # every batch ends with a barrier
+            ok_(isinstance(msgs[-1], self.dp.ofproto_parser.OFPBarrierRequest))
+            mods.extend(msgs[:-1])
+        return mods
+
+    def _reply(self, refused=()):
+        # the switch replies to the barriers and refuses the FlowMods
+        # with the given cookies
+        app = rest_firewall.RestFirewallAPI(dpset=mock.Mock(),
+                                            wsgi=mock.MagicMock())
+        parser = self.dp.ofproto_parser
+        ofp = self.dp.ofproto
+
+        def send_msgs(msgs):
+            self.dp.sent.append(msgs)
+            for msg in msgs:
+                if isinstance(msg, parser.OFPBarrierRequest):
+                    reply = parser.OFPBarrierReply(self.dp)
+                    handler = app.barrier_reply_handler
+                elif msg.cookie in refused:
+                    reply = parser.OFPErrorMsg(self.dp, ofp.OFPET_BAD_REQUEST,
+                                               ofp.OFPBRC_BAD_TYPE)
+                    handler = app.error_msg_handler
+                else:
+                    continue
+                reply.xid = msg.xid
+                handler(mock.Mock(msg=reply))
+
+        self.dp.send_msgs = send_msgs
+        return app.waiters
+
+    def _rules(self, vlan_id=rest_firewall.REST_ALL):
+        res = self.fw.get_rules(None, vlan_id)
+        return res[rest_firewall.REST_ACL]
+
+    def test_set_rule(self):
+        res = self.fw.set_rule({'nw_src': '10.0.0.0/8', 'nw_proto': 'TCP',
+                                'tp_dst': 80, 'priority': 10}, None,
+                               rest_firewall.VLANID_NONE)
+        eq_('Rule added. : rule_id=1',
+            res[rest_firewall.REST_COMMAND_RESULT][0]['details'])
+        eq_(1, len(self._flow_mods()))
+
+        acl = self._rules()
+        eq_(1, len(acl))
+        rule = acl[0][rest_firewall.REST_RULES][0]
+        eq_(1, rule['rule_id'])
+        eq_(10, rule['priority'])
+        eq_('TCP', rule['nw_proto'])
+        eq_('IPv4', rule['dl_type'])
+        eq_('ALLOW', rule['actions'])
+
+    def test_shadowed_rule(self):
+        self.fw.set_rule({'nw_src': '10.0.0.0/8', 'priority': 10}, None,
+                         rest_firewall.VLANID_NONE)
+        # matches a subset of the packets of the rule above
+        rule = {'nw_src': '10.1.0.0/16', 'nw_proto': 'TCP', 'tp_dst': 22,
+                'priority': 5}
+        assert_raises(ValueError, self.fw.set_rule, dict(rule), None,
+                      rest_firewall.VLANID_NONE)
+        eq_(1, len(self._flow_mods()))
+
+        # a higher priority makes an exception to the rule above
+        rule['priority'] = 20
+        self.fw.set_rule(rule, None, rest_firewall.VLANID_NONE)
+        eq_(2, len(self._flow_mods()))
+
+    def test_not_shadowed(self):
+        self.fw.set_rule({'nw_src': '10.0.0.0/8', 'nw_proto': 'TCP',
+                          'priority': 10}, None, rest_firewall.VLANID_NONE)
+        # more packets than the rule above
+        self.fw.set_rule({'nw_src': '10.1.0.0/16', 'priority': 5}, None,
+                         rest_firewall.VLANID_NONE)
+        # other addresses
+        self.fw.set_rule({'nw_src': '11.0.0.0/8', 'nw_proto': 'TCP',
+                          'priority': 5}, None, rest_firewall.VLANID_NONE)
+        # other VLAN
+        self.fw.set_rule({'nw_src': '10.0.0.0/8', 'nw_proto': 'TCP',
+                          'priority': 5}, None, 100)
+        eq_(4, len(self._flow_mods()))
+
+    def test_import_rules(self):
+        rules = [{'nw_src': '10.0.0.%d' % i, 'actions': 'DENY',
+                  'priority': 10} for i in range(1, 6)]
+        with mock.patch.object(rest_firewall, 'FLOW_MOD_BATCH', 2):
+            res = self.fw.import_rules(rules, None, 100)
+        msg = res[rest_firewall.REST_COMMAND_RESULT][0]
+        eq_('Rules added. : rule_id=1-5', msg['details'])
+        eq_(100, msg[rest_firewall.REST_VLANID])
+        eq_(3, len(self.dp.sent))
+        eq_(5, len(self._flow_mods()))
+        eq_(5, len(self._rules(100)[0][rest_firewall.REST_RULES]))
+
+    def test_import_rules_all_or_nothing(self):
+        rules = [{'nw_src': '10.0.0.0/8', 'priority': 10},
+                 {'nw_src': '10.0.0.1', 'priority': 10}]
+        assert_raises(ValueError, self.fw.import_rules, rules, None,
+                      rest_firewall.VLANID_NONE)
+        eq_([], self.dp.sent)
+        eq_(0, len(self.fw.rules))
+
+        # the rule ids aren't used up by the refused rules
+        self.fw.import_rules(rules[:1], None, rest_firewall.VLANID_NONE)
+        eq_(1, self._rules()[0][rest_firewall.REST_RULES][0]['rule_id'])
+
+    def test_export_rules(self):
+        rules = [{'nw_dst': '192.168.0.0/24', 'nw_proto': 'UDP',
+                  'tp_dst': 53, 'priority': 10},
+                 {'nw_proto': 'ICMP', 'actions': 'DENY', 'priority': 5}]
+        self.fw.import_rules(rules, None, 100)
+        res = self.fw.export_rules(None, 100)
+        acl = res[rest_firewall.REST_ACL]
+        eq_(100, acl[0][rest_firewall.REST_VLANID])
+        exported = acl[0][rest_firewall.REST_RULES]
+        for rule in exported:
+            ok_('rule_id' not in rule)
+            ok_('dl_vlan' not in rule)
+
+        # the exported rules can be imported again
+        dp = _Datapath(self.version)
+        fw = rest_firewall.Firewall(dp)
+        fw.rules = rest_firewall.RuleCache()
+        fw.import_rules(exported, None, 100)
+        eq_(acl, fw.export_rules(None, 100)[rest_firewall.REST_ACL])
+
+    def test_delete_rule(self):
+        self.fw.set_rule({'nw_src': '10.0.0.1', 'priority': 10}, None, 100)
+        self.fw.set_rule({'nw_src': '10.0.0.2', 'priority': 10}, None, 100)
+        res = self.fw.delete_rule({'rule_id': '1'}, None, 100)
+        eq_('Rule deleted. : ruleID=1',
+            res[rest_firewall.REST_COMMAND_RESULT][0]['details'])
+        mod = self._flow_mods()[-1]
+        eq_(self.dp.ofproto.OFPFC_DELETE_STRICT, mod.command)
+        eq_([2], [r['rule_id']
+                  for r in self._rules(100)[0][rest_firewall.REST_RULES]])
+
+        self.fw.delete_rule({'rule_id': 'all'}, None, 100)
+        eq_([], self._rules())
+        ok_(100 not in self.fw.vlan_list)
+
+    def test_log_status(self):
+        self.fw.set_rule({'nw_src': '10.0.0.1', 'actions': 'DENY'}, None,
+                         rest_firewall.VLANID_NONE)
+        self.fw.set_rule({'nw_src': '10.0.0.2'}, None,
+                         rest_firewall.VLANID_NONE)
+        self.dp.sent = []
+        self.fw.set_log_enable()
+        ok_(self.fw.log_enabled)
+        # the LOG flow and the DENY rule
+        eq_(2, len(self._flow_mods()))
+        out = 'OUTPUT:%d' % self.dp.ofproto.OFPP_CONTROLLER
+        flows = self.fw.rules.get_flows(rest_firewall.REST_ALL)
+        eq_([out], flows[0][rest_firewall.REST_ACTION])
+
+        # new DENY rules are logged
+        self.fw.set_rule({'nw_src': '10.0.0.3', 'actions': 'DENY'}, None,
+                         rest_firewall.VLANID_NONE)
+        flows = self.fw.rules.get_flows(rest_firewall.REST_ALL)
+        eq_([out], flows[2][rest_firewall.REST_ACTION])
+
+    def test_load_rules(self):
+        self.fw.set_rule({'nw_src': '10.0.0.1', 'priority': 10}, None, 100)
+        flow_stats = self.fw.rules.get_flows(rest_firewall.REST_ALL)
+        status = {'cookie': 0, 'priority': rest_firewall.ARP_FLOW_PRIORITY,
+                  'match': {}, 'actions': []}
+
+        fw = rest_firewall.Firewall(self.dp)
+        with mock.patch.object(
+                fw.ofctl, 'get_flow_stats',
+                return_value={'1': flow_stats + [status]}) as m:
+            eq_(1, len(fw.get_rules('waiters', 100)[rest_firewall.REST_ACL]))
+            fw.get_rules('waiters', 100)
+            eq_(1, m.call_count)
+        eq_(1, len(fw.rules))
+        fw.set_rule({'nw_src': '10.0.0.2', 'priority': 10}, None, 100)
+        ids = [r['rule_id']
+               for r in fw.get_rules(None, 100)[rest_firewall.REST_ACL][0][
+                   rest_firewall.REST_RULES]]
+        eq_([1, 2], ids)
+
+    def test_load_rules_timeout(self):
+        fw = rest_firewall.Firewall(self.dp)
+        with mock.patch.object(
+                fw.ofctl, 'get_flow_stats',
+                side_effect=OFPStatsTimeout(dpid=1, timeout=1)):
+            assert_raises(OFPStatsTimeout, fw.get_rules, 'waiters', 100)
+        # no cache from a partial reply, it's loaded by the next request
+        eq_(None, fw.rules)
+        with mock.patch.object(fw.ofctl, 'get_flow_stats',
+                               return_value={'1': []}) as m:
+            eq_([], fw.get_rules('waiters', 100)[rest_firewall.REST_ACL])
+            eq_(1, m.call_count)
+        ok_(fw.rules is not None)
+
+    def test_refused_rules(self):
+        # the second rule is refused by the switch
+        waiters = self._reply(refused=(2, ))
+        rules = [{'nw_src': '10.0.0.%d' % i, 'priority': 10}
+                 for i in range(1, 4)]
+        res = self.fw.import_rules(rules, waiters, rest_firewall.VLANID_NONE)
+        eq_(['Rules added. : rule_id=1,3',
+             'Rules refused by the switch. : rule_id=2'],
+            [msg['details']
+             for msg in res[rest_firewall.REST_COMMAND_RESULT]])
+        eq_([1, 3], [r['rule_id']
+                     for r in self._rules()[0][rest_firewall.REST_RULES]])
+        eq_({1: {}}, waiters)
+
+        # the refused deletion keeps the rule
+        waiters = self._reply(refused=(3, ))
+        res = self.fw.delete_rule({'rule_id': 'all'}, waiters,
+                                  rest_firewall.VLANID_NONE)
+        eq_(['Rule deleted. : ruleID=1',
+             'Rule refused by the switch. : ruleID=3'],
+            [msg['details']
+             for msg in res[rest_firewall.REST_COMMAND_RESULT]])
+        eq_([3], [r['rule_id']
+                  for r in self._rules()[0][rest_firewall.REST_RULES]])
+
+    def test_barrier_timeout(self):
+        waiters = {}
+        with mock.patch.object(rest_firewall, 'REPLY_TIMEOUT', 0.01):
+            assert_raises(OFPBarrierTimeout, self.fw.set_rule,
+                          {'nw_src': '10.0.0.1'}, waiters,
+                          rest_firewall.VLANID_NONE)
+        eq_({1: {}}, waiters)
+        # the rules on the switch are unknown, they are loaded again
+        eq_(None, self.fw.rules)
+
+
+class Test_Firewall_v1_0(Test_Firewall):
+    """ Test case for ryu.app.rest_firewall.Firewall with OpenFlow 1.0
+    """
+
+    version = ofproto_v1_0.OFP_VERSION
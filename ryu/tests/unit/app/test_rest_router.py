@@ -0,0 +1,136 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu.app import rest_router
+
+
+def _count_nodes(node):
+    if node is None:
+        return 0
+    return 1 + _count_nodes(node[0]) + _count_nodes(node[1])
+
+
+class Test_RoutingTable(unittest.TestCase):
+    """ Test case for ryu.app.rest_router.RoutingTable
+    """
+
+    def setUp(self):
+        self.table = rest_router.RoutingTable()
+
+    def test_longest_match(self):
+        eq_(None, self.table.get_data(dst_ip='10.1.2.3'))
+        r8 = self.table.add('10.0.0.0/8', '192.168.0.1')
+        r16 = self.table.add('10.1.0.0/16', '192.168.0.2')
+        r24 = self.table.add('10.1.2.0/24', '192.168.0.3')
+        r32 = self.table.add('10.1.2.3', '192.168.0.4')
+        eq_(r32, self.table.get_data(dst_ip='10.1.2.3'))
+        eq_(r24, self.table.get_data(dst_ip='10.1.2.4'))
+        eq_(r16, self.table.get_data(dst_ip='10.1.3.4'))
+        eq_(r8, self.table.get_data(dst_ip='10.2.3.4'))
+        eq_(None, self.table.get_data(dst_ip='11.0.0.1'))
+
+        default = self.table.add(rest_router.DEFAULT_ROUTE, '192.168.0.5')
+        eq_(default, self.table.get_data(dst_ip='11.0.0.1'))
+        eq_(r8, self.table.get_data(dst_ip='10.2.3.4'))
+
+    def test_delete(self):
+        r8 = self.table.add('10.0.0.0/8', '192.168.0.1')
+        r24 = self.table.add('10.1.2.0/24', '192.168.0.1')
+        self.table.delete(r24.route_id)
+        eq_(r8, self.table.get_data(dst_ip='10.1.2.3'))
+        ok_('10.1.2.0/24' not in self.table)
+        # the branch of the deleted route is pruned
+        eq_(1 + 8, _count_nodes(self.table._trie))
+
+        self.table.delete(r8.route_id)
+        eq_(None, self.table.get_data(dst_ip='10.1.2.3'))
+        eq_(1, _count_nodes(self.table._trie))
+        eq_([], self.table.get_gateways())
+        # unknown route_id
+        self.table.delete(r8.route_id)
+
+    def test_overlap(self):
+        route = self.table.add('10.1.2.0/24', '192.168.0.1')
+        # the destination is normalized before the check
+        assert_raises(rest_router.CommandFailure,
+                      self.table.add, '10.1.2.3/24', '192.168.0.2')
+        assert_raises(ValueError, self.table.add, '10.1.2.0/33',
+                      '192.168.0.2')
+        eq_([route], self.table.values())
+
+    def test_gateways(self):
+        r1 = self.table.add('10.0.0.0/8', '192.168.0.1')
+        r2 = self.table.add('11.0.0.0/8', '192.168.0.1')
+        r3 = self.table.add('12.0.0.0/8', '192.168.0.2')
+        eq_(['192.168.0.1', '192.168.0.2'], sorted(self.table.get_gateways()))
+        ok_(self.table.is_gateway('192.168.0.1'))
+        ok_(not self.table.is_gateway('10.0.0.1'))
+        eq_(sorted([r1.route_id, r2.route_id]),
+            sorted(r.route_id for r in self.table.get_routes('192.168.0.1')))
+        self.table.delete(r3.route_id)
+        ok_(not self.table.is_gateway('192.168.0.2'))
+
+
+class Test_VlanRouter(unittest.TestCase):
+    """ Test case for the bulk import of rest_router.VlanRouter
+    """
+
+    def setUp(self):
+        router = rest_router.VlanRouter.__new__(rest_router.VlanRouter)
+        router.vlan_id = rest_router.VLANID_NONE
+        router.address_data = rest_router.AddressData()
+        router.address_data.add('192.168.0.254/24')
+        router.routing_tbl = rest_router.RoutingTable()
+        router.ofctl = mock.Mock()
+        router.logger = mock.Mock()
+        router.sw_id = {'sw_id': '0000000000000001'}
+        router.send_arp_request = mock.Mock()
+        self.router = router
+
+    def test_import_routes(self):
+        routes = [{'destination': '10.%d.%d.0/24' % (i // 256, i % 256),
+                   'gateway': '192.168.0.%d' % (i % 2 + 1)}
+                  for i in range(1000)]
+        routes.append({'gateway': '192.168.0.1'})
+        msg = self.router.import_routes(routes)
+        eq_(rest_router.REST_OK, msg[rest_router.REST_RESULT])
+        eq_(1001, len(self.router.routing_tbl))
+        eq_(1001, self.router.ofctl.set_packetin_flow.call_count)
+        # one ARP request per gateway
+        eq_(2, self.router.send_arp_request.call_count)
+        route = self.router.routing_tbl.get_data(dst_ip='10.3.5.1')
+        eq_('10.3.5.0', route.dst_ip)
+
+    def test_import_routes_invalid(self):
+        routes = [{'destination': '10.0.0.0/24', 'gateway': '192.168.0.1'},
+                  {'destination': '10.0.0.0/24', 'gateway': '192.168.0.2'}]
+        msg = self.router.import_routes(routes)
+        eq_(rest_router.REST_NG, msg[rest_router.REST_RESULT])
+        eq_(0, len(self.router.routing_tbl))
+
+        # the gateway is not in the address of the router
+        msg = self.router.import_routes(
+            [{'destination': '10.0.0.0/24', 'gateway': '172.16.0.1'}])
+        eq_(rest_router.REST_NG, msg[rest_router.REST_RESULT])
+
+        assert_raises(ValueError, self.router.import_routes,
+                      {'gateway': '192.168.0.1'})
+        assert_raises(ValueError, self.router.import_routes,
+                      [{'destination': '10.0.0.0/24'}])
@@ -0,0 +1,98 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu.app.stats_collector import StatsCollector, CounterSeries
+from ryu.app.wsgi import WSGIApplication
+from ryu.exception import OFPStatsTimeout
+from ryu.lib import ofctl_v1_3
+from ryu.ofproto import ofproto_v1_3
+
+
+class Test_stats_collector(unittest.TestCase):
+
+    def test_counter_series(self):
+        s = CounterSeries(('packet_count',), 2)
+        s.update(10.0, {'packet_count': 100})
+        eq_([], s.history())
+        s.update(12.0, {'packet_count': 120})
+        s.update(14.0, {'packet_count': 130})
+        s.update(16.0, {'packet_count': 5})     # counter reset
+        h = s.history()
+        eq_(2, len(h))
+        eq_(10, h[0]['packet_count'])
+        eq_(5.0, h[0]['packet_count_rate'])
+        eq_(5, h[1]['packet_count'])
+        eq_({'packet_count': 5}, s.latest()['counters'])
+
+    def test_update_flows_by_cookie(self):
+        app = StatsCollector(wsgi=mock.Mock(), dpset=mock.Mock())
+        flows = [{'cookie': 1, 'packet_count': 1, 'byte_count': 10},
+                 {'cookie': 1, 'packet_count': 2, 'byte_count': 20},
+                 {'cookie': 2, 'packet_count': 5, 'byte_count': 50}]
+        app.update(1, 'flow', 1.0, flows)
+        flows[0]['packet_count'] = 11
+        app.update(1, 'flow', 2.0, flows[:2])
+
+        series = app.series[1]['flow']
+        eq_([(1,)], series.keys())
+        eq_(10, series[(1,)].latest()['rates']['packet_count'])
+        eq_(10.0, series[(1,)].latest()['rates']['packet_count_rate'])
+
+    def test_update_skips_empty_reply(self):
+        app = StatsCollector(wsgi=mock.Mock(), dpset=mock.Mock())
+        ports = [{'port_no': 1, 'rx_packets': 1, 'tx_packets': 1,
+                  'rx_bytes': 1, 'tx_bytes': 1, 'rx_dropped': 0,
+                  'tx_dropped': 0, 'rx_errors': 0, 'tx_errors': 0}]
+        app.update(1, 'port', 1.0, ports)
+        app.update(1, 'port', 2.0, [])
+        eq_([(1,)], app.series[1]['port'].keys())
+        eq_(1.0, app.series[1]['port'][(1,)].last_time)
+
+    def test_poll_errors(self):
+        app = StatsCollector(wsgi=mock.Mock(), dpset=mock.Mock())
+        app.series[1] = {'flow': {(1,): CounterSeries(('packet_count',), 2)}}
+        dp = mock.Mock(id=1)
+        dp.ofproto.OFP_VERSION = ofproto_v1_3.OFP_VERSION
+        with mock.patch.object(
+                ofctl_v1_3, 'get_flow_stats',
+                side_effect=OFPStatsTimeout(dpid=1, timeout=1.0)) as m:
+            app._poll(dp, 'flow')
+            eq_(app.timeout, m.call_args[1]['timeout'])
+        # the history is kept on a timeout
+        eq_([(1,)], app.series[1]['flow'].keys())
+
+        # a bad reply doesn't stop the polling thread
+        with mock.patch.object(ofctl_v1_3, 'get_flow_stats',
+                               return_value={'1': [{'cookie': 1}]}):
+            app._poll(dp, 'flow')
+        eq_([(1,)], app.series[1]['flow'].keys())
+
+    def test_rest_dpid(self):
+        wsgi = WSGIApplication()
+        app = StatsCollector(wsgi=wsgi, dpset=mock.Mock())
+        app.update(1, 'flow', 1.0, [{'cookie': 1, 'packet_count': 1,
+                                     'byte_count': 10}])
+        statuses = []
+        for path in ('/collector/flow/1', '/collector/flow/1/1',
+                     '/collector/flow/foo', '/collector/flow/foo/1'):
+            wsgi({'REQUEST_METHOD': 'GET', 'PATH_INFO': path},
+                 lambda status, _headers: statuses.append(status))
+        eq_(['200 OK', '200 OK', '404 Not Found', '404 Not Found'],
+            statuses)
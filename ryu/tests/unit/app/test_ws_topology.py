@@ -19,36 +19,136 @@ import unittest
 from socket import error as SocketError
 
 import mock
+from nose.tools import *
 
+from ryu.app.ws_topology import TopologyClient
 from ryu.app.ws_topology import WebSocketTopology
 
 
+def _switch(dpid):
+    return {'dpid': dpid, 'ports': []}
+
+
+def _link(src, dst):
+    return {'src': {'dpid': src, 'port_no': '00000001'},
+            'dst': {'dpid': dst, 'port_no': '00000002'}}
+
+
+def _ev(switch=None, link=None):
+    ev = mock.Mock()
+    ev.switch.to_dict.return_value = switch
+    ev.link.to_dict.return_value = link
+    return ev
+
+
 class Test_ws_topology(unittest.TestCase):
 
-    def test_when_sock_error(self):
+    def setUp(self):
         args = {
             'wsgi': mock.Mock(),
         }
-        app = WebSocketTopology(**args)
+        self.app = WebSocketTopology(**args)
+
+    def _add_client(self, rpc_client):
+        client = TopologyClient(rpc_client, self.app.queue_size)
+        client.resync = False
+        self.app.clients.append(client)
+        return client
 
+    def test_when_sock_error(self):
+        app = self.app
         rpc_client_mock1 = mock.Mock()
         config = {
-            'get_proxy.return_value.event_link_add.side_effect': SocketError,
+            'get_proxy.return_value.event_topology_update.side_effect':
+            SocketError,
         }
         rpc_client_mock1.configure_mock(**config)
 
         rpc_client_mock2 = mock.Mock()
 
-        app.rpc_clients = [
-            rpc_client_mock1,
-            rpc_client_mock2,
-        ]
+        client1 = self._add_client(rpc_client_mock1)
+        client2 = self._add_client(rpc_client_mock2)
 
-        ev_mock = mock.Mock()
-        app._event_link_add_handler(ev_mock)
+        app._event_link_add_handler(_ev(link=_link('1', '2')))
+        app._flush()
+        app._send_pending(client1)
+        app._send_pending(client2)
 
         rpc_client_mock1.get_proxy.assert_called_once_with()
         rpc_client_mock2.get_proxy.assert_called_once_with()
+        eq_([client2], app.clients)
+
+    def test_batch(self):
+        app = self.app
+        rpc_client = mock.Mock()
+        client = self._add_client(rpc_client)
+
+        app._event_switch_enter_handler(_ev(switch=_switch('1')))
+        app._event_switch_enter_handler(_ev(switch=_switch('2')))
+        app._event_link_add_handler(_ev(link=_link('1', '2')))
+        # cancels out
+        app._event_switch_enter_handler(_ev(switch=_switch('3')))
+        app._event_switch_leave_handler(_ev(switch=_switch('3')))
+        app._flush()
+        app._send_pending(client)
+
+        proxy = rpc_client.get_proxy.return_value
+        eq_(1, proxy.event_topology_update.call_count)
+        msg = proxy.event_topology_update.call_args[0][0]
+        eq_(['1', '2'], sorted(s['dpid'] for s in msg['switches']['add']))
+        eq_([], msg['switches']['delete'])
+        eq_([_link('1', '2')], msg['links']['add'])
+
+        # nothing changed in the end
+        app._event_link_delete_handler(_ev(link=_link('1', '2')))
+        app._event_link_add_handler(_ev(link=_link('1', '2')))
+        app._flush()
+        eq_(0, len(client.queue))
+
+    def test_resync(self):
+        app = self.app
+        app.queue_size = 2
+        rpc_client = mock.Mock()
+        client = app.add_client(rpc_client)
+        ok_(client.resync)
+
+        for i in range(5):
+            app._event_switch_enter_handler(_ev(switch=_switch(str(i))))
+            app._flush()
+        ok_(client.resync)
+        app._send_pending(client)
+
+        proxy = rpc_client.get_proxy.return_value
+        eq_(0, proxy.event_topology_update.call_count)
+        msg = proxy.event_topology_snapshot.call_args[0][0]
+        eq_(5, len(msg['switches']))
+        eq_([], msg['links'])
+        app.remove_client(client)
+
+    def test_resync_with_pending_delta(self):
+        app = self.app
+        rpc_client = mock.Mock()
+        client = self._add_client(rpc_client)
+        app._event_switch_enter_handler(_ev(switch=_switch('1')))
+        app._event_switch_enter_handler(_ev(switch=_switch('2')))
+        app._flush()
+        app._send_pending(client)
+
+        # changes not flushed yet when the client is resynchronized
+        app._event_switch_enter_handler(_ev(switch=_switch('3')))
+        app._event_switch_leave_handler(_ev(switch=_switch('1')))
+        client.resync = True
+        app._send_pending(client)
+        proxy = rpc_client.get_proxy.return_value
+        msg = proxy.event_topology_snapshot.call_args[0][0]
+        eq_(['2', '3'], sorted(s['dpid'] for s in msg['switches']))
+
+        # the snapshot isn't followed by the changes it includes
+        app._flush()
+        app._send_pending(client)
+        eq_(1, proxy.event_topology_update.call_count)
+        eq_(0, len(client.queue))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,140 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import logging
+
+from nose.tools import *
+
+from ryu.controller import bundle
+from ryu.ofproto import ofproto_v1_4, ofproto_v1_4_parser
+from ryu.ofproto.ofproto_protocol import ProtocolDesc
+
+
+LOG = logging.getLogger('test_bundle')
+
+
+class _Datapath(ProtocolDesc):
+    """Answer bundle requests synchronously like a switch would."""
+
+    def __init__(self, failing_xids=()):
+        super(_Datapath, self).__init__(ofproto_v1_4.OFP_VERSION)
+        self.xid = 0
+        self.xid_handlers = {}
+        self.sent = []
+        self.failing_xids = failing_xids
+
+    def set_xid(self, msg):
+        self.xid += 1
+        msg.set_xid(self.xid)
+        return self.xid
+
+    def register_xid_handler(self, xid, func):
+        self.xid_handlers[xid] = func
+
+    def unregister_xid_handler(self, xid):
+        self.xid_handlers.pop(xid, None)
+
+    def _reply(self, msg):
+        handler = self.xid_handlers.get(msg.xid)
+        if handler is not None:
+            handler(msg)
+
+    def _error(self, xid):
+        err = ofproto_v1_4_parser.OFPErrorMsg(
+            self, ofproto_v1_4.OFPET_BUNDLE_FAILED,
+            ofproto_v1_4.OFPBFC_MSG_FAILED)
+        err.msg_type = ofproto_v1_4.OFPT_ERROR
+        err.xid = xid
+        return err
+
+    def send_msg(self, msg):
+        msg.serialize()
+        self.sent.append(msg)
+        if msg.xid in self.failing_xids:
+            self._reply(self._error(msg.xid))
+        elif isinstance(msg, ofproto_v1_4_parser.OFPBundleCtrlMsg):
+            reply = ofproto_v1_4_parser.OFPBundleCtrlMsg(
+                self, msg.bundle_id, msg.type + 1, msg.flags, [])
+            reply.msg_type = ofproto_v1_4.OFPT_BUNDLE_CONTROL
+            reply.xid = msg.xid
+            self._reply(reply)
+
+
+class Test_bundle(unittest.TestCase):
+    """ Test case for ryu.controller.bundle
+    """
+
+    def _flow_mod(self, dp):
+        return ofproto_v1_4_parser.OFPFlowMod(dp)
+
+    def _ctrl_types(self, dp):
+        return [m.type for m in dp.sent
+                if isinstance(m, ofproto_v1_4_parser.OFPBundleCtrlMsg)]
+
+    def test_commit(self):
+        dp = _Datapath()
+        flags = ofproto_v1_4.OFPBF_ATOMIC
+        with bundle.Bundle(dp, 1, flags) as b:
+            b.add(self._flow_mod(dp))
+            b.add(self._flow_mod(dp))
+
+        eq_([ofproto_v1_4.OFPBCT_OPEN_REQUEST,
+             ofproto_v1_4.OFPBCT_COMMIT_REQUEST], self._ctrl_types(dp))
+        adds = [m for m in dp.sent
+                if isinstance(m, ofproto_v1_4_parser.OFPBundleAddMsg)]
+        eq_(2, len(adds))
+        for m in adds:
+            eq_(1, m.bundle_id)
+            eq_(flags, m.flags)
+            eq_(m.xid, m.message.xid)
+        eq_({}, dp.xid_handlers)
+        eq_([], b.errors)
+
+    def test_discard_on_exception(self):
+        dp = _Datapath()
+
+        def _run():
+            with bundle.Bundle(dp, 1) as b:
+                b.add(self._flow_mod(dp))
+                raise ValueError()
+
+        assert_raises(ValueError, _run)
+        eq_([ofproto_v1_4.OFPBCT_OPEN_REQUEST,
+             ofproto_v1_4.OFPBCT_DISCARD_REQUEST], self._ctrl_types(dp))
+        eq_({}, dp.xid_handlers)
+
+    def test_error_correlation(self):
+        # xid 1 is the open request, xid 3 is the second bundled message.
+        dp = _Datapath(failing_xids=(3,))
+        mod1 = self._flow_mod(dp)
+        mod2 = self._flow_mod(dp)
+        try:
+            with bundle.Bundle(dp, 1) as b:
+                b.add(mod1)
+                b.add(mod2)
+        except bundle.BundleFailed as e:
+            eq_(1, len(e.errors))
+            msg, err = e.errors[0]
+            ok_(msg is mod2)
+            eq_(3, err.xid)
+        else:
+            ok_(False, 'BundleFailed is not raised')
+
+    def test_open_failure(self):
+        dp = _Datapath(failing_xids=(1,))
+        b = bundle.Bundle(dp, 1)
+        assert_raises(bundle.BundleFailed, b.open)
+        ok_(not b.is_open)
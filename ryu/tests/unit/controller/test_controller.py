@@ -0,0 +1,85 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import logging
+
+import mock
+from nose.tools import *
+
+# app_manager has to be imported before controller to avoid a circular
+# import.
+from ryu.base import app_manager
+from ryu.controller import controller
+from ryu.ofproto import ofproto_parser
+from ryu.ofproto import ofproto_v1_3
+from ryu.ofproto import ofproto_v1_3_parser
+from ryu.ofproto.ofproto_protocol import ProtocolDesc
+
+
+LOG = logging.getLogger('test_controller')
+
+
+class Test_Datapath(unittest.TestCase):
+    """ Test case for ryu.controller.controller.Datapath
+    """
+
+    def _datapath(self, socket):
+        with mock.patch('ryu.base.app_manager.lookup_service_brick'):
+            dp = controller.Datapath(socket, ('127.0.0.1', 6633))
+        return dp
+
+    def test_echo_fast_path(self):
+        pd = ProtocolDesc(ofproto_v1_3.OFP_VERSION)
+        echo = ofproto_v1_3_parser.OFPEchoRequest(pd, data='ping')
+        echo.set_xid(123)
+        echo.serialize()
+
+        socket = mock.Mock()
+        socket.recv.side_effect = [str(echo.buf), '']
+        dp = self._datapath(socket)
+        dp._recv_loop()
+
+        eq_(1, socket.sendall.call_count)
+        buf = socket.sendall.call_args[0][0]
+        (version, msg_type, msg_len, xid) = ofproto_parser.header(buf)
+        eq_(ofproto_v1_3.OFPT_ECHO_REPLY, msg_type)
+        eq_(123, xid)
+        eq_('ping', str(buf[8:]))
+
+    def test_acknowledge_echo_reply(self):
+        dp = self._datapath(mock.Mock())
+        dp.echo_requests[10] = 0.0
+        dp.echo_requests[11] = 0.0
+        dp.acknowledge_echo_reply(12)   # unknown xid is ignored
+        eq_(None, dp.echo_rtt)
+
+        with mock.patch('time.time', return_value=0.5):
+            dp.acknowledge_echo_reply(11)
+        eq_({}, dp.echo_requests)
+        eq_(0.5, dp.echo_rtt)
+        eq_(0.5, dp.echo_rtt_avg)
+
+    def test_send_msgs(self):
+        dp = self._datapath(mock.Mock())
+        dp.xid = 0
+        msgs = [dp.ofproto_parser.OFPBarrierRequest(dp) for _i in range(3)]
+        dp.send_msgs(msgs)
+
+        # sent in one write
+        eq_(1, dp.send_q.qsize())
+        buf = dp.send_q.get()
+        eq_(''.join(str(m.buf) for m in msgs), str(buf))
+        eq_([1, 2, 3], [m.xid for m in msgs])
@@ -0,0 +1,96 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import logging
+
+from nose.tools import *
+
+from ryu.controller.mac_to_port import MacToPortTable
+
+
+LOG = logging.getLogger('test_mac_to_port')
+
+MAC1 = '00:00:00:00:00:01'
+MAC2 = '00:00:00:00:00:02'
+MAC3 = '00:00:00:00:00:03'
+
+
+class Test_MacToPortTable(unittest.TestCase):
+    """ Test case for ryu.controller.mac_to_port.MacToPortTable
+    """
+
+    def test_unbounded(self):
+        table = MacToPortTable()
+        table.dpid_add(1)
+        eq_(None, table.port_add(1, 1, MAC1))
+        eq_(1, table.port_add(1, 1, MAC1))
+        eq_(1, table.port_get(1, MAC1))
+        # binary addresses are accepted too
+        haddr = '\x00\x00\x00\x00\x00\x01'
+        table.port_add(1, 1, haddr)
+        eq_(1, table.port_add(1, 2, haddr))
+        eq_([MAC1], table.mac_list(1, 1))
+        table.mac_del(1, MAC1)
+        eq_(None, table.port_get(1, MAC1))
+
+    def test_move(self):
+        table = MacToPortTable()
+        table.dpid_add(1)
+        table.port_add(1, 1, MAC1, now=0)
+        eq_(1, table.port_add(1, 2, MAC1, now=1))
+        eq_(2, table.port_get(1, MAC1))
+
+    def test_lru(self):
+        table = MacToPortTable(capacity=2)
+        table.dpid_add(1)
+        table.dpid_add(2)
+        table.port_add(1, 1, MAC1, now=0)
+        table.port_add(1, 2, MAC2, now=1)
+        table.port_add(1, 1, MAC1, now=2)
+        table.port_add(1, 3, MAC3, now=3)
+        eq_(None, table.port_get(1, MAC2))
+        eq_(1, table.port_get(1, MAC1))
+        eq_(3, table.port_get(1, MAC3))
+        # the capacity is per datapath
+        table.port_add(2, 1, MAC2, now=3)
+        eq_(1, table.port_get(2, MAC2))
+
+    def test_age(self):
+        table = MacToPortTable(max_age=10)
+        table.dpid_add(1)
+        table.port_add(1, 1, MAC1, now=0)
+        table.port_add(1, 2, MAC2, now=5)
+        eq_(1, table.port_get(1, MAC1, now=10))
+        eq_(None, table.port_get(1, MAC1, now=11))
+        # expired on learning
+        table.port_add(1, 3, MAC3, now=16)
+        eq_([MAC3], table.mac_to_port[1].keys())
+
+    def test_flow_needed(self):
+        table = MacToPortTable(flow_timeout=5)
+        table.dpid_add(1)
+        table.port_add(1, 2, MAC2, now=0)
+        ok_(table.flow_needed(1, 1, MAC2, 2, now=0))
+        ok_(not table.flow_needed(1, 1, MAC2, 2, now=1))
+        # another in_port
+        ok_(table.flow_needed(1, 3, MAC2, 2, now=1))
+        # timed out
+        ok_(table.flow_needed(1, 1, MAC2, 2, now=5))
+
+        # the destination moved
+        table.port_add(1, 4, MAC2, now=6)
+        ok_(table.flow_needed(1, 1, MAC2, 4, now=6))
+        ok_(not table.flow_needed(1, 1, MAC2, 4, now=7))
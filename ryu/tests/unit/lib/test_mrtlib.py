@@ -0,0 +1,154 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import struct
+import unittest
+from StringIO import StringIO
+from nose.tools import *
+
+from ryu.lib import mrtlib
+from ryu.lib.packet import bgp
+
+
+def _attrs(as_path=[65001, 70000]):
+    return [bgp.BGPPathAttributeOrigin(0),
+            bgp.BGPPathAttributeAsPath([as_path]),
+            bgp.BGPPathAttributeMultiExitDisc(10)]
+
+
+def _write(*records):
+    f = StringIO()
+    writer = mrtlib.Writer(f)
+    for record in records:
+        writer.write(record)
+    return f.getvalue()
+
+
+def _read(buf):
+    return list(mrtlib.Reader(StringIO(buf)))
+
+
+class Test_mrtlib(unittest.TestCase):
+    """ Test case for ryu.lib.mrtlib
+    """
+
+    def test_peer_index_table(self):
+        peers = [mrtlib.MrtPeer('10.0.0.2', '10.0.0.2', 65001),
+                 mrtlib.MrtPeer('10.0.0.3', '2001:db8::3', 70000)]
+        record, = _read(_write(mrtlib.PeerIndexTable(
+            '10.0.0.1', 'view', peers, 1400000000)))
+        eq_(mrtlib.TABLE_DUMP_V2_PEER_INDEX_TABLE, record.subtype)
+        eq_(1400000000, record.timestamp)
+        eq_(('10.0.0.1', 'view'), (record.collector_bgp_id,
+                                   record.view_name))
+        eq_([('10.0.0.2', '10.0.0.2', 65001),
+             ('10.0.0.3', '2001:db8::3', 70000)],
+            [(p.bgp_id, p.ip_addr, p.as_num) for p in record.peers])
+
+    def test_peer_as2(self):
+        # a peer with a 2 bytes AS number
+        buf = '\x00' + '\x0a\x00\x00\x02' * 2 + struct.pack('!H', 65001)
+        peer, rest = mrtlib.MrtPeer.parser(buf + 'rest')
+        eq_(('10.0.0.2', '10.0.0.2', 65001),
+            (peer.bgp_id, peer.ip_addr, peer.as_num))
+        eq_('rest', rest)
+
+    def test_rib_ipv4(self):
+        attrs = _attrs() + [bgp.BGPPathAttributeNextHop('10.0.0.2')]
+        entries = [mrtlib.RibEntry(0, 1400000000, attrs),
+                   mrtlib.RibEntry(1, 1400000001, _attrs([65002]) + attrs[3:])]
+        nlri = bgp.IPAddrPrefix(24, '10.1.0.0')
+        record, = _read(_write(mrtlib.RibRecord(7, nlri, entries)))
+        eq_(mrtlib.TABLE_DUMP_V2_RIB_IPV4_UNICAST, record.subtype)
+        eq_((7, '10.1.0.0/24'), (record.seq_num, record.prefix.prefix))
+        eq_([(0, 1400000000), (1, 1400000001)],
+            [(e.peer_index, e.originated_time) for e in record.entries])
+        entry = record.entries[0]
+        eq_(None, entry.next_hop)
+        eq_([0, [[65001, 70000]], 10, '10.0.0.2'],
+            [a.value for a in entry.attributes])
+        eq_(entries[0].attr_buf, entry.attr_buf)
+
+    def test_rib_ipv6(self):
+        entry = mrtlib.RibEntry(0, 0, _attrs(), next_hop='2001:db8::2')
+        nlri = bgp.IP6AddrPrefix(48, '2001:db8:1::')
+        record, = _read(_write(mrtlib.RibRecord(0, nlri, [entry])))
+        eq_(mrtlib.TABLE_DUMP_V2_RIB_IPV6_UNICAST, record.subtype)
+        eq_('2001:db8:1::/48', record.prefix.prefix)
+        entry = record.entries[0]
+        eq_('2001:db8::2', entry.next_hop)
+        # the abbreviated MP_REACH_NLRI isn't one of the attributes
+        eq_([0, [[65001, 70000]], 10], [a.value for a in entry.attributes])
+
+    def test_rib_generic(self):
+        entry = mrtlib.RibEntry(0, 0, _attrs(), next_hop='10.0.0.2')
+        nlri = bgp.LabelledVPNIPAddrPrefix(24, '10.1.0.0', labels=[100],
+                                           route_dist='65000:1')
+        record, = _read(_write(mrtlib.RibRecord(0, nlri, [entry])))
+        eq_(mrtlib.TABLE_DUMP_V2_RIB_GENERIC, record.subtype)
+        eq_(bgp.RF_IPv4_VPN, record.prefix.ROUTE_FAMILY)
+        eq_('65000:1:10.1.0.0/24', record.prefix.formatted_nlri_str)
+        eq_('10.0.0.2', record.entries[0].next_hop)
+
+    def test_next_hop(self):
+        # the next hop of VPN routes follows a route distinguisher, and a
+        # link local address may follow the global IPv6 address
+        eq_('10.0.0.2', mrtlib._parse_next_hop(
+            '\x0c' + '\x00' * 8 + '\x0a\x00\x00\x02'))
+        eq_('2001:db8::2', mrtlib._parse_next_hop(
+            '\x20' + '\x20\x01\x0d\xb8' + '\x00' * 11 + '\x02' +
+            '\xfe\x80' + '\x00' * 13 + '\x01'))
+
+    def test_bgp4mp(self):
+        update = bgp.BGPUpdate(
+            path_attributes=[bgp.BGPPathAttributeOrigin(0)],
+            nlri=[bgp.IPAddrPrefix(24, '10.1.0.0')])
+        records = _read(_write(
+            mrtlib.Bgp4MpMessage(70000, 65000, 0, '10.0.0.2', '10.0.0.1',
+                                 update, 1400000000),
+            mrtlib.Bgp4MpMessage(65001, 65000, 1, '2001:db8::2',
+                                 '2001:db8::1', str(update.serialize()))))
+        eq_([mrtlib.BGP4MP_MESSAGE_AS4] * 2, [r.subtype for r in records])
+        record = records[0]
+        eq_((70000, 65000, 0, '10.0.0.2', '10.0.0.1', 1400000000),
+            (record.peer_as, record.local_as, record.if_index,
+             record.peer_ip, record.local_ip, record.timestamp))
+        eq_(['10.1.0.0/24'], [n.prefix for n in record.message.nlri])
+        eq_(('2001:db8::2', '2001:db8::1'),
+            (records[1].peer_ip, records[1].local_ip))
+        eq_(str(update.serialize()), records[1].data)
+
+    def test_bgp4mp_as2(self):
+        update = str(bgp.BGPKeepAlive().serialize())
+        body = struct.pack('!HHHH', 65001, 65000, 0, 1) + \
+            '\x0a\x00\x00\x02\x0a\x00\x00\x01' + update
+        buf = struct.pack('!IHHI', 0, mrtlib.MRT_TYPE_BGP4MP,
+                          mrtlib.BGP4MP_MESSAGE, len(body)) + body
+        record, = _read(buf)
+        eq_((65001, 65000, '10.0.0.2'),
+            (record.peer_as, record.local_as, record.peer_ip))
+        eq_(bgp.BGP_MSG_KEEPALIVE, record.message.type)
+
+    def test_unknown(self):
+        buf = struct.pack('!IHHI', 1, 12, 1, 3) + 'abc'
+        record, = _read(buf)
+        ok_(isinstance(record, mrtlib.MrtUnknownRecord))
+        eq_((12, 1, 'abc'), (record._TYPE, record.subtype, record.data))
+        eq_(buf, _write(record))
+
+    def test_truncated(self):
+        buf = _write(mrtlib.PeerIndexTable('10.0.0.1', '', []))
+        assert_raises(ValueError, _read, buf[:-1])
+        assert_raises(ValueError, _read, buf[:5])
@@ -25,10 +25,11 @@ from ryu.controller.handler import (
     set_ev_cls,
     MAIN_DISPATCHER,
 )
-from ryu.lib.packet import vlan, ethernet, ipv4
+from ryu.lib.packet import packet, vlan, ethernet, ipv4, udp
 from ryu.lib.ofp_pktinfilter import packet_in_filter, RequiredTypeFilter
+from ryu.lib.ofp_pktinfilter import PacketInAdmission, TokenBucket
 from ryu.lib import mac
-from ryu.ofproto import ether, ofproto_v1_3, ofproto_v1_3_parser
+from ryu.ofproto import ether, inet, ofproto_v1_3, ofproto_v1_3_parser
 from ryu.ofproto.ofproto_protocol import ProtocolDesc
 
 
@@ -89,3 +90,105 @@ class Test_packet_in_filter(unittest.TestCase):
                                                  data=truncated_data)
         ev = ofp_event.EventOFPPacketIn(pkt_in)
         ok_(not self.app.packet_in_handler(ev))
+
+    def test_pkt_in_filter_parse_once(self):
+        datapath = ProtocolDesc(version=ofproto_v1_3.OFP_VERSION)
+        e = ethernet.ethernet(mac.BROADCAST_STR,
+                              mac.BROADCAST_STR,
+                              ether.ETH_TYPE_8021Q)
+        pkt = (e / vlan.vlan() / ipv4.ipv4())
+        pkt.serialize()
+        pkt_in = ofproto_v1_3_parser.OFPPacketIn(datapath,
+                                                 data=buffer(pkt.data))
+        ev = ofp_event.EventOFPPacketIn(pkt_in)
+        ok_(self.app.packet_in_handler(ev))
+
+        # the filter and the handlers share the same parsed packet
+        parsed = pkt_in.packet
+        ok_(isinstance(parsed, packet.ReadOnlyPacket))
+        ok_(parsed is pkt_in.packet)
+        ok_(vlan.vlan in parsed)
+        ok_('packet' not in pkt_in.to_jsondict()['OFPPacketIn'])
+
+
+class Test_packet_in_admission(unittest.TestCase):
+
+    """ Test case for PacketIn admission control
+    """
+
+    def _packet_in(self, in_port=1, src='00:00:00:00:00:01',
+                   ethertype=ether.ETH_TYPE_IP, payload=None):
+        datapath = ProtocolDesc(version=ofproto_v1_3.OFP_VERSION)
+        pkt = packet.Packet()
+        pkt.add_protocol(ethernet.ethernet(mac.BROADCAST_STR, src, ethertype))
+        for p in payload or []:
+            pkt.add_protocol(p)
+        pkt.serialize()
+        match = ofproto_v1_3_parser.OFPMatch(in_port=in_port)
+        return ofproto_v1_3_parser.OFPPacketIn(datapath, match=match,
+                                               data=buffer(pkt.data))
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(10, 2)
+        ok_(bucket.consume(0.0))
+        ok_(bucket.consume(0.0))
+        ok_(not bucket.consume(0.0))
+        ok_(bucket.consume(0.1))
+        ok_(not bucket.consume(0.1))
+
+    def test_port_rate_limit(self):
+        adm = PacketInAdmission(port_rate=1)
+        ok_(adm.admit(self._packet_in(in_port=1), now=0.0))
+        ok_(not adm.admit(self._packet_in(in_port=1), now=0.1))
+        ok_(adm.admit(self._packet_in(in_port=2), now=0.1))
+        ok_(adm.admit(self._packet_in(in_port=1), now=1.1))
+        eq_(3, adm.counters['admitted'])
+        eq_(1, adm.counters['dropped_port'])
+
+    def test_datapath_rate_limit(self):
+        adm = PacketInAdmission(dp_rate=1)
+        ok_(adm.admit(self._packet_in(in_port=1), now=0.0))
+        ok_(not adm.admit(self._packet_in(in_port=2), now=0.0))
+        eq_(1, adm.counters['dropped_datapath'])
+
+    def test_flooding_port(self):
+        adm = PacketInAdmission(dp_rate=10, port_rate=2)
+        admitted = []
+        for i in range(200):
+            now = i * 0.01
+            # port 1 floods at 100 pps, port 2 sends 2 pps
+            adm.admit(self._packet_in(in_port=1), now=now)
+            if i % 50 == 0:
+                admitted.append(adm.admit(self._packet_in(in_port=2),
+                                          now=now))
+        # the PacketIns dropped by the port bucket don't use up the
+        # tokens of the datapath
+        eq_([True] * 4, admitted)
+        eq_(0, adm.counters['dropped_datapath'])
+
+    def test_dedup(self):
+        adm = PacketInAdmission(dedup_ttl=1)
+        ok_(adm.admit(self._packet_in(), now=0.0))
+        ok_(not adm.admit(self._packet_in(), now=0.5))
+        ok_(adm.admit(self._packet_in(src='00:00:00:00:00:02'), now=0.5))
+        ok_(adm.admit(self._packet_in(), now=1.5))
+        eq_(1, adm.counters['dropped_duplicate'])
+
+    def test_priority(self):
+        adm = PacketInAdmission(dp_rate=1, dedup_ttl=1)
+        ok_(adm.admit(self._packet_in(), now=0.0))
+        ok_(not adm.admit(self._packet_in(), now=0.0))
+        ok_(adm.admit(self._packet_in(ethertype=ether.ETH_TYPE_LLDP),
+                      now=0.0))
+        ok_(adm.admit(self._packet_in(ethertype=ether.ETH_TYPE_ARP),
+                      now=0.0))
+        bfd = [ipv4.ipv4(proto=inet.IPPROTO_UDP),
+               udp.udp(src_port=49152, dst_port=3784)]
+        ok_(adm.admit(self._packet_in(payload=bfd), now=0.0))
+        eq_(3, adm.counters['priority'])
+
+        adm = PacketInAdmission(dp_rate=1, priority=False)
+        ok_(adm.admit(self._packet_in(ethertype=ether.ETH_TYPE_LLDP),
+                      now=0.0))
+        ok_(not adm.admit(self._packet_in(ethertype=ether.ETH_TYPE_LLDP),
+                          now=0.0))
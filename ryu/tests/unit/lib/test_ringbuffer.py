@@ -0,0 +1,57 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from nose.tools import *
+
+from ryu.lib.ringbuffer import RingBuffer
+
+
+class Test_ringbuffer(unittest.TestCase):
+    """ Test case for ryu.lib.ringbuffer
+    """
+
+    def test_append(self):
+        r = RingBuffer(3)
+        eq_(0, len(r))
+        eq_(None, r.latest())
+        r.append(1)
+        r.append(2)
+        eq_(2, len(r))
+        eq_([1, 2], list(r))
+        eq_(2, r.latest())
+
+    def test_wrap(self):
+        r = RingBuffer(3)
+        for i in range(5):
+            r.append(i)
+        eq_(3, len(r))
+        eq_([2, 3, 4], list(r))
+        eq_(2, r[0])
+        eq_(4, r[-1])
+        eq_(4, r.latest())
+
+    def test_index_error(self):
+        r = RingBuffer(3)
+        r.append(1)
+        assert_raises(IndexError, r.__getitem__, 1)
+        assert_raises(IndexError, r.__getitem__, -2)
+
+    def test_clear(self):
+        r = RingBuffer(2, 'L')
+        r.append(1)
+        r.clear()
+        eq_(0, len(r))
+        eq_([], list(r))
@@ -0,0 +1,86 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from nose.tools import *
+
+from ryu.lib.timerwheel import TimerWheel
+
+
+class Test_timerwheel(unittest.TestCase):
+    """ Test case for ryu.lib.timerwheel
+    """
+
+    def test_expire(self):
+        w = TimerWheel(1, slots=4, levels=2, now=0)
+        w.schedule('a', 2, now=0)
+        w.schedule('b', 3.5, now=0)
+        eq_(2, len(w))
+        eq_([], w.advance(1.9))
+        eq_(['a'], w.advance(2))
+        eq_([], w.advance(3.9))
+        eq_(['b'], w.advance(4))
+        eq_(0, len(w))
+        eq_(None, w.next_timeout(4))
+
+    def test_upper_levels(self):
+        # 4 slots and 2 levels cover 16 ticks, the rest is parked
+        w = TimerWheel(1, slots=4, levels=2, now=0)
+        delays = [5, 7, 15, 16, 40, 100]
+        for d in delays:
+            w.schedule(d, d, now=0)
+        expired = {}
+        for now in range(101):
+            for key in w.advance(now):
+                expired[key] = now
+        eq_(dict((d, d) for d in delays), expired)
+
+    def test_due(self):
+        w = TimerWheel(1, slots=4, levels=2, now=0)
+        w.advance(3)
+        w.schedule('a', 0, now=3)
+        eq_(0, w.next_timeout(3))
+        eq_(['a'], w.advance(3))
+
+    def test_cancel_and_reschedule(self):
+        w = TimerWheel(1, slots=4, levels=2, now=0)
+        w.schedule('a', 2, now=0)
+        w.schedule('b', 2, now=0)
+        w.cancel('b')
+        w.schedule('a', 6, now=0)
+        ok_('a' in w)
+        ok_('b' not in w)
+        eq_([], w.advance(5))
+        eq_(['a'], w.advance(6))
+
+    def test_next_timeout(self):
+        w = TimerWheel(1, slots=4, levels=2, now=0)
+        w.schedule('a', 2, now=0)
+        eq_(1.5, w.next_timeout(0.5))
+        w.advance(2)
+        w.schedule('b', 10, now=2)
+        # wakes up at the next cascade, then at the expiry
+        eq_(2, w.next_timeout(2))
+        w.advance(4)
+        w.advance(8)
+        eq_(4, w.next_timeout(8))
+        eq_(['b'], w.advance(12))
+
+    def test_clear(self):
+        w = TimerWheel(1, now=0)
+        w.schedule('a', 1, now=0)
+        w.clear()
+        eq_(0, len(w))
+        eq_([], w.advance(2))
@@ -1526,3 +1526,23 @@ class TestPacket(unittest.TestCase):
         ok_(isinstance(pkt.protocols[0], ethernet.ethernet))
         ok_(isinstance(pkt.protocols[1], ipv4.ipv4))
         ok_(isinstance(pkt.protocols[2], udp.udp))
+
+    def test_read_only_packet(self):
+        e = ethernet.ethernet(self.dst_mac, self.src_mac, ether.ETH_TYPE_IP)
+        i = ipv4.ipv4(src=self.src_ip, dst=self.dst_ip,
+                      proto=inet.IPPROTO_UDP)
+        u = udp.udp(self.src_port, self.dst_port)
+        p = e / i / u
+        p.serialize()
+
+        pkt = packet.ReadOnlyPacket(p.data)
+        ok_(isinstance(pkt, packet.Packet))
+        eq_(self.dst_ip, pkt.get_protocol(ipv4.ipv4).dst)
+        ok_(udp.udp in pkt)
+        eq_(str(packet.Packet(p.data)), str(pkt))
+
+        assert_raises(TypeError, pkt.add_protocol, self.payload)
+        assert_raises(TypeError, pkt.serialize)
+        assert_raises(TypeError, pkt.__setitem__, 0, self.payload)
+        assert_raises(TypeError, pkt.__delitem__, 0)
+        assert_raises(TypeError, lambda: pkt / self.payload)
@@ -0,0 +1,335 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gc
+import random
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp import processor
+from ryu.services.protocols.bgp.info_base.base import ASPathFilter
+from ryu.services.protocols.bgp.info_base.base import FilterList
+from ryu.services.protocols.bgp.info_base.base import PathAttrMap
+from ryu.services.protocols.bgp.info_base.base import PrefixFilter
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Table
+from ryu.services.protocols.bgp.info_base.rtc import RtcTable
+from ryu.services.protocols.bgp.info_base.vpnv4 import Vpnv4Path
+from ryu.services.protocols.bgp.info_base.vpnv4 import Vpnv4Table
+from ryu.services.protocols.bgp.info_base.ipv6 import Ipv6Path
+
+
+def _peer(remote_as, router_id):
+    peer = mock.Mock(remote_as=remote_as, version_num=1)
+    peer.protocol.recv_open_msg.bgp_identifier = router_id
+    return peer
+
+
+def _pattrs(as_path=[65001]):
+    return {bgp.BGP_ATTR_TYPE_AS_PATH: bgp.BGPPathAttributeAsPath([as_path]),
+            bgp.BGP_ATTR_TYPE_ORIGIN: bgp.BGPPathAttributeOrigin(0)}
+
+
+class Test_PathAttrMap(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.info_base.base.PathAttrMap
+    """
+
+    def test_mapping(self):
+        pattrs = _pattrs()
+        m = PathAttrMap(pattrs)
+        eq_(2, len(m))
+        # ordered by attribute type
+        eq_([bgp.BGP_ATTR_TYPE_ORIGIN, bgp.BGP_ATTR_TYPE_AS_PATH], list(m))
+        eq_(pattrs[bgp.BGP_ATTR_TYPE_ORIGIN], m[bgp.BGP_ATTR_TYPE_ORIGIN])
+        eq_(None, m.get(bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC))
+        ok_(not hasattr(m, '__setitem__'))
+
+        # the map doesn't change with the dict it was made from
+        del pattrs[bgp.BGP_ATTR_TYPE_ORIGIN]
+        eq_(2, len(m))
+
+    def test_eq(self):
+        m1 = PathAttrMap(_pattrs())
+        m2 = PathAttrMap(_pattrs())
+        m3 = PathAttrMap(_pattrs([65002]))
+        ok_(m1 == m2)
+        eq_(hash(m1), hash(m2))
+        ok_(m1 != m3)
+        ok_(m1 != PathAttrMap())
+
+    def test_intern(self):
+        m1 = PathAttrMap(_pattrs()).intern()
+        m2 = PathAttrMap(_pattrs()).intern()
+        ok_(m1 is m2)
+        ok_(m1.intern() is m1)
+        ok_(PathAttrMap(_pattrs([65002])).intern() is not m1)
+
+    def test_intern_collected(self):
+        m = PathAttrMap(_pattrs([65003])).intern()
+        n = len(PathAttrMap._internable_dict)
+        del m
+        gc.collect()
+        eq_(n - 1, len(PathAttrMap._internable_dict))
+
+
+class Test_Path(unittest.TestCase):
+    """ Test case for the path attributes of
+    ryu.services.protocols.bgp.info_base.base.Path
+    """
+
+    def _path(self, prefix, pattrs):
+        return Ipv4Path(None, bgp.IPAddrPrefix(24, prefix), 0,
+                        pattrs=pattrs, nexthop='10.0.0.1')
+
+    def test_shared(self):
+        pattrs = PathAttrMap(_pattrs()).intern()
+        p1 = self._path('10.0.0.0', pattrs)
+        p2 = self._path('10.0.1.0', pattrs)
+        ok_(p1.pathattrs is p2.pathattrs)
+        ok_(p1.clone().pathattrs is pattrs)
+        eq_(bgp.BGP_ATTR_TYPE_AS_PATH,
+            p1.get_pattr(bgp.BGP_ATTR_TYPE_AS_PATH).type)
+
+    def test_pathattr_map(self):
+        pattrs = PathAttrMap(_pattrs())
+        p = self._path('10.0.0.0', pattrs)
+        # pathattr_map is a copy which can be modified
+        m = p.pathattr_map
+        m[bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC] = \
+            bgp.BGPPathAttributeMultiExitDisc(100)
+        eq_(None, p.get_pattr(bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC))
+        eq_(2, len(pattrs))
+
+        # any mapping is copied
+        p = self._path('10.0.0.0', _pattrs())
+        ok_(isinstance(p.pathattrs, PathAttrMap))
+
+
+class Test_Table(unittest.TestCase):
+    """ Test case for the prefix index of
+    ryu.services.protocols.bgp.info_base.base.Table
+    """
+
+    prefixes = ['10.1.0.0/16', '10.0.0.0/8', '10.1.2.0/24', '192.168.0.0/24']
+
+    def setUp(self):
+        self.table = Ipv4Table(mock.Mock(), mock.Mock())
+        for prefix in self.prefixes:
+            addr, length = prefix.split('/')
+            nlri = bgp.IPAddrPrefix(int(length), addr)
+            self.table.insert(Ipv4Path(None, nlri, 0, pattrs=_pattrs(),
+                                       nexthop='10.0.0.1'))
+
+    def _prefixes(self, dests):
+        return [d.nlri.prefix for d in dests]
+
+    def test_itervalues(self):
+        # ordered by prefix
+        eq_(sorted(self.prefixes), self._prefixes(self.table.itervalues()))
+        eq_(set(self.prefixes), set(self.table.destinations))
+
+    def test_match(self):
+        eq_(['10.1.0.0/16'], self._prefixes(
+            self.table.match_exact('10.1.0.0/16')))
+        eq_([], self.table.match_exact('10.2.0.0/16'))
+        eq_(['10.1.2.0/24'], self._prefixes(
+            self.table.match_longest('10.1.2.1')))
+        eq_(['10.0.0.0/8'], self._prefixes(
+            self.table.match_longest('10.2.0.1')))
+        eq_([], self.table.match_longest('11.0.0.1'))
+        eq_(['10.1.0.0/16', '10.1.2.0/24'], self._prefixes(
+            self.table.match_longer('10.1.0.0/16')))
+
+        assert_raises(ValueError, self.table.match_exact, '10.1.0.0/33')
+        assert_raises(ValueError, self.table.match_longest, '10.1.0')
+        assert_raises(ValueError, self.table.match_longest, '2001:db8::1')
+        rtc_table = RtcTable(mock.Mock(), mock.Mock())
+        assert_raises(ValueError, rtc_table.match_longest, '10.1.0.1')
+
+    def test_delete(self):
+        nlri = bgp.IPAddrPrefix(16, '10.1.0.0')
+        dest = self.table.delete_dest_by_nlri(nlri)
+        eq_('10.1.0.0/16', dest.nlri.prefix)
+        eq_(['10.0.0.0/8'], self._prefixes(
+            self.table.match_longest('10.1.3.1')))
+        self.table.delete_dest(self.table.match_exact('10.0.0.0/8')[0])
+        eq_(['10.1.2.0/24', '192.168.0.0/24'],
+            self._prefixes(self.table.itervalues()))
+
+    def test_vpn(self):
+        table = Vpnv4Table(mock.Mock(), mock.Mock())
+        for route_dist in ['65000:200', '65000:100']:
+            for prefix in ['10.0.0.0/8', '10.1.0.0/16']:
+                addr, length = prefix.split('/')
+                nlri = bgp.LabelledVPNIPAddrPrefix(
+                    int(length), addr, labels=[100], route_dist=route_dist)
+                table.insert(Vpnv4Path(None, nlri, 0, pattrs=_pattrs(),
+                                       nexthop='10.0.0.1'))
+        eq_(['65000:100:10.0.0.0/8', '65000:100:10.1.0.0/16',
+             '65000:200:10.0.0.0/8', '65000:200:10.1.0.0/16'],
+            [d.nlri.formatted_nlri_str for d in table.itervalues()])
+        eq_(['65000:100:10.1.0.0/16', '65000:200:10.1.0.0/16'],
+            [d.nlri.formatted_nlri_str
+             for d in table.match_longest('10.1.0.1')])
+        eq_(['65000:200:10.1.0.0/16'],
+            [d.nlri.formatted_nlri_str
+             for d in table.match_longest('10.1.0.1', '65000:200')])
+
+
+class Test_Destination(unittest.TestCase):
+    """ Test case for the best path selection of
+    ryu.services.protocols.bgp.info_base.base.Destination
+    """
+
+    def setUp(self):
+        core_service = mock.Mock(asn=65000, router_id='10.0.0.1')
+        self.table = Ipv4Table(core_service, mock.Mock())
+        self.nlri = bgp.IPAddrPrefix(24, '10.1.0.0')
+
+    def _path(self, peer, as_path, is_withdraw=False):
+        if is_withdraw:
+            return Ipv4Path(peer, self.nlri, 1, is_withdraw=True)
+        return Ipv4Path(peer, self.nlri, 1, pattrs=_pattrs(as_path),
+                        nexthop='10.0.0.2')
+
+    def _process(self, *paths):
+        for path in paths:
+            dest = self.table.insert(path)
+        dest.process()
+        return dest
+
+    def test_best_path(self):
+        peers = [_peer(65000 + i, '10.0.0.%d' % i) for i in range(1, 4)]
+        p1 = self._path(peers[0], [65001, 65010])
+        dest = self._process(p1)
+        eq_(p1, dest.best_path)
+        eq_(processor.BPR_ONLY_PATH, dest.best_path_reason)
+
+        p2 = self._path(peers[1], [65002])
+        dest = self._process(p2)
+        eq_(p2, dest.best_path)
+        eq_(processor.BPR_ASPATH, dest.best_path_reason)
+
+        # the new path is only compared with the best path
+        p3 = self._path(peers[2], [65003, 65010])
+        with mock.patch.object(dest, '_compute_best_known_path') as m:
+            self._process(p3)
+            eq_(0, m.call_count)
+        eq_(p2, dest.best_path)
+        eq_(processor.BPR_ASPATH, dest.best_path_reason)
+        ok_(p1.best_path_key is not None)
+
+        # all the known paths are compared once the best path is withdrawn,
+        # the first best path wins
+        self._process(self._path(peers[1], None, is_withdraw=True))
+        eq_(p1, dest.best_path)
+        eq_(processor.BPR_UNKNOWN, dest.best_path_reason)
+        eq_([p1, p3], dest.known_path_list)
+
+        # a better path from the source of the best path
+        p4 = self._path(peers[0], [65001])
+        self._process(p4)
+        eq_(p4, dest.best_path)
+        eq_(processor.BPR_ASPATH, dest.best_path_reason)
+        eq_([p3, p4], dest.known_path_list)
+
+
+class Test_FilterList(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.info_base.base.FilterList
+    """
+
+    def _path(self, prefix):
+        addr, length = prefix.split('/')
+        if ':' in addr:
+            return Ipv6Path(None, bgp.IP6AddrPrefix(int(length), addr), 0,
+                            pattrs=_pattrs(), nexthop='::1')
+        return Ipv4Path(None, bgp.IPAddrPrefix(int(length), addr), 0,
+                        pattrs=_pattrs(), nexthop='10.0.0.1')
+
+    def _evaluate(self, filters, path):
+        # the filters evaluated one by one
+        for filter_ in filters:
+            if filter_.ROUTE_FAMILY != path.ROUTE_FAMILY:
+                continue
+            policy, is_matched = filter_.evaluate(path)
+            if policy == PrefixFilter.POLICY_PERMIT and is_matched:
+                return False, None
+            elif policy == PrefixFilter.POLICY_DENY and is_matched:
+                return True, filter_.prefix + ' - DENY'
+        return False, None
+
+    def test_evaluate(self):
+        permit = PrefixFilter.POLICY_PERMIT
+        deny = PrefixFilter.POLICY_DENY
+        filters = FilterList([
+            PrefixFilter('10.1.0.0/16', permit, ge=24, le=24),
+            ASPathFilter(65001, ASPathFilter.POLICY_INCLUDE),
+            PrefixFilter('10.0.0.0/8', deny, le=16),
+            PrefixFilter('10.1.2.0/24', deny),
+            PrefixFilter('2001:db8::/32', deny)])
+        eq_((False, None), filters.evaluate(self._path('10.1.2.0/24')))
+        eq_((True, '10.0.0.0/8 - DENY'),
+            filters.evaluate(self._path('10.1.0.0/16')))
+        eq_((True, '10.1.2.0/24 - DENY'),
+            filters.evaluate(self._path('10.1.2.0/25')))
+        eq_((False, None), filters.evaluate(self._path('10.2.0.0/24')))
+        eq_((False, None), filters.evaluate(self._path('11.0.0.0/8')))
+        # the filters are of the IPv4 unicast route family
+        eq_((False, None), filters.evaluate(self._path('2001:db8::/48')))
+        eq_((False, None), FilterList().evaluate(self._path('10.0.0.0/8')))
+
+    def test_random(self):
+        rand = random.Random(1)
+
+        def prefix(min_length, max_length):
+            # in 10.0.0.0/12 so that the filters overlap
+            length = rand.randint(min_length, max_length)
+            addr = 10 << 24 | rand.getrandbits(4) << 20 | rand.getrandbits(20)
+            addr &= ~((1 << (32 - length)) - 1)
+            return '%d.%d.%d.%d/%d' % (addr >> 24, (addr >> 16) & 0xff,
+                                       (addr >> 8) & 0xff, addr & 0xff,
+                                       length)
+
+        filters = []
+        for _ in range(200):
+            ge = rand.choice([None, 0, rand.randint(8, 32)])
+            le = rand.choice([None, 0, rand.randint(8, 32)])
+            policy = rand.choice([PrefixFilter.POLICY_PERMIT,
+                                  PrefixFilter.POLICY_DENY])
+            filters.append(PrefixFilter(prefix(8, 20), policy, ge=ge, le=le))
+        filter_list = FilterList(filters)
+        for _ in range(1000):
+            path = self._path(prefix(0, 32))
+            eq_(self._evaluate(filters, path), filter_list.evaluate(path))
+
+    def test_diff(self):
+        deny = PrefixFilter.POLICY_DENY
+        f1 = PrefixFilter('10.1.0.0/16', deny)
+        f2 = PrefixFilter('10.2.0.0/16', deny)
+        f3 = PrefixFilter('10.3.0.0/16', deny)
+        changes = FilterList([f1, f2]).diff(
+            FilterList([f1.clone(), f3]))
+        eq_([f2, f3], sorted(changes.filters))
+        ok_(not changes.matches(self._path('10.1.0.0/24')))
+        ok_(changes.matches(self._path('10.2.0.0/24')))
+        ok_(changes.matches(self._path('10.3.0.0/24')))
+        # the policy changed
+        changes = FilterList([f1]).diff(FilterList([
+            PrefixFilter('10.1.0.0/16', PrefixFilter.POLICY_PERMIT)]))
+        ok_(changes.matches(self._path('10.1.0.0/24')))
+        eq_([], FilterList([f1, f2]).diff(FilterList([f1, f2])).filters)
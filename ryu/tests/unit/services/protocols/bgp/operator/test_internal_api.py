@@ -0,0 +1,67 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Table
+from ryu.services.protocols.bgp.operator import internal_api
+
+
+class Test_InternalApi(unittest.TestCase):
+    """ Test case for the RIB queries of
+    ryu.services.protocols.bgp.operator.internal_api.InternalApi
+    """
+
+    prefixes = ['10.1.0.0/16', '10.0.0.0/8', '10.1.2.0/24']
+
+    def setUp(self):
+        table = Ipv4Table(mock.Mock(), mock.Mock())
+        pattrs = {
+            bgp.BGP_ATTR_TYPE_AS_PATH: bgp.BGPPathAttributeAsPath([[65001]]),
+            bgp.BGP_ATTR_TYPE_ORIGIN: bgp.BGPPathAttributeOrigin(0)}
+        for prefix in self.prefixes:
+            addr, length = prefix.split('/')
+            nlri = bgp.IPAddrPrefix(int(length), addr)
+            dest = table.insert(Ipv4Path(None, nlri, 0, pattrs=pattrs,
+                                         nexthop='10.0.0.1'))
+            dest._known_path_list = dest._new_path_list
+        self.api = internal_api.InternalApi()
+        core_service = mock.Mock()
+        tm = core_service.table_manager
+        tm.get_global_table_by_route_family.return_value = table
+        self.api.get_core_service = mock.Mock(return_value=core_service)
+
+    def _prefixes(self, *args):
+        routes = self.api.get_single_rib_routes('ipv4', *args)
+        return [r['prefix'] for r in routes]
+
+    def test_all(self):
+        eq_(['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24'], self._prefixes())
+        route = self.api.get_single_rib_routes('ipv4')[0]
+        eq_([65001], route['paths'][0]['aspath'])
+
+    def test_prefix(self):
+        eq_(['10.1.0.0/16'], self._prefixes('10.1.0.0/16'))
+        eq_(['10.1.0.0/16'], self._prefixes('10.1.3.1'))
+        eq_(['10.1.0.0/16', '10.1.2.0/24'],
+            self._prefixes('10.1.0.0/16', True))
+        eq_([], self._prefixes('10.2.0.0/16'))
+        assert_raises(internal_api.WrongParamError,
+                      self._prefixes, '10.1.0.0/40')
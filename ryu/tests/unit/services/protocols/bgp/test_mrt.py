@@ -0,0 +1,263 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import mock
+from nose.tools import *
+
+from ryu.lib import mrtlib
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp import mrt
+from ryu.services.protocols.bgp.core_managers.table_manager import \
+    TableCoreManager
+from ryu.services.protocols.bgp.info_base import base
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.info_base.ipv6 import Ipv6Path
+from ryu.services.protocols.bgp.info_base.vpnv4 import Vpnv4Path
+from ryu.services.protocols.bgp.rtconf.vrfs import VRF_RF_IPV4
+from ryu.services.protocols.bgp.signals.emit import BgpSignalBus
+
+
+def _peer(ip_address, remote_as, router_id):
+    peer = mock.Mock(ip_address=ip_address, remote_as=remote_as,
+                     version_num=1, host_bind_ip='10.0.0.1')
+    peer.protocol.recv_open_msg.bgp_identifier = router_id
+    return peer
+
+
+def _pattrs(as_path, med=None):
+    as_path = bgp.BGPPathAttributeAsPath([as_path] if as_path else [])
+    pattrs = {bgp.BGP_ATTR_TYPE_AS_PATH: as_path,
+              bgp.BGP_ATTR_TYPE_ORIGIN: bgp.BGPPathAttributeOrigin(0)}
+    if med is not None:
+        pattrs[bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC] = \
+            bgp.BGPPathAttributeMultiExitDisc(med)
+    return pattrs
+
+
+def _core_service():
+    core_service = mock.Mock(asn=65000, router_id='10.0.0.1',
+                             mrt_sources={})
+    core_service.table_manager = TableCoreManager(
+        core_service, mock.Mock(label_range=(100, 200)))
+    return core_service
+
+
+class Test_Mrt(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.mrt
+    """
+
+    def setUp(self):
+        self.core_service = _core_service()
+        self.peers = [_peer('10.0.0.2', 65001, '10.0.0.2'),
+                      _peer('10.0.0.3', 70000, '10.0.0.3')]
+        paths = []
+        for i in range(3):
+            nlri = bgp.IPAddrPrefix(24, '10.%d.0.0' % i)
+            pattrs = _pattrs([65001])
+            pattrs[bgp.BGP_ATTR_TYPE_NEXT_HOP] = \
+                bgp.BGPPathAttributeNextHop('10.0.0.2')
+            paths.append(Ipv4Path(self.peers[0], nlri, 1, pattrs=pattrs,
+                                  nexthop='10.0.0.2'))
+            paths.append(Ipv4Path(self.peers[1], nlri, 1,
+                                  pattrs=_pattrs([70000, 65003], i),
+                                  nexthop='10.0.0.3'))
+        nlri = bgp.IP6AddrPrefix(48, '2001:db8:1::')
+        paths.append(Ipv6Path(None, nlri, 1, pattrs=_pattrs([]),
+                              nexthop='2001:db8::1'))
+        nlri = bgp.LabelledVPNIPAddrPrefix(24, '10.1.0.0', labels=[100],
+                                           route_dist='65000:1')
+        paths.append(Vpnv4Path(self.peers[1], nlri, 1,
+                               pattrs=_pattrs([70000]), nexthop='10.0.0.3'))
+        self.paths = paths
+
+    def _dests(self, core_service):
+        dests = []
+        for table in core_service.table_manager.global_tables.values():
+            dests.extend(table.itervalues())
+        return sorted(dests, key=lambda d: d.nlri.formatted_nlri_str)
+
+    def test_bulk_load(self):
+        tm = self.core_service.table_manager
+        eq_(5, tm.bulk_load(self.paths))
+        # the destinations are processed without being signaled
+        eq_(0, self.core_service.signal_bus.dest_changed.call_count)
+        dests = self._dests(self.core_service)
+        eq_(['10.0.0.0/24', '10.1.0.0/24', '10.2.0.0/24',
+             '2001:db8:1::/48', '65000:1:10.1.0.0/24'],
+            [d.nlri.formatted_nlri_str for d in dests])
+        eq_([self.paths[0], self.paths[2], self.paths[4], self.paths[6],
+             self.paths[7]], [d.best_path for d in dests])
+
+    def test_dump_and_load(self):
+        self.core_service.table_manager.bulk_load(self.paths)
+        vrf_conf = mock.Mock(route_family=VRF_RF_IPV4, route_dist='65000:1',
+                             import_rts=[], import_maps=[])
+        vrf_table = self.core_service.table_manager.create_and_link_vrf_table(
+            vrf_conf)
+        vrf_table.import_vpn_path(self.paths[7])
+        for dest in vrf_table.itervalues():
+            dest.process()
+
+        f = StringIO()
+        eq_(6, mrt.dump_tables(self.core_service, f))
+        records = list(mrtlib.Reader(StringIO(f.getvalue())))
+        eq_([mrtlib.PeerIndexTable] + [mrtlib.RibRecord] * 3 +
+            [mrtlib.PeerIndexTable, mrtlib.RibRecord] * 3,
+            [r.__class__ for r in records])
+        eq_(['', '', '', '65000:1'],
+            [r.view_name for r in records
+             if isinstance(r, mrtlib.PeerIndexTable)])
+        eq_([('10.0.0.2', 65001), ('10.0.0.3', 70000)],
+            [(p.ip_addr, p.as_num) for p in records[0].peers])
+        eq_([('10.0.0.1', '0.0.0.0', 65000)],
+            [(p.bgp_id, p.ip_addr, p.as_num) for p in records[4].peers])
+
+        core_service = _core_service()
+        eq_(5, mrt.load_tables(core_service, StringIO(f.getvalue())))
+        dests = self._dests(core_service)
+        eq_([d.nlri.formatted_nlri_str for d in self._dests(
+            self.core_service)], [d.nlri.formatted_nlri_str for d in dests])
+        for dest, orig in zip(dests, self._dests(self.core_service)):
+            eq_(len(orig.known_path_list), len(dest.known_path_list))
+            best, orig_best = dest.best_path, orig.best_path
+            eq_(orig_best.nexthop, best.nexthop)
+            eq_(orig_best.get_pattr(bgp.BGP_ATTR_TYPE_AS_PATH).value,
+                best.get_pattr(bgp.BGP_ATTR_TYPE_AS_PATH).value)
+            if orig_best.source is None:
+                eq_(None, best.source)
+            else:
+                eq_(orig_best.source.remote_as, best.source.remote_as)
+                eq_(orig_best.source.ip_address, best.source.ip_address)
+        # the attributes of the IPv4 paths of each peer are shared
+        ipv4_paths = [dest.known_path_list[0] for dest in dests[:3]]
+        ok_(ipv4_paths[0].pathattrs is ipv4_paths[1].pathattrs)
+        # the sources are shared by the tables
+        ok_(dests[-1].best_path.source is dests[0].known_path_list[1].source)
+
+    def test_yield(self):
+        with mock.patch.object(base, 'YIELD_INTERVAL', 2), \
+                mock.patch.object(base.hub, 'sleep') as sleep:
+            self.core_service.table_manager.bulk_load(self.paths)
+        # after 2, 4 and 6 IPv4 paths, and after 2 IPv4 destinations
+        eq_(4, sleep.call_count)
+
+        with mock.patch.object(mrt, 'YIELD_INTERVAL', 2), \
+                mock.patch.object(mrt.hub, 'sleep') as sleep:
+            mrt.dump_tables(self.core_service, StringIO())
+        # before the third IPv4 destination
+        eq_(1, sleep.call_count)
+
+    def test_dump_table_change(self):
+        tm = self.core_service.table_manager
+        tm.bulk_load(self.paths)
+        source = _peer('10.0.0.4', 65004, '10.0.0.4')
+
+        def add_path(_seconds):
+            # a peer comes up while the dump yields
+            nlri = bgp.IPAddrPrefix(24, '10.2.0.0')
+            tm.bulk_load([Ipv4Path(source, nlri, 1, pattrs=_pattrs([65004]),
+                                   nexthop='10.0.0.4')])
+
+        f = StringIO()
+        with mock.patch.object(mrt, 'YIELD_INTERVAL', 2), \
+                mock.patch.object(mrt.hub, 'sleep', side_effect=add_path):
+            eq_(5, mrt.dump_tables(self.core_service, f))
+        records = list(mrtlib.Reader(StringIO(f.getvalue())))
+        # the path of the new peer isn't in the dump
+        eq_(2, len(records[0].peers))
+        eq_(2, len(records[3].entries))
+
+    def test_reload(self):
+        self.core_service.table_manager.bulk_load(self.paths)
+        f = StringIO()
+        mrt.dump_tables(self.core_service, f)
+        # a dump without the path of the first peer to 10.2.0.0/24
+        core_service = _core_service()
+        core_service.table_manager.bulk_load(self.paths[:4] + self.paths[5:])
+        f_partial = StringIO()
+        mrt.dump_tables(core_service, f_partial)
+
+        core_service = _core_service()
+        mrt.load_tables(core_service, StringIO(f.getvalue()))
+        sources = dict(core_service.mrt_sources)
+        eq_(2, len(sources))
+        # the paths of the first load are replaced, not doubled
+        mrt.load_tables(core_service, StringIO(f.getvalue()))
+        eq_(sources, core_service.mrt_sources)
+        eq_([2, 2, 2, 1, 1], [len(d.known_path_list)
+                              for d in self._dests(core_service)])
+
+        mrt.load_tables(core_service, StringIO(f_partial.getvalue()))
+        eq_([2, 2, 1, 1, 1], [len(d.known_path_list)
+                              for d in self._dests(core_service)])
+        eq_([2, 2], [s.version_num for s in sources.values()])
+
+    def test_mrt_source(self):
+        source = mrt.MrtSource(mrtlib.MrtPeer('10.0.0.3', '10.0.0.3', 70000))
+        eq_(70000, source.remote_as)
+        eq_(bgp.AS_TRANS, source.protocol.recv_open_msg.my_as)
+        eq_('10.0.0.3', source.protocol.recv_open_msg.bgp_identifier)
+        # the paths of a source are cleaned up as the paths of a peer
+        table = self.core_service.table_manager.get_ipv4_table()
+        nlri = bgp.IPAddrPrefix(24, '10.0.0.0')
+        table.bulk_load([Ipv4Path(source, nlri, source.version_num,
+                                  pattrs=_pattrs([70000]),
+                                  nexthop='10.0.0.3')])
+        eq_(1, len(list(table.itervalues())[0].known_path_list))
+        source.version_num += 1
+        table.cleanup_paths_for_peer(source)
+        eq_(0, len(list(table.itervalues())[0].known_path_list))
+
+
+class Test_MrtRecorder(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.mrt.MrtRecorder
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, 'updates.mrt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_record(self):
+        signal_bus = BgpSignalBus()
+        core_service = mock.Mock(asn=65000, signal_bus=signal_bus)
+        peer = _peer('10.0.0.2', 65001, '10.0.0.2')
+        update = bgp.BGPUpdate(
+            path_attributes=[bgp.BGPPathAttributeOrigin(0)],
+            nlri=[bgp.IPAddrPrefix(24, '10.1.0.0')])
+
+        recorder = mrt.MrtRecorder(core_service, self.filename)
+        signal_bus.update_received(peer, update)
+        signal_bus.update_received(peer, update)
+        recorder.stop()
+        # not recorded any more
+        signal_bus.update_received(peer, update)
+
+        with open(self.filename, 'rb') as f:
+            records = list(mrtlib.Reader(f))
+        eq_(2, len(records))
+        record = records[0]
+        eq_((65001, 65000, '10.0.0.2', '10.0.0.1'),
+            (record.peer_as, record.local_as, record.peer_ip,
+             record.local_ip))
+        eq_(['10.1.0.0/24'], [n.prefix for n in record.message.nlri])
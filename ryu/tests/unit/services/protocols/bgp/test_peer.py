@@ -0,0 +1,229 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp import peer
+from ryu.services.protocols.bgp.base import Sink
+from ryu.services.protocols.bgp.info_base.base import FilterList
+from ryu.services.protocols.bgp.info_base.base import PrefixFilter
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.model import OutgoingRoute
+
+
+def _path(prefix, is_withdraw=False):
+    nlri = bgp.IPAddrPrefix(24, prefix)
+    if is_withdraw:
+        return Ipv4Path(None, nlri, 0, is_withdraw=True)
+    pattrs = {bgp.BGP_ATTR_TYPE_ORIGIN: bgp.BGPPathAttributeOrigin(0)}
+    return Ipv4Path(None, nlri, 0, pattrs=pattrs, nexthop='10.0.0.1')
+
+
+def _construct_update(outgoing_route):
+    path = outgoing_route.path
+    if path.is_withdraw:
+        return bgp.BGPUpdate(withdrawn_routes=[
+            bgp.BGPWithdrawnRoute(path.nlri.length, path.nlri.addr)])
+    attrs = [bgp.BGPPathAttributeNextHop('10.0.0.1'),
+             bgp.BGPPathAttributeOrigin(0),
+             bgp.BGPPathAttributeAsPath([[65001]])]
+    return bgp.BGPUpdate(path_attributes=attrs, nlri=[path.nlri])
+
+
+class Test_Peer(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.peer.Peer
+    """
+
+    def setUp(self):
+        p = peer.Peer.__new__(peer.Peer)
+        p.version_num = 1
+        p.outgoing_msg_list = Sink.OutgoingMsgList()
+        p.outgoing_msg_event = mock.Mock()
+        p.messages_queued = 0
+        p._queued_routes = {}
+        p._next_round_time = 0
+        p._round_sent = False
+        p._adj_rib_out = {}
+        p._signal_bus = mock.Mock()
+        p._core_service = mock.Mock()
+        p._protocol = mock.Mock()
+        p.state = mock.Mock()
+        p._apply_out_filter = mock.Mock(return_value=(False, None))
+        p._construct_update = _construct_update
+        self.peer = p
+
+    def _sent(self):
+        return [c[0][0] for c in self.peer._protocol.send.call_args_list]
+
+    def test_pop_outgoing_routes(self):
+        routes = [OutgoingRoute(_path('10.0.%d.0' % i)) for i in range(3)]
+        rr = bgp.BGPRouteRefresh(1, 1)
+        for msg in routes[1:] + [rr]:
+            self.peer.outgoing_msg_list.append(msg)
+        eq_(routes, self.peer._pop_outgoing_routes(routes[0]))
+        # the other messages are kept in the queue
+        eq_(rr, self.peer.outgoing_msg_list.pop_first())
+
+    def _queued(self):
+        return list(self.peer.outgoing_msg_list)
+
+    def test_enque_outgoing_msg(self):
+        routes = [OutgoingRoute(_path('10.0.0.0')),
+                  OutgoingRoute(_path('10.0.1.0')),
+                  OutgoingRoute(_path('10.0.0.0', is_withdraw=True))]
+        for route in routes:
+            self.peer.enque_outgoing_msg(route)
+        # the last route of a prefix takes the place of the first one
+        eq_([routes[2], routes[1]], self._queued())
+        self.peer.state.incr.assert_called_once_with(
+            peer.PeerCounterNames.SUPPRESSED_UPDATES)
+
+    def test_enque_outgoing_msg_eor(self):
+        routes = [OutgoingRoute(_path('10.0.0.0')),
+                  OutgoingRoute(_path('10.0.0.0', is_withdraw=True))]
+        eor = bgp.BGPUpdate()
+        self.peer.enque_outgoing_msg(routes[0])
+        self.peer.enque_outgoing_msg(eor)
+        self.peer.enque_outgoing_msg(routes[1])
+        # a route isn't moved before an EOR queued after it
+        eq_([routes[0], eor, routes[1]], self._queued())
+        eq_(0, self.peer.state.incr.call_count)
+
+    def test_enque_outgoing_msg_sent(self):
+        routes = [OutgoingRoute(_path('10.0.%d.0' % i)) for i in range(2)]
+        for route in routes:
+            self.peer.enque_outgoing_msg(route)
+        self.peer._send_outgoing_routes(
+            self.peer._pop_outgoing_routes(
+                self.peer.outgoing_msg_list.pop_first()))
+        eq_({}, self.peer._queued_routes)
+        route = OutgoingRoute(_path('10.0.0.0', is_withdraw=True))
+        self.peer.enque_outgoing_msg(route)
+        eq_([route], self._queued())
+
+    @mock.patch('ryu.services.protocols.bgp.peer.time')
+    def test_advertisement_interval(self, time_mock):
+        now = [100.0]
+        time_mock.time.side_effect = lambda: now[0]
+
+        def pause(seconds):
+            now[0] += seconds
+        routes = [OutgoingRoute(_path('10.0.%d.0' % i)) for i in range(3)]
+
+        def wait():
+            # routes are queued 5 seconds after the queue is emptied the
+            # first time
+            if len(sent_times) > 1:
+                raise StopIteration
+            now[0] += 5
+            for route in routes[1:]:
+                self.peer.enque_outgoing_msg(route)
+        sent_times = []
+        self.peer._protocol.send.side_effect = \
+            lambda _: sent_times.append(now[0])
+        self.peer._neigh_conf = mock.Mock(advertisement_interval=30)
+        self.peer.pause = pause
+        self.peer.outgoing_msg_event.wait.side_effect = wait
+        self.peer.enque_outgoing_msg(routes[0])
+        assert_raises(StopIteration, self.peer._process_outgoing_msg_list)
+        # the routes queued meanwhile are sent together 30 seconds after
+        # the first one
+        eq_([100.0, 130.0], sent_times)
+        eq_(2, len(self._sent()[1].nlri))
+        eq_(160.0, self.peer._next_round_time)
+
+    def test_send_outgoing_routes(self):
+        routes = [OutgoingRoute(_path('10.0.%d.0' % i)) for i in range(100)]
+        self.peer._send_outgoing_routes(routes)
+        sent = self._sent()
+        eq_(1, len(sent))
+        eq_(100, len(sent[0].nlri))
+        eq_(100, len(self.peer._adj_rib_out))
+        tm = self.peer._core_service.table_manager
+        eq_(100, tm.remember_sent_route.call_count)
+        eq_(1, self.peer.state.incr.call_count)
+
+    def test_send_outgoing_routes_same_prefix(self):
+        # only the last route of a prefix is sent
+        routes = [OutgoingRoute(_path('10.0.0.0')),
+                  OutgoingRoute(_path('10.0.1.0')),
+                  OutgoingRoute(_path('10.0.0.0', is_withdraw=True))]
+        self.peer._send_outgoing_routes(routes)
+        sent = self._sent()
+        eq_(2, len(sent))
+        eq_(['10.0.1.0'], [n.addr for u in sent for n in u.nlri])
+        eq_(['10.0.0.0'], [n.addr for u in sent for n in u.withdrawn_routes])
+        sent_route = self.peer._adj_rib_out['10.0.0.0/24']
+        ok_(sent_route.path.is_withdraw)
+
+    def test_send_outgoing_routes_blocked(self):
+        routes = [OutgoingRoute(_path('10.0.0.0')),
+                  OutgoingRoute(_path('10.0.1.0'))]
+        self.peer._apply_out_filter.side_effect = [(False, None),
+                                                   (True, 'filter')]
+        self.peer._send_outgoing_routes(routes)
+        sent = self._sent()
+        eq_(['10.0.0.0'], [n.addr for u in sent for n in u.nlri])
+        ok_(self.peer._adj_rib_out['10.0.1.0/24'].filtered)
+
+    def test_on_update_out_filter(self):
+        self.peer._out_filters = []
+        self.peer._out_filter_list = FilterList()
+        self.peer._apply_out_filter = mock.Mock(
+            wraps=peer.Peer._apply_out_filter.__get__(self.peer))
+        routes = [OutgoingRoute(_path('10.0.%d.0' % i)) for i in range(3)]
+        self.peer._send_outgoing_routes(routes)
+        self.peer._apply_out_filter.reset_mock()
+        self.peer.enque_outgoing_msg = mock.Mock()
+
+        self.peer.out_filters = [
+            PrefixFilter('10.0.1.0/24', PrefixFilter.POLICY_DENY)]
+        # only the path matched by the new filter is evaluated again
+        eq_(1, self.peer._apply_out_filter.call_count)
+        route = self.peer.enque_outgoing_msg.call_args[0][0]
+        ok_(route.path.is_withdraw)
+        eq_('10.0.1.0/24', route.path.nlri.formatted_nlri_str)
+        ok_(self.peer._adj_rib_out['10.0.1.0/24'].filtered)
+
+        # the blocked path is sent again once the filter is removed
+        self.peer.out_filters = []
+        route = self.peer.enque_outgoing_msg.call_args[0][0]
+        ok_(not route.path.is_withdraw)
+        eq_('10.0.1.0/24', route.path.nlri.formatted_nlri_str)
+        eq_(2, self.peer.enque_outgoing_msg.call_count)
+
+    def test_extract_shared_pathattrs(self):
+        self.peer._common_conf = mock.Mock(local_as=65000)
+        self.peer._neigh_conf = mock.Mock()
+        self.peer._adj_rib_in = {}
+        self.peer._apply_in_filter = mock.Mock(return_value=(False, None))
+        for i in range(2):
+            attrs = [bgp.BGPPathAttributeNextHop('10.0.0.1'),
+                     bgp.BGPPathAttributeOrigin(0),
+                     bgp.BGPPathAttributeAsPath([[65001]])]
+            nlri = [bgp.IPAddrPrefix(24, '10.%d.%d.0' % (i, j))
+                    for j in range(2)]
+            update = bgp.BGPUpdate(path_attributes=attrs, nlri=nlri)
+            self.peer._extract_and_handle_bgp4_new_paths(update)
+        tm = self.peer._core_service.table_manager
+        paths = [c[0][0] for c in tm.learn_path.call_args_list]
+        eq_(4, len(paths))
+        # the paths of both UPDATEs share one set of path attributes
+        for path in paths[1:]:
+            ok_(path.pathattrs is paths[0].pathattrs)
@@ -0,0 +1,58 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.core_managers.peer_manager import \
+    PeerManager
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+
+
+class Test_PeerManager(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.core_managers.peer_manager
+    """
+
+    def _resend_sent(self, med):
+        nlri = bgp.IPAddrPrefix(24, '10.1.0.0')
+        pattrs = {bgp.BGP_ATTR_TYPE_ORIGIN: bgp.BGPPathAttributeOrigin(0)}
+        path = Ipv4Path(None, nlri, 0, pattrs=pattrs, nexthop='10.0.0.1')
+        peer = mock.Mock(med=med)
+        dest = mock.Mock(sent_routes=[mock.Mock(sent_peer=peer, path=path)])
+        core_service = mock.Mock()
+        core_service.table_manager.get_global_table_by_route_family.\
+            return_value.itervalues.return_value = [dest]
+
+        peer_manager = PeerManager(core_service, None)
+        peer_manager._peers['10.0.0.2'] = peer
+        peer_manager.resend_sent(bgp.RF_IPv4_UC, peer)
+        eq_(1, peer.enque_outgoing_msg.call_count)
+        outgoing_route = peer.enque_outgoing_msg.call_args[0][0]
+        ok_(outgoing_route.for_route_refresh)
+        return path, outgoing_route.path
+
+    def test_resend_sent(self):
+        # a path without MED is sent again as is to a peer without MED
+        path, sent_path = self._resend_sent(None)
+        ok_(sent_path is path)
+
+    def test_resend_sent_med(self):
+        path, sent_path = self._resend_sent(100)
+        eq_(100, sent_path.get_pattr(
+            bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC).value)
+        ok_(sent_path.med_set_by_target_neighbor)
@@ -0,0 +1,198 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp import processor
+from ryu.services.protocols.bgp.info_base.base import FilterList
+from ryu.services.protocols.bgp.info_base.base import PrefixFilter
+from ryu.services.protocols.bgp.info_base.ipv4 import IPv4Dest
+from ryu.services.protocols.bgp.info_base.ipv4 import Ipv4Path
+from ryu.services.protocols.bgp.utils import stats
+
+LOCAL_AS = 65000
+LOCAL_ID = '10.0.0.1'
+
+
+def _peer(remote_as, router_id):
+    peer = mock.Mock(remote_as=remote_as, version_num=1)
+    peer.protocol.recv_open_msg.bgp_identifier = router_id
+    peer.protocol.sent_open_msg.bgp_identifier = LOCAL_ID
+    return peer
+
+
+def _path(source, as_path=[65001], origin=bgp.BGP_ATTR_ORIGIN_IGP,
+          local_pref=None, med=None):
+    pattrs = {bgp.BGP_ATTR_TYPE_AS_PATH: bgp.BGPPathAttributeAsPath([as_path]),
+              bgp.BGP_ATTR_TYPE_ORIGIN: bgp.BGPPathAttributeOrigin(origin)}
+    if local_pref is not None:
+        pattrs[bgp.BGP_ATTR_TYPE_LOCAL_PREF] = \
+            bgp.BGPPathAttributeLocalPref(local_pref)
+    if med is not None:
+        pattrs[bgp.BGP_ATTR_TYPE_MULTI_EXIT_DISC] = \
+            bgp.BGPPathAttributeMultiExitDisc(med)
+    return Ipv4Path(source, bgp.IPAddrPrefix(24, '10.1.0.0'), 1,
+                    pattrs=pattrs, nexthop='10.0.0.2')
+
+
+class Test_BestPath(unittest.TestCase):
+    """ Test case for the best path selection of
+    ryu.services.protocols.bgp.processor
+    """
+
+    ebgp1 = _peer(65001, '10.0.0.3')
+    ebgp2 = _peer(65002, '10.0.0.2')
+    ibgp1 = _peer(LOCAL_AS, '10.0.0.3')
+    ibgp2 = _peer(LOCAL_AS, '10.0.0.2')
+
+    def _best(self, path1, path2, best, reason):
+        eq_((best, reason),
+            processor.compute_best_path(LOCAL_AS, path1, path2))
+        # the order of the paths doesn't matter
+        eq_((best, reason),
+            processor.compute_best_path(LOCAL_AS, path2, path1))
+
+    def test_steps(self):
+        def test(path1, path2, reason):
+            self._best(path1, path2, path1, reason)
+
+        test(_path(self.ebgp1, local_pref=200), _path(None),
+             processor.BPR_LOCAL_PREF)
+        # a path without local-pref has the default local-pref
+        test(_path(self.ebgp1), _path(self.ebgp2, local_pref=50),
+             processor.BPR_LOCAL_PREF)
+        test(_path(None, as_path=[65001, 65002]), _path(self.ebgp1),
+             processor.BPR_LOCAL_ORIGIN)
+        test(_path(self.ebgp1), _path(self.ebgp2, as_path=[65002, 65003]),
+             processor.BPR_ASPATH)
+        test(_path(self.ebgp1, origin=bgp.BGP_ATTR_ORIGIN_EGP),
+             _path(self.ebgp2, origin=bgp.BGP_ATTR_ORIGIN_INCOMPLETE),
+             processor.BPR_ORIGIN)
+        # a path without MED has a MED of 0
+        test(_path(self.ebgp1), _path(self.ebgp2, med=10),
+             processor.BPR_MED)
+        test(_path(self.ebgp1), _path(self.ibgp2), processor.BPR_ASN)
+        test(_path(self.ibgp2), _path(self.ibgp1), processor.BPR_ROUTER_ID)
+        test(_path(None), _path(self.ibgp2), processor.BPR_LOCAL_ORIGIN)
+
+    def test_tie(self):
+        # eBGP paths aren't tie broken by router id
+        self._best(_path(self.ebgp1), _path(self.ebgp2), None,
+                   processor.BPR_UNKNOWN)
+        self._best(_path(None), _path(None), None, processor.BPR_UNKNOWN)
+
+    def test_key(self):
+        path = _path(self.ibgp2, as_path=[65001, 65002], med=5)
+        eq_((processor.DEFAULT_LOCAL_PREF, 0, -2, 3, -5, 0, -0x0a000002),
+            processor.best_path_key(LOCAL_AS, LOCAL_ID, path))
+        eq_((processor.DEFAULT_LOCAL_PREF, 1, -1, 3, 0, 0, -0x0a000001),
+            processor.best_path_key(LOCAL_AS, LOCAL_ID, _path(None)))
+        eq_(0, processor.best_path_key(LOCAL_AS, LOCAL_ID,
+                                       _path(self.ebgp1))[-1])
+
+
+class Test_BgpProcessor(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.processor.BgpProcessor
+    """
+
+    def setUp(self):
+        self.table = mock.Mock(route_family=bgp.RF_IPv4_UC)
+        # prefixes of the destinations in the order they are processed
+        self.processed = []
+
+    def _dest(self, prefix, withdraw=False):
+        addr, length = prefix.split('/')
+        dest = IPv4Dest(self.table, bgp.IPAddrPrefix(int(length), addr))
+        if withdraw:
+            dest._withdraw_list.append(mock.Mock())
+        dest.process = lambda: self.processed.append(prefix)
+        return dest
+
+    def test_priority(self):
+        loopbacks = FilterList([PrefixFilter('0.0.0.0/0',
+                                             PrefixFilter.POLICY_PERMIT,
+                                             ge=32)])
+        bgp_processor = processor.BgpProcessor(None, 2,
+                                               priority_filter=loopbacks)
+        for prefix in ['10.1.0.0/24', '10.2.0.0/24', '10.0.0.1/32']:
+            bgp_processor.enqueue(self._dest(prefix))
+        bgp_processor.enqueue(self._dest('10.3.0.0/24', withdraw=True))
+        eq_(4, bgp_processor.backlog)
+        bgp_processor._process_dest()
+        eq_(['10.0.0.1/32', '10.3.0.0/24'], self.processed)
+        bgp_processor._process_dest()
+        eq_(['10.1.0.0/24', '10.2.0.0/24'], self.processed[2:])
+        eq_(0, bgp_processor.backlog)
+
+    def test_promote(self):
+        bgp_processor = processor.BgpProcessor(None, 1)
+        dest1 = self._dest('10.1.0.0/24')
+        dest2 = self._dest('10.2.0.0/24')
+        bgp_processor.enqueue(dest1)
+        bgp_processor.enqueue(dest2)
+        # a queued destination with a path withdrawn moves to the priority
+        # lane, once
+        dest2._withdraw_list.append(mock.Mock())
+        bgp_processor.enqueue(dest2)
+        bgp_processor.enqueue(dest2)
+        summary = bgp_processor.get_stats_summary_dict()
+        eq_((1, 1), (summary[stats.PROCESSOR_BACKLOG],
+                     summary[stats.PROCESSOR_PRIORITY_BACKLOG]))
+        bgp_processor._process_dest()
+        bgp_processor._process_dest()
+        eq_(['10.2.0.0/24', '10.1.0.0/24'], self.processed)
+        ok_(bgp_processor._dest_queue.is_empty())
+        ok_(bgp_processor._prio_dest_queue.is_empty())
+
+    @mock.patch('ryu.services.protocols.bgp.processor.time')
+    def test_adaptive(self, time_mock):
+        now = [100.0]
+        time_mock.time.side_effect = lambda: now[0]
+
+        def process():
+            now[0] += 1 / 1024.0
+        bgp_processor = processor.BgpProcessor(None, time_budget=1 / 16.0)
+        for i in range(200):
+            dest = self._dest('10.%d.%d.0/24' % (i >> 8, i & 0xff))
+            dest.process = process
+            bgp_processor.enqueue(dest)
+        eq_(processor.BgpProcessor.MAX_DEST_PROCESSED_PER_CYCLE,
+            bgp_processor.work_units_per_cycle)
+        bgp_processor._process_dest()
+        # 1/1024 sec per destination, 64 fit in the budget of a cycle
+        eq_(64, bgp_processor.work_units_per_cycle)
+        bgp_processor._process_dest()
+        summary = bgp_processor.get_stats_summary_dict()
+        eq_(36, summary[stats.PROCESSOR_BACKLOG])
+        eq_(164, summary[stats.PROCESSOR_DEST_PROCESSED])
+        eq_(2, summary[stats.PROCESSOR_CYCLES])
+        eq_(64 / 1024.0, summary[stats.PROCESSOR_LAST_CYCLE_TIME])
+        eq_(100 / 1024.0, summary[stats.PROCESSOR_MAX_CYCLE_TIME])
+        eq_(82 / 1024.0, summary[stats.PROCESSOR_AVG_CYCLE_TIME])
+        # destinations were all queued at 100.0
+        eq_(100 / 1024.0, summary[stats.PROCESSOR_MAX_QUEUE_AGE])
+        eq_(164 / 1024.0, summary[stats.PROCESSOR_OLDEST_QUEUE_AGE])
+
+    def test_fixed(self):
+        bgp_processor = processor.BgpProcessor(None, 3)
+        for i in range(5):
+            bgp_processor.enqueue(self._dest('10.%d.0.0/16' % i))
+        bgp_processor._process_dest()
+        eq_(3, len(self.processed))
+        eq_(3, bgp_processor.work_units_per_cycle)
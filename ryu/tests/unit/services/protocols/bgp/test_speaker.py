@@ -0,0 +1,86 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import mock
+from nose.tools import *
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.speaker import BgpProtocol
+
+
+def _update(prefix):
+    attrs = [bgp.BGPPathAttributeOrigin(0),
+             bgp.BGPPathAttributeAsPath([[65001]]),
+             bgp.BGPPathAttributeNextHop('10.0.0.1')]
+    return str(bgp.BGPUpdate(path_attributes=attrs,
+                             nlri=[bgp.IPAddrPrefix(24, prefix)]).serialize())
+
+
+_KEEPALIVE = str(bgp.BGPKeepAlive().serialize())
+
+
+def _decode(bufs):
+    return [bgp.BGPMessage.parser(buf)[0] for buf in bufs]
+
+
+class Test_BgpProtocol(unittest.TestCase):
+    """ Test case for the message decoding of
+    ryu.services.protocols.bgp.speaker.BgpProtocol
+    """
+
+    def setUp(self):
+        self.protocol = BgpProtocol.__new__(BgpProtocol)
+        self.protocol._recv_buff = ''
+        self.protocol._decode_pool = None
+        self.protocol._handle_msg = mock.Mock()
+
+    def _handled(self):
+        msgs = [c[0][0] for c in self.protocol._handle_msg.call_args_list]
+        return [m.nlri[0].addr if m.type == bgp.BGP_MSG_UPDATE else m.type
+                for m in msgs]
+
+    def test_data_received(self):
+        data = _update('10.0.0.0') + _KEEPALIVE + _update('10.0.1.0')
+        # the last message is received in two parts
+        self.protocol._data_received(data[:-10])
+        eq_(['10.0.0.0', bgp.BGP_MSG_KEEPALIVE], self._handled())
+        eq_(data[-len(_update('10.0.1.0')):-10], self.protocol._recv_buff)
+        self.protocol._data_received(data[-10:])
+        eq_(['10.0.0.0', bgp.BGP_MSG_KEEPALIVE, '10.0.1.0'], self._handled())
+        eq_('', self.protocol._recv_buff)
+
+    def test_decode_pool(self):
+        pool = mock.Mock()
+        pool.decode.side_effect = _decode
+        self.protocol._decode_pool = pool
+        updates = [_update('10.0.%d.0' % i) for i in range(3)]
+        self.protocol._data_received(updates[0] + updates[1] + _KEEPALIVE +
+                                     updates[2])
+        # the messages are handled in order
+        eq_(['10.0.0.0', '10.0.1.0', bgp.BGP_MSG_KEEPALIVE, '10.0.2.0'],
+            self._handled())
+        eq_([updates[:2], updates[2:]],
+            [c[0][0] for c in pool.decode.call_args_list])
+
+    def test_decode_pool_error(self):
+        pool = mock.Mock()
+        pool.decode.side_effect = lambda bufs: (_decode(bufs[:1]) +
+                                                [bgp.MalformedAttrList()])
+        self.protocol._decode_pool = pool
+        assert_raises(bgp.MalformedAttrList, self.protocol._data_received,
+                      _update('10.0.0.0') + _update('10.0.1.0'))
+        eq_(['10.0.0.0'], self._handled())
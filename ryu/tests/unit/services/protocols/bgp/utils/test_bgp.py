@@ -0,0 +1,115 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from nose.tools import *
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.utils import bgp as bgp_utils
+
+
+MAX_LEN = 4096
+
+
+def _attrs(as_path, next_hop='10.0.0.1'):
+    return [bgp.BGPPathAttributeNextHop(next_hop),
+            bgp.BGPPathAttributeOrigin(0),
+            bgp.BGPPathAttributeAsPath([as_path])]
+
+
+def _prefix(i):
+    return bgp.IPAddrPrefix(24, '10.%d.%d.0' % (i // 256, i % 256))
+
+
+def _update(i, as_path=[65001]):
+    return bgp.BGPUpdate(path_attributes=_attrs(as_path), nlri=[_prefix(i)])
+
+
+def _nlri(updates):
+    return sorted(n.prefix for u in updates for n in u.nlri)
+
+
+class Test_pack_updates(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.utils.bgp.pack_updates
+    """
+
+    def test_same_attributes(self):
+        updates = [_update(i) for i in range(2000)]
+        packed = bgp_utils.pack_updates(updates, MAX_LEN)
+        # 4 bytes per prefix
+        eq_(2, len(packed))
+        for update in packed:
+            ok_(len(update.serialize()) <= MAX_LEN)
+        eq_(_nlri(updates), _nlri(packed))
+
+        # the packed messages can be parsed back
+        msg, _rest = bgp.BGPMessage.parser(packed[0].serialize())
+        eq_(len(packed[0].nlri), len(msg.nlri))
+
+    def test_different_attributes(self):
+        updates = [_update(i, [65001 + i % 3]) for i in range(30)]
+        packed = bgp_utils.pack_updates(updates, MAX_LEN)
+        eq_(3, len(packed))
+        for update in packed:
+            as_path = update.get_path_attr(bgp.BGP_ATTR_TYPE_AS_PATH)
+            first = as_path.path_seg_list[0][0]
+            for n in update.nlri:
+                i = int(n.prefix.split('.')[2])
+                eq_(65001 + i % 3, first)
+
+    def test_withdrawn_routes(self):
+        updates = [bgp.BGPUpdate(withdrawn_routes=[
+            bgp.BGPWithdrawnRoute(24, '10.0.%d.0' % i)]) for i in range(10)]
+        updates.append(_update(0))
+        packed = bgp_utils.pack_updates(updates, MAX_LEN)
+        eq_(2, len(packed))
+        eq_(10, len(packed[0].withdrawn_routes))
+        eq_([], packed[0].path_attributes)
+        eq_(1, len(packed[1].nlri))
+
+    def test_mp_reach(self):
+        attrs = _attrs([65001])[1:]
+        updates = []
+        for i in range(1000):
+            prefix = bgp.IP6AddrPrefix(64, '2001:db8:%x::' % i)
+            mp_reach = bgp.BGPPathAttributeMpReachNLRI(
+                bgp.RF_IPv6_UC.afi, bgp.RF_IPv6_UC.safi, '2001:db8::1',
+                [prefix])
+            updates.append(bgp.BGPUpdate(path_attributes=[mp_reach] + attrs))
+        packed = bgp_utils.pack_updates(updates, MAX_LEN)
+        # 9 bytes per prefix
+        eq_(3, len(packed))
+        total = 0
+        for update in packed:
+            ok_(len(update.serialize()) <= MAX_LEN)
+            mp_reach = update.get_path_attr(bgp.BGP_ATTR_TYPE_MP_REACH_NLRI)
+            eq_('2001:db8::1', mp_reach.next_hop)
+            eq_(3, len(update.path_attributes))
+            total += len(mp_reach.nlri)
+        eq_(1000, total)
+
+    def test_mp_unreach(self):
+        updates = []
+        for i in range(10):
+            prefix = bgp.IP6AddrPrefix(64, '2001:db8:%x::' % i)
+            mp_unreach = bgp.BGPPathAttributeMpUnreachNLRI(
+                bgp.RF_IPv6_UC.afi, bgp.RF_IPv6_UC.safi, [prefix])
+            updates.append(bgp.BGPUpdate(path_attributes=[mp_unreach]))
+        packed = bgp_utils.pack_updates(updates, MAX_LEN)
+        eq_(1, len(packed))
+        mp_unreach = packed[0].get_path_attr(
+            bgp.BGP_ATTR_TYPE_MP_UNREACH_NLRI)
+        eq_(10, len(mp_unreach.withdrawn_routes))
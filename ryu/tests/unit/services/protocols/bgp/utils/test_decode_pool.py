@@ -0,0 +1,123 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import cPickle
+import unittest
+
+from nose.tools import *
+
+from ryu.lib.packet import bgp
+from ryu.services.protocols.bgp.utils.decode_pool import decode_updates
+from ryu.services.protocols.bgp.utils.decode_pool import DecodeError
+from ryu.services.protocols.bgp.utils.decode_pool import DecodedUpdate
+from ryu.services.protocols.bgp.utils.decode_pool import DecodePool
+
+
+def _attrs(as_path=[65001]):
+    return [bgp.BGPPathAttributeOrigin(0),
+            bgp.BGPPathAttributeAsPath([as_path]),
+            bgp.BGPPathAttributeNextHop('10.0.0.1')]
+
+
+def _update(prefixes, withdrawn=[], as_path=[65001]):
+    return str(bgp.BGPUpdate(
+        withdrawn_routes=[bgp.BGPWithdrawnRoute(24, p) for p in withdrawn],
+        path_attributes=_attrs(as_path),
+        nlri=[bgp.IPAddrPrefix(24, p) for p in prefixes]).serialize())
+
+
+def _mp_update():
+    nlri = [bgp.LabelledVPNIPAddrPrefix(24, '10.0.0.0', labels=[100],
+                                        route_dist='65000:100')]
+    attrs = _attrs()[:2] + [bgp.BGPPathAttributeMpReachNLRI(
+        1, 128, '10.0.0.1', nlri)]
+    return str(bgp.BGPUpdate(path_attributes=attrs).serialize())
+
+
+def _bad_update():
+    # the AS_PATH segment is longer than the attribute
+    buf = bytearray(_update(['10.0.0.0']))
+    buf[30] = 0xff
+    return str(buf)
+
+
+class Test_decode_updates(unittest.TestCase):
+    """ Test case for
+    ryu.services.protocols.bgp.utils.decode_pool.decode_updates
+    """
+
+    def test_decode(self):
+        records = decode_updates([_update(['10.0.0.0', '10.0.1.0'],
+                                          withdrawn=['10.1.0.0'])])
+        eq_(1, len(records))
+        withdrawn, attrs, nlri = records[0]
+        eq_([(24, '10.1.0.0')], withdrawn)
+        eq_(''.join(str(a.serialize()) for a in _attrs()), attrs)
+        eq_([(24, '10.0.0.0'), (24, '10.0.1.0')], nlri)
+
+    def test_mp(self):
+        # sent back raw
+        buf = _mp_update()
+        eq_([buf], decode_updates([buf]))
+
+    def test_error(self):
+        records = decode_updates([_update(['10.0.0.0']), _bad_update(),
+                                  _update(['10.0.1.0'])])
+        # the messages following the bad one aren't decoded
+        eq_(2, len(records))
+        ok_(isinstance(records[1].exception(), ValueError))
+
+    def test_decode_error(self):
+        error = cPickle.loads(cPickle.dumps(DecodeError(bgp.BadLen(2, 5000)),
+                                            cPickle.HIGHEST_PROTOCOL))
+        exc = error.exception()
+        ok_(isinstance(exc, bgp.BadLen))
+        eq_(5000, exc.length)
+        eq_(bgp.BadLen.SUB_CODE, exc.SUB_CODE)
+
+
+class Test_DecodePool(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.utils.decode_pool.DecodePool
+    """
+
+    def setUp(self):
+        self.pool = DecodePool(2)
+
+    def tearDown(self):
+        self.pool.stop()
+
+    def test_decode(self):
+        bufs = [_update(['10.0.%d.0' % i]) for i in range(3)]
+        bufs.append(_update(['10.1.0.0'], as_path=[65002]))
+        bufs.append(_mp_update())
+        msgs = self.pool.decode(bufs)
+        eq_(5, len(msgs))
+        for i in range(3):
+            ok_(isinstance(msgs[i], DecodedUpdate))
+            eq_(['10.0.%d.0' % i], [n.addr for n in msgs[i].nlri])
+            eq_('10.0.0.1', msgs[i].get_path_attr(
+                bgp.BGP_ATTR_TYPE_NEXT_HOP).value)
+            # the messages share the interned path attributes
+            ok_(msgs[i].pathattrs is msgs[0].pathattrs)
+        ok_(msgs[3].pathattrs is not msgs[0].pathattrs)
+        ok_(not isinstance(msgs[4], DecodedUpdate))
+        ok_(msgs[4].get_path_attr(bgp.BGP_ATTR_TYPE_MP_REACH_NLRI))
+
+    def test_error(self):
+        msgs = self.pool.decode([_update(['10.0.0.0']), _bad_update()])
+        eq_(2, len(msgs))
+        ok_(isinstance(msgs[1], ValueError))
+        # the workers are still usable
+        eq_(1, len(self.pool.decode([_update(['10.0.0.0'])])))
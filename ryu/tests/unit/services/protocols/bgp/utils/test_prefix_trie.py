@@ -0,0 +1,149 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+
+from nose.tools import *
+
+from ryu.services.protocols.bgp.utils.prefix_trie import int_to_ip
+from ryu.services.protocols.bgp.utils.prefix_trie import ip_to_int
+from ryu.services.protocols.bgp.utils.prefix_trie import PrefixTrie
+
+
+def _p(prefix):
+    addr, length = prefix.split('/')
+    return ip_to_int(addr), int(length)
+
+
+def _s(prefix):
+    addr, length = prefix
+    width = 32 if addr < 1 << 32 else 128
+    return '%s/%d' % (int_to_ip(addr, width), length)
+
+
+class Test_PrefixTrie(unittest.TestCase):
+    """ Test case for ryu.services.protocols.bgp.utils.prefix_trie.PrefixTrie
+    """
+
+    prefixes = ['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24', '10.1.3.0/24',
+                '10.128.0.0/9', '192.168.0.0/16', '0.0.0.0/0']
+
+    def setUp(self):
+        self.trie = PrefixTrie(32)
+        for prefix in self.prefixes:
+            self.trie.insert(*(_p(prefix) + (prefix, )))
+
+    def test_get(self):
+        eq_(len(self.prefixes), len(self.trie))
+        for prefix in self.prefixes:
+            eq_(prefix, self.trie.get(*_p(prefix)))
+            ok_(_p(prefix) in self.trie)
+        eq_(None, self.trie.get(*_p('10.1.0.0/17')))
+        eq_(None, self.trie.get(*_p('10.0.0.0/7')))
+        eq_(None, self.trie.get(*_p('11.0.0.0/8')))
+        # replace
+        self.trie.insert(*(_p('10.1.0.0/16') + ('new', )))
+        eq_('new', self.trie.get(*_p('10.1.0.0/16')))
+        eq_(len(self.prefixes), len(self.trie))
+
+    def test_invalid_length(self):
+        assert_raises(ValueError, self.trie.get, 0, 33)
+
+    def test_longest_match(self):
+        def lm(addr):
+            return self.trie.longest_match(ip_to_int(addr))[1]
+        eq_('10.1.2.0/24', lm('10.1.2.3'))
+        eq_('10.1.0.0/16', lm('10.1.4.1'))
+        eq_('10.0.0.0/8', lm('10.2.0.1'))
+        eq_('10.128.0.0/9', lm('10.200.0.1'))
+        eq_('0.0.0.0/0', lm('11.0.0.1'))
+        eq_('10.1.0.0/16',
+            self.trie.longest_match(*_p('10.1.2.0/23'))[1])
+        eq_((ip_to_int('10.1.2.0'), 24),
+            self.trie.longest_match(ip_to_int('10.1.2.3'))[0])
+
+        self.trie.remove(*_p('0.0.0.0/0'))
+        eq_(None, self.trie.longest_match(ip_to_int('11.0.0.1')))
+
+    def test_matches(self):
+        eq_(['0.0.0.0/0', '10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24'],
+            [v for _prefix, v in self.trie.matches(ip_to_int('10.1.2.3'))])
+        eq_(['0.0.0.0/0', '10.0.0.0/8', '10.1.0.0/16'],
+            [v for _prefix, v in self.trie.matches(*_p('10.1.2.0/23'))])
+        eq_([(_p('0.0.0.0/0'), '0.0.0.0/0')],
+            self.trie.matches(ip_to_int('11.0.0.1')))
+        eq_([], PrefixTrie(32).matches(ip_to_int('11.0.0.1')))
+
+    def test_iteration(self):
+        eq_(['0.0.0.0/0', '10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24',
+             '10.1.3.0/24', '10.128.0.0/9', '192.168.0.0/16'],
+            [_s(p) for p in self.trie])
+        eq_(['10.1.0.0/16', '10.1.2.0/24', '10.1.3.0/24'],
+            list(self.trie.itervalues(*_p('10.1.0.0/16'))))
+        eq_(['10.1.2.0/24', '10.1.3.0/24'],
+            list(self.trie.itervalues(*_p('10.1.2.0/23'))))
+        eq_([], list(self.trie.itervalues(*_p('11.0.0.0/8'))))
+
+    def test_remove(self):
+        eq_('10.1.0.0/16', self.trie.remove(*_p('10.1.0.0/16')))
+        eq_(None, self.trie.remove(*_p('10.1.0.0/16')))
+        eq_(None, self.trie.remove(*_p('10.1.0.0/17')))
+        eq_(len(self.prefixes) - 1, len(self.trie))
+        eq_('10.0.0.0/8', self.trie.longest_match(ip_to_int('10.1.4.1'))[1])
+        eq_(['10.1.2.0/24', '10.1.3.0/24'],
+            list(self.trie.itervalues(*_p('10.1.0.0/16'))))
+
+        for prefix in self.prefixes:
+            self.trie.remove(*_p(prefix))
+        eq_(0, len(self.trie))
+        eq_([], list(self.trie))
+        # the nodes are reused
+        nodes = len(self.trie._keys)
+        for prefix in self.prefixes:
+            self.trie.insert(*(_p(prefix) + (prefix, )))
+        eq_(len(self.prefixes), len(self.trie))
+        eq_(nodes, len(self.trie._keys))
+
+    def test_ipv6(self):
+        trie = PrefixTrie(128)
+        for prefix in ['2001:db8::/32', '2001:db8:1::/48', '::/0']:
+            trie.insert(*(_p(prefix) + (prefix, )))
+        eq_('2001:db8:1::/48',
+            trie.longest_match(ip_to_int('2001:db8:1::1'))[1])
+        eq_('2001:db8::/32', trie.longest_match(ip_to_int('2001:db8::1'))[1])
+        eq_('::/0', trie.longest_match(ip_to_int('2001::1'))[1])
+        eq_(['::/0', '2001:db8::/32', '2001:db8:1::/48'], list(
+            trie.itervalues()))
+
+    def test_random(self):
+        rand = random.Random(1)
+        trie = PrefixTrie(32)
+        prefixes = {}
+        for i in range(3000):
+            length = rand.choice([0, 8, 12, 16, 24, 32])
+            addr = rand.getrandbits(8) << 24 | rand.getrandbits(4) << 20
+            addr &= ~((1 << (32 - length)) - 1)
+            if prefixes and rand.random() < 0.4:
+                prefix = rand.choice(prefixes.keys())
+                eq_(prefixes.pop(prefix), trie.remove(*prefix))
+            else:
+                trie.insert(addr, length, i)
+                prefixes[(addr, length)] = i
+        eq_(sorted(prefixes), list(trie))
+        for prefix, value in prefixes.iteritems():
+            eq_(value, trie.get(*prefix))
+        # fewer nodes in use than 2 * the prefixes
+        ok_(len(trie._keys) - len(trie._free) < 2 * len(prefixes))
@@ -0,0 +1,131 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import unittest
+import logging
+
+from nose.tools import *
+
+from ryu.ofproto import ofproto_v1_3
+from ryu.topology import graph
+from ryu.topology import switches
+
+
+LOG = logging.getLogger('test_graph')
+
+
+_OFPPort = collections.namedtuple(
+    '_OFPPort', ('port_no', 'hw_addr', 'name', 'config', 'state'))
+
+
+def _port(dpid, port_no):
+    ofpport = _OFPPort(port_no, '00:00:00:00:00:%02x' % port_no,
+                       'port%d' % port_no, 0, 0)
+    return switches.Port(dpid, ofproto_v1_3, ofpport)
+
+
+def _link(src, dst, port_no=None):
+    # port numbers default to the dpid of the other end
+    if port_no is None:
+        port_no = (dst, src)
+    return switches.Link(_port(src, port_no[0]), _port(dst, port_no[1]))
+
+
+def _graph(edges):
+    g = graph.TopologyGraph()
+    for src, dst in edges:
+        g = g.add_link(_link(src, dst)).add_link(_link(dst, src))
+    return g
+
+
+class Test_TopologyGraph(unittest.TestCase):
+    """ Test case for ryu.topology.graph.TopologyGraph
+    """
+
+    # 1 - 2 - 4
+    #  \     /
+    #   - 3 -
+    #        \
+    #         5
+    EDGES = [(1, 2), (1, 3), (2, 4), (3, 4), (3, 5)]
+
+    def test_paths(self):
+        g = _graph(self.EDGES)
+        eq_([1, 2, 3, 4, 5], sorted(g.nodes()))
+        eq_(2, g.distance(1, 4))
+        eq_([1, 3, 5], g.shortest_path(1, 5))
+        eq_([[1, 2, 4], [1, 3, 4]], sorted(g.ecmp_paths(1, 4)))
+        eq_(1, len(g.ecmp_paths(1, 4, max_paths=1)))
+        eq_([[1]], g.ecmp_paths(1, 1))
+
+        g = g.add_node(6)
+        eq_(None, g.shortest_path(1, 6))
+        eq_([], g.ecmp_paths(1, 6))
+        eq_(None, g.distance(7, 1))
+
+    def test_links(self):
+        g = _graph(self.EDGES)
+        eq_((_link(1, 2), ), g.get_links(1, 2))
+        eq_((), g.get_links(1, 4))
+        eq_(len(self.EDGES) * 2, len(list(g.links())))
+
+        # parallel link
+        g = g.add_link(_link(1, 2, (10, 10)))
+        eq_(2, len(g.get_links(1, 2)))
+        g = g.remove_link(_link(1, 2))
+        eq_((_link(1, 2, (10, 10)), ), g.get_links(1, 2))
+        eq_([[1, 2, 4], [1, 3, 4]], sorted(g.ecmp_paths(1, 4)))
+
+    def test_snapshot(self):
+        g1 = _graph(self.EDGES)
+        g1.compute_all()
+        g2 = g1.remove_link(_link(1, 3))
+        eq_([1, 3, 5], g1.shortest_path(1, 5))
+        eq_([1, 2, 4, 3, 5], g2.shortest_path(1, 5))
+        eq_((_link(1, 3), ), g1.get_links(1, 3))
+        eq_((), g2.get_links(1, 3))
+
+    def test_invalidation(self):
+        g1 = _graph(self.EDGES)
+        g1.compute_all()
+
+        # 1 -> 3 is used by the paths from 1 and 2 (2 - 1 - 3)
+        g2 = g1.remove_link(_link(1, 3))
+        eq_([3, 4, 5], sorted(g2._trees))
+        for src in g2._trees:
+            ok_(g2._trees[src] is g1._trees[src])
+
+        # 5 -> 4 shortens the paths from 5 only
+        g3 = g1.add_link(_link(5, 4))
+        eq_([1, 2, 3, 4], sorted(g3._trees))
+        eq_([5, 4], g3.shortest_path(5, 4))
+
+        # 5 is reachable from every switch
+        g4 = g1.remove_node(5)
+        eq_({}, g4._trees)
+        ok_(5 not in g4)
+        eq_((), g4.get_links(3, 5))
+        eq_([1, 2, 3, 4], sorted(g4.nodes()))
+
+        # a parallel link changes nothing
+        g5 = g1.add_link(_link(1, 2, (10, 10)))
+        eq_(sorted(g1._trees), sorted(g5._trees))
+
+    def test_unknown(self):
+        g = _graph(self.EDGES)
+        ok_(g.remove_link(_link(1, 5)) is g)
+        ok_(g.remove_node(9) is g)
+        ok_(g.add_link(_link(1, 2)) is g)
@@ -0,0 +1,121 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+import logging
+
+from nose.tools import *
+
+from ryu.topology.hosts import Host, HostTable
+
+
+LOG = logging.getLogger('test_hosts')
+
+MAC1 = '00:00:00:00:00:01'
+MAC2 = '00:00:00:00:00:02'
+MAC3 = '00:00:00:00:00:03'
+
+
+class Test_HostTable(unittest.TestCase):
+    """ Test case for ryu.topology.hosts.HostTable
+    """
+
+    def setUp(self):
+        self.table = HostTable(2, 100)
+
+    def test_learn(self):
+        host, added, moved_from, removed = self.table.learn(
+            MAC1, 0, 1, 1, ipv4='10.0.0.1', now=0)
+        ok_(added)
+        eq_((None, []), (moved_from, removed))
+        eq_(host, self.table.get(MAC1, 0))
+        eq_([host], self.table.get_by_mac(MAC1))
+        eq_(host, self.table.get_by_ip('10.0.0.1'))
+        eq_([host], self.table.get_by_port(1, 1))
+        eq_([host], self.table.get_by_dpid(1))
+
+        _host, added, moved_from, _removed = self.table.learn(
+            MAC1, 0, 1, 1, ipv6='fe80::1', now=1)
+        eq_((False, None), (added, moved_from))
+        eq_(['10.0.0.1'], host.ipv4)
+        eq_(['fe80::1'], host.ipv6)
+        eq_(1, host.timestamp)
+
+    def test_move(self):
+        host, _added, _moved_from, _removed = self.table.learn(
+            MAC1, 0, 1, 1, now=0)
+        _host, added, moved_from, _removed = self.table.learn(
+            MAC1, 0, 2, 3, now=1)
+        eq_((False, (1, 1)), (added, moved_from))
+        eq_((2, 3), (host.dpid, host.port_no))
+        eq_([], self.table.get_by_port(1, 1))
+        eq_([host], self.table.get_by_port(2, 3))
+
+    def test_vlan(self):
+        self.table.learn(MAC1, 0, 1, 1, now=0)
+        self.table.learn(MAC1, 10, 1, 2, now=0)
+        eq_(2, len(self.table))
+        eq_([0, 10], sorted(h.vlan for h in self.table.get_by_mac(MAC1)))
+
+    def test_ip_taken_over(self):
+        host1, _a, _m, _r = self.table.learn(MAC1, 0, 1, 1,
+                                             ipv4='10.0.0.1', now=0)
+        host2, _a, _m, _r = self.table.learn(MAC2, 0, 1, 2,
+                                             ipv4='10.0.0.1', now=1)
+        eq_([], host1.ipv4)
+        eq_(host2, self.table.get_by_ip('10.0.0.1'))
+        self.table.remove(host1)
+        eq_(host2, self.table.get_by_ip('10.0.0.1'))
+
+    def test_max_addrs(self):
+        for i in range(Host.MAX_ADDRS + 1):
+            host, _a, _m, _r = self.table.learn(
+                MAC1, 0, 1, 1, ipv4='10.0.0.%d' % i, now=0)
+        eq_(Host.MAX_ADDRS, len(host.ipv4))
+        eq_(None, self.table.get_by_ip('10.0.0.0'))
+
+    def test_lru(self):
+        self.table.learn(MAC1, 0, 1, 1, now=0)
+        self.table.learn(MAC2, 0, 1, 2, now=1)
+        # MAC1 is refreshed, so MAC2 is the least recently seen
+        self.table.learn(MAC1, 0, 1, 1, now=2)
+        _host, _added, _moved_from, removed = self.table.learn(
+            MAC3, 0, 1, 3, now=3)
+        eq_([MAC2], [h.mac for h in removed])
+        eq_(None, self.table.get(MAC2, 0))
+        eq_([], self.table.get_by_port(1, 2))
+
+    def test_expire(self):
+        self.table.learn(MAC1, 0, 1, 1, ipv4='10.0.0.1', now=0)
+        self.table.learn(MAC2, 0, 1, 2, now=50)
+        eq_([], self.table.expire(100))
+        eq_([MAC1], [h.mac for h in self.table.expire(101)])
+        eq_(None, self.table.get_by_ip('10.0.0.1'))
+        eq_(1, len(self.table))
+
+    def test_remove_port(self):
+        self.table.learn(MAC1, 0, 1, 1, now=0)
+        self.table.learn(MAC2, 10, 1, 1, now=0)
+        eq_(2, len(self.table.remove_port(1, 1)))
+        eq_(0, len(self.table))
+        eq_([], self.table.remove_port(1, 1))
+
+    def test_to_dict(self):
+        host, _a, _m, _r = self.table.learn(MAC1, 0, 1, 1,
+                                            ipv4='10.0.0.1', now=0)
+        eq_({'mac': MAC1, 'vlan': 0, 'ipv4': ['10.0.0.1'], 'ipv6': [],
+             'port': {'dpid': '0000000000000001',
+                      'port_no': '00000001'}},
+            host.to_dict())
@@ -0,0 +1,72 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from nose.tools import *
+
+from ryu.topology.snapshot import TopologySnapshot
+
+
+class Test_TopologySnapshot(unittest.TestCase):
+    """ Test case for ryu.topology.snapshot
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'links')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _lines(self):
+        with open(self.path) as f:
+            return f.readlines()
+
+    def test_log(self):
+        s = TopologySnapshot(self.path)
+        eq_(set(), s.load())
+        s.add_link((1, 2, 3, 4))
+        s.add_link((1, 2, 3, 4))
+        s.add_link((0xffff, 0xfffffffe, 5, 6))
+        s.remove_link((1, 2, 3, 4))
+        s.remove_link((7, 8, 9, 10))
+        eq_(['+ 1 2 3 4\n', '+ ffff fffffffe 5 6\n', '- 1 2 3 4\n'],
+            self._lines())
+        s.close()
+
+        # compacted on load
+        s = TopologySnapshot(self.path)
+        eq_(set([(0xffff, 0xfffffffe, 5, 6)]), s.load())
+        eq_(['+ ffff fffffffe 5 6\n'], self._lines())
+
+    def test_compact(self):
+        s = TopologySnapshot(self.path)
+        s.COMPACT_MIN_RECORDS = 4
+        s.load()
+        for i in range(3):
+            s.add_link((1, 1, 2, 1))
+            s.remove_link((1, 1, 2, 1))
+        eq_(set(), s.links)
+        ok_(len(self._lines()) <= 4)
+        eq_(set(), TopologySnapshot(self.path).load())
+
+    def test_broken_record(self):
+        with open(self.path, 'w') as f:
+            f.write('+ 1 2 3 4\n+ 5 6 x 8\n- 1 2\n+ 9 a b')
+        eq_(set([(1, 2, 3, 4)]), TopologySnapshot(self.path).load())
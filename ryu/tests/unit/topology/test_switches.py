@@ -0,0 +1,321 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+
+import mock
+from nose.tools import *
+
+from ryu.lib.packet import packet, ethernet, lldp, arp
+from ryu.ofproto import ofproto_v1_0, ofproto_v1_0_parser
+from ryu.ofproto import ofproto_v1_3, ofproto_v1_3_parser
+from ryu.ofproto.ofproto_protocol import ProtocolDesc
+from ryu.topology import event
+from ryu.topology import switches
+from ryu.topology.hosts import HostTable
+from ryu.topology.snapshot import TopologySnapshot
+
+
+LOG = logging.getLogger('test_switches')
+
+
+class _Datapath(ProtocolDesc):
+    def __init__(self, dpid, version):
+        super(_Datapath, self).__init__(version)
+        self.id = dpid
+        self.writes = []
+
+    def send_msgs(self, msgs):
+        self.writes.append(msgs)
+
+
+_OFPPort = collections.namedtuple(
+    '_OFPPort', ('port_no', 'hw_addr', 'name', 'config', 'state'))
+
+
+def _port(dpid, port_no, ofproto=ofproto_v1_3):
+    ofpport = _OFPPort(port_no, '00:00:00:00:00:%02x' % port_no,
+                       'port%d' % port_no, 0, 0)
+    return switches.Port(dpid, ofproto, ofpport)
+
+
+def _switches():
+    # RyuApp.__init__ is bypassed as ryu.base.app_manager can be
+    # reloaded by other tests after this module was imported.
+    app = switches.Switches.__new__(switches.Switches)
+    app.dps = {}
+    app.ports = switches.PortDataState(app.LLDP_TIMER_TICK)
+    app.links = switches.LinkState(app.LINK_TIMEOUT, app.LINK_TIMER_TICK)
+    app.lldp_event = mock.Mock()
+    app.send_event_to_observers = mock.Mock()
+    app.snapshot = None
+    app.pending_links = {}
+    app.provisional_links = set()
+    app.hosts = HostTable(1024, 300)
+    return app
+
+
+class Test_LLDPPacket(unittest.TestCase):
+    """ Test case for ryu.topology.switches.LLDPPacket
+    """
+
+    def test_template(self):
+        args = (0x123456789abcdef0, 0xfffffffe, '12:34:56:78:9a:bc', 120)
+        eq_(switches.LLDPPacket._build_lldp_packet(*args),
+            switches.LLDPPacket.lldp_packet(*args))
+
+    def test_parse(self):
+        data = switches.LLDPPacket.lldp_packet(
+            1, 2, '12:34:56:78:9a:bc', 120)
+        eq_((1, 2), switches.LLDPPacket.lldp_parse(str(data)))
+        eq_((1, 2), switches.LLDPPacket.lldp_parse(
+            packet.ReadOnlyPacket(str(data))))
+        eth = packet.Packet(data).get_protocol(ethernet.ethernet)
+        eq_('12:34:56:78:9a:bc', eth.src)
+
+
+class Test_Switches(unittest.TestCase):
+    """ Test case for ryu.topology.switches.Switches
+    """
+
+    def setUp(self):
+        self.app = _switches()
+
+    def test_send_lldp_packets(self):
+        dp1 = _Datapath(1, ofproto_v1_3.OFP_VERSION)
+        dp2 = _Datapath(2, ofproto_v1_0.OFP_VERSION)
+        self.app.dps = {1: dp1, 2: dp2}
+        ports = [_port(1, 1), _port(1, 2),
+                 _port(2, 1, ofproto_v1_0)]
+        for port in ports:
+            self.app._port_added(port)
+        self.app.send_lldp_packets(ports)
+
+        # one write per datapath
+        eq_(1, len(dp1.writes))
+        eq_([1, 2], [m.actions[0].port for m in dp1.writes[0]])
+        eq_(1, len(dp2.writes))
+        out = dp2.writes[0][0]
+        ok_(isinstance(out, ofproto_v1_0_parser.OFPPacketOut))
+        eq_((2, 1), switches.LLDPPacket.lldp_parse(str(out.data)))
+        for port in ports:
+            eq_(1, self.app.ports.get_port(port).sent)
+
+    def test_lldp_schedule(self):
+        with mock.patch('time.time', return_value=100.0):
+            app = _switches()
+            port = _port(1, 1)
+            app._port_added(port)
+        ports = app.ports
+
+        # the first packet is sent within a period
+        eq_([port], ports.lldp_expired(
+            100 + app.LLDP_SEND_PERIOD_PER_PORT + app.LLDP_TIMER_TICK))
+        with mock.patch('time.time', return_value=101.0):
+            ports.lldp_sent(port, 1)
+        eq_([], ports.lldp_expired(101.5))
+        eq_([port], ports.lldp_expired(102))
+
+        # move_front schedules the port at once
+        with mock.patch('time.time', return_value=102.0):
+            ports.move_front(port)
+        eq_(0, ports.lldp_timeout(102))
+        eq_([port], ports.lldp_expired(102))
+
+        ports.del_port(port)
+        eq_(None, ports.lldp_timeout(102))
+
+    def test_lldp_period(self):
+        app = self.app
+        eq_(app.LLDP_SEND_PERIOD_PER_PORT, app._lldp_period())
+        for i in range(int(app.LLDP_SEND_RATE) * 2):
+            app.ports[i] = None
+        eq_(2, app._lldp_period())
+
+    def test_check_links(self):
+        with mock.patch('time.time', return_value=100.0):
+            app = _switches()
+            ports = [_port(1, 1), _port(2, 1), _port(3, 1), _port(4, 1)]
+            for port in ports:
+                app._port_added(port)
+            # 1 <-> 2 and 3 <-> 4
+            for src, dst in [(0, 1), (1, 0), (2, 3), (3, 2)]:
+                app.links.update_link(ports[src], ports[dst])
+
+        now = 100 + app.LINK_TIMEOUT + 1
+        # timed out but the LLDP packets are not dropped yet
+        eq_([], app.check_links(now))
+
+        # port 1 and 3 lose LLDP packets
+        for i in range(app.LINK_LLDP_DROP + 1):
+            app.ports.lldp_sent(ports[0], 1)
+            app.ports.lldp_sent(ports[2], 1)
+        now += app.TIMEOUT_CHECK_PERIOD
+        deleted = app.check_links(now)
+        eq_(sorted([(1, 2), (3, 4)]),
+            sorted((l.src.dpid, l.dst.dpid) for l in deleted))
+        eq_(2, app.send_event_to_observers.call_count)
+
+        # the reverse links are checked in the next sweep
+        for port in (ports[1], ports[3]):
+            for i in range(app.LINK_LLDP_DROP + 1):
+                app.ports.lldp_sent(port, 1)
+        eq_(2, len(app.check_links(now + app.LINK_TIMER_TICK)))
+        eq_({}, app.links)
+
+
+class Test_restore(unittest.TestCase):
+    """ Test case for the links restored from a snapshot
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'links')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _connect(self, app, dpid, port_nos):
+        dp = _Datapath(dpid, ofproto_v1_3.OFP_VERSION)
+        app.dps[dpid] = dp
+        app.port_state[dpid] = switches.PortState()
+        for port_no in port_nos:
+            port = _port(dpid, port_no)
+            app.port_state[dpid].add(port_no, _OFPPort(
+                port_no, port.hw_addr, port.name, 0, 0))
+            app._port_added(port)
+        app._restore_links(dpid)
+
+    def _events(self, app, ev_cls):
+        calls = app.send_event_to_observers.call_args_list
+        return [c[0][0].link for c in calls if isinstance(c[0][0], ev_cls)]
+
+    def test_restore(self):
+        snapshot = TopologySnapshot(self.path)
+        snapshot.load()
+        # 1.1 <-> 2.1 and 1.2 <-> 3.1
+        for key in [(1, 1, 2, 1), (2, 1, 1, 1), (1, 2, 3, 1), (3, 1, 1, 2)]:
+            snapshot.add_link(key)
+        snapshot.close()
+
+        with mock.patch('time.time', return_value=100.0):
+            app = _switches()
+            app.port_state = {}
+            app._load_snapshot(self.path)
+            self._connect(app, 1, [1, 2])
+            eq_([], self._events(app, event.EventLinkAdd))
+            # 1 <-> 2 are provisional until LLDP packets are received
+            self._connect(app, 2, [1])
+        link = switches.Link(_port(1, 1), _port(2, 1))
+        eq_(2, len(self._events(app, event.EventLinkAdd)))
+        ok_(link in app.provisional_links)
+        eq_(0, app.ports.lldp_timeout(100))
+
+        app.links.update_link(link.src, link.dst)
+        app.provisional_links.discard(link)
+
+        # the reverse link was not seen
+        now = 100 + app.PROVISIONAL_LINK_TIMEOUT + 1
+        deleted = app.check_links(now)
+        eq_([switches.Link(_port(2, 1), _port(1, 1))], deleted)
+        eq_(set([(1, 1, 2, 1), (1, 2, 3, 1), (3, 1, 1, 2)]),
+            app.snapshot.links)
+
+        # switch 3 never connected
+        app.check_links(100 + app.RESTORE_WAIT + 1)
+        eq_({}, app.pending_links)
+        eq_(set([(1, 1, 2, 1)]), TopologySnapshot(self.path).load())
+
+
+class Test_hosts(unittest.TestCase):
+    """ Test case for the host tracking of Switches
+    """
+
+    def setUp(self):
+        self.app = _switches()
+        self.app.link_discovery = False
+        self.app.host_discovery = True
+        self.app.port_state = {}
+        for dpid in (1, 2):
+            dp = _Datapath(dpid, ofproto_v1_3.OFP_VERSION)
+            self.app.dps[dpid] = dp
+            self.app.port_state[dpid] = switches.PortState()
+            for port_no in (1, 2):
+                self.app.port_state[dpid].add(port_no, _OFPPort(
+                    port_no, '00:00:00:00:00:%02x' % port_no,
+                    'port%d' % port_no, 0, 0))
+
+    def _packet_in(self, dpid, port_no, src, src_ip):
+        pkt = packet.Packet()
+        pkt.add_protocol(ethernet.ethernet(
+            ethertype=0x0806, src=src, dst='ff:ff:ff:ff:ff:ff'))
+        pkt.add_protocol(arp.arp(src_mac=src, src_ip=src_ip,
+                                 dst_ip='10.0.0.254'))
+        pkt.serialize()
+        msg = ofproto_v1_3_parser.OFPPacketIn(
+            self.app.dps[dpid], buffer_id=0xffffffff, reason=0,
+            match=ofproto_v1_3_parser.OFPMatch(in_port=port_no),
+            data=str(pkt.data))
+        self.app.packet_in_handler(mock.Mock(msg=msg))
+
+    def _events(self):
+        calls = self.app.send_event_to_observers.call_args_list
+        return [c[0][0] for c in calls]
+
+    def test_learn(self):
+        mac = '00:00:00:00:00:0a'
+        self._packet_in(1, 1, mac, '10.0.0.1')
+        evs = self._events()
+        eq_(1, len(evs))
+        ok_(isinstance(evs[0], event.EventHostAdd))
+        host = evs[0].host
+        eq_((mac, 0, 1, 1, ['10.0.0.1']),
+            (host.mac, host.vlan, host.dpid, host.port_no, host.ipv4))
+        eq_(host, self.app.hosts.get_by_ip('10.0.0.1'))
+
+        # seen again at the same port
+        self._packet_in(1, 1, mac, '10.0.0.1')
+        eq_(1, len(self._events()))
+
+        # moved to another switch
+        self._packet_in(2, 2, mac, '10.0.0.1')
+        evs = self._events()
+        eq_(2, len(evs))
+        ok_(isinstance(evs[1], event.EventHostMove))
+        eq_((1, 1), (evs[1].old_dpid, evs[1].old_port_no))
+        eq_([host], self.app.hosts.get_by_port(2, 2))
+        eq_([], self.app.hosts.get_by_port(1, 1))
+
+    def test_not_edge_port(self):
+        # port 1.1 is connected to 2.1
+        src = _port(1, 1)
+        dst = _port(2, 1)
+        self.app.links.update_link(src, dst)
+        self._packet_in(1, 1, '00:00:00:00:00:0a', '10.0.0.1')
+        eq_(0, len(self.app.hosts))
+
+    def test_link_added(self):
+        self._packet_in(1, 1, '00:00:00:00:00:0a', '10.0.0.1')
+        self._packet_in(1, 2, '00:00:00:00:00:0b', '10.0.0.2')
+        self.app._link_added(switches.Link(_port(1, 1), _port(2, 1)))
+        evs = self._events()
+        ok_(isinstance(evs[-1], event.EventHostDelete))
+        eq_('00:00:00:00:00:0a', evs[-1].host.mac)
+        eq_(1, len(self.app.hosts))
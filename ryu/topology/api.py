@@ -35,4 +35,28 @@ def get_all_link(app):
     return get_link(app)
 
 
+def get_host(app, dpid=None, mac=None, ip=None):
+    rep = app.send_request(event.EventHostRequest(dpid, mac, ip))
+    return rep.hosts
+
+
+def get_all_host(app):
+    return get_host(app)
+
+
+def get_graph(app):
+    """Return the current snapshot of the topology graph.
+
+    The snapshot is a ryu.topology.graph.TopologyGraph which is never
+    modified, so it can be kept and read without copying.
+
+    The graph service isn't loaded for every user of this module, the
+    application calling this function must require it::
+
+        app_manager.require_app('ryu.topology.graph')
+    """
+    rep = app.send_request(event.EventGraphRequest())
+    return rep.graph
+
+
 app_manager.require_app('ryu.topology.switches', api_style=True)
@@ -126,3 +126,78 @@ class EventLinkReply(event.EventReplyBase):
     def __str__(self):
         return 'EventLinkReply<dst=%s, dpid=%s, links=%s>' % \
             (self.dst, self.dpid, len(self.links))
+
+
+class EventHostBase(event.EventBase):
+    def __init__(self, host):
+        super(EventHostBase, self).__init__()
+        self.host = host
+
+    def __str__(self):
+        return '%s<%s>' % (self.__class__.__name__, self.host)
+
+
+class EventHostAdd(EventHostBase):
+    def __init__(self, host):
+        super(EventHostAdd, self).__init__(host)
+
+
+class EventHostDelete(EventHostBase):
+    def __init__(self, host):
+        super(EventHostDelete, self).__init__(host)
+
+
+class EventHostMove(EventHostBase):
+    # host has already been moved to its new port.
+    def __init__(self, host, old_dpid, old_port_no):
+        super(EventHostMove, self).__init__(host)
+        self.old_dpid = old_dpid
+        self.old_port_no = old_port_no
+
+    def __str__(self):
+        return '%s<%s, old_dpid=%s, old_port_no=%s>' % \
+            (self.__class__.__name__, self.host,
+             self.old_dpid, self.old_port_no)
+
+
+class EventHostRequest(event.EventRequestBase):
+    # If all of dpid, mac and ip are None, reply all list
+    def __init__(self, dpid=None, mac=None, ip=None):
+        super(EventHostRequest, self).__init__()
+        self.dst = 'switches'
+        self.dpid = dpid
+        self.mac = mac
+        self.ip = ip
+
+    def __str__(self):
+        return 'EventHostRequest<src=%s, dpid=%s, mac=%s, ip=%s>' % \
+            (self.src, self.dpid, self.mac, self.ip)
+
+
+class EventHostReply(event.EventReplyBase):
+    def __init__(self, dst, dpid, hosts):
+        super(EventHostReply, self).__init__(dst)
+        self.dpid = dpid
+        self.hosts = hosts
+
+    def __str__(self):
+        return 'EventHostReply<dst=%s, dpid=%s, hosts=%s>' % \
+            (self.dst, self.dpid, len(self.hosts))
+
+
+class EventGraphRequest(event.EventRequestBase):
+    def __init__(self):
+        super(EventGraphRequest, self).__init__()
+        self.dst = 'topology_graph'
+
+    def __str__(self):
+        return 'EventGraphRequest<src=%s>' % self.src
+
+
+class EventGraphReply(event.EventReplyBase):
+    def __init__(self, dst, graph):
+        super(EventGraphReply, self).__init__(dst)
+        self.graph = graph
+
+    def __str__(self):
+        return 'EventGraphReply<dst=%s, %s>' % (self.dst, self.graph)
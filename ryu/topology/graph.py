@@ -0,0 +1,302 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Topology graph service.
+
+The switches and links found by ryu.topology.switches are kept in an
+adjacency index which is updated incrementally from the topology
+events.  The graph is published as an immutable snapshot: every change
+makes a new TopologyGraph sharing the unchanged parts with the previous
+one, so readers never need a lock nor a copy.
+
+Shortest paths are computed per source switch with Dijkstra on demand
+and cached in the snapshot.  When the graph changes, only the cached
+results the change can affect are dropped; the others are carried over
+to the new snapshot.  The cost of a path is its hop count.
+
+Usage::
+
+    from ryu.base import app_manager
+    from ryu.topology import api
+
+    app_manager.require_app('ryu.topology.graph')
+
+    graph = api.get_graph(self)
+    path = graph.shortest_path(src_dpid, dst_dpid)
+    paths = graph.ecmp_paths(src_dpid, dst_dpid, max_paths=4)
+    links = graph.get_links(path[0], path[1])
+"""
+
+import heapq
+import logging
+
+from ryu import cfg
+from ryu.base import app_manager
+from ryu.controller import handler
+from ryu.topology import event
+
+LOG = logging.getLogger(__name__)
+
+
+CONF = cfg.CONF
+
+CONF.register_cli_opts([
+    cfg.BoolOpt('topology-graph-all-pairs', default=False,
+                help='topology graph: compute the shortest paths between '
+                     'all the switches on every change instead of on '
+                     'demand')
+])
+
+
+class _PathTree(object):
+    # shortest paths from a single source.
+    # preds: dpid -> list of the previous hops on the shortest paths
+    def __init__(self, src, dist, preds):
+        super(_PathTree, self).__init__()
+        self.src = src
+        self.dist = dist
+        self.preds = preds
+
+    def uses_edge(self, src, dst):
+        return src in self.preds.get(dst, ())
+
+    def may_shorten(self, src, dst):
+        # can a new edge src -> dst give another shortest path?
+        if src not in self.dist:
+            return False
+        d = self.dist.get(dst)
+        return d is None or self.dist[src] + 1 <= d
+
+
+class TopologyGraph(object):
+    """An immutable snapshot of the topology.
+
+    The methods modifying the graph return a new snapshot and leave
+    this one untouched.
+    """
+
+    def __init__(self, adj=None, trees=None):
+        super(TopologyGraph, self).__init__()
+        # dpid -> {neighbor dpid -> tuple of Link}
+        self._adj = adj or {}
+        # source dpid -> _PathTree, filled lazily by the readers
+        self._trees = trees or {}
+
+    def __len__(self):
+        return len(self._adj)
+
+    def __contains__(self, dpid):
+        return dpid in self._adj
+
+    def __str__(self):
+        return 'TopologyGraph<%d switches, %d links>' % (
+            len(self._adj), len(list(self.links())))
+
+    def nodes(self):
+        return list(self._adj)
+
+    def neighbors(self, dpid):
+        return list(self._adj.get(dpid, ()))
+
+    def get_links(self, src, dst):
+        """Return the links from switch src to switch dst."""
+        return self._adj.get(src, {}).get(dst, ())
+
+    def links(self):
+        for nbrs in self._adj.itervalues():
+            for links in nbrs.itervalues():
+                for link in links:
+                    yield link
+
+    # write operations
+
+    def _copy(self, trees):
+        return TopologyGraph(dict(self._adj), trees)
+
+    def add_node(self, dpid):
+        if dpid in self._adj:
+            return self
+        graph = self._copy(dict(self._trees))
+        graph._adj[dpid] = {}
+        return graph
+
+    def remove_node(self, dpid):
+        if dpid not in self._adj:
+            return self
+        trees = dict((src, t) for src, t in self._trees.iteritems()
+                     if src != dpid and dpid not in t.dist)
+        graph = self._copy(trees)
+        adj = graph._adj
+        del adj[dpid]
+        for src, nbrs in adj.items():
+            if dpid in nbrs:
+                nbrs = dict(nbrs)
+                del nbrs[dpid]
+                adj[src] = nbrs
+        return graph
+
+    def add_link(self, link):
+        src, dst = link.src.dpid, link.dst.dpid
+        nbrs = self._adj.get(src, {})
+        links = nbrs.get(dst, ())
+        if link in links:
+            return self
+
+        if links:
+            # a parallel link doesn't change the paths between switches
+            trees = dict(self._trees)
+        else:
+            trees = dict((s, t) for s, t in self._trees.iteritems()
+                         if not t.may_shorten(src, dst))
+        graph = self._copy(trees)
+        nbrs = dict(nbrs)
+        nbrs[dst] = links + (link, )
+        graph._adj[src] = nbrs
+        graph._adj.setdefault(dst, {})
+        return graph
+
+    def remove_link(self, link):
+        src, dst = link.src.dpid, link.dst.dpid
+        nbrs = self._adj.get(src, {})
+        links = nbrs.get(dst, ())
+        if link not in links:
+            return self
+
+        links = tuple(l for l in links if l != link)
+        if links:
+            trees = dict(self._trees)
+        else:
+            trees = dict((s, t) for s, t in self._trees.iteritems()
+                         if not t.uses_edge(src, dst))
+        graph = self._copy(trees)
+        nbrs = dict(nbrs)
+        if links:
+            nbrs[dst] = links
+        else:
+            del nbrs[dst]
+        graph._adj[src] = nbrs
+        return graph
+
+    # path queries
+
+    def _tree(self, src):
+        tree = self._trees.get(src)
+        if tree is None:
+            tree = self._dijkstra(src)
+            self._trees[src] = tree
+        return tree
+
+    def _dijkstra(self, src):
+        dist = {src: 0}
+        preds = {src: []}
+        queue = [(0, src)]
+        while queue:
+            d, u = heapq.heappop(queue)
+            if d > dist[u]:
+                continue
+            for v in self._adj[u]:
+                nd = d + 1
+                vd = dist.get(v)
+                if vd is None or nd < vd:
+                    dist[v] = nd
+                    preds[v] = [u]
+                    heapq.heappush(queue, (nd, v))
+                elif nd == vd:
+                    preds[v].append(u)
+        return _PathTree(src, dist, preds)
+
+    def compute_all(self):
+        """Fill the cache with the shortest paths from every switch."""
+        for src in self._adj:
+            self._tree(src)
+
+    def distance(self, src, dst):
+        """Return the hop count from src to dst, None if unreachable."""
+        if src not in self._adj:
+            return None
+        return self._tree(src).dist.get(dst)
+
+    def shortest_path(self, src, dst):
+        """Return a shortest path as a list of dpids, None if there is
+        no path.
+        """
+        paths = self.ecmp_paths(src, dst, max_paths=1)
+        if not paths:
+            return None
+        return paths[0]
+
+    def ecmp_paths(self, src, dst, max_paths=None):
+        """Return the equal cost shortest paths from src to dst.
+
+        Each path is a list of dpids starting with src and ending with
+        dst.  At most max_paths paths are returned if it is given.
+        """
+        if src not in self._adj or dst not in self._adj:
+            return []
+        preds = self._tree(src).preds
+        if dst not in preds:
+            return []
+
+        paths = []
+        # walk the predecessors back from dst
+        stack = [(dst, [dst])]
+        while stack:
+            node, path = stack.pop()
+            if node == src:
+                paths.append(path[::-1])
+                if max_paths is not None and len(paths) >= max_paths:
+                    break
+                continue
+            for p in preds[node]:
+                stack.append((p, path + [p]))
+        return paths
+
+
+class TopologyGraphService(app_manager.RyuApp):
+    def __init__(self, *args, **kwargs):
+        super(TopologyGraphService, self).__init__(*args, **kwargs)
+        self.name = 'topology_graph'
+        self.all_pairs = self.CONF.topology_graph_all_pairs
+        self.graph = TopologyGraph()
+
+    def _update(self, graph):
+        if self.all_pairs:
+            graph.compute_all()
+        self.graph = graph
+
+    @handler.set_ev_cls(event.EventSwitchEnter)
+    def switch_enter_handler(self, ev):
+        self._update(self.graph.add_node(ev.switch.dp.id))
+
+    @handler.set_ev_cls(event.EventSwitchLeave)
+    def switch_leave_handler(self, ev):
+        self._update(self.graph.remove_node(ev.switch.dp.id))
+
+    @handler.set_ev_cls(event.EventLinkAdd)
+    def link_add_handler(self, ev):
+        self._update(self.graph.add_link(ev.link))
+
+    @handler.set_ev_cls(event.EventLinkDelete)
+    def link_delete_handler(self, ev):
+        self._update(self.graph.remove_link(ev.link))
+
+    @handler.set_ev_cls(event.EventGraphRequest)
+    def graph_request_handler(self, req):
+        rep = event.EventGraphReply(req.src, self.graph)
+        self.reply_to_request(req, rep)
+
+
+app_manager.require_app('ryu.topology.switches')
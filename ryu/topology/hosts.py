@@ -0,0 +1,188 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Host location table.
+
+Hosts are identified by (MAC address, VLAN id) and located by the
+switch port they are attached to.  The table is indexed by MAC address,
+IP address and attachment point, and is bounded: the least recently
+seen host is evicted when the table is full, and hosts not seen for
+max_age seconds are expired.
+"""
+
+import collections
+import time
+
+from ryu.lib.dpid import dpid_to_str
+from ryu.lib.port_no import port_no_to_str
+
+
+class Host(object):
+    # This is data class passed by EventHostXXX
+    MAX_ADDRS = 8   # IP addresses kept per address family
+
+    def __init__(self, mac, vlan, dpid, port_no):
+        super(Host, self).__init__()
+        self.mac = mac
+        self.vlan = vlan
+        self.dpid = dpid
+        self.port_no = port_no
+        self.ipv4 = []
+        self.ipv6 = []
+        self.timestamp = None
+
+    @property
+    def key(self):
+        return (self.mac, self.vlan)
+
+    def to_dict(self):
+        return {'mac': self.mac,
+                'vlan': self.vlan,
+                'ipv4': list(self.ipv4),
+                'ipv6': list(self.ipv6),
+                'port': {'dpid': dpid_to_str(self.dpid),
+                         'port_no': port_no_to_str(self.port_no)}}
+
+    def __str__(self):
+        return 'Host<mac=%s, vlan=%s, dpid=%s, port_no=%s, ip=%s>' % \
+            (self.mac, self.vlan, self.dpid, self.port_no,
+             self.ipv4 + self.ipv6)
+
+
+class HostTable(object):
+    def __init__(self, size, max_age):
+        super(HostTable, self).__init__()
+        self.size = size
+        self.max_age = max_age
+        # (mac, vlan) -> Host, the least recently seen first
+        self._hosts = collections.OrderedDict()
+        self._by_mac = {}       # mac -> {vlan: Host}
+        self._by_ip = {}        # ip address -> Host
+        self._by_port = {}      # (dpid, port_no) -> {(mac, vlan): Host}
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def __iter__(self):
+        return self._hosts.itervalues()
+
+    def get(self, mac, vlan):
+        return self._hosts.get((mac, vlan))
+
+    def get_by_mac(self, mac):
+        return self._by_mac.get(mac, {}).values()
+
+    def get_by_ip(self, ip):
+        return self._by_ip.get(ip)
+
+    def get_by_port(self, dpid, port_no):
+        return self._by_port.get((dpid, port_no), {}).values()
+
+    def get_by_dpid(self, dpid):
+        return [h for h in self._hosts.itervalues() if h.dpid == dpid]
+
+    def _attach(self, host):
+        port = (host.dpid, host.port_no)
+        self._by_port.setdefault(port, {})[host.key] = host
+
+    def _detach(self, host):
+        port = (host.dpid, host.port_no)
+        hosts = self._by_port[port]
+        del hosts[host.key]
+        if not hosts:
+            del self._by_port[port]
+
+    def _add_ip(self, host, addrs, ip):
+        if ip in addrs:
+            return
+        old = self._by_ip.get(ip)
+        if old is not None:
+            # the address was given to another host
+            (old.ipv4 if ip in old.ipv4 else old.ipv6).remove(ip)
+        addrs.append(ip)
+        self._by_ip[ip] = host
+        if len(addrs) > Host.MAX_ADDRS:
+            del self._by_ip[addrs.pop(0)]
+
+    def remove(self, host):
+        del self._hosts[host.key]
+        vlans = self._by_mac[host.mac]
+        del vlans[host.vlan]
+        if not vlans:
+            del self._by_mac[host.mac]
+        for ip in host.ipv4 + host.ipv6:
+            del self._by_ip[ip]
+        self._detach(host)
+
+    def learn(self, mac, vlan, dpid, port_no, ipv4=None, ipv6=None,
+              now=None):
+        """Record that a host was seen on a port.
+
+        Returns (host, added, moved_from, removed).  added is True if
+        the host is new.  moved_from is the former (dpid, port_no) of
+        the host if it moved, otherwise None.  removed is the list of
+        the hosts expired or evicted to make room.
+        """
+        if now is None:
+            now = time.time()
+        removed = self.expire(now)
+
+        key = (mac, vlan)
+        host = self._hosts.pop(key, None)
+        added = host is None
+        moved_from = None
+        if added:
+            host = Host(mac, vlan, dpid, port_no)
+            self._by_mac.setdefault(mac, {})[vlan] = host
+            self._attach(host)
+        elif (host.dpid, host.port_no) != (dpid, port_no):
+            moved_from = (host.dpid, host.port_no)
+            self._detach(host)
+            host.dpid = dpid
+            host.port_no = port_no
+            self._attach(host)
+        # (re)insert at the most recently seen end
+        self._hosts[key] = host
+        host.timestamp = now
+
+        if ipv4 is not None:
+            self._add_ip(host, host.ipv4, ipv4)
+        if ipv6 is not None:
+            self._add_ip(host, host.ipv6, ipv6)
+
+        while len(self._hosts) > self.size:
+            _key, lru = self._hosts.iteritems().next()
+            self.remove(lru)
+            removed.append(lru)
+        return host, added, moved_from, removed
+
+    def expire(self, now):
+        """Remove and return the hosts not seen for max_age."""
+        expired = []
+        deadline = now - self.max_age
+        for host in self._hosts.itervalues():
+            if host.timestamp >= deadline:
+                break
+            expired.append(host)
+        for host in expired:
+            self.remove(host)
+        return expired
+
+    def remove_port(self, dpid, port_no):
+        hosts = list(self.get_by_port(dpid, port_no))
+        for host in hosts:
+            self.remove(host)
+        return hosts
@@ -0,0 +1,112 @@
+# Copyright (C) 2014 Nippon Telegraph and Telephone Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+On-disk snapshot of the discovered links.
+
+The file is a log of one line per change, appended as the links come
+and go::
+
+    + <src dpid> <src port_no> <dst dpid> <dst port_no>
+    - <src dpid> <src port_no> <dst dpid> <dst port_no>
+
+dpids and port numbers are in hex.  When the log grows much larger than
+the set of links it describes, it is rewritten with only the current
+links.
+"""
+
+import logging
+import os
+
+LOG = logging.getLogger(__name__)
+
+
+def link_key(link):
+    return (link.src.dpid, link.src.port_no,
+            link.dst.dpid, link.dst.port_no)
+
+
+class TopologySnapshot(object):
+    COMPACT_MIN_RECORDS = 1024
+
+    def __init__(self, path):
+        super(TopologySnapshot, self).__init__()
+        self.path = path
+        self.links = set()
+        self._records = 0
+        self._file = None
+
+    def load(self):
+        """Read the snapshot, rewrite it compacted and return the links
+        as a set of (src dpid, src port_no, dst dpid, dst port_no).
+        """
+        self.links = set()
+        try:
+            f = open(self.path)
+        except IOError as e:
+            LOG.debug('no topology snapshot %s: %s', self.path, e)
+            f = None
+        if f is not None:
+            with f:
+                for line in f:
+                    try:
+                        op, key = line[0], line[1:].split()
+                        key = tuple(int(k, 16) for k in key)
+                        assert op in '+-' and len(key) == 4
+                    except (IndexError, ValueError, AssertionError):
+                        # e.g. a line truncated by a crash
+                        LOG.warning('topology snapshot %s: broken record %r',
+                                    self.path, line)
+                        continue
+                    if op == '+':
+                        self.links.add(key)
+                    else:
+                        self.links.discard(key)
+        self.compact()
+        return set(self.links)
+
+    def _write(self, op, key):
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write('%s %x %x %x %x\n' % ((op, ) + key))
+        self._file.flush()
+        self._records += 1
+        if self._records > max(self.COMPACT_MIN_RECORDS,
+                               len(self.links) * 2):
+            self.compact()
+
+    def add_link(self, key):
+        if key not in self.links:
+            self.links.add(key)
+            self._write('+', key)
+
+    def remove_link(self, key):
+        if key in self.links:
+            self.links.remove(key)
+            self._write('-', key)
+
+    def compact(self):
+        self.close()
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            for key in self.links:
+                f.write('+ %x %x %x %x\n' % key)
+        os.rename(tmp, self.path)
+        self._records = len(self.links)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -14,6 +14,7 @@
 # limitations under the License.
 
 import logging
+import random
 import struct
 import time
 import json
@@ -29,7 +30,11 @@ from ryu.lib import addrconv, hub
 from ryu.lib.mac import DONTCARE_STR
 from ryu.lib.dpid import dpid_to_str, str_to_dpid
 from ryu.lib.port_no import port_no_to_str
+from ryu.lib.timerwheel import TimerWheel
+from ryu.topology.snapshot import TopologySnapshot, link_key
+from ryu.topology.hosts import HostTable
 from ryu.lib.packet import packet, ethernet, lldp
+from ryu.lib.packet import arp, icmpv6, ipv4, ipv6, vlan
 from ryu.ofproto.ether import ETH_TYPE_LLDP
 from ryu.ofproto import ofproto_v1_0
 from ryu.ofproto import nx_match
@@ -50,7 +55,19 @@ CONF.register_cli_opts([
                 help='link discovery: explicitly install flow entry '
                      'to send lldp packet to controller'),
     cfg.BoolOpt('explicit-drop', default=True,
-                help='link discovery: explicitly drop lldp packet in')
+                help='link discovery: explicitly drop lldp packet in'),
+    cfg.StrOpt('topology-snapshot', default=None,
+               help='link discovery: file the links are saved to, '
+                    'to restore them on restart'),
+    cfg.BoolOpt('observe-hosts', default=False,
+                help='learn the location of the hosts from packet in, '
+                     'requires observe-links'),
+    cfg.IntOpt('host-table-size', default=65536,
+               help='host tracking: max number of hosts, the least '
+                    'recently seen host is forgotten when it is full'),
+    cfg.IntOpt('host-max-age', default=300,
+               help='host tracking: seconds a host is kept without '
+                    'being seen')
 ])
 
 
@@ -205,64 +222,39 @@ class PortData(object):
 
 class PortDataState(dict):
     # dict: Port class -> PortData class
-    # slimed down version of OrderedDict as python 2.6 doesn't support it.
-    _PREV = 0
-    _NEXT = 1
-    _KEY = 2
-
-    def __init__(self):
+    # The LLDP send schedule of the ports is kept in a timer wheel.
+    def __init__(self, tick):
         super(PortDataState, self).__init__()
-        self._root = root = []          # sentinel node
-        root[:] = [root, root, None]    # [_PREV, _NEXT, _KEY]
-                                        # doubly linked list
-        self._map = {}
-
-    def _remove_key(self, key):
-        link_prev, link_next, key = self._map.pop(key)
-        link_prev[self._NEXT] = link_next
-        link_next[self._PREV] = link_prev
-
-    def _append_key(self, key):
-        root = self._root
-        last = root[self._PREV]
-        last[self._NEXT] = root[self._PREV] = self._map[key] = [last, root,
-                                                                key]
+        self._timer = TimerWheel(tick)
 
-    def _prepend_key(self, key):
-        root = self._root
-        first = root[self._NEXT]
-        first[self._PREV] = root[self._NEXT] = self._map[key] = [root, first,
-                                                                 key]
-
-    def _move_last_key(self, key):
-        self._remove_key(key)
-        self._append_key(key)
-
-    def _move_front_key(self, key):
-        self._remove_key(key)
-        self._prepend_key(key)
-
-    def add_port(self, port, lldp_data):
+    def add_port(self, port, lldp_data, delay=0):
         if port not in self:
-            self._prepend_key(port)
             self[port] = PortData(port.is_down(), lldp_data)
+            self._timer.schedule(port, delay)
         else:
             self[port].is_down = port.is_down()
 
-    def lldp_sent(self, port):
+    def lldp_sent(self, port, period):
         port_data = self[port]
         port_data.lldp_sent()
-        self._move_last_key(port)
+        self._timer.schedule(port, period)
         return port_data
 
     def lldp_received(self, port):
         self[port].lldp_received()
 
+    def lldp_expired(self, now):
+        # ports whose LLDP packet is to be sent
+        return self._timer.advance(now)
+
+    def lldp_timeout(self, now):
+        return self._timer.next_timeout(now)
+
     def move_front(self, port):
         port_data = self.get(port, None)
         if port_data is not None:
             port_data.clear_timestamp()
-            self._move_front_key(port)
+            self._timer.schedule(port, 0)
 
     def set_down(self, port):
         is_down = port.is_down()
@@ -270,7 +262,7 @@ class PortDataState(dict):
         port_data.set_down(is_down)
         port_data.clear_timestamp()
         if not is_down:
-            self._move_front_key(port)
+            self._timer.schedule(port, 0)
         return is_down
 
     def get_port(self, port):
@@ -278,38 +270,26 @@ class PortDataState(dict):
 
     def del_port(self, port):
         del self[port]
-        self._remove_key(port)
-
-    def __iter__(self):
-        root = self._root
-        curr = root[self._NEXT]
-        while curr is not root:
-            yield curr[self._KEY]
-            curr = curr[self._NEXT]
+        self._timer.cancel(port)
 
     def clear(self):
-        for node in self._map.itervalues():
-            del node[:]
-        root = self._root
-        root[:] = [root, root, None]
-        self._map.clear()
+        self._timer.clear()
         dict.clear(self)
 
-    def items(self):
-        'od.items() -> list of (key, value) pairs in od'
-        return [(key, self[key]) for key in self]
-
-    def iteritems(self):
-        'od.iteritems -> an iterator over the (key, value) pairs in od'
-        for k in self:
-            yield (k, self[k])
-
 
 class LinkState(dict):
     # dict: Link class -> timestamp
-    def __init__(self):
+    # The links are also kept in a timer wheel by the time they time out
+    # so that the timed out links are found without scanning all of them.
+    def __init__(self, timeout, tick):
         super(LinkState, self).__init__()
         self._map = {}
+        self.timeout = timeout
+        self._timer = TimerWheel(tick)
+
+    def _set_timestamp(self, link, timestamp):
+        self[link] = timestamp
+        self._timer.schedule(link, self.timeout, now=timestamp)
 
     def get_peer(self, src):
         return self._map.get(src, None)
@@ -317,7 +297,7 @@ class LinkState(dict):
     def update_link(self, src, dst):
         link = Link(src, dst)
 
-        self[link] = time.time()
+        self._set_timestamp(link, time.time())
         self._map[src] = dst
 
         # return if the reverse link is also up or not
@@ -327,11 +307,21 @@ class LinkState(dict):
     def link_down(self, link):
         del self[link]
         del self._map[link.src]
+        self._timer.cancel(link)
 
     def rev_link_set_timestamp(self, rev_link, timestamp):
         # rev_link may or may not in LinkSet
         if rev_link in self:
-            self[rev_link] = timestamp
+            self._set_timestamp(rev_link, timestamp)
+
+    def expired(self, now):
+        # links which have not been seen for the timeout
+        return self._timer.advance(now)
+
+    def check_later(self, link, now, delay):
+        # check the link again after delay without updating its timestamp
+        if link in self:
+            self._timer.schedule(link, delay, now=now)
 
     def port_deleted(self, src):
         dst = self.get_peer(src)
@@ -342,8 +332,10 @@ class LinkState(dict):
         rev_link = Link(dst, src)
         del self[link]
         del self._map[src]
+        self._timer.cancel(link)
         # reverse link might not exist
         self.pop(rev_link, None)
+        self._timer.cancel(rev_link)
         rev_link_dst = self._map.pop(dst, None)
 
         return dst, rev_link_dst
@@ -359,11 +351,20 @@ class LLDPPacket(object):
     PORT_ID_STR = '!I'      # uint32_t
     PORT_ID_SIZE = 4
 
+    # offsets in the frame built by _build_lldp_packet()
+    ETH_SRC_OFFSET = 6
+    CHASSIS_ID_OFFSET = ethernet.ethernet._MIN_LEN + lldp.LLDP_TLV_SIZE + 1
+    PORT_ID_OFFSET = (CHASSIS_ID_OFFSET +
+                      len(CHASSIS_ID_FMT % dpid_to_str(0)) +
+                      lldp.LLDP_TLV_SIZE + 1)
+
+    _templates = {}     # ttl -> LLDP frame
+
     class LLDPUnknownFormat(RyuException):
         message = '%(msg)s'
 
     @staticmethod
-    def lldp_packet(dpid, port_no, dl_addr, ttl):
+    def _build_lldp_packet(dpid, port_no, dl_addr, ttl):
         pkt = packet.Packet()
 
         dst = lldp.LLDP_MAC_NEAREST_BRIDGE
@@ -392,9 +393,33 @@ class LLDPPacket(object):
         pkt.serialize()
         return pkt.data
 
+    @staticmethod
+    def lldp_packet(dpid, port_no, dl_addr, ttl):
+        # copy the template of this ttl and patch the addresses in.
+        # the chassis id has a fixed length as the dpid is zero-padded.
+        template = LLDPPacket._templates.get(ttl)
+        if template is None:
+            template = LLDPPacket._build_lldp_packet(0, 0, DONTCARE_STR, ttl)
+            LLDPPacket._templates[ttl] = template
+
+        data = bytearray(template)
+        data[LLDPPacket.ETH_SRC_OFFSET:
+             LLDPPacket.ETH_SRC_OFFSET + 6] = \
+            addrconv.mac.text_to_bin(dl_addr)
+        chassis_id = LLDPPacket.CHASSIS_ID_FMT % dpid_to_str(dpid)
+        data[LLDPPacket.CHASSIS_ID_OFFSET:
+             LLDPPacket.CHASSIS_ID_OFFSET + len(chassis_id)] = chassis_id
+        struct.pack_into(LLDPPacket.PORT_ID_STR, data,
+                         LLDPPacket.PORT_ID_OFFSET, port_no)
+        return data
+
     @staticmethod
     def lldp_parse(data):
-        pkt = packet.Packet(data)
+        # data may also be an already parsed packet, e.g. msg.packet
+        if isinstance(data, packet.Packet):
+            pkt = data
+        else:
+            pkt = packet.Packet(data)
         i = iter(pkt)
         eth_pkt = i.next()
         assert type(eth_pkt) == ethernet.ethernet
@@ -432,16 +457,26 @@ class Switches(app_manager.RyuApp):
     _EVENTS = [event.EventSwitchEnter, event.EventSwitchLeave,
                event.EventPortAdd, event.EventPortDelete,
                event.EventPortModify,
-               event.EventLinkAdd, event.EventLinkDelete]
+               event.EventLinkAdd, event.EventLinkDelete,
+               event.EventHostAdd, event.EventHostDelete,
+               event.EventHostMove]
 
     DEFAULT_TTL = 120  # unused. ignored.
     LLDP_PACKET_LEN = len(LLDPPacket.lldp_packet(0, 0, DONTCARE_STR, 0))
 
-    LLDP_SEND_GUARD = .05
+    LLDP_TIMER_TICK = .05
     LLDP_SEND_PERIOD_PER_PORT = .9
+    LLDP_SEND_RATE = 1000.    # upper limit of LLDP packets sent per second
     TIMEOUT_CHECK_PERIOD = 5.
     LINK_TIMEOUT = TIMEOUT_CHECK_PERIOD * 2
+    LINK_TIMER_TICK = .5
     LINK_LLDP_DROP = 5
+    # links restored from the snapshot are dropped if they are not seen
+    # within PROVISIONAL_LINK_TIMEOUT after both switches connected.
+    # The links of switches which don't connect within RESTORE_WAIT are
+    # forgotten.
+    PROVISIONAL_LINK_TIMEOUT = 3.
+    RESTORE_WAIT = 60.
 
     def __init__(self, *args, **kwargs):
         super(Switches, self).__init__(*args, **kwargs)
@@ -449,16 +484,34 @@ class Switches(app_manager.RyuApp):
         self.name = 'switches'
         self.dps = {}                 # datapath_id => Datapath class
         self.port_state = {}          # datapath_id => ports
-        self.ports = PortDataState()  # Port class -> PortData class
-        self.links = LinkState()      # Link class -> timestamp
+        # Port class -> PortData class
+        self.ports = PortDataState(self.LLDP_TIMER_TICK)
+        # Link class -> timestamp
+        self.links = LinkState(self.LINK_TIMEOUT, self.LINK_TIMER_TICK)
         self.is_active = True
 
+        self.snapshot = None
+        self.pending_links = {}         # dpid -> keys of restored links
+        self.provisional_links = set()  # restored links not seen yet
+
+        self.host_discovery = self.CONF.observe_hosts
+        if self.host_discovery and not self.CONF.observe_links:
+            # without the links, the ports between the switches can't be
+            # told from the edge ports the hosts are attached to
+            LOG.warning('observe-hosts requires observe-links, '
+                        'host discovery is disabled')
+            self.host_discovery = False
+        self.hosts = HostTable(self.CONF.host_table_size,
+                               self.CONF.host_max_age)
+
         self.link_discovery = self.CONF.observe_links
         if self.link_discovery:
             self.install_flow = self.CONF.install_lldp_flow
             self.explicit_drop = self.CONF.explicit_drop
             self.lldp_event = hub.Event()
             self.link_event = hub.Event()
+            if self.CONF.topology_snapshot:
+                self._load_snapshot(self.CONF.topology_snapshot)
             self.threads.append(hub.spawn(self.lldp_loop))
             self.threads.append(hub.spawn(self.link_loop))
 
@@ -468,6 +521,122 @@ class Switches(app_manager.RyuApp):
             self.lldp_event.set()
             self.link_event.set()
             hub.joinall(self.threads)
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+    def _load_snapshot(self, path):
+        self.snapshot = TopologySnapshot(path)
+        for key in self.snapshot.load():
+            self.pending_links.setdefault(key[0], set()).add(key)
+            self.pending_links.setdefault(key[2], set()).add(key)
+        self.restore_deadline = time.time() + self.RESTORE_WAIT
+
+    def _restore_links(self, dpid):
+        # The links of the snapshot between this switch and the already
+        # connected ones are added as provisional and probed at once.
+        expire = time.time() - self.LINK_TIMEOUT + \
+            self.PROVISIONAL_LINK_TIMEOUT
+        for key in self.pending_links.pop(dpid, ()):
+            src = self._get_port(key[0], key[1])
+            dst = self._get_port(key[2], key[3])
+            if src is None or dst is None:
+                # wait for the other switch or forget a stale link
+                continue
+            peer_dpid = key[2] if key[0] == dpid else key[0]
+            self.pending_links.get(peer_dpid, set()).discard(key)
+
+            link = Link(src, dst)
+            if (src not in self.ports or dst not in self.ports or
+                    link in self.links):
+                continue
+            self.links.update_link(src, dst)
+            self.links.rev_link_set_timestamp(link, expire)
+            self.provisional_links.add(link)
+            self._link_added(link)
+            self.ports.move_front(src)
+
+    def _expire_pending_links(self, now):
+        if not self.pending_links or now < self.restore_deadline:
+            return
+        for keys in self.pending_links.values():
+            for key in keys:
+                self.snapshot.remove_link(key)
+        self.pending_links = {}
+
+    def _link_added(self, link):
+        self.send_event_to_observers(event.EventLinkAdd(link))
+        # the ports of a link are not edge ports any more
+        self._hosts_deleted(self.hosts.remove_port(link.src.dpid,
+                                                   link.src.port_no))
+        self._hosts_deleted(self.hosts.remove_port(link.dst.dpid,
+                                                   link.dst.port_no))
+        if self.snapshot is not None:
+            self.snapshot.add_link(link_key(link))
+
+    def _link_deleted(self, link):
+        self.provisional_links.discard(link)
+        self.send_event_to_observers(event.EventLinkDelete(link))
+        if self.snapshot is not None:
+            self.snapshot.remove_link(link_key(link))
+
+    def _hosts_deleted(self, hosts):
+        for host in hosts:
+            self.send_event_to_observers(event.EventHostDelete(host))
+
+    def _is_edge_port(self, dpid, port_no):
+        ofpport = self.port_state[dpid].get(port_no)
+        if ofpport is None:
+            return False
+        port = Port(dpid, self.dps[dpid].ofproto, ofpport)
+        return not port.is_reserved() and self.links.get_peer(port) is None
+
+    def _learn_host(self, msg, port_no):
+        dpid = msg.datapath.id
+        if not self._is_edge_port(dpid, port_no):
+            return
+        pkt = msg.packet
+        eth = pkt.get_protocol(ethernet.ethernet)
+        if eth is None or int(eth.src[:2], 16) & 1:
+            # multicast source
+            return
+        if pkt.get_protocol(lldp.lldp) is not None:
+            return
+        ip_v4 = None
+        ip_v6 = None
+        arp_pkt = pkt.get_protocol(arp.arp)
+        if arp_pkt is not None:
+            ip_v4 = arp_pkt.src_ip
+        else:
+            ip_pkt = pkt.get_protocol(ipv4.ipv4)
+            if ip_pkt is not None:
+                ip_v4 = ip_pkt.src
+            else:
+                ip_pkt = pkt.get_protocol(ipv6.ipv6)
+                if ip_pkt is None:
+                    return
+                icmp = pkt.get_protocol(icmpv6.icmpv6)
+                if icmp is not None and icmp.type_ in (
+                        icmpv6.ND_NEIGHBOR_SOLICIT,
+                        icmpv6.ND_NEIGHBOR_ADVERT):
+                    ip_v6 = ip_pkt.src
+        if ip_v4 == '0.0.0.0':
+            # e.g. ARP probe, DHCP discover
+            ip_v4 = None
+        if ip_v6 == '::':
+            # duplicate address detection
+            ip_v6 = None
+
+        vlan_pkt = pkt.get_protocol(vlan.vlan)
+        vid = vlan_pkt.vid if vlan_pkt is not None else 0
+
+        host, added, moved_from, removed = self.hosts.learn(
+            eth.src, vid, dpid, port_no, ip_v4, ip_v6)
+        self._hosts_deleted(removed)
+        if added:
+            self.send_event_to_observers(event.EventHostAdd(host))
+        elif moved_from is not None:
+            self.send_event_to_observers(
+                event.EventHostMove(host, moved_from[0], moved_from[1]))
 
     def _register(self, dp):
         assert dp.id is not None
@@ -497,10 +666,20 @@ class Switches(app_manager.RyuApp):
                 if p.port_no == port_no:
                     return p
 
+    def _lldp_period(self):
+        # The more switches (and so ports) there are, the longer the
+        # period gets so that the LLDP packets are sent at no more
+        # than LLDP_SEND_RATE.
+        return max(self.LLDP_SEND_PERIOD_PER_PORT,
+                   len(self.ports) / self.LLDP_SEND_RATE)
+
     def _port_added(self, port):
         lldp_data = LLDPPacket.lldp_packet(
             port.dpid, port.port_no, port.hw_addr, self.DEFAULT_TTL)
-        self.ports.add_port(port, lldp_data)
+        # spread the ports over the period, the phase is then kept as
+        # each port is rescheduled one period after it was sent.
+        delay = random.uniform(0, self._lldp_period())
+        self.ports.add_port(port, lldp_data, delay)
         # LOG.debug('_port_added dpid=%s, port_no=%s, live=%s',
         #           port.dpid, port.port_no, port.is_live())
 
@@ -512,10 +691,10 @@ class Switches(app_manager.RyuApp):
             #           port, self.links.get_peer(port))
             return
         link = Link(port, dst)
-        self.send_event_to_observers(event.EventLinkDelete(link))
+        self._link_deleted(link)
         if rev_link_dst:
             rev_link = Link(dst, rev_link_dst)
-            self.send_event_to_observers(event.EventLinkDelete(rev_link))
+            self._link_deleted(rev_link)
         self.ports.move_front(dst)
 
     @set_ev_cls(ofp_event.EventOFPStateChange,
@@ -584,6 +763,7 @@ class Switches(app_manager.RyuApp):
                 for port in switch.ports:
                     if not port.is_reserved():
                         self._port_added(port)
+                self._restore_links(dp.id)
 
             self.lldp_event.set()
 
@@ -595,6 +775,9 @@ class Switches(app_manager.RyuApp):
             self._unregister(dp)
             LOG.debug('unregister %s', switch)
             self.send_event_to_observers(event.EventSwitchLeave(switch))
+            for port in switch.ports:
+                self._hosts_deleted(self.hosts.remove_port(port.dpid,
+                                                           port.port_no))
 
             if not self.link_discovery:
                 return
@@ -635,6 +818,8 @@ class Switches(app_manager.RyuApp):
             self.port_state[dp.id].remove(ofpport.port_no)
             self.send_event_to_observers(
                 event.EventPortDelete(Port(dp.id, dp.ofproto, ofpport)))
+            self._hosts_deleted(self.hosts.remove_port(dp.id,
+                                                       ofpport.port_no))
 
             if not self.link_discovery:
                 return
@@ -681,25 +866,31 @@ class Switches(app_manager.RyuApp):
 
     @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
     def packet_in_handler(self, ev):
-        if not self.link_discovery:
+        if not self.link_discovery and not self.host_discovery:
             return
 
         msg = ev.msg
-        try:
-            src_dpid, src_port_no = LLDPPacket.lldp_parse(msg.data)
-        except LLDPPacket.LLDPUnknownFormat as e:
-            # This handler can receive all the packtes which can be
-            # not-LLDP packet. Ignore it silently
-            return
-
         dst_dpid = msg.datapath.id
         if msg.datapath.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
             dst_port_no = msg.in_port
         elif msg.datapath.ofproto.OFP_VERSION >= ofproto_v1_2.OFP_VERSION:
             dst_port_no = msg.match['in_port']
         else:
-            LOG.error('cannot accept LLDP. unsupported version. %x',
+            LOG.error('cannot accept packet in. unsupported version. %x',
                       msg.datapath.ofproto.OFP_VERSION)
+            return
+
+        try:
+            src_dpid, src_port_no = LLDPPacket.lldp_parse(msg.packet)
+        except LLDPPacket.LLDPUnknownFormat as e:
+            # This handler can receive all the packtes which can be
+            # not-LLDP packet.
+            if self.host_discovery and dst_dpid in self.dps:
+                self._learn_host(msg, dst_port_no)
+            return
+
+        if not self.link_discovery:
+            return
 
         src = self._get_port(src_dpid, src_port_no)
         if not src or src.dpid == dst_dpid:
@@ -724,11 +915,12 @@ class Switches(app_manager.RyuApp):
         # LOG.debug("  old_peer=%s", old_peer)
         if old_peer and old_peer != dst:
             old_link = Link(src, old_peer)
-            self.send_event_to_observers(event.EventLinkDelete(old_link))
+            self._link_deleted(old_link)
 
         link = Link(src, dst)
         if link not in self.links:
-            self.send_event_to_observers(event.EventLinkAdd(link))
+            self._link_added(link)
+        self.provisional_links.discard(link)
 
         if not self.links.update_link(src, dst):
             # reverse link is not detected yet.
@@ -738,101 +930,107 @@ class Switches(app_manager.RyuApp):
         if self.explicit_drop:
             self._drop_packet(msg)
 
-    def send_lldp_packet(self, port):
-        try:
-            port_data = self.ports.lldp_sent(port)
-        except KeyError as e:
-            # ports can be modified during our sleep in self.lldp_loop()
-            # LOG.debug('send_lldp: KeyError %s', e)
-            return
-        if port_data.is_down:
-            return
-
-        dp = self.dps.get(port.dpid, None)
-        if dp is None:
-            # datapath was already deleted
-            return
-
-        # LOG.debug('lldp sent dpid=%s, port_no=%d', dp.id, port.port_no)
+    @staticmethod
+    def _lldp_packet_out(dp, port_no, data):
         # TODO:XXX
+        actions = [dp.ofproto_parser.OFPActionOutput(port_no)]
         if dp.ofproto.OFP_VERSION == ofproto_v1_0.OFP_VERSION:
-            actions = [dp.ofproto_parser.OFPActionOutput(port.port_no)]
-            dp.send_packet_out(actions=actions, data=port_data.lldp_data)
+            return dp.ofproto_parser.OFPPacketOut(
+                datapath=dp, in_port=dp.ofproto.OFPP_NONE,
+                buffer_id=dp.ofproto.OFP_NO_BUFFER, actions=actions,
+                data=data)
         elif dp.ofproto.OFP_VERSION >= ofproto_v1_2.OFP_VERSION:
-            actions = [dp.ofproto_parser.OFPActionOutput(port.port_no)]
-            out = dp.ofproto_parser.OFPPacketOut(
+            return dp.ofproto_parser.OFPPacketOut(
                 datapath=dp, in_port=dp.ofproto.OFPP_CONTROLLER,
                 buffer_id=dp.ofproto.OFP_NO_BUFFER, actions=actions,
-                data=port_data.lldp_data)
-            dp.send_msg(out)
+                data=data)
         else:
             LOG.error('cannot send lldp packet. unsupported version. %x',
                       dp.ofproto.OFP_VERSION)
 
+    def send_lldp_packets(self, ports):
+        # The packets to the same datapath are sent in one write.
+        period = self._lldp_period()
+        outs = {}
+        for port in ports:
+            try:
+                port_data = self.ports.lldp_sent(port, period)
+            except KeyError as e:
+                # ports can be deleted while the packets are sent
+                # LOG.debug('send_lldp: KeyError %s', e)
+                continue
+            if port_data.is_down:
+                continue
+
+            dp = self.dps.get(port.dpid, None)
+            if dp is None:
+                # datapath was already deleted
+                continue
+
+            # LOG.debug('lldp sent dpid=%s, port_no=%d', dp.id, port.port_no)
+            out = self._lldp_packet_out(dp, port.port_no, port_data.lldp_data)
+            if out is not None:
+                outs.setdefault(dp, []).append(out)
+
+        for dp, msgs in outs.items():
+            dp.send_msgs(msgs)
+
+    def send_lldp_packet(self, port):
+        self.send_lldp_packets([port])
+
     def lldp_loop(self):
         while self.is_active:
             self.lldp_event.clear()
 
-            now = time.time()
-            timeout = None
-            ports_now = []
-            ports = []
-            for (key, data) in self.ports.items():
-                if data.timestamp is None:
-                    ports_now.append(key)
-                    continue
-
-                expire = data.timestamp + self.LLDP_SEND_PERIOD_PER_PORT
-                if expire <= now:
-                    ports.append(key)
-                    continue
-
-                timeout = expire - now
-                break
+            self.send_lldp_packets(self.ports.lldp_expired(time.time()))
 
-            for port in ports_now:
-                self.send_lldp_packet(port)
-            for port in ports:
-                self.send_lldp_packet(port)
-                hub.sleep(self.LLDP_SEND_GUARD)      # don't burst
-
-            if timeout is not None and ports:
-                timeout = 0     # We have already slept
+            timeout = self.ports.lldp_timeout(time.time())
             # LOG.debug('lldp sleep %s', timeout)
             self.lldp_event.wait(timeout=timeout)
 
+    def check_links(self, now):
+        # Only the links which timed out are looked at.  The links are
+        # brought down together before the events are sent.
+        deleted = []
+        self._expire_pending_links(now)
+        for link in self.links.expired(now):
+            if link in self.provisional_links:
+                # restored from the snapshot and not confirmed
+                deleted.append(link)
+                continue
+            src = link.src
+            if src in self.ports:
+                port_data = self.ports.get_port(src)
+                # LOG.debug('port_data %s', port_data)
+                if port_data.lldp_dropped() > self.LINK_LLDP_DROP:
+                    deleted.append(link)
+                    continue
+            self.links.check_later(link, now, self.TIMEOUT_CHECK_PERIOD)
+
+        for link in deleted:
+            self.links.link_down(link)
+            # LOG.debug('delete %s', link)
+        for link in deleted:
+            self._link_deleted(link)
+
+        deleted_set = set(deleted)
+        expire = now - self.LINK_TIMEOUT
+        for link in deleted:
+            dst = link.dst
+            rev_link = Link(dst, link.src)
+            if rev_link not in deleted_set:
+                # It is very likely that the reverse link is also
+                # disconnected. Check it early.
+                self.links.rev_link_set_timestamp(rev_link, expire)
+                if dst in self.ports:
+                    self.ports.move_front(dst)
+                    self.lldp_event.set()
+        return deleted
+
     def link_loop(self):
         while self.is_active:
             self.link_event.clear()
-
-            now = time.time()
-            deleted = []
-            for (link, timestamp) in self.links.items():
-                # LOG.debug('%s timestamp %d (now %d)', link, timestamp, now)
-                if timestamp + self.LINK_TIMEOUT < now:
-                    src = link.src
-                    if src in self.ports:
-                        port_data = self.ports.get_port(src)
-                        # LOG.debug('port_data %s', port_data)
-                        if port_data.lldp_dropped() > self.LINK_LLDP_DROP:
-                            deleted.append(link)
-
-            for link in deleted:
-                self.links.link_down(link)
-                # LOG.debug('delete %s', link)
-                self.send_event_to_observers(event.EventLinkDelete(link))
-
-                dst = link.dst
-                rev_link = Link(dst, link.src)
-                if rev_link not in deleted:
-                    # It is very likely that the reverse link is also
-                    # disconnected. Check it early.
-                    expire = now - self.LINK_TIMEOUT
-                    self.links.rev_link_set_timestamp(rev_link, expire)
-                    if dst in self.ports:
-                        self.ports.move_front(dst)
-                        self.lldp_event.set()
-
+            self.check_links(time.time())
             self.link_event.wait(timeout=self.TIMEOUT_CHECK_PERIOD)
 
     @set_ev_cls(event.EventSwitchRequest)
@@ -851,6 +1049,25 @@ class Switches(app_manager.RyuApp):
         rep = event.EventSwitchReply(req.src, switches)
         self.reply_to_request(req, rep)
 
+    @set_ev_cls(event.EventHostRequest)
+    def host_request_handler(self, req):
+        # LOG.debug(req)
+        self._hosts_deleted(self.hosts.expire(time.time()))
+
+        if req.mac is not None:
+            hosts = self.hosts.get_by_mac(req.mac)
+        elif req.ip is not None:
+            host = self.hosts.get_by_ip(req.ip)
+            hosts = [host] if host is not None else []
+        elif req.dpid is not None:
+            hosts = self.hosts.get_by_dpid(req.dpid)
+        else:
+            hosts = list(self.hosts)
+        if req.dpid is not None:
+            hosts = [host for host in hosts if host.dpid == req.dpid]
+        rep = event.EventHostReply(req.src, req.dpid, hosts)
+        self.reply_to_request(req, rep)
+
     @set_ev_cls(event.EventLinkRequest)
     def link_request_handler(self, req):
         # LOG.debug(req)